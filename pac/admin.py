@@ -1,20 +1,68 @@
 from django.contrib import admin
-from .models import AIMInicial, PACProgramado, PACEjecutadoCompromiso, PACEjecutadoPago, CargaArchivo, FuenteFinanciacion
+from django.http import FileResponse
+from django.shortcuts import get_object_or_404
+from django.urls import path, reverse
+from django.utils.html import format_html
+
+from . import alertas
+from .models import (
+    AIMInicial, PACProgramado, PACEjecutadoCompromiso, PACEjecutadoPago, CargaArchivo, FuenteFinanciacion,
+    TrabajoExportacion, PerfilRequest, BloqueoImportacion, Alerta, IndiceRubro, ResumenRubro, VersionDatos,
+)
 
 
 @admin.register(FuenteFinanciacion)
 class FuenteFinanciacionAdmin(admin.ModelAdmin):
+    """
+    Como las vistas de fuentes, reevalua las alertas de la fuente al guardarla o borrarla: el presupuesto
+    asignado cambia la regla de sobrecompromiso (de su nombre y vigencia anteriores y de los nuevos).
+    """
     list_display = ['codigo', 'nombre', 'presupuesto_asignado', 'vigencia', 'activa']
     list_filter = ['vigencia', 'activa']
     search_fields = ['nombre', 'codigo']
 
+    def save_model(self, request, obj, form, change):
+        anterior = FuenteFinanciacion.objects.filter(pk=obj.pk).values_list('vigencia', 'nombre').first()
+        super().save_model(request, obj, form, change)
+        if anterior and anterior != (obj.vigencia, obj.nombre):
+            alertas.evaluar(anterior[0], fuentes=[anterior[1]])
+        alertas.evaluar(obj.vigencia, fuentes=[obj.nombre])
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        alertas.evaluar(obj.vigencia, fuentes=[obj.nombre])
+
+    def delete_queryset(self, request, queryset):
+        por_vigencia = {}
+        for vigencia, nombre in queryset.values_list('vigencia', 'nombre'):
+            por_vigencia.setdefault(vigencia, []).append(nombre)
+        super().delete_queryset(request, queryset)
+        for vigencia, nombres in por_vigencia.items():
+            # queryset.delete() no pasa por FuenteFinanciacion.delete(): la version de los datos se incrementa aqui
+            VersionDatos.incrementar(vigencia)
+            alertas.evaluar(vigencia, fuentes=nombres)
+
 
 class PACBaseAdmin(admin.ModelAdmin):
+    """
+    Solo lectura: los datos se cambian importando el Excel, que mantiene en la misma transaccion los valores
+    mensuales, el resumen por rubro, el indice de busqueda y las alertas. Guardar o borrar un registro aqui
+    dejaria esas tablas desactualizadas.
+    """
     list_display = ['vigencia', 'tipo', 'categoria', 'codigo_rubro', 'nombre_rubro',
                     'apropiacion_definitiva', 'total', 'es_subtotal']
     list_filter = ['vigencia', 'tipo', 'categoria', 'es_subtotal']
     search_fields = ['codigo_rubro', 'nombre_rubro']
 
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
 
 @admin.register(AIMInicial)
 class AIMInicialAdmin(PACBaseAdmin):
@@ -38,5 +86,106 @@ class PACEjecutadoPagoAdmin(PACBaseAdmin):
 
 @admin.register(CargaArchivo)
 class CargaArchivoAdmin(admin.ModelAdmin):
-    list_display = ['tipo', 'fecha_carga', 'usuario', 'registros_cargados']
+    list_display = ['tipo', 'fecha_carga', 'usuario', 'registros_cargados', 'hoja', 'tiempo_total_ms',
+                    'filas_por_segundo', 'memoria_pico_kb']
     list_filter = ['tipo', 'fecha_carga']
+    fieldsets = [
+        (None, {'fields': ['tipo', 'archivo', 'usuario', 'registros_cargados', 'observaciones']}),
+        ('Rendimiento de la importacion', {'fields': [
+            'hoja', 'tiempo_lectura_ms', 'tiempo_clasificacion_ms', 'tiempo_conversion_ms',
+            'tiempo_eliminacion_ms', 'tiempo_insercion_ms', 'tiempo_total_ms', 'memoria_pico_kb',
+            'filas_por_segundo', 'filas_omitidas',
+        ]}),
+    ]
+    readonly_fields = [
+        'hoja', 'tiempo_lectura_ms', 'tiempo_clasificacion_ms', 'tiempo_conversion_ms', 'tiempo_eliminacion_ms',
+        'tiempo_insercion_ms', 'tiempo_total_ms', 'memoria_pico_kb', 'filas_por_segundo', 'filas_omitidas',
+    ]
+
+
+@admin.register(TrabajoExportacion)
+class TrabajoExportacionAdmin(admin.ModelAdmin):
+    list_display = ['tipo', 'modulo', 'formato', 'vigencia', 'estado', 'usuario', 'fecha_solicitud', 'fecha_fin']
+    list_filter = ['tipo', 'estado', 'vigencia']
+    readonly_fields = ['clave', 'error', 'fecha_solicitud', 'fecha_inicio', 'latido', 'fecha_fin']
+
+
+@admin.register(BloqueoImportacion)
+class BloqueoImportacionAdmin(admin.ModelAdmin):
+    """Cargas en curso; un bloqueo de un proceso caido se puede borrar aqui antes de que venza."""
+    list_display = ['modulo', 'vigencia', 'usuario', 'fecha']
+    readonly_fields = ['modulo', 'vigencia', 'usuario', 'fecha']
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(ResumenRubro)
+class ResumenRubroAdmin(admin.ModelAdmin):
+    """Resumen por rubro; lo mantienen las importaciones y el comando resumir_rubros."""
+    list_display = ['vigencia', 'tipo', 'categoria', 'codigo_rubro', 'nombre_rubro', 'fuente_financiacion',
+                    'prog_total', 'comp_total', 'pago_total']
+    list_filter = ['vigencia', 'tipo', 'categoria', 'en_aim', 'en_programado', 'en_compromisos', 'en_pagos']
+    search_fields = ['codigo_rubro', 'nombre_rubro']
+    readonly_fields = [f.name for f in ResumenRubro._meta.fields if f.name != 'id']
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(Alerta)
+class AlertaAdmin(admin.ModelAdmin):
+    """Alertas generadas por el motor de alertas al importar; se recalculan en cada carga."""
+    list_display = ['vigencia', 'nivel', 'regla', 'fuente_financiacion', 'codigo_rubro', 'mes', 'porcentaje', 'mensaje']
+    list_filter = ['vigencia', 'nivel', 'regla']
+    search_fields = ['fuente_financiacion', 'codigo_rubro']
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(PerfilRequest)
+class PerfilRequestAdmin(admin.ModelAdmin):
+    """Perfiles ordenados del mas lento al mas rapido, con descarga en formato pstats."""
+    list_display = ['url', 'vista', 'usuario', 'fecha', 'duracion_ms', 'consultas', 'memoria_pico_kb', 'descargar']
+    list_filter = ['vista', 'fecha']
+    search_fields = ['url', 'vista']
+    ordering = ['-duracion_ms']
+    readonly_fields = [f.name for f in PerfilRequest._meta.fields if f.name != 'id'] + ['descargar']
+
+    def has_add_permission(self, request):
+        return False
+
+    def get_urls(self):
+        return [
+            path('<int:pk>/descargar/', self.admin_site.admin_view(self.descargar_perfil),
+                 name='pac_perfilrequest_descargar'),
+        ] + super().get_urls()
+
+    def descargar_perfil(self, request, pk):
+        perfil = get_object_or_404(PerfilRequest, pk=pk)
+        return FileResponse(perfil.archivo.open('rb'), as_attachment=True, filename=f'perfil_{pk}.pstats')
+
+    @admin.display(description='Perfil')
+    def descargar(self, obj):
+        return format_html('<a href="{}">pstats</a>', reverse('admin:pac_perfilrequest_descargar', args=[obj.pk]))
+
+    def delete_model(self, request, obj):
+        obj.archivo.delete(save=False)
+        super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        for obj in queryset:
+            obj.archivo.delete(save=False)
+        super().delete_queryset(request, queryset)
+
+
+@admin.register(IndiceRubro)
+class IndiceRubroAdmin(admin.ModelAdmin):
+    """Indice de busqueda de rubros; lo mantienen las importaciones y el comando indexar_rubros."""
+    list_display = ['vigencia', 'modulo', 'codigo_rubro', 'nombre_rubro', 'bpin', 'numero_rp', 'total']
+    list_filter = ['vigencia', 'modulo', 'tipo', 'es_subtotal']
+    readonly_fields = [f.name for f in IndiceRubro._meta.fields if f.name != 'id']
+
+    def has_add_permission(self, request):
+        return False
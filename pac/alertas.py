@@ -0,0 +1,285 @@
+"""
+Motor de alertas de desviacion.
+
+Se ejecuta al terminar cada importacion (utils.importar_excel_pac) y solo
+sobre lo que esa carga cambio: antes de escribir se toma la huella de los
+rubros del modulo y se compara con los registros nuevos; los rubros
+(tipo, fuente, codigo sin sufijo RP) cuyos valores cambiaron, y sus
+fuentes, son los unicos que se reevaluan. Si la carga cambia el ultimo mes
+con pagos de la vigencia, se reevalua toda la vigencia (las reglas de
+ejecucion acumulan hasta ese mes).
+
+Reglas (umbrales en settings, PAC_ALERTA_*):
+- EJECUCION_BAJA: pagos (gastos) o recaudo (ingresos) acumulados hasta el
+  ultimo mes ejecutado por debajo de un porcentaje del programado.
+- SOBRECOMPROMISO: compromisos de un rubro por encima de su apropiacion
+  definitiva, o de una fuente por encima de su presupuesto_asignado.
+- SALDO_NEGATIVO: recaudo menos pagos acumulado de una fuente negativo al
+  cierre de un mes ejecutado.
+- SALTO_MENSUAL: compromisos o pagos de un mes varias veces los del mes
+  anterior.
+
+Las alertas se guardan en el modelo Alerta; el dashboard solo las lee.
+La migracion 0008 no las calcula: el despliegue (docker-compose.yml) corre
+evaluar_alertas despues de migrate, lo que tambien aplica los umbrales
+nuevos a las vigencias ya cargadas.
+"""
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import BigIntegerField, Max, Sum
+from django.db.models.functions import Cast
+
+from .centavos import a_centavos, de_centavos
+from .models import (
+    AIMInicial, Alerta, FuenteFinanciacion, PACEjecutadoCompromiso, PACEjecutadoPago, PACProgramado,
+    PACValorMensual, MESES, MESES_DISPLAY, codigo_base,
+)
+
+
+def _umbral(nombre, defecto):
+    return getattr(settings, f'PAC_ALERTA_{nombre}', defecto)
+
+
+# ============================================================
+# RUBROS CAMBIADOS POR UNA CARGA
+# ============================================================
+def _llave(tipo, fuente, codigo):
+    return tipo, fuente, codigo_base(codigo)
+
+
+def huella(modelo_class, vigencia):
+    """{(tipo, fuente, codigo base): valores} de los registros actuales del modulo, para comparar con una carga."""
+    campos = ['apropiacion_definitiva_centavos'] + MESES
+    filas = (
+        modelo_class.objects.filter(vigencia=vigencia, es_subtotal=False)
+        .values_list('tipo', 'fuente_financiacion', 'codigo_rubro', *campos).order_by()
+    )
+    resultado = {}
+    for tipo, fuente, codigo, *valores in filas:
+        resultado.setdefault(_llave(tipo, fuente, codigo), []).append(tuple(a_centavos(v) for v in valores))
+    return {llave: sorted(valores) for llave, valores in resultado.items()}
+
+
+def huella_registros(registros):
+    """huella() de registros aun no guardados (normalizados)."""
+    resultado = {}
+    for r in registros:
+        if r.es_subtotal:
+            continue
+        valores = [r.apropiacion_definitiva_centavos] + r.get_valores_mensuales()
+        resultado.setdefault(_llave(r.tipo, r.fuente_financiacion, r.codigo_rubro), []).append(
+            tuple(a_centavos(v) for v in valores)
+        )
+    return {llave: sorted(valores) for llave, valores in resultado.items()}
+
+
+def cambios(antes, despues):
+    """Rubros cuyos valores difieren entre dos huellas (incluye los que aparecen o desaparecen)."""
+    return {llave for llave in antes.keys() | despues.keys() if antes.get(llave) != despues.get(llave)}
+
+
+def mes_corte(vigencia):
+    """Ultimo mes con pagos o recaudo registrados en la vigencia (0 = sin ejecucion)."""
+    return PACValorMensual.objects.filter(
+        vigencia=vigencia, modulo=PACEjecutadoPago.MODULO, es_subtotal=False,
+    ).aggregate(m=Max('mes'))['m'] or 0
+
+
+# ============================================================
+# EVALUACION
+# ============================================================
+def evaluar(vigencia, rubros=None, fuentes=()):
+    """
+    Recalcula las alertas de la vigencia para `rubros` ({(tipo, fuente, codigo base)}) y sus fuentes, mas
+    las `fuentes` indicadas completas. rubros=None evalua toda la vigencia. Retorna las alertas creadas.
+    """
+    todo = rubros is None
+    rubros = set(rubros or ())
+    completas = set(fuentes)
+    fuentes = completas | {fuente for _, fuente, _ in rubros}
+    if not todo and not fuentes:
+        return []
+
+    datos = _datos(vigencia, None if todo else fuentes)
+    # Rubros a evaluar: los cambiados y todos los de las fuentes completas
+    evaluar_fila = np.array(
+        [todo or llave in rubros or llave[1] in completas for llave in datos['llaves']], dtype=bool,
+    ).reshape(-1)
+    nuevas = (
+        _reglas_rubros(vigencia, datos, evaluar_fila)
+        + _reglas_fuentes(vigencia, datos, datos['fuentes'] if todo else sorted(fuentes))
+    )
+
+    existentes = Alerta.objects.filter(vigencia=vigencia)
+    if not todo:
+        existentes = existentes.filter(fuente_financiacion__in=fuentes)
+    obsoletas = [
+        pk for pk, tipo, fuente, codigo in existentes.values_list('pk', 'tipo', 'fuente_financiacion', 'codigo_rubro')
+        if todo or not codigo or (tipo, fuente, codigo) in rubros or fuente in completas
+    ]
+    with transaction.atomic():
+        for inicio in range(0, len(obsoletas), 500):
+            Alerta.objects.filter(pk__in=obsoletas[inicio:inicio + 500]).delete()
+        Alerta.objects.bulk_create(nuevas, batch_size=500)
+    return nuevas
+
+
+def _datos(vigencia, fuentes):
+    """
+    Matrices (rubros, 12) en centavos de programado, compromisos y pagos por (tipo, fuente, codigo base),
+    apropiacion definitiva por rubro y presupuesto asignado por fuente. fuentes=None lee toda la vigencia.
+    """
+    filtro = {'vigencia': vigencia, 'es_subtotal': False}
+    if fuentes is not None:
+        filtro['fuente_financiacion__in'] = sorted(fuentes)
+    modulos = [PACProgramado.MODULO, PACEjecutadoCompromiso.MODULO, PACEjecutadoPago.MODULO]
+    filas = list(
+        PACValorMensual.objects.filter(modulo__in=modulos, **filtro)
+        .values('modulo', 'tipo', 'fuente_financiacion', 'codigo_rubro', 'mes')
+        .annotate(c=Cast(Sum('valor_centavos'), BigIntegerField())).order_by()
+        .values_list('modulo', 'tipo', 'fuente_financiacion', 'codigo_rubro', 'mes', 'c')
+    )
+    apropiaciones = list(
+        AIMInicial.objects.filter(**filtro)
+        .values_list('tipo', 'fuente_financiacion', 'codigo_rubro', 'apropiacion_definitiva_centavos')
+    )
+
+    indice = {}
+    for _, tipo, fuente, codigo, *_ in filas:
+        indice.setdefault(_llave(tipo, fuente, codigo), len(indice))
+    for tipo, fuente, codigo, _ in apropiaciones:
+        indice.setdefault(_llave(tipo, fuente, codigo), len(indice))
+
+    matrices = {modulo: np.zeros((len(indice), len(MESES)), dtype=np.int64) for modulo in modulos}
+    for modulo, tipo, fuente, codigo, mes, c in filas:
+        # Varias filas RP de un mismo rubro se acumulan en su codigo base
+        matrices[modulo][indice[_llave(tipo, fuente, codigo)], mes - 1] += c or 0
+    apropiacion = np.zeros(len(indice), dtype=np.int64)
+    for tipo, fuente, codigo, valor in apropiaciones:
+        apropiacion[indice[_llave(tipo, fuente, codigo)]] += a_centavos(valor)
+
+    llaves = list(indice)
+    nombres = sorted({fuente for _, fuente, _ in llaves})
+    presupuestos = FuenteFinanciacion.objects.filter(vigencia=vigencia)
+    if fuentes is not None:
+        presupuestos = presupuestos.filter(nombre__in=sorted(fuentes))
+    return {
+        'llaves': llaves, 'fuentes': nombres,
+        'tipo': np.array([t for t, _, _ in llaves], dtype=str),
+        'fuente': np.array([f for _, f, _ in llaves], dtype=str),
+        'programado': matrices[PACProgramado.MODULO],
+        'compromisos': matrices[PACEjecutadoCompromiso.MODULO],
+        'pagos': matrices[PACEjecutadoPago.MODULO],
+        'apropiacion': apropiacion,
+        'presupuestos': {nombre: a_centavos(valor) for nombre, valor in presupuestos.values_list('nombre', 'presupuesto_asignado')},
+        'corte': mes_corte(vigencia),
+    }
+
+
+def _alerta(vigencia, regla, nivel, llave, mensaje, valor, referencia, modulo='', mes=None):
+    tipo, fuente, codigo = llave
+    return Alerta(
+        vigencia=vigencia, regla=regla, nivel=nivel, modulo=modulo, tipo=tipo, fuente_financiacion=fuente,
+        codigo_rubro=codigo, mes=mes, valor=de_centavos(valor), referencia=de_centavos(referencia),
+        porcentaje=round(valor / referencia * 100, 1) if referencia else None, mensaje=mensaje[:300],
+    )
+
+
+def _reglas_rubros(vigencia, datos, evaluar_fila):
+    alertas = []
+    minimo = a_centavos(_umbral('MONTO_MINIMO', 1000000))
+    corte = datos['corte']
+    es_gasto = datos['tipo'] == 'GASTO'
+
+    # Ejecucion acumulada hasta el corte contra lo programado
+    if corte:
+        programado = datos['programado'][:, :corte].sum(axis=1)
+        pagado = datos['pagos'][:, :corte].sum(axis=1)
+        pct = np.divide(pagado * 100.0, programado, out=np.full(len(programado), np.inf), where=programado > 0)
+        minima, critica = _umbral('EJECUCION_MINIMA', 50), _umbral('EJECUCION_CRITICA', 25)
+        for i in np.flatnonzero(evaluar_fila & (programado >= minimo) & (pct < minima)):
+            que = 'Pagos acumulados' if es_gasto[i] else 'Recaudo acumulado'
+            alertas.append(_alerta(
+                vigencia, 'EJECUCION_BAJA', 'CRITICA' if pct[i] < critica else 'ADVERTENCIA', datos['llaves'][i],
+                f'{que} a {MESES_DISPLAY[corte - 1]} en {pct[i]:.1f}% de lo programado',
+                pagado[i], programado[i], modulo=PACEjecutadoPago.MODULO, mes=corte,
+            ))
+
+    # Compromisos por encima de la apropiacion definitiva del rubro
+    comprometido = datos['compromisos'].sum(axis=1)
+    apropiacion = datos['apropiacion']
+    for i in np.flatnonzero(evaluar_fila & es_gasto & (apropiacion > 0) & (comprometido > apropiacion)):
+        alertas.append(_alerta(
+            vigencia, 'SOBRECOMPROMISO', 'CRITICA', datos['llaves'][i],
+            'Compromisos superan la apropiacion definitiva del rubro',
+            comprometido[i], apropiacion[i], modulo=PACEjecutadoCompromiso.MODULO,
+        ))
+
+    # Saltos mes a mes en compromisos y pagos de gastos (el mayor de cada rubro)
+    factor = _umbral('SALTO_MENSUAL', 3.0)
+    for modulo, clave, nombre in [
+        (PACEjecutadoCompromiso.MODULO, 'compromisos', 'Compromisos'), (PACEjecutadoPago.MODULO, 'pagos', 'Pagos'),
+    ]:
+        serie = datos[clave][:, :max(corte, 1)]
+        anterior, actual = serie[:, :-1], serie[:, 1:]
+        razon = np.divide(actual, anterior, out=np.zeros(anterior.shape), where=anterior >= minimo)
+        mes = razon.argmax(axis=1) if razon.size else np.zeros(len(serie), dtype=int)
+        mayor = razon.max(axis=1) if razon.size else np.zeros(len(serie))
+        for i in np.flatnonzero(evaluar_fila & es_gasto & (mayor >= factor)):
+            m = mes[i] + 1
+            alertas.append(_alerta(
+                vigencia, 'SALTO_MENSUAL', 'ADVERTENCIA', datos['llaves'][i],
+                f'{nombre} de {MESES_DISPLAY[m]} son {mayor[i]:.1f} veces los de {MESES_DISPLAY[m - 1]}',
+                actual[i, m - 1], anterior[i, m - 1], modulo=modulo, mes=m + 1,
+            ))
+    return alertas
+
+
+def _reglas_fuentes(vigencia, datos, fuentes):
+    alertas = []
+    corte = datos['corte']
+    es_gasto = datos['tipo'] == 'GASTO'
+    for fuente in fuentes:
+        filas = datos['fuente'] == fuente
+        llave = ('', fuente, '')
+
+        presupuesto = datos['presupuestos'].get(fuente, 0)
+        comprometido = int(datos['compromisos'][filas & es_gasto].sum())
+        if presupuesto > 0 and comprometido > presupuesto:
+            alertas.append(_alerta(
+                vigencia, 'SOBRECOMPROMISO', 'CRITICA', llave,
+                f'Compromisos de la fuente {fuente} superan su presupuesto asignado',
+                comprometido, presupuesto, modulo=PACEjecutadoCompromiso.MODULO,
+            ))
+
+        if corte:
+            flujo = datos['pagos'][filas & ~es_gasto].sum(axis=0) - datos['pagos'][filas & es_gasto].sum(axis=0)
+            saldo = flujo[:corte].cumsum()
+            negativos = np.flatnonzero(saldo < 0)
+            if len(negativos):
+                m = int(negativos[0]) + 1
+                alertas.append(_alerta(
+                    vigencia, 'SALDO_NEGATIVO', 'CRITICA', llave,
+                    f'Saldo de caja de la fuente {fuente} negativo al cierre de {MESES_DISPLAY[m - 1]} '
+                    f'(recaudo menos pagos acumulados)',
+                    int(saldo[m - 1]), 0, modulo=PACEjecutadoPago.MODULO, mes=m,
+                ))
+    return alertas
+
+
+# ============================================================
+# INTEGRACION CON LA IMPORTACION
+# ============================================================
+def antes_de_importar(modelo_class, vigencia):
+    """Estado previo a una carga: huella del modulo y ultimo mes ejecutado."""
+    return huella(modelo_class, vigencia), mes_corte(vigencia)
+
+
+def despues_de_importar(vigencia, estado_previo, registros):
+    """Evalua las alertas de los rubros que cambio la carga (toda la vigencia si cambio el mes de corte)."""
+    anterior, corte = estado_previo
+    if mes_corte(vigencia) != corte:
+        return evaluar(vigencia)
+    return evaluar(vigencia, cambios(anterior, huella_registros(registros)))
@@ -1,7 +1,12 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
 
 
 class PacConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'pac'
     verbose_name = 'Plan Anual de Caja'
+
+    def ready(self):
+        from .concurrencia import configurar_conexion
+        connection_created.connect(configurar_conexion, dispatch_uid='pac_configurar_conexion')
@@ -0,0 +1,315 @@
+"""
+Archivado de vigencias cerradas.
+
+Una vigencia archivada sale de las tablas de la base principal y queda en
+un archivo SQLite propio (PAC_ARCHIVO_DIR/vigencia_<año>.sqlite3) que se
+abre en modo de solo lectura: las tablas de la vigencia en curso se
+mantienen pequenas y los años anteriores se siguen consultando.
+
+El enrutamiento es transparente: el QuerySet de los modelos PAC
+(models.PACQuerySet) envia a la base de archivo toda consulta filtrada por
+una vigencia archivada (vigencia=, vigencia__exact= o vigencia__in=), de
+modo que las vistas, exportaciones y comandos no cambian. Lo que no se
+puede enviar a una sola base falla con ValueError: vigencias de bases
+distintas, rangos que incluyen una archivada y condiciones Q o exclude()
+sobre la vigencia. La existencia del archivo es la marca de vigencia archivada, por
+lo que todos los workers la ven sin reiniciar.
+
+El comando archivar_vigencia archiva y restaura. Las importaciones y
+eliminaciones de una vigencia archivada fallan con VigenciaArchivada.
+"""
+
+import os
+from contextlib import ExitStack
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Count, Sum
+
+
+PREFIJO_ALIAS = 'archivo_'
+
+# Tablas que se archivan (nombre de modelo en minusculas); el resto siempre vive en la base principal
+MODELOS_ARCHIVADOS = {'aiminicial', 'pacprogramado', 'pacejecutadocompromiso', 'pacejecutadopago', 'pacvalormensual'}
+
+
+class VigenciaArchivada(Exception):
+    pass
+
+
+def directorio():
+    return Path(getattr(settings, 'PAC_ARCHIVO_DIR', Path(settings.BASE_DIR) / 'archivo_vigencias'))
+
+
+def ruta_archivo(vigencia):
+    return directorio() / f'vigencia_{vigencia}.sqlite3'
+
+
+def vigencias_archivadas():
+    if not directorio().is_dir():
+        return []
+    return sorted(
+        int(ruta.stem.split('_')[1]) for ruta in directorio().glob('vigencia_*.sqlite3')
+        if ruta.stem.split('_')[1].isdigit()
+    )
+
+
+def esta_archivada(vigencia):
+    try:
+        return ruta_archivo(int(vigencia)).exists()
+    except (TypeError, ValueError):
+        return False
+
+
+def es_alias_archivo(alias):
+    return bool(alias) and alias.startswith(PREFIJO_ALIAS)
+
+
+def _registrar(alias, ruta, solo_lectura=True):
+    if alias not in connections.settings:
+        nombre = f'file:{ruta}?mode=ro' if solo_lectura else str(ruta)
+        configuracion = {'ENGINE': 'django.db.backends.sqlite3', 'NAME': nombre, 'OPTIONS': {'timeout': 20}}
+        # configure_settings completa los valores por defecto de Django (exige el alias 'default')
+        completas = connections.configure_settings({'default': connections.settings['default'], alias: configuracion})
+        connections.settings[alias] = completas[alias]
+    return alias
+
+
+def _olvidar(alias):
+    if alias in connections.settings:
+        connections[alias].close()
+        del connections[alias]
+        del connections.settings[alias]
+
+
+def alias_vigencia(vigencia):
+    """Alias de la base de archivo de `vigencia`, o None si no esta archivada."""
+    if not esta_archivada(vigencia):
+        return None
+    vigencia = int(vigencia)
+    return _registrar(f'{PREFIJO_ALIAS}{vigencia}', ruta_archivo(vigencia))
+
+
+# Lookups de rango sobre la vigencia: (lookup, vigencia, valor) -> la vigencia cumple el filtro
+_RANGOS = {
+    'gt': lambda vigencia, valor: vigencia > int(valor),
+    'gte': lambda vigencia, valor: vigencia >= int(valor),
+    'lt': lambda vigencia, valor: vigencia < int(valor),
+    'lte': lambda vigencia, valor: vigencia <= int(valor),
+    'range': lambda vigencia, valor: int(valor[0]) <= vigencia <= int(valor[1]),
+}
+
+
+def _lookups_vigencia(filtros):
+    """{lookup: valor} de los filtros sobre la vigencia ('vigencia' y 'vigencia__exact' son 'exact')."""
+    lookups = {}
+    for clave, valor in filtros.items():
+        campo, _, lookup = clave.partition('__')
+        if campo == 'vigencia':
+            lookups[lookup or 'exact'] = valor
+    return lookups
+
+
+def _abarca(vigencia, lookups):
+    """True si `vigencia` puede cumplir los lookups (los que no son de rango se suponen cumplidos)."""
+    return all(lookup not in _RANGOS or _RANGOS[lookup](vigencia, valor) for lookup, valor in lookups.items())
+
+
+def _menciona_vigencia(condicion):
+    """True si un Q (o una expresion) filtra por la vigencia."""
+    hijos = getattr(condicion, 'children', None)
+    if hijos is None:
+        return False
+    return any(
+        _menciona_vigencia(hijo) if not isinstance(hijo, tuple) else hijo[0].partition('__')[0] == 'vigencia'
+        for hijo in hijos
+    )
+
+
+def alias_para_filtro(filtros, condiciones=()):
+    """
+    Alias de archivo que corresponde a los filtros (kwargs) y condiciones (Q) de un QuerySet (None = base
+    por defecto). ValueError si la consulta puede abarcar vigencias archivadas y no se puede enviar a una
+    sola base: vigencias de bases distintas, rangos que incluyen una archivada o condiciones Q sobre la
+    vigencia.
+    """
+    archivadas = vigencias_archivadas()
+    if archivadas and any(_menciona_vigencia(c) for c in condiciones):
+        raise ValueError('Las condiciones Q sobre la vigencia no se envian a la base de archivo; '
+                         'filtre con vigencia= o vigencia__in= (o elija la base con using())')
+    lookups = _lookups_vigencia(filtros)
+    if 'exact' in lookups:
+        return alias_vigencia(lookups['exact'])
+    if 'in' in lookups:
+        aliases = {alias_vigencia(v) for v in lookups['in']}
+        if len(aliases) > 1:
+            raise ValueError('Las vigencias estan en bases distintas (archivadas y actuales); '
+                             'consulte cada grupo por separado (ver archivado.agrupar_por_base)')
+        return aliases.pop() if aliases else None
+    if lookups and any(_abarca(v, lookups) for v in archivadas):
+        raise ValueError(f'El filtro {lookups} abarca vigencias archivadas ({archivadas}); '
+                         'consulte cada base por separado (ver archivado.agrupar_por_base) o elija la base con using()')
+    return None
+
+
+def verificar_exclusion(filtros, condiciones=()):
+    """exclude() sobre la vigencia no se puede enviar a una sola base: ValueError si hay vigencias archivadas."""
+    if vigencias_archivadas() and (_lookups_vigencia(filtros) or any(_menciona_vigencia(c) for c in condiciones)):
+        raise ValueError('exclude() sobre la vigencia no se envia a la base de archivo; '
+                         'filtre con vigencia= o vigencia__in= (o elija la base con using())')
+
+
+def agrupar_por_base(vigencias):
+    """{alias o None: [vigencias]} para consultar juntas las vigencias que comparten base."""
+    grupos = {}
+    for vigencia in vigencias:
+        grupos.setdefault(alias_vigencia(vigencia), []).append(vigencia)
+    return grupos
+
+
+def _modelos():
+    from .models import AIMInicial, PACEjecutadoCompromiso, PACEjecutadoPago, PACProgramado, PACValorMensual
+    return [AIMInicial, PACProgramado, PACEjecutadoCompromiso, PACEjecutadoPago, PACValorMensual]
+
+
+def resumen(vigencia, alias):
+    """{modelo: (filas, suma en centavos)} de la vigencia en la base `alias`, para comparar copias."""
+    datos = {}
+    for modelo in _modelos():
+        campo = 'valor_centavos' if modelo._meta.model_name == 'pacvalormensual' else 'apropiacion_definitiva_centavos'
+        r = modelo.objects.using(alias).filter(vigencia=vigencia).aggregate(n=Count('id'), s=Sum(campo))
+        datos[modelo._meta.verbose_name_plural] = (r['n'], r['s'] or 0)
+    return datos
+
+
+def _filas(modelo, origen, destino, vigencia, tamano_lote):
+    """Filas de la vigencia listas para insertar en `destino`."""
+    campos = modelo._meta.concrete_fields
+    lectura = connections[origen]
+    if lectura.vendor == connections[destino].vendor:
+        # Mismo motor: los valores se copian tal como estan guardados (SQLite conserva los decimales de la carga)
+        quote = lectura.ops.quote_name
+        with lectura.cursor() as cursor:
+            cursor.execute(
+                'SELECT {} FROM {} WHERE {} = %s ORDER BY {}'.format(
+                    ', '.join(quote(f.column) for f in campos), quote(modelo._meta.db_table),
+                    quote('vigencia'), quote(modelo._meta.pk.column),
+                ),
+                [vigencia],
+            )
+            while True:
+                filas = cursor.fetchmany(tamano_lote)
+                if not filas:
+                    return
+                yield from filas
+    else:
+        conexion = connections[destino]
+        filas = (
+            modelo.objects.using(origen).filter(vigencia=vigencia).order_by('pk')
+            .values_list(*[f.attname for f in campos]).iterator(chunk_size=tamano_lote)
+        )
+        for fila in filas:
+            yield [f.get_db_prep_save(valor, conexion) for f, valor in zip(campos, fila)]
+
+
+def _copiar(modelo, origen, destino, vigencia, usuarios=None, tamano_lote=1000):
+    """Copia las filas de la vigencia con sus ids y fechas originales (sin pre_save ni save)."""
+    campos = modelo._meta.concrete_fields
+    conexion = connections[destino]
+    quote = conexion.ops.quote_name
+    sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+        quote(modelo._meta.db_table), ', '.join(quote(f.column) for f in campos), ', '.join(['%s'] * len(campos)),
+    )
+    total = 0
+    lote = []
+    with conexion.cursor() as cursor:
+        for valores in _filas(modelo, origen, destino, vigencia, tamano_lote):
+            if usuarios is not None:
+                # Usuarios eliminados mientras la vigencia estaba archivada
+                valores = [None if f.attname == 'usuario_id' and v not in usuarios else v
+                           for f, v in zip(campos, valores)]
+            lote.append(valores)
+            if len(lote) >= tamano_lote:
+                cursor.executemany(sql, lote)
+                total += len(lote)
+                lote = []
+        if lote:
+            cursor.executemany(sql, lote)
+            total += len(lote)
+    return total
+
+
+def _bloquear_modulos(pila, vigencia, usuario, permitir_archivada=False):
+    from .concurrencia import bloqueo_importacion
+    for modelo in _modelos()[:4]:
+        pila.enter_context(bloqueo_importacion(modelo.MODULO, vigencia, usuario, permitir_archivada))
+
+
+def archivar(vigencia, usuario=None):
+    """
+    Copia la vigencia a su archivo SQLite, verifica la copia y la elimina de
+    la base principal. Retorna el resumen de lo archivado.
+    """
+    if esta_archivada(vigencia):
+        raise VigenciaArchivada(f'La vigencia {vigencia} ya esta archivada')
+    directorio().mkdir(parents=True, exist_ok=True)
+    ruta = ruta_archivo(vigencia)
+    temporal = ruta.with_name(ruta.name + '.tmp')
+
+    with ExitStack() as pila:
+        # Ninguna importacion de la vigencia puede escribir mientras se copia
+        _bloquear_modulos(pila, vigencia, usuario)
+        esperado = resumen(vigencia, 'default')
+        if not any(filas for filas, _ in esperado.values()):
+            raise ValueError(f'La vigencia {vigencia} no tiene datos para archivar')
+
+        if temporal.exists():
+            temporal.unlink()
+        alias = _registrar(f'{PREFIJO_ALIAS}nuevo_{vigencia}', temporal, solo_lectura=False)
+        try:
+            destino = connections[alias]
+            with destino.schema_editor() as editor:
+                for modelo in _modelos():
+                    editor.create_model(modelo)
+            # La tabla de usuarios no se copia: usuario_id queda como referencia a la base principal
+            with destino.constraint_checks_disabled(), transaction.atomic(using=alias):
+                for modelo in _modelos():
+                    _copiar(modelo, 'default', alias, vigencia)
+            if resumen(vigencia, alias) != esperado:
+                raise ValueError(f'La copia de la vigencia {vigencia} no coincide con la base principal')
+        except BaseException:
+            _olvidar(alias)
+            temporal.unlink()
+            raise
+        _olvidar(alias)
+
+        # Desde aqui las lecturas de la vigencia van al archivo; luego se liberan las tablas principales
+        os.replace(temporal, ruta)
+        with transaction.atomic(using='default'):
+            for modelo in _modelos():
+                modelo.objects.using('default').filter(vigencia=vigencia).delete()
+    return esperado
+
+
+def restaurar(vigencia, usuario=None):
+    """Devuelve una vigencia archivada a la base principal y elimina su archivo."""
+    from django.contrib.auth.models import User
+
+    alias = alias_vigencia(vigencia)
+    if alias is None:
+        raise ValueError(f'La vigencia {vigencia} no esta archivada')
+    with ExitStack() as pila:
+        _bloquear_modulos(pila, vigencia, usuario, permitir_archivada=True)
+        if any(filas for filas, _ in resumen(vigencia, 'default').values()):
+            raise ValueError(f'La base principal ya tiene datos de la vigencia {vigencia}')
+        esperado = resumen(vigencia, alias)
+        usuarios = set(User.objects.using('default').values_list('pk', flat=True))
+        with transaction.atomic(using='default'):
+            for modelo in _modelos():
+                _copiar(modelo, alias, 'default', vigencia, usuarios=usuarios)
+            if resumen(vigencia, 'default') != esperado:
+                raise ValueError(f'La restauracion de la vigencia {vigencia} no coincide con el archivo')
+        _olvidar(alias)
+        ruta_archivo(vigencia).unlink()
+    return esperado
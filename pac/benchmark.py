@@ -0,0 +1,235 @@
+"""
+Benchmarks de los caminos criticos: importacion, vistas de lectura y exportaciones.
+
+Cada caso se mide sobre libros sinteticos (pac.sintetico) de tamano creciente,
+importados en una vigencia reservada dentro de una transaccion que el comando
+revierte al terminar. Por caso se registra el tiempo (mediana y minimo de
+varias repeticiones), el numero de consultas SQL y el pico de memoria de
+Python (tracemalloc, en una ejecucion aparte para no distorsionar el tiempo).
+Los resultados se guardan en JSON para compararlos entre commits. La suite
+corre sobre el motor configurado (SQLite o PostgreSQL con PAC_DB_MOTOR); el
+informe registra cual.
+"""
+
+import io
+import json
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+
+from django.conf import settings
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from . import cache_exportaciones, exportacion
+from .models import AIMInicial, PACProgramado, PACEjecutadoCompromiso, PACEjecutadoPago
+from .sintetico import crear_fuentes, libro_pac
+from .utils import importar_excel_pac
+
+
+VIGENCIA = 9999
+
+# Modulo y hoja de cada importacion (las mismas que usan las vistas importar_*)
+IMPORTACIONES = [
+    ('aim_inicial', AIMInicial, None),
+    ('programado', PACProgramado, 'PROG PAC'),
+    ('compromisos', PACEjecutadoCompromiso, 'EJECUTADO COMPROMISO'),
+    ('pagos', PACEjecutadoPago, 'EJECUTADO PAGO'),
+]
+
+VISTAS = [
+    'dashboard', 'aim_inicial', 'pac_programado', 'pac_ejecutado_compromisos', 'pac_ejecutado_pagos',
+    'seguimiento_ingresos', 'seguimiento_gastos', 'seguimiento_compromisos_vs_pagos', 'reportes', 'proyeccion_caja',
+    'fuentes_financiacion',
+]
+
+
+def configuracion_escala(escala):
+    """Parametros de pac.sintetico.estructura_pac para un multiplo del tamano real."""
+    return {
+        'rubros': 40 * escala, 'bpin_por_sector': 3 * escala,
+        'reservas': 40 * escala, 'cuentas_por_pagar': 15 * escala,
+    }
+
+
+def libro_sintetico(escala, semilla=0, vigencia=VIGENCIA, **configuracion):
+    """Bytes del libro sintetico de una escala; `configuracion` sobreescribe parametros de estructura_pac."""
+    datos = io.BytesIO()
+    libro_pac(vigencia, semilla, **{**configuracion_escala(escala), **configuracion}).guardar(datos)
+    return datos.getvalue()
+
+
+def cargar(datos, vigencia=VIGENCIA):
+    """Importa el libro en los cuatro modulos. Retorna el numero de registros de cada uno."""
+    return {
+        nombre: importar_excel_pac(io.BytesIO(datos), vigencia, modelo, None, nombre_hoja=hoja)
+        for nombre, modelo, hoja in IMPORTACIONES
+    }
+
+
+def urls_vistas(vigencia, fuente_pk):
+    q = f'?vigencia={vigencia}'
+    urls = [(nombre, reverse(nombre) + q) for nombre in VISTAS]
+    urls.append(('fuente_detalle', reverse('fuente_detalle', args=[fuente_pk]) + q))
+    return urls
+
+
+def urls_exportaciones(vigencia):
+    q = f'?vigencia={vigencia}'
+    urls = [
+        (f'seguimiento_{tipo}', reverse('exportar_seguimiento', args=[tipo]) + q)
+        for tipo in ['ingresos', 'gastos', 'comp_vs_pago']
+    ]
+    urls.append(('reporte_fuentes', reverse('exportar_reporte_fuentes') + q))
+    urls.append(('libro_consolidado', reverse('exportar_libro_consolidado') + q))
+    formatos = ['csv', 'parquet'] if exportacion.parquet_disponible() else ['csv']
+    for tipo in exportacion.TIPOS_EXPORTACION:
+        for formato in formatos:
+            urls.append((f'datos_{tipo}_{formato}', reverse('exportar_datos', args=[tipo]) + f'{q}&formato={formato}'))
+    return urls
+
+
+def cliente(usuario):
+    c = Client(HTTP_HOST='localhost')
+    c.force_login(usuario)
+    return c
+
+
+def obtener(c, url):
+    """GET completo (incluido el contenido en streaming). Retorna los bytes recibidos."""
+    response = c.get(url)
+    if response.status_code != 200:
+        raise RuntimeError(f'{url} respondio {response.status_code}')
+    if response.streaming:
+        return sum(len(bloque) for bloque in response.streaming_content)
+    return len(response.content)
+
+
+def medir(funcion, repeticiones=3, medir_memoria=True, preparar=None):
+    """
+    Ejecuta funcion() `repeticiones` veces (preparar() antes de cada una, fuera
+    de la medicion). Retorna {'segundos', 'minimo', 'consultas', 'memoria_pico_kb'}.
+    """
+    tiempos = []
+    consultas = None
+    for i in range(repeticiones):
+        if preparar:
+            preparar()
+        if i == 0:
+            with CaptureQueriesContext(connection) as capturadas:
+                inicio = time.perf_counter()
+                funcion()
+                tiempos.append(time.perf_counter() - inicio)
+            consultas = len(capturadas)
+        else:
+            inicio = time.perf_counter()
+            funcion()
+            tiempos.append(time.perf_counter() - inicio)
+
+    pico = None
+    if medir_memoria and not tracemalloc.is_tracing():
+        if preparar:
+            preparar()
+        tracemalloc.start()
+        try:
+            funcion()
+            pico = tracemalloc.get_traced_memory()[1] // 1024
+        finally:
+            tracemalloc.stop()
+    return {
+        'segundos': round(statistics.median(tiempos), 4), 'minimo': round(min(tiempos), 4),
+        'consultas': consultas, 'memoria_pico_kb': pico,
+    }
+
+
+def ejecutar(usuario, escalas, repeticiones=3, medir_memoria=True, semilla=0, informar=None):
+    """
+    Corre la suite para cada escala y retorna la lista de resultados. Debe
+    llamarse dentro de una transaccion que se revierta: reemplaza los datos de
+    VIGENCIA y crea fuentes de financiacion sinteticas.
+    """
+    resultados = []
+
+    def registrar(escala, grupo, nombre, medicion, **extra):
+        resultado = {'escala': escala, 'grupo': grupo, 'nombre': nombre, **medicion, **extra}
+        resultados.append(resultado)
+        if informar:
+            informar(resultado)
+
+    c = cliente(usuario)
+    for escala in escalas:
+        datos = libro_sintetico(escala, semilla)
+        filas = 0
+        for nombre, modelo, hoja in IMPORTACIONES:
+            def importar(modelo=modelo, hoja=hoja):
+                return importar_excel_pac(io.BytesIO(datos), VIGENCIA, modelo, None, nombre_hoja=hoja)
+            # Los tiempos de la carga no se toman bajo el tracemalloc de PAC_IMPORTACION_MEDIR_MEMORIA
+            with override_settings(PAC_IMPORTACION_MEDIR_MEMORIA=False):
+                medicion = medir(importar, repeticiones, medir_memoria)
+            filas = modelo.objects.filter(vigencia=VIGENCIA).count()
+            registrar(escala, 'importacion', nombre, medicion, filas=filas)
+
+        fuentes = crear_fuentes(VIGENCIA)
+        for nombre, url in urls_vistas(VIGENCIA, fuentes[0].pk):
+            registrar(escala, 'vista', nombre, medir(lambda url=url: obtener(c, url), repeticiones, medir_memoria), filas=filas)
+
+        # Cada repeticion construye el archivo: la cache de exportaciones se vacia antes de medir
+        for nombre, url in urls_exportaciones(VIGENCIA):
+            medicion = medir(lambda url=url: obtener(c, url), repeticiones, medir_memoria,
+                             preparar=cache_exportaciones.limpiar)
+            registrar(escala, 'exportacion', nombre, medicion, filas=filas)
+    return resultados
+
+
+def _commit_actual():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, timeout=5,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def informe(resultados):
+    """Documento JSON con los resultados y el contexto de la ejecucion."""
+    return {
+        'fecha': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': _commit_actual(),
+        'python': platform.python_version(),
+        'base_datos': connection.vendor,
+        'resultados': resultados,
+    }
+
+
+def guardar(documento, ruta):
+    with open(ruta, 'w', encoding='utf-8') as archivo:
+        json.dump(documento, archivo, indent=2, ensure_ascii=False)
+
+
+def comparar(actual, base, umbral=0.2):
+    """
+    Compara dos documentos de informe(). Retorna [(clave, descripcion)] de los
+    casos cuyo tiempo crece mas del `umbral` (proporcion) o cuyo numero de
+    consultas aumenta.
+    """
+    anteriores = {(r['escala'], r['grupo'], r['nombre']): r for r in base['resultados']}
+    regresiones = []
+    for r in actual['resultados']:
+        clave = (r['escala'], r['grupo'], r['nombre'])
+        anterior = anteriores.get(clave)
+        if anterior is None:
+            continue
+        motivos = []
+        if anterior['segundos'] and r['segundos'] > anterior['segundos'] * (1 + umbral):
+            motivos.append(f"tiempo {anterior['segundos']:.3f} s -> {r['segundos']:.3f} s "
+                           f"(+{(r['segundos'] / anterior['segundos'] - 1) * 100:.0f}%)")
+        if anterior['consultas'] is not None and (r['consultas'] or 0) > anterior['consultas']:
+            motivos.append(f"consultas {anterior['consultas']} -> {r['consultas']}")
+        if motivos:
+            regresiones.append((clave, '; '.join(motivos)))
+    return regresiones
@@ -0,0 +1,229 @@
+"""
+Busqueda de rubros por texto completo.
+
+IndiceRubro guarda un documento por modulo, vigencia y codigo de rubro: el
+codigo, el nombre, el BPIN (propio o del proyecto que contiene al rubro) y
+el numero RP/CxP normalizados a minusculas sin tildes ni signos, mas la
+apropiacion y el total del modulo. La migracion 0009 indexa la columna
+texto con FTS5 en SQLite y con un tsvector generado e indice GIN en
+PostgreSQL; en otros motores la busqueda cae a LIKE sobre el texto.
+
+La importacion (utils.importar_excel_pac) sincroniza las filas de su modulo
+dentro del bloqueo de la carga y solo escribe las que cambian: recargar el
+mismo libro no toca el indice. El comando indexar_rubros lo reconstruye.
+
+Cada palabra de la consulta se busca por prefijo y los fragmentos de codigo
+como frase: "fotov" encuentra "FOTOVOLTAICA" y "2.3.21" los rubros cuyo
+codigo contiene 2.3.21... Un resultado agrupa los modulos del codigo:
+apropiacion, programado, compromisos y pagos en una sola respuesta.
+"""
+
+import re
+import unicodedata
+
+from django.db import connections, transaction
+
+from .centavos import a_centavos, de_centavos
+from .models import (
+    AIMInicial, IndiceRubro, PACEjecutadoCompromiso, PACEjecutadoPago, PACProgramado, codigo_base,
+)
+
+
+LIMITE = 20
+MAX_LIMITE = 100
+MIN_CARACTERES = 2
+
+# Modulos en el orden en que aportan nombre, tipo y categoria de un resultado, con el campo de su total
+MODELOS = [
+    (AIMInicial, None),
+    (PACProgramado, 'programado'),
+    (PACEjecutadoCompromiso, 'compromisos'),
+    (PACEjecutadoPago, 'pagos'),
+]
+MODULOS = [(modelo_class.MODULO, campo) for modelo_class, campo in MODELOS]
+CAMPOS = [
+    'nombre_rubro', 'tipo', 'categoria', 'fuente_financiacion', 'es_subtotal', 'bpin', 'numero_rp',
+    'apropiacion', 'total', 'texto',
+]
+
+_NO_ALFANUMERICO = re.compile(r'[^0-9a-z]+')
+_BPIN = re.compile(r'BPIN\D{0,3}(\d{6,})', re.IGNORECASE)
+_RP = re.compile(r'RP:\s*([^)\s]+)')
+
+
+def normalizar(texto):
+    """Minusculas, sin tildes y con los signos (puntos, guiones, parentesis) como espacios."""
+    descompuesto = unicodedata.normalize('NFKD', texto.lower())
+    sin_tildes = ''.join(c for c in descompuesto if not unicodedata.combining(c))
+    return ' '.join(_NO_ALFANUMERICO.sub(' ', sin_tildes).split())
+
+
+# ============================================================
+# MANTENIMIENTO DEL INDICE
+# ============================================================
+def _bpin_contenedor(codigo, proyectos):
+    """BPIN del proyecto cuyo codigo es prefijo del rubro (los productos de inversion no lo repiten)."""
+    base = codigo_base(codigo)
+    while '.' in base:
+        base = base.rsplit('.', 1)[0]
+        if base in proyectos:
+            return proyectos[base]
+    return ''
+
+
+def documentos(registros):
+    """{codigo: campos de IndiceRubro} de los registros de una carga; los codigos repetidos suman sus valores."""
+    proyectos = {}
+    for r in registros:
+        bpin = _BPIN.search(r.nombre_rubro)
+        if bpin:
+            proyectos[codigo_base(r.codigo_rubro)] = bpin.group(1)
+
+    campos, valores = {}, {}
+    for r in registros:
+        codigo = r.codigo_rubro
+        if not codigo:
+            continue
+        apropiacion = a_centavos(r.apropiacion_definitiva)
+        total = a_centavos(r.total_centavos)
+        if codigo in valores:
+            valores[codigo][0] += apropiacion
+            valores[codigo][1] += total
+            continue
+        valores[codigo] = [apropiacion, total]
+        bpin = proyectos.get(codigo_base(codigo)) or _bpin_contenedor(codigo, proyectos)
+        rp = _RP.search(codigo)
+        campos[codigo] = {
+            'nombre_rubro': r.nombre_rubro, 'tipo': r.tipo, 'categoria': r.categoria,
+            'fuente_financiacion': r.fuente_financiacion, 'es_subtotal': r.es_subtotal,
+            'bpin': bpin[:30], 'numero_rp': rp.group(1)[:30] if rp else '',
+            'texto': normalizar(f'{codigo} {r.nombre_rubro} {bpin}'),
+        }
+    for codigo, (apropiacion, total) in valores.items():
+        campos[codigo]['apropiacion'] = de_centavos(apropiacion)
+        campos[codigo]['total'] = de_centavos(total)
+    return campos
+
+
+def actualizar(vigencia, modelo_class, registros):
+    """
+    Sincroniza las filas del modulo en el indice con los registros de una carga (lista vacia = modulo
+    eliminado). Solo escribe las filas nuevas, cambiadas u obsoletas; retorna cuantas escribio.
+    """
+    modulo = modelo_class.MODULO
+    nuevos = documentos(registros)
+    existentes = {fila.codigo_rubro: fila for fila in IndiceRubro.objects.filter(vigencia=vigencia, modulo=modulo)}
+
+    crear, cambiar = [], []
+    for codigo, campos in nuevos.items():
+        fila = existentes.pop(codigo, None)
+        if fila is None:
+            crear.append(IndiceRubro(vigencia=vigencia, modulo=modulo, codigo_rubro=codigo, **campos))
+        elif any(getattr(fila, campo) != valor for campo, valor in campos.items()):
+            for campo, valor in campos.items():
+                setattr(fila, campo, valor)
+            cambiar.append(fila)
+    obsoletas = [fila.pk for fila in existentes.values()]
+
+    with transaction.atomic():
+        for inicio in range(0, len(obsoletas), 500):
+            IndiceRubro.objects.filter(pk__in=obsoletas[inicio:inicio + 500]).delete()
+        IndiceRubro.objects.bulk_update(cambiar, CAMPOS, batch_size=500)
+        IndiceRubro.objects.bulk_create(crear, batch_size=500)
+    return len(crear) + len(cambiar) + len(obsoletas)
+
+
+def indexar(vigencia):
+    """Reconstruye el indice de la vigencia desde las tablas de los modulos. Retorna las filas escritas."""
+    escritas = 0
+    for modelo_class, _ in MODELOS:
+        registros = modelo_class.objects.filter(vigencia=vigencia).only(
+            'codigo_rubro', 'nombre_rubro', 'tipo', 'categoria', 'fuente_financiacion', 'es_subtotal',
+            'apropiacion_definitiva', 'total_centavos',
+        )
+        escritas += actualizar(vigencia, modelo_class, list(registros))
+    return escritas
+
+
+def reconstruir_texto():
+    """Rehace la tabla FTS5 desde pac_indicerubro (SQLite); en PostgreSQL la columna generada no lo necesita."""
+    conexion = connections['default']
+    if conexion.vendor == 'sqlite':
+        with conexion.cursor() as cursor:
+            cursor.execute("INSERT INTO pac_indicerubro_fts(pac_indicerubro_fts) VALUES ('rebuild')")
+
+
+# ============================================================
+# BUSQUEDA
+# ============================================================
+def terminos(consulta):
+    """Tokens normalizados de cada palabra de la consulta; cada palabra es una frase con el ultimo token por prefijo."""
+    return [t for t in (normalizar(palabra).split() for palabra in consulta.split()) if t]
+
+
+def _codigos(vigencia, frases, limite):
+    """Codigos de la vigencia que contienen todas las frases, del mas al menos relevante."""
+    conexion = connections[IndiceRubro.objects.db]
+    if conexion.vendor == 'sqlite':
+        # CROSS JOIN fija el orden: primero el MATCH y luego la vigencia (con JOIN el planificador recorre
+        # la vigencia y repite la busqueda FTS por cada fila)
+        sql = (
+            'SELECT i.codigo_rubro FROM pac_indicerubro_fts f CROSS JOIN pac_indicerubro i ON i.id = f.rowid '
+            'WHERE pac_indicerubro_fts MATCH %s AND i.vigencia = %s '
+            'GROUP BY i.codigo_rubro ORDER BY MIN(f.rank), i.codigo_rubro LIMIT %s'
+        )
+        params = [' '.join('"{}"*'.format(' '.join(frase)) for frase in frases), vigencia, limite]
+    elif conexion.vendor == 'postgresql':
+        sql = (
+            "SELECT codigo_rubro FROM pac_indicerubro WHERE vigencia = %s AND documento @@ to_tsquery('simple', %s) "
+            "GROUP BY codigo_rubro ORDER BY MAX(ts_rank(documento, to_tsquery('simple', %s))) DESC, codigo_rubro "
+            "LIMIT %s"
+        )
+        consulta = ' & '.join('({}:*)'.format(' <-> '.join(frase)) for frase in frases)
+        params = [vigencia, consulta, consulta, limite]
+    else:
+        qs = IndiceRubro.objects.filter(vigencia=vigencia)
+        for frase in frases:
+            qs = qs.filter(texto__contains=' '.join(frase))
+        return list(qs.order_by('codigo_rubro').values_list('codigo_rubro', flat=True).distinct()[:limite])
+    with conexion.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [codigo for codigo, in cursor.fetchall()]
+
+
+def buscar(vigencia, consulta, limite=LIMITE):
+    """
+    Rubros de la vigencia que coinciden con la consulta (nombre, codigo, BPIN o RP), cada uno con su
+    apropiacion y sus totales programado, compromisos y pagos (pesos, Decimal). Dos consultas.
+    """
+    frases = terminos(consulta)
+    if sum(len(token) for frase in frases for token in frase) < MIN_CARACTERES:
+        return []
+    codigos = _codigos(vigencia, frases, min(limite, MAX_LIMITE))
+    if not codigos:
+        return []
+
+    orden = {modulo: i for i, (modulo, _) in enumerate(MODULOS)}
+    filas = sorted(
+        IndiceRubro.objects.filter(vigencia=vigencia, codigo_rubro__in=codigos).defer('texto'),
+        key=lambda fila: orden[fila.modulo],
+    )
+    resultados = {}
+    for fila in filas:
+        resultado = resultados.get(fila.codigo_rubro)
+        if resultado is None:
+            resultado = resultados[fila.codigo_rubro] = {
+                'codigo_rubro': fila.codigo_rubro, 'nombre_rubro': fila.nombre_rubro, 'tipo': fila.tipo,
+                'categoria': fila.categoria, 'fuente_financiacion': fila.fuente_financiacion,
+                'es_subtotal': fila.es_subtotal, 'bpin': fila.bpin, 'numero_rp': fila.numero_rp,
+                'apropiacion': fila.apropiacion, 'modulos': [],
+                'programado': de_centavos(0), 'compromisos': de_centavos(0), 'pagos': de_centavos(0),
+            }
+        resultado['modulos'].append(fila.modulo)
+        campo = dict(MODULOS)[fila.modulo]
+        if campo:
+            resultado[campo] = fila.total
+    for resultado in resultados.values():
+        base = resultado['programado'] or resultado['apropiacion']
+        resultado['pct_pagado'] = round(float(resultado['pagos'] / base * 100), 1) if base else None
+    return [resultados[codigo] for codigo in codigos if codigo in resultados]
@@ -0,0 +1,151 @@
+"""
+Cache en disco de los archivos exportados.
+
+Cada archivo se guarda en MEDIA_ROOT/exportaciones con un nombre derivado de
+(tipo de exportacion, vigencia, version de los datos), de modo que una
+descarga repetida sin importaciones de por medio se sirve directamente desde
+disco. Al servir un archivo se actualiza su mtime; cuando el directorio supera
+PAC_CACHE_EXPORTACIONES_MB se eliminan los de mtime mas antiguo (LRU).
+"""
+
+import os
+import time
+import uuid
+from pathlib import Path
+
+from django.conf import settings
+
+from . import metricas
+from .consultas import version_datos
+
+
+# Cambiar al modificar el formato de alguna exportacion para invalidar la cache
+VERSION_FORMATO = 1
+
+
+def directorio():
+    ruta = Path(settings.MEDIA_ROOT) / 'exportaciones'
+    ruta.mkdir(parents=True, exist_ok=True)
+    return ruta
+
+
+def limite_bytes():
+    return getattr(settings, 'PAC_CACHE_EXPORTACIONES_MB', 200) * 1024 * 1024
+
+
+def clave(tipo, vigencia, extension):
+    """Nombre del archivo en cache para una exportacion de la version actual de los datos."""
+    return f'{tipo}_{vigencia}_v{VERSION_FORMATO}-{version_datos(vigencia)}.{extension}'
+
+
+def _patron_versiones(nombre):
+    """Patron glob que cubre todas las versiones de la misma exportacion."""
+    return nombre.rsplit('_', 1)[0] + '_*' + Path(nombre).suffix
+
+
+def _etiquetas_metricas(nombre):
+    # nombre = '<tipo>_<vigencia>_v<formato>-<version>.<extension>'
+    return {'exportacion': nombre.rsplit('_', 2)[0], 'formato': Path(nombre).suffix.lstrip('.')}
+
+
+def obtener(nombre):
+    """Ruta del archivo en cache (marcandolo como usado) o None si no existe."""
+    ruta = directorio() / nombre
+    try:
+        os.utime(ruta)
+    except FileNotFoundError:
+        metricas.contador('pac_cache_exportaciones_total', resultado='miss', **_etiquetas_metricas(nombre))
+        return None
+    metricas.contador('pac_cache_exportaciones_total', resultado='hit', **_etiquetas_metricas(nombre))
+    return ruta
+
+
+def _ruta_temporal(nombre):
+    return directorio() / f'.{nombre}.{uuid.uuid4().hex}.tmp'
+
+
+def _publicar(temporal, nombre):
+    """Mueve el archivo terminado a su nombre final y aplica la politica de retencion."""
+    ruta = directorio() / nombre
+    os.replace(temporal, ruta)
+    # Las versiones anteriores de la misma exportacion ya no se pueden servir
+    for anterior in directorio().glob(_patron_versiones(nombre)):
+        if anterior.name != nombre:
+            anterior.unlink(missing_ok=True)
+    desalojar()
+    return ruta
+
+
+def guardar_mientras_envia(nombre, bloques):
+    """
+    Reenvia los bloques de bytes (para StreamingHttpResponse) y a la vez los
+    escribe en la cache. Si la descarga se interrumpe no se guarda nada.
+    """
+    temporal = _ruta_temporal(nombre)
+    completo = False
+    inicio = time.perf_counter()
+    try:
+        with open(temporal, 'wb') as archivo:
+            for bloque in bloques:
+                archivo.write(bloque)
+                yield bloque
+        completo = True
+    finally:
+        if completo:
+            # Incluye el envio al cliente: la construccion y la descarga van intercaladas
+            metricas.histograma(
+                'pac_exportacion_duracion_segundos', time.perf_counter() - inicio, **_etiquetas_metricas(nombre)
+            )
+            _publicar(temporal, nombre)
+        else:
+            temporal.unlink(missing_ok=True)
+
+
+def guardar_con(nombre, escribir):
+    """Llama escribir(ruta_temporal) y publica el resultado. Retorna la ruta final."""
+    temporal = _ruta_temporal(nombre)
+    inicio = time.perf_counter()
+    try:
+        escribir(temporal)
+    except BaseException:
+        temporal.unlink(missing_ok=True)
+        raise
+    metricas.histograma(
+        'pac_exportacion_duracion_segundos', time.perf_counter() - inicio, **_etiquetas_metricas(nombre)
+    )
+    return _publicar(temporal, nombre)
+
+
+def desalojar(limite=None):
+    """Elimina los archivos usados hace mas tiempo hasta quedar bajo el limite. Retorna los eliminados."""
+    limite = limite_bytes() if limite is None else limite
+    archivos = []
+    for ruta in directorio().iterdir():
+        if ruta.name.startswith('.'):
+            # Temporales huerfanos de descargas interrumpidas por un reinicio
+            try:
+                if time.time() - ruta.stat().st_mtime > 3600:
+                    ruta.unlink(missing_ok=True)
+            except FileNotFoundError:
+                pass
+            continue
+        try:
+            st = ruta.stat()
+        except FileNotFoundError:
+            continue
+        archivos.append((st.st_mtime, st.st_size, ruta))
+
+    total = sum(tamano for _, tamano, _ in archivos)
+    eliminados = []
+    for _, tamano, ruta in sorted(archivos):
+        if total <= limite:
+            break
+        ruta.unlink(missing_ok=True)
+        total -= tamano
+        eliminados.append(ruta.name)
+    return eliminados
+
+
+def limpiar():
+    """Vacia la cache de exportaciones."""
+    return desalojar(limite=0)
@@ -0,0 +1,222 @@
+"""
+Prueba de carga contra un servidor en ejecucion (runserver o gunicorn).
+
+Simula analistas concurrentes, cada uno en su propio hilo con su sesion:
+inicia sesion y repite, durante un tiempo fijo, una mezcla configurable de
+vistas de lectura, exportaciones e importaciones de libros sinteticos. Por
+endpoint se registran latencias, errores y errores de bloqueo de SQLite
+("database is locked", que el servidor muestra en la pagina de error con
+DEBUG o en el mensaje de error de las importaciones).
+"""
+
+import http.client
+import math
+import http.cookiejar
+import random
+import re
+import threading
+import time
+import uuid
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlencode
+from urllib.request import HTTPCookieProcessor, Request, build_opener
+
+from django.urls import reverse
+
+from . import benchmark
+
+
+BLOQUEO_SQLITE = re.compile(rb'database (table )?is locked')
+CONTENT_TYPE_XLSX = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# Vistas de importacion por modulo (la hoja la elige cada vista)
+VISTAS_IMPORTACION = [
+    ('aim_inicial', 'importar_aim_inicial'),
+    ('programado', 'importar_pac_programado'),
+    ('compromisos', 'importar_pac_compromisos'),
+    ('pagos', 'importar_pac_pagos'),
+]
+
+
+def percentil(valores, p):
+    """Percentil por rango mas cercano de una lista ordenada."""
+    if not valores:
+        return None
+    return valores[max(0, math.ceil(p / 100 * len(valores)) - 1)]
+
+
+class Sesion:
+    """Cliente HTTP con cookies propias (una sesion de Django por analista simulado)."""
+
+    def __init__(self, base, timeout=120):
+        self.base = base.rstrip('/')
+        self.timeout = timeout
+        self.cookies = http.cookiejar.CookieJar()
+        self.opener = build_opener(HTTPCookieProcessor(self.cookies))
+
+    def _csrf(self):
+        return next((c.value for c in self.cookies if c.name == 'csrftoken'), '')
+
+    def solicitar(self, ruta, datos=None, archivo=None):
+        """Retorna (estado, cuerpo). datos: campos de un POST; archivo: (campo, nombre, bytes, content_type)."""
+        url = self.base + ruta
+        encabezados = {'Referer': url}
+        cuerpo = None
+        if datos is not None or archivo is not None:
+            datos = {'csrfmiddlewaretoken': self._csrf(), **(datos or {})}
+            if archivo is None:
+                cuerpo = urlencode(datos).encode()
+                encabezados['Content-Type'] = 'application/x-www-form-urlencoded'
+            else:
+                cuerpo, encabezados['Content-Type'] = _multipart(datos, *archivo)
+        try:
+            with self.opener.open(Request(url, data=cuerpo, headers=encabezados), timeout=self.timeout) as respuesta:
+                return respuesta.status, respuesta.read()
+        except HTTPError as e:
+            return e.code, e.read()
+
+    def iniciar_sesion(self, usuario, clave):
+        self.solicitar('/login/')
+        estado, cuerpo = self.solicitar('/login/', {'username': usuario, 'password': clave})
+        # Un login fallido vuelve a mostrar el formulario
+        if estado != 200 or b'name="password"' in cuerpo:
+            raise RuntimeError(f'No se pudo iniciar sesion como {usuario} en {self.base}')
+
+
+def _multipart(campos, campo_archivo, nombre, contenido, content_type):
+    limite = uuid.uuid4().hex
+    partes = []
+    for campo, valor in campos.items():
+        partes.append(f'--{limite}\r\nContent-Disposition: form-data; name="{campo}"\r\n\r\n{valor}\r\n'.encode())
+    partes.append(
+        f'--{limite}\r\nContent-Disposition: form-data; name="{campo_archivo}"; filename="{nombre}"\r\n'
+        f'Content-Type: {content_type}\r\n\r\n'.encode()
+    )
+    partes.append(contenido)
+    partes.append(f'\r\n--{limite}--\r\n'.encode())
+    return b''.join(partes), f'multipart/form-data; boundary={limite}'
+
+
+def operaciones(vigencia, fuente_pk=None):
+    """{grupo: [(nombre, funcion(sesion, libro) -> (estado, cuerpo, ok))]} de la mezcla."""
+    def lectura(url):
+        def ejecutar(sesion, libro):
+            estado, cuerpo = sesion.solicitar(url)
+            return estado, cuerpo, estado == 200
+        return ejecutar
+
+    def importacion(nombre_url):
+        url = reverse(nombre_url)
+
+        def ejecutar(sesion, libro):
+            estado, cuerpo = sesion.solicitar(
+                url, {'vigencia': vigencia}, ('archivo', f'pac_carga_{vigencia}.xlsx', libro, CONTENT_TYPE_XLSX)
+            )
+            # Una importacion exitosa redirige al listado; si vuelve al formulario hubo un error
+            return estado, cuerpo, estado == 200 and b'name="archivo"' not in cuerpo
+        return ejecutar
+
+    # Sin fuentes en la vigencia no hay detalle que consultar
+    vistas = [(n, url) for n, url in benchmark.urls_vistas(vigencia, fuente_pk or 0) if fuente_pk or n != 'fuente_detalle']
+    return {
+        'vistas': [(nombre, lectura(url)) for nombre, url in vistas],
+        'exportaciones': [(nombre, lectura(url)) for nombre, url in benchmark.urls_exportaciones(vigencia)],
+        'importaciones': [(f'importar_{modulo}', importacion(nombre_url)) for modulo, nombre_url in VISTAS_IMPORTACION],
+    }
+
+
+def preparar(sesion, libro, vigencia, importar=True):
+    """
+    Importa el libro en los cuatro modulos de la vigencia (si `importar`).
+    Retorna el pk de una fuente de la vigencia para la vista de detalle, o None.
+    """
+    if importar:
+        for nombre, operacion in operaciones(vigencia)['importaciones']:
+            estado, _, ok = operacion(sesion, libro)
+            if not ok:
+                raise RuntimeError(f'La importacion {nombre} fallo (HTTP {estado})')
+    _, cuerpo = sesion.solicitar(reverse('fuentes_financiacion') + f'?vigencia={vigencia}')
+    encontrada = re.search(rb'/fuentes/(\d+)/detalle/', cuerpo)
+    return int(encontrada.group(1)) if encontrada else None
+
+
+class Resultados:
+    def __init__(self):
+        self._candado = threading.Lock()
+        self.por_endpoint = {}
+
+    def registrar(self, nombre, ms, ok, bloqueo):
+        with self._candado:
+            r = self.por_endpoint.setdefault(nombre, {'latencias': [], 'errores': 0, 'bloqueos': 0})
+            r['latencias'].append(ms)
+            r['errores'] += not ok
+            r['bloqueos'] += bloqueo
+
+    def resumen(self, segundos):
+        """Filas por endpoint (y una fila 'TOTAL') con percentiles, throughput y tasas de error."""
+        filas = []
+        todas = []
+        for nombre, r in sorted(self.por_endpoint.items()):
+            todas.append(r)
+            filas.append(_fila(nombre, r['latencias'], r['errores'], r['bloqueos'], segundos))
+        filas.append(_fila(
+            'TOTAL', [ms for r in todas for ms in r['latencias']],
+            sum(r['errores'] for r in todas), sum(r['bloqueos'] for r in todas), segundos,
+        ))
+        return filas
+
+
+def _fila(nombre, latencias, errores, bloqueos, segundos):
+    latencias = sorted(latencias)
+    n = len(latencias)
+    return {
+        'nombre': nombre, 'requests': n, 'por_segundo': round(n / segundos, 2) if segundos else None,
+        'p50_ms': percentil(latencias, 50), 'p95_ms': percentil(latencias, 95), 'p99_ms': percentil(latencias, 99),
+        'max_ms': latencias[-1] if latencias else None,
+        'errores': errores, 'tasa_error': round(errores / n, 4) if n else 0, 'bloqueos_sqlite': bloqueos,
+    }
+
+
+def ejecutar(base, usuario, clave, mezcla, analistas, segundos, libro, vigencia,
+             fuente_pk=None, pausa=0.5, semilla=0, timeout=120):
+    """
+    Corre la prueba y retorna (Resultados, segundos reales). mezcla:
+    {grupo: peso} con grupos de operaciones(). Cada analista espera en promedio
+    `pausa` segundos (distribucion exponencial) entre requests.
+    """
+    grupos = operaciones(vigencia, fuente_pk)
+    pesos = [(grupo, peso) for grupo, peso in mezcla.items() if peso > 0 and grupos.get(grupo)]
+    resultados = Resultados()
+    fin = time.monotonic() + segundos
+    fallas_login = []
+
+    def analista(i):
+        aleatorio = random.Random(semilla * 1000 + i)
+        sesion = Sesion(base, timeout)
+        try:
+            sesion.iniciar_sesion(usuario, clave)
+        except (RuntimeError, URLError, OSError) as e:
+            fallas_login.append(str(e))
+            return
+        while time.monotonic() < fin:
+            grupo = aleatorio.choices([g for g, _ in pesos], [p for _, p in pesos])[0]
+            nombre, operacion = aleatorio.choice(grupos[grupo])
+            inicio = time.perf_counter()
+            try:
+                estado, cuerpo, ok = operacion(sesion, libro)
+                bloqueo = bool(BLOQUEO_SQLITE.search(cuerpo))
+            except (URLError, OSError, http.client.HTTPException):
+                ok, bloqueo = False, False
+            resultados.registrar(nombre, round((time.perf_counter() - inicio) * 1000, 1), ok and not bloqueo, bloqueo)
+            if pausa:
+                time.sleep(aleatorio.expovariate(1 / pausa))
+
+    hilos = [threading.Thread(target=analista, args=(i,), daemon=True) for i in range(analistas)]
+    inicio = time.monotonic()
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    if fallas_login and not resultados.por_endpoint:
+        raise RuntimeError(fallas_login[0])
+    return resultados, time.monotonic() - inicio
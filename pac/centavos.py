@@ -0,0 +1,55 @@
+"""
+Representacion de valores monetarios como enteros de 64 bits en centavos.
+
+Las columnas Decimal(20, 2) se suman en SQLite como REAL y se convierten de
+nuevo a Decimal en Python. Guardando centavos enteros la suma es exacta en la
+base de datos y en NumPy (int64), y la conversion a Decimal solo ocurre en los
+bordes (ORM y Excel).
+"""
+
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import models
+
+
+CENTAVO = Decimal('0.01')
+
+
+def a_centavos(valor):
+    """Convierte pesos (Decimal, int, float o str) a centavos enteros, redondeando al centavo."""
+    if valor is None or valor == '':
+        return 0
+    if not isinstance(valor, Decimal):
+        valor = Decimal(str(valor))
+    return int((valor * 100).quantize(Decimal('1'), rounding=ROUND_HALF_UP))
+
+
+def de_centavos(centavos):
+    """Convierte centavos enteros a pesos como Decimal con 2 decimales (exacto)."""
+    if centavos is None:
+        return None
+    return Decimal(int(centavos)).scaleb(-2)
+
+
+class CentavosField(models.BigIntegerField):
+    """
+    Guarda un valor en pesos como entero de centavos (BIGINT).
+    En Python se lee y escribe como Decimal, de modo que Sum() devuelve
+    un Decimal exacto calculado con aritmetica entera en la base de datos.
+    """
+    description = 'Valor monetario en centavos (entero de 64 bits)'
+
+    def from_db_value(self, value, expression, connection):
+        return de_centavos(value)
+
+    def to_python(self, value):
+        if value is None or isinstance(value, Decimal):
+            return value
+        return Decimal(str(value)).quantize(CENTAVO, rounding=ROUND_HALF_UP)
+
+    def get_prep_value(self, value):
+        if value is None:
+            return None
+        if hasattr(value, 'resolve_expression'):
+            return value
+        return a_centavos(value)
@@ -0,0 +1,172 @@
+"""
+Comparacion entre vigencias.
+
+comparar() retorna, para varias vigencias a la vez, las curvas mensuales de
+programado y ejecutado alineadas por mes y los totales por categoria y por
+rubro alineados por codigo de rubro. Los totales de programado, compromisos
+y pagos se suman sobre la tabla larga (consultas.campo_valor), igual que
+las curvas y las demas paginas. Cada modelo se consulta una sola vez para
+todo el conjunto (vigencia__in agrupado por vigencia) en lugar de repetir
+las consultas de una vigencia N veces; las vigencias archivadas se
+consultan en su propia base (ver archivado.agrupar_por_base).
+
+El resultado se guarda en la cache 'pac' con una clave formada por el
+conjunto de vigencias y la version de sus datos (consultas.versiones_datos),
+de modo que una importacion o eliminacion en cualquiera de ellas lo invalida.
+"""
+
+from hashlib import sha1
+from itertools import accumulate
+
+from django.conf import settings
+from django.db.models import Max, Sum
+
+from .archivado import agrupar_por_base
+from .centavos import CENTAVO
+from .consultas import D0, cache_resultados, campo_apropiacion, campo_valor, versiones_datos
+from .models import AIMInicial, PACEjecutadoCompromiso, PACEjecutadoPago, PACProgramado, PACValorMensual, MESES
+
+
+MAX_VIGENCIAS = 10
+
+CERO = D0.quantize(CENTAVO)
+
+# Curvas mensuales: (clave, modelo, tipo, categorias excluidas), con las mismas exclusiones que Reportes
+CURVAS = [
+    ('prog_ing', PACProgramado, 'INGRESO', ['SALDO_INICIAL']),
+    ('ejec_ing', PACEjecutadoPago, 'INGRESO', ['SALDO_INICIAL']),
+    ('prog_gas', PACProgramado, 'GASTO', ['RESERVAS', 'CUENTAS_POR_PAGAR']),
+    ('comp_gas', PACEjecutadoCompromiso, 'GASTO', ['RESERVAS', 'CUENTAS_POR_PAGAR']),
+    ('pago_gas', PACEjecutadoPago, 'GASTO', ['RESERVAS', 'CUENTAS_POR_PAGAR']),
+]
+
+# Totales por categoria y rubro: (clave, modelo); AIM suma la apropiacion definitiva y los demas sus meses
+# en la tabla larga
+TOTALES = [
+    ('aim', AIMInicial),
+    ('prog', PACProgramado),
+    ('comp', PACEjecutadoCompromiso),
+    ('pago', PACEjecutadoPago),
+]
+
+
+def _clave_cache(vigencias):
+    versiones = versiones_datos(vigencias)
+    huella = sha1(repr([(v, versiones[v]) for v in vigencias]).encode()).hexdigest()[:12]
+    return f"pac:comparacion:{'-'.join(map(str, vigencias))}:{huella}"
+
+
+def comparar(vigencias):
+    """Comparacion de `vigencias` (ordenadas y sin repetir), desde la cache si los datos no cambiaron."""
+    vigencias = sorted(set(vigencias))
+    clave = _clave_cache(vigencias)
+    cache = cache_resultados()
+    resultado = cache.get(clave)
+    if resultado is None:
+        resultado = _calcular(vigencias)
+        cache.set(clave, resultado, getattr(settings, 'PAC_COMPARACION_CACHE_SEGUNDOS', 3600))
+    return resultado
+
+
+def limpiar():
+    """Vacia la cache 'pac' (comparaciones, proyecciones y simulaciones); la cache por defecto no se toca."""
+    cache_resultados().clear()
+
+
+def _calcular(vigencias):
+    mensual = {}
+    rubros = {}
+    for grupo in agrupar_por_base(vigencias).values():
+        # Una consulta sobre la tabla larga para las curvas de los tres modulos mensuales
+        qs = PACValorMensual.objects.filter(
+            vigencia__in=grupo, es_subtotal=False,
+            modulo__in=[PACProgramado.MODULO, PACEjecutadoCompromiso.MODULO, PACEjecutadoPago.MODULO],
+        )
+        filas = qs.values('vigencia', 'modulo', 'tipo', 'categoria', 'mes').annotate(t=Sum(campo_valor())).order_by()
+        for fila in filas:
+            clave = (fila['vigencia'], fila['modulo'], fila['tipo'], fila['categoria'], fila['mes'])
+            mensual[clave] = _pesos(fila['t'])
+        # Y otra para sus totales por rubro, de modo que coincidan con las curvas y con las demas paginas
+        filas = (
+            qs.values('vigencia', 'modulo', 'tipo', 'categoria', 'codigo_rubro')
+            .annotate(t=Sum(campo_valor())).order_by()
+        )
+        totales = {
+            (fila['vigencia'], fila['modulo'], fila['tipo'], fila['categoria'], fila['codigo_rubro']): _pesos(fila['t'])
+            for fila in filas
+        }
+        # Una consulta por modulo para los rubros (y la apropiacion del AIM)
+        for nombre, modelo in TOTALES:
+            agregados = {'t': Sum(campo_apropiacion())} if modelo is AIMInicial else {}
+            filas = (
+                modelo.objects.filter(vigencia__in=grupo, es_subtotal=False)
+                .values('vigencia', 'tipo', 'categoria', 'codigo_rubro')
+                .annotate(nombre_rubro=Max('nombre_rubro'), **agregados).order_by()
+            )
+            for fila in filas:
+                rubro = rubros.setdefault((fila['tipo'], fila['categoria'], fila['codigo_rubro']), {
+                    'tipo': fila['tipo'], 'codigo_rubro': fila['codigo_rubro'],
+                    'nombre_rubro': fila['nombre_rubro'], 'categoria': fila['categoria'],
+                    'valores': {v: dict.fromkeys([n for n, _ in TOTALES], CERO) for v in vigencias},
+                })
+                if modelo is AIMInicial:
+                    valor = _pesos(fila['t'])
+                else:
+                    valor = totales.get(
+                        (fila['vigencia'], modelo.MODULO, fila['tipo'], fila['categoria'], fila['codigo_rubro']), CERO
+                    )
+                rubro['valores'][fila['vigencia']][nombre] += valor
+
+    return {
+        'vigencias': vigencias,
+        'curvas': [_curvas(vigencia, mensual) for vigencia in vigencias],
+        'categorias': _categorias(vigencias, rubros.values()),
+        'rubros': [
+            {**rubro, 'valores': [rubro['valores'][v] for v in vigencias]}
+            for _, rubro in sorted(rubros.items(), key=_orden)
+        ],
+    }
+
+
+def _pesos(suma):
+    # Las sumas de columnas Decimal en SQLite son REAL: se redondean al centavo
+    return (suma or CERO).quantize(CENTAVO)
+
+
+def _orden(item):
+    # Ingresos antes que gastos; luego por categoria y codigo
+    (tipo, *resto), _ = item
+    return tipo != 'INGRESO', resto
+
+
+def _curvas(vigencia, mensual):
+    """Series mensuales y acumuladas de una vigencia (listas de 12, indice 0 = enero)."""
+    curvas = {'vigencia': vigencia}
+    for clave, modelo, tipo, excluidas in CURVAS:
+        serie = [CERO] * len(MESES)
+        for (v, modulo, t, categoria, mes), valor in mensual.items():
+            if v == vigencia and modulo == modelo.MODULO and t == tipo and categoria not in excluidas:
+                serie[mes - 1] += valor
+        curvas[clave] = serie
+        curvas[f'acum_{clave}'] = list(accumulate(serie))
+    return curvas
+
+
+def _categorias(vigencias, rubros):
+    nombres = dict(AIMInicial.CATEGORIA_CHOICES)
+    categorias = {}
+    for rubro in rubros:
+        if not rubro['categoria']:
+            continue
+        categoria = categorias.setdefault((rubro['tipo'], rubro['categoria']), {
+            'tipo': rubro['tipo'], 'categoria': rubro['categoria'],
+            'nombre': nombres.get(rubro['categoria'], rubro['categoria']),
+            'valores': {v: dict.fromkeys([n for n, _ in TOTALES], CERO) for v in vigencias},
+        })
+        for v in vigencias:
+            for nombre, valor in rubro['valores'][v].items():
+                categoria['valores'][v][nombre] += valor
+    return [
+        {**categoria, 'valores': [categoria['valores'][v] for v in vigencias]}
+        for _, categoria in sorted(categorias.items(), key=_orden)
+    ]
@@ -0,0 +1,76 @@
+"""
+Concurrencia sobre SQLite.
+
+- Cada conexion SQLite se abre en modo WAL (PAC_SQLITE_WAL): los lectores
+  leen una instantanea confirmada y no se bloquean mientras una importacion
+  escribe. La espera maxima por el bloqueo de escritura (busy timeout) es la
+  opcion 'timeout' de DATABASES.
+- Las importaciones de un mismo modulo y vigencia se serializan con un
+  registro BloqueoImportacion: una segunda carga simultanea falla con
+  ImportacionEnCurso en lugar de intercalar su borrado e insercion con la
+  primera. El bloqueo vive en la base de datos, por lo que vale entre workers.
+- La importacion lee y clasifica el libro fuera de la transaccion y solo
+  escribe (borrado de la vigencia, insercion masiva, alertas, indice de
+  busqueda y resumen por rubro) en una transaccion corta; ver
+  utils.importar_excel_pac.
+- Una vigencia archivada (ver pac/archivado.py) es de solo lectura: su
+  bloqueo falla con VigenciaArchivada.
+"""
+
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .archivado import VigenciaArchivada, es_alias_archivo, esta_archivada
+from .models import BloqueoImportacion
+
+
+class ImportacionEnCurso(Exception):
+    pass
+
+
+def configurar_conexion(sender, connection, **kwargs):
+    """Receptor de connection_created: activa WAL en las conexiones SQLite."""
+    if connection.vendor != 'sqlite' or not getattr(settings, 'PAC_SQLITE_WAL', True):
+        return
+    if es_alias_archivo(connection.alias):
+        # Los archivos de vigencias se abren de solo lectura y se mueven como un unico archivo
+        return
+    with connection.cursor() as cursor:
+        # El modo WAL queda guardado en el archivo; synchronous=NORMAL es seguro con WAL
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute('PRAGMA synchronous=NORMAL')
+
+
+def _vencimiento():
+    return timezone.now() - timedelta(minutes=getattr(settings, 'PAC_IMPORTACION_BLOQUEO_MINUTOS', 30))
+
+
+@contextmanager
+def bloqueo_importacion(modulo, vigencia, usuario=None, permitir_archivada=False):
+    """
+    Reserva la carga de `modulo` y `vigencia` mientras dura el bloque. Lanza
+    ImportacionEnCurso si otra carga la tiene y VigenciaArchivada si la
+    vigencia esta archivada. Los bloqueos mas antiguos que
+    PAC_IMPORTACION_BLOQUEO_MINUTOS (proceso caido) se descartan.
+    """
+    if not permitir_archivada and esta_archivada(vigencia):
+        raise VigenciaArchivada(
+            f'La vigencia {vigencia} esta archivada (solo lectura); restaurela con archivar_vigencia --restaurar '
+            'para modificarla.'
+        )
+    BloqueoImportacion.objects.filter(modulo=modulo, vigencia=vigencia, fecha__lt=_vencimiento()).delete()
+    try:
+        with transaction.atomic():
+            bloqueo = BloqueoImportacion.objects.create(modulo=modulo, vigencia=vigencia, usuario=usuario)
+    except IntegrityError:
+        raise ImportacionEnCurso(
+            f'Ya hay una carga de {modulo} para la vigencia {vigencia} en curso; intente de nuevo cuando termine.'
+        )
+    try:
+        yield bloqueo
+    finally:
+        BloqueoImportacion.objects.filter(pk=bloqueo.pk).delete()
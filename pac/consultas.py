@@ -0,0 +1,139 @@
+"""
+Consultas agregadas sobre la tabla larga PACValorMensual.
+
+Cada serie mensual se obtiene con un solo GROUP BY mes en lugar de un
+Sum() por cada columna enero..diciembre. Con PAC_ARITMETICA_CENTAVOS activo
+las sumas se hacen sobre las columnas en centavos enteros (ver pac/centavos.py).
+"""
+
+from decimal import Decimal
+from hashlib import sha1
+from itertools import accumulate
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import BigIntegerField, Sum
+from django.db.models.functions import Cast
+
+from .models import PACValorMensual, VersionDatos, MESES
+
+
+D0 = Decimal('0')
+
+
+def usar_centavos():
+    return getattr(settings, 'PAC_ARITMETICA_CENTAVOS', True)
+
+
+def campo_valor():
+    """Columna de la tabla larga sobre la que se agrega."""
+    return 'valor_centavos' if usar_centavos() else 'valor'
+
+
+def campo_apropiacion():
+    """Columna de apropiacion definitiva sobre la que se agrega."""
+    return 'apropiacion_definitiva_centavos' if usar_centavos() else 'apropiacion_definitiva'
+
+
+def campo_total():
+    """Columna de total de los modulos PAC sobre la que se agrega (la suma de los meses en centavos)."""
+    return 'total_centavos' if usar_centavos() else 'total'
+
+
+def _valores_qs(modelo, vigencia, mes_desde=1, mes_hasta=12, excluir_categorias=None, **filtros):
+    qs = PACValorMensual.objects.filter(
+        modulo=modelo.MODULO, vigencia=vigencia,
+        mes__gte=mes_desde, mes__lte=mes_hasta, **filtros
+    )
+    if excluir_categorias:
+        qs = qs.exclude(categoria__in=excluir_categorias)
+    return qs
+
+
+def serie_mensual(modelo, vigencia, mes_desde=1, mes_hasta=12, excluir_categorias=None, **filtros):
+    """
+    Suma por mes de un modulo PAC.
+
+    Retorna una lista de 12 Decimal (indice 0 = enero). Los meses fuera del
+    rango [mes_desde, mes_hasta] quedan en cero.
+    """
+    serie = [D0] * len(MESES)
+    qs = _valores_qs(modelo, vigencia, mes_desde, mes_hasta, excluir_categorias, **filtros)
+    for fila in qs.values('mes').annotate(t=Sum(campo_valor())):
+        serie[fila['mes'] - 1] = fila['t'] or D0
+    return serie
+
+
+def series_mensuales_por(campos, modelo, vigencia, mes_desde=1, mes_hasta=12, excluir_categorias=None, **filtros):
+    """
+    Igual que serie_mensual pero agrupado por los campos indicados.
+
+    Retorna un dict {tupla de valores de campos: lista de 12 Decimal}.
+    """
+    campos = list(campos)
+    series = {}
+    qs = _valores_qs(modelo, vigencia, mes_desde, mes_hasta, excluir_categorias, **filtros)
+    for fila in qs.values(*campos, 'mes').annotate(t=Sum(campo_valor())):
+        clave = tuple(fila[c] for c in campos)
+        serie = series.setdefault(clave, [D0] * len(MESES))
+        serie[fila['mes'] - 1] = fila['t'] or D0
+    return series
+
+
+def acumulado(serie):
+    """Curva acumulada de una serie mensual."""
+    return list(accumulate(serie))
+
+
+def totales_mensuales(modelo, vigencia, **kwargs):
+    """Serie mensual como dict {nombre_mes: valor} para los footers de las tablas."""
+    return dict(zip(MESES, serie_mensual(modelo, vigencia, **kwargs)))
+
+
+def matriz_mensual_centavos(modelo, vigencia, mes_desde=1, mes_hasta=12, excluir_categorias=None, **filtros):
+    """
+    Valores mensuales como matriz NumPy int64 en centavos.
+
+    Retorna (registro_ids, matriz) donde matriz tiene forma (n_registros, 12)
+    y la fila i corresponde a registro_ids[i]. Las sumas sobre la matriz son
+    exactas; convertir a pesos con de_centavos() solo al presentar.
+    """
+    qs = _valores_qs(modelo, vigencia, mes_desde, mes_hasta, excluir_categorias, **filtros)
+    filas = np.array(
+        list(qs.annotate(c=Cast('valor_centavos', BigIntegerField())).values_list('registro_id', 'mes', 'c')),
+        dtype=np.int64,
+    ).reshape(-1, 3)
+    registro_ids, posiciones = np.unique(filas[:, 0], return_inverse=True)
+    matriz = np.zeros((len(registro_ids), len(MESES)), dtype=np.int64)
+    np.add.at(matriz, (posiciones, filas[:, 1] - 1), filas[:, 2])
+    return registro_ids, matriz
+
+
+def cache_resultados():
+    """Cache de las comparaciones, proyecciones y simulaciones (alias 'pac' de CACHES)."""
+    return caches['pac']
+
+
+def version_datos(vigencia):
+    """
+    Huella de los datos de una vigencia: cambia con cada escritura (ver
+    models.VersionDatos, que incrementan la importacion, la eliminacion y el
+    save()/delete() de cada registro o fuente). Sirve como parte de la clave
+    de cache de los archivos exportados, las comparaciones y las proyecciones.
+    """
+    return versiones_datos([vigencia])[vigencia]
+
+
+def versiones_datos(vigencias):
+    """version_datos de varias vigencias con una sola consulta."""
+    contadores = {
+        fila[0]: fila for fila in VersionDatos.objects.filter(vigencia__in=vigencias).values_list(
+            'vigencia', 'version', 'fecha'
+        )
+    }
+    # La fecha distingue un contador recreado (base nueva o reiniciada) de uno anterior con el mismo numero
+    return {
+        vigencia: sha1(repr((contadores.get(vigencia), usar_centavos())).encode()).hexdigest()[:12]
+        for vigencia in vigencias
+    }
@@ -0,0 +1,81 @@
+"""
+Enrutamiento de lecturas a una replica de solo lectura.
+
+Si DATABASES define el alias 'replica' (PAC_DB_REPLICA o PAC_DB_REPLICA_HOST,
+ver settings), las vistas de consulta y las exportaciones de pac leen los
+datos PAC de la replica; las importaciones, el CRUD, las escrituras y los
+modelos que deben verse al instante (trabajos, bloqueos, perfiles) usan la
+primaria. ReplicaLecturaMiddleware decide por request y, despues de una
+escritura, fija al usuario a la primaria durante
+PAC_REPLICA_LECTURA_PROPIA_SEGUNDOS para que vea sus propios cambios aunque
+la replica aun no los tenga.
+
+En desarrollo la replica puede ser un segundo archivo SQLite que el comando
+refrescar_replica copia con la API de backup.
+
+Las vigencias archivadas tienen su propia base (ver pac/archivado.py); el
+QuerySet las elige por vigencia y este enrutador solo evita que las
+relaciones de sus registros (usuario) se busquen en el archivo.
+"""
+
+import contextvars
+
+from django.conf import settings
+
+from .archivado import MODELOS_ARCHIVADOS, es_alias_archivo
+
+
+ALIAS_REPLICA = 'replica'
+
+# Modelos que siempre se leen de la primaria: cambian durante el request o se consultan para ver su estado
+SOLO_PRIMARIA = {'trabajoexportacion', 'bloqueoimportacion', 'perfilrequest'}
+
+_alias_lectura = contextvars.ContextVar('pac_alias_lectura', default=None)
+
+
+def replica_configurada():
+    return ALIAS_REPLICA in settings.DATABASES
+
+
+def alias_lectura():
+    """Alias del que lee el request actual (None = primaria)."""
+    return _alias_lectura.get()
+
+
+def fijar_alias_lectura(alias):
+    _alias_lectura.set(alias)
+
+
+def _desde_archivo(model, hints):
+    """Base de archivo de la instancia relacionada, si es un registro archivado."""
+    instancia = hints.get('instance')
+    alias = instancia._state.db if instancia is not None else None
+    if es_alias_archivo(alias):
+        return alias
+    return None
+
+
+class EnrutadorReplica:
+    def db_for_read(self, model, **hints):
+        archivo = _desde_archivo(model, hints)
+        if archivo:
+            return archivo if model._meta.model_name in MODELOS_ARCHIVADOS else 'default'
+        alias = _alias_lectura.get()
+        if alias and model._meta.app_label == 'pac' and model._meta.model_name not in SOLO_PRIMARIA:
+            return alias
+        return None
+
+    def db_for_write(self, model, **hints):
+        # Un registro archivado solo se puede guardar en su archivo, que es de solo lectura
+        archivo = _desde_archivo(model, hints)
+        if archivo and model._meta.model_name in MODELOS_ARCHIVADOS:
+            return archivo
+        # Un objeto leido de la replica se guarda en la primaria
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # La replica es una copia de la primaria
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != ALIAS_REPLICA and not es_alias_archivo(db)
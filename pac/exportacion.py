@@ -0,0 +1,191 @@
+"""
+Exportacion masiva del detalle por rubro en CSV y Parquet.
+
+Los registros se leen con QuerySet.iterator() (cursor del lado del servidor
+en PostgreSQL, lectura por bloques en SQLite) y se escriben por lotes, de modo
+que la memoria usada no depende del numero de filas.
+
+Tipos de exportacion:
+    aim_inicial, programado, compromisos, pagos: todas las columnas de PACBase
+    consolidado: los cuatro modulos unidos por rubro (tipo, codigo, fuente)
+"""
+
+import csv
+
+from django.db import connection
+from django.db.models import F
+from django.db.models.functions import Collate
+
+from .models import AIMInicial, PACProgramado, PACEjecutadoCompromiso, PACEjecutadoPago, MESES
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet es opcional
+    pa = pq = None
+
+
+MODULOS = {
+    'aim_inicial': AIMInicial,
+    'programado': PACProgramado,
+    'compromisos': PACEjecutadoCompromiso,
+    'pagos': PACEjecutadoPago,
+}
+PREFIJOS = {'aim_inicial': 'aim', 'programado': 'prog', 'compromisos': 'comp', 'pagos': 'pago'}
+CONSOLIDADO = 'consolidado'
+TIPOS_EXPORTACION = [*MODULOS, CONSOLIDADO]
+FORMATOS = ['csv', 'parquet']
+
+COLUMNAS_VALOR = [
+    'apropiacion_inicial', 'adiciones', 'reduccion', 'creditos', 'contracreditos',
+    'apropiacion_definitiva', *MESES, 'total',
+]
+COLUMNAS_DETALLE = [
+    'id', 'vigencia', 'tipo', 'categoria', 'codigo_rubro', 'nombre_rubro', 'fuente_financiacion',
+    *COLUMNAS_VALOR, 'es_subtotal', 'fila_excel',
+]
+
+CLAVE_RUBRO = ['tipo', 'codigo_rubro', 'fuente_financiacion']
+DESCRIPCION_RUBRO = ['nombre_rubro', 'categoria', 'es_subtotal']
+VALORES_CONSOLIDADO = ['apropiacion_definitiva', *MESES, 'total']
+COLUMNAS_CONSOLIDADO = [
+    'vigencia', *CLAVE_RUBRO, *DESCRIPCION_RUBRO,
+    *[f'{prefijo}_{c}' for prefijo in PREFIJOS.values() for c in VALORES_CONSOLIDADO],
+]
+
+TAMANO_LOTE = 2000
+TAMANO_LOTE_PARQUET = 10000
+
+
+def filas_detalle(modelo, vigencia, tamano_lote=TAMANO_LOTE):
+    """Itera las filas de un modulo como tuplas en el orden de COLUMNAS_DETALLE."""
+    qs = modelo.objects.filter(vigencia=vigencia).order_by('id').values_list(*COLUMNAS_DETALLE)
+    return qs.iterator(chunk_size=tamano_lote)
+
+
+def _orden_binario(campo):
+    # El merge-join compara claves en Python, asi que la base de datos debe
+    # ordenar por punto de codigo (SQLite ya lo hace con su collation BINARY).
+    if connection.vendor == 'postgresql':
+        return Collate(campo, 'C')
+    return F(campo)
+
+
+def _flujo_por_rubro(modelo, vigencia, tamano_lote):
+    """
+    Registros de un modulo ordenados por rubro como pares (clave, resto).
+    Un rubro repetido dentro del modulo se distingue por su numero de aparicion.
+    """
+    qs = (
+        modelo.objects.filter(vigencia=vigencia)
+        .order_by(*[_orden_binario(c) for c in CLAVE_RUBRO], 'fila_excel', 'id')
+        .values_list(*CLAVE_RUBRO, *DESCRIPCION_RUBRO, *VALORES_CONSOLIDADO)
+    )
+    anterior, aparicion = None, 0
+    for fila in qs.iterator(chunk_size=tamano_lote):
+        clave = fila[:len(CLAVE_RUBRO)]
+        aparicion = aparicion + 1 if clave == anterior else 0
+        anterior = clave
+        yield (*clave, aparicion), fila[len(CLAVE_RUBRO):]
+
+
+def filas_consolidado(vigencia, tamano_lote=TAMANO_LOTE):
+    """
+    Une los cuatro modulos por rubro con un merge-join sobre flujos ordenados:
+    solo se mantiene en memoria la fila actual de cada modulo. Los valores de
+    un modulo donde el rubro no existe quedan vacios.
+    """
+    vacio = (None,) * len(VALORES_CONSOLIDADO)
+    n_desc = len(DESCRIPCION_RUBRO)
+    flujos = [_flujo_por_rubro(m, vigencia, tamano_lote) for m in MODULOS.values()]
+    actuales = [next(f, None) for f in flujos]
+    while any(actuales):
+        clave = min(actual[0] for actual in actuales if actual)
+        descripcion = None
+        valores = []
+        for i, actual in enumerate(actuales):
+            if actual and actual[0] == clave:
+                descripcion = descripcion or actual[1][:n_desc]
+                valores.extend(actual[1][n_desc:])
+                actuales[i] = next(flujos[i], None)
+            else:
+                valores.extend(vacio)
+        yield (vigencia, *clave[:len(CLAVE_RUBRO)], *descripcion, *valores)
+
+
+def columnas_y_filas(tipo, vigencia, tamano_lote=TAMANO_LOTE):
+    """Retorna (columnas, iterador de filas) para un tipo de TIPOS_EXPORTACION."""
+    if tipo == CONSOLIDADO:
+        return COLUMNAS_CONSOLIDADO, filas_consolidado(vigencia, tamano_lote)
+    return COLUMNAS_DETALLE, filas_detalle(MODULOS[tipo], vigencia, tamano_lote)
+
+
+# ============================================================
+# CSV
+# ============================================================
+class _Eco:
+    """Pseudo-archivo para csv.writer: write() retorna la linea en lugar de guardarla."""
+
+    def write(self, valor):
+        return valor
+
+
+def generar_csv(columnas, filas, tamano_lote=TAMANO_LOTE):
+    """Genera el CSV como bloques de bytes UTF-8 de `tamano_lote` filas."""
+    escritor = csv.writer(_Eco())
+    bloque = [escritor.writerow(columnas)]
+    for fila in filas:
+        bloque.append(escritor.writerow(fila))
+        if len(bloque) >= tamano_lote:
+            yield ''.join(bloque).encode('utf-8')
+            bloque = []
+    if bloque:
+        yield ''.join(bloque).encode('utf-8')
+
+
+# ============================================================
+# PARQUET
+# ============================================================
+def parquet_disponible():
+    return pq is not None
+
+
+def _tipo_arrow(columna):
+    if columna == 'id':
+        return pa.int64()
+    if columna in ('vigencia', 'fila_excel'):
+        return pa.int32()
+    if columna == 'es_subtotal':
+        return pa.bool_()
+    if columna in COLUMNAS_VALOR or columna.split('_', 1)[-1] in VALORES_CONSOLIDADO:
+        return pa.decimal128(20, 2)
+    return pa.string()
+
+
+def escribir_parquet(columnas, filas, destino, tamano_lote=TAMANO_LOTE_PARQUET):
+    """
+    Escribe las filas en `destino` (ruta o archivo binario) como Parquet,
+    un row group por lote. Retorna el numero de filas escritas.
+    """
+    esquema = pa.schema([(c, _tipo_arrow(c)) for c in columnas])
+
+    def tabla(lote):
+        columnas_lote = zip(*lote) if lote else [[] for _ in columnas]
+        return pa.Table.from_arrays(
+            [pa.array(valores, type=campo.type) for valores, campo in zip(columnas_lote, esquema)],
+            schema=esquema,
+        )
+
+    total = 0
+    with pq.ParquetWriter(destino, esquema, compression='zstd') as escritor:
+        lote = []
+        for fila in filas:
+            lote.append(fila)
+            if len(lote) >= tamano_lote:
+                escritor.write_table(tabla(lote))
+                total += len(lote)
+                lote = []
+        if lote or not total:
+            escritor.write_table(tabla(lote))
+            total += len(lote)
+    return total
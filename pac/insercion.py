@@ -0,0 +1,57 @@
+"""
+Insercion masiva de registros.
+
+En PostgreSQL (con psycopg 3) las filas se envian con COPY ... FROM STDIN,
+bastante mas rapido que los INSERT por lotes de bulk_create. En los demas
+motores se usa bulk_create. Ninguno de los dos llama a save(): los campos
+derivados se deben completar antes (ver PACBase.normalizar).
+"""
+
+from django.conf import settings
+from django.db import connection
+
+
+def copy_disponible():
+    return (
+        connection.vendor == 'postgresql'
+        and connection.Database.__name__ == 'psycopg'
+        and getattr(settings, 'PAC_IMPORTACION_COPY', True)
+    )
+
+
+def insertar(modelo, objetos, asignar_pk=False, tamano_lote=1000):
+    """
+    Inserta `objetos` (instancias sin guardar de `modelo`). Con asignar_pk
+    cada objeto queda con su pk, para las filas que lo referencian.
+    """
+    if not objetos:
+        return
+    if copy_disponible():
+        _copiar(modelo, objetos, asignar_pk)
+    elif asignar_pk and not connection.features.can_return_rows_from_bulk_insert:
+        for objeto in objetos:
+            objeto.save()
+    else:
+        modelo.objects.bulk_create(objetos, batch_size=tamano_lote)
+
+
+def _copiar(modelo, objetos, asignar_pk):
+    opts = modelo._meta
+    campos = [f for f in opts.concrete_fields if asignar_pk or not f.primary_key]
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        if asignar_pk:
+            # COPY no retorna los ids generados: se reservan antes en la secuencia de la tabla
+            cursor.execute(
+                'SELECT nextval(pg_get_serial_sequence(%s, %s)) FROM generate_series(1, %s)',
+                [opts.db_table, opts.pk.column, len(objetos)],
+            )
+            for objeto, (pk,) in zip(objetos, cursor.fetchall()):
+                objeto.pk = pk
+        columnas = ', '.join(quote(f.column) for f in campos)
+        with cursor.cursor.copy(f'COPY {quote(opts.db_table)} ({columnas}) FROM STDIN') as copia:
+            for objeto in objetos:
+                copia.write_row([f.get_db_prep_save(f.pre_save(objeto, True), connection) for f in campos])
+        for objeto in objetos:
+            objeto._state.adding = False
+            objeto._state.db = connection.alias
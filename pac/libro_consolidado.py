@@ -0,0 +1,67 @@
+"""
+Construccion en paralelo de libros xlsx de varias hojas.
+
+Cada trabajo es una tupla (funcion, argumentos) donde funcion(*argumentos)
+retorna una HojaStream. Los datos se leen antes de crear los procesos; como
+los procesos se crean con fork, todos los trabajos comparten esa instantanea
+en memoria sin copiarla ni volver a consultar la base de datos. Cada proceso
+escribe el XML de su hoja en un archivo temporal y el proceso principal solo
+une las hojas en el ZIP final.
+"""
+
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+
+from .xlsx_stream import HojaArchivo, LibroStream
+
+
+_trabajos = []
+_candado = threading.Lock()
+
+
+def procesos_disponibles():
+    if getattr(settings, 'PAC_EXPORTACION_PROCESOS', None):
+        return settings.PAC_EXPORTACION_PROCESOS
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count()
+    return min(cpus or 1, 4)
+
+
+def _renderizar(indice, directorio):
+    funcion, argumentos = _trabajos[indice]
+    inicio = time.perf_counter()
+    hoja = funcion(*argumentos)
+    ruta = os.path.join(directorio, f'hoja{indice}.xml')
+    with open(ruta, 'wb') as destino:
+        hoja.escribir_xml(destino)
+    return hoja.titulo, ruta, time.perf_counter() - inicio
+
+
+def construir_libro(trabajos, destino, procesos=None):
+    """
+    Construye las hojas en paralelo y escribe el libro en `destino` (archivo
+    binario). Sin fork disponible, o con procesos=1, se construyen en serie.
+    Retorna [(titulo, segundos)] con el tiempo de construccion de cada hoja.
+    """
+    procesos = min(procesos or procesos_disponibles(), len(trabajos))
+    with _candado, tempfile.TemporaryDirectory() as directorio:
+        _trabajos[:] = trabajos
+        try:
+            argumentos = [(i, directorio) for i in range(len(trabajos))]
+            if procesos > 1 and 'fork' in multiprocessing.get_all_start_methods():
+                with multiprocessing.get_context('fork').Pool(procesos) as pool:
+                    resultados = pool.starmap(_renderizar, argumentos)
+            else:
+                resultados = [_renderizar(*a) for a in argumentos]
+        finally:
+            _trabajos.clear()
+
+        libro = LibroStream()
+        for titulo, ruta, _ in resultados:
+            libro.agregar_hoja(HojaArchivo(titulo, ruta))
+        libro.guardar(destino)
+    return [(titulo, segundos) for titulo, _, segundos in resultados]
@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from pac import archivado
+from pac.concurrencia import ImportacionEnCurso
+
+
+class Command(BaseCommand):
+    help = ('Archiva una vigencia cerrada: mueve sus registros PAC y valores mensuales de la base principal a '
+            'un archivo SQLite de solo lectura en PAC_ARCHIVO_DIR. Las consultas de esa vigencia siguen '
+            'funcionando (se leen del archivo). Con --restaurar la devuelve a la base principal.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('vigencia', type=int, nargs='?')
+        parser.add_argument('--restaurar', action='store_true', help='Devolver la vigencia a la base principal')
+        parser.add_argument('--listar', action='store_true', help='Mostrar las vigencias archivadas')
+        parser.add_argument('--forzar', action='store_true', help='Permitir archivar la vigencia del año en curso')
+        parser.add_argument('--compactar', action='store_true',
+                            help='Ejecutar VACUUM en la base principal despues de archivar')
+
+    def handle(self, *args, **options):
+        if options['listar']:
+            self._listar()
+            return
+        vigencia = options['vigencia']
+        if vigencia is None:
+            raise CommandError('Indique la vigencia (o --listar)')
+
+        try:
+            if options['restaurar']:
+                resumen = archivado.restaurar(vigencia)
+                accion = 'restaurada en la base principal'
+            else:
+                if vigencia >= timezone.now().year and not options['forzar']:
+                    raise CommandError(f'La vigencia {vigencia} no esta cerrada; use --forzar para archivarla')
+                resumen = archivado.archivar(vigencia)
+                accion = f'archivada en {archivado.ruta_archivo(vigencia)}'
+        except (ValueError, ImportacionEnCurso, archivado.VigenciaArchivada) as e:
+            raise CommandError(str(e))
+
+        for nombre, (filas, _) in resumen.items():
+            self.stdout.write(f'  {nombre}: {filas} filas')
+        if options['compactar'] and not options['restaurar']:
+            with connection.cursor() as cursor:
+                cursor.execute('VACUUM')
+        self.stdout.write(self.style.SUCCESS(f'Vigencia {vigencia} {accion}'))
+
+    def _listar(self):
+        vigencias = archivado.vigencias_archivadas()
+        if not vigencias:
+            self.stdout.write(f'No hay vigencias archivadas en {archivado.directorio()}')
+            return
+        for vigencia in vigencias:
+            ruta = archivado.ruta_archivo(vigencia)
+            filas = sum(n for n, _ in archivado.resumen(vigencia, archivado.alias_vigencia(vigencia)).values())
+            self.stdout.write(f'{vigencia}: {filas} filas, {ruta.stat().st_size / 1024 / 1024:.1f} MB ({ruta})')
@@ -0,0 +1,80 @@
+import time
+from decimal import Decimal
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.db.models import Sum
+
+from pac.centavos import de_centavos
+from pac.consultas import matriz_mensual_centavos
+from pac.models import (
+    AIMInicial, PACProgramado, PACEjecutadoCompromiso, PACEjecutadoPago, PACValorMensual, MESES
+)
+
+
+class Command(BaseCommand):
+    help = 'Compara la agregacion sobre columnas Decimal contra columnas en centavos enteros'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--vigencia', type=int, default=2026)
+        parser.add_argument('--repeticiones', type=int, default=20)
+
+    def _medir(self, fn, repeticiones):
+        inicio = time.perf_counter()
+        for _ in range(repeticiones):
+            resultado = fn()
+        return (time.perf_counter() - inicio) / repeticiones * 1000, resultado
+
+    def handle(self, *args, **options):
+        vigencia = options['vigencia']
+        rep = options['repeticiones']
+
+        for modelo in [AIMInicial, PACProgramado, PACEjecutadoCompromiso, PACEjecutadoPago]:
+            qs = PACValorMensual.objects.filter(modulo=modelo.MODULO, vigencia=vigencia, es_subtotal=False)
+            n = qs.count()
+            if not n:
+                continue
+            self.stdout.write(self.style.MIGRATE_HEADING(f'{modelo.__name__} ({n} valores mensuales)'))
+
+            def sql_decimal():
+                return {f['mes']: f['t'] for f in qs.values('mes').annotate(t=Sum('valor'))}
+
+            def sql_centavos():
+                return {f['mes']: f['t'] for f in qs.values('mes').annotate(t=Sum('valor_centavos'))}
+
+            def python_decimal():
+                serie = [Decimal('0')] * len(MESES)
+                for mes, valor in qs.values_list('mes', 'valor'):
+                    serie[mes - 1] += valor
+                return serie
+
+            def numpy_centavos():
+                _, matriz = matriz_mensual_centavos(modelo, vigencia, es_subtotal=False)
+                return matriz.sum(axis=0, dtype=np.int64)
+
+            def numpy_float():
+                valores = np.array(list(qs.values_list('mes', 'valor')), dtype=np.float64).reshape(-1, 2)
+                return np.bincount(valores[:, 0].astype(np.int64) - 1, weights=valores[:, 1], minlength=len(MESES))
+
+            t_sql_dec, r_sql_dec = self._medir(sql_decimal, rep)
+            t_sql_cen, r_sql_cen = self._medir(sql_centavos, rep)
+            t_py_dec, r_py_dec = self._medir(python_decimal, rep)
+            t_np_cen, r_np_cen = self._medir(numpy_centavos, rep)
+            t_np_flt, r_np_flt = self._medir(numpy_float, rep)
+
+            self.stdout.write(f'  SQL Sum(Decimal)        {t_sql_dec:9.3f} ms')
+            self.stdout.write(f'  SQL Sum(centavos)       {t_sql_cen:9.3f} ms')
+            self.stdout.write(f'  Python sum(Decimal)     {t_py_dec:9.3f} ms')
+            self.stdout.write(f'  NumPy int64 centavos    {t_np_cen:9.3f} ms')
+            self.stdout.write(f'  NumPy float64           {t_np_flt:9.3f} ms')
+
+            # Deriva: diferencia maxima de cada representacion frente a la suma exacta en centavos
+            exacto = [de_centavos(c) for c in r_np_cen]
+            deriva = {
+                'SQL Decimal': max(abs(r_sql_dec.get(i + 1, 0) - exacto[i]) for i in range(len(MESES))),
+                'SQL centavos': max(abs(r_sql_cen.get(i + 1, 0) - exacto[i]) for i in range(len(MESES))),
+                'Python Decimal': max(abs(r_py_dec[i] - exacto[i]) for i in range(len(MESES))),
+                'NumPy float64': max(abs(Decimal(repr(float(r_np_flt[i]))) - exacto[i]) for i in range(len(MESES))),
+            }
+            for nombre, dif in deriva.items():
+                self.stdout.write(f'  deriva max {nombre:15s} {dif}')
@@ -0,0 +1,72 @@
+import os
+import tempfile
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from pac import exportacion
+from pac.sintetico import poblar
+
+
+class Command(BaseCommand):
+    help = ('Mide el rendimiento de la exportacion masiva CSV/Parquet sobre datos sinteticos. '
+            'Los datos se crean dentro de una transaccion que se revierte al terminar.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--filas', type=int, default=1000000, help='Filas sinteticas en total (repartidas en los cuatro modulos)')
+        parser.add_argument('--vigencia', type=int, default=9999)
+        parser.add_argument('--sin-memoria', action='store_true', help='No medir el pico de memoria (tracemalloc)')
+
+    def _medir(self, nombre, escribir, filas, medir_memoria):
+        with tempfile.NamedTemporaryFile(suffix='.' + nombre.split()[-1].lower(), delete=False) as tmp:
+            ruta = tmp.name
+        try:
+            inicio = time.perf_counter()
+            escribir(ruta)
+            segundos = time.perf_counter() - inicio
+            tamano = os.path.getsize(ruta) / 1024 / 1024
+            pico = ''
+            if medir_memoria:
+                tracemalloc.start()
+                escribir(ruta)
+                pico = f'  pico {tracemalloc.get_traced_memory()[1] / 1024 / 1024:7.1f} MB'
+                tracemalloc.stop()
+        finally:
+            if os.path.exists(ruta):
+                os.remove(ruta)
+        self.stdout.write(
+            f'  {nombre:28s} {filas:>9d} filas  {segundos:7.2f} s  {filas / segundos:10.0f} filas/s  '
+            f'{tamano:8.1f} MB{pico}'
+        )
+
+    def handle(self, *args, **options):
+        vigencia = options['vigencia']
+        por_modulo = options['filas'] // len(exportacion.MODULOS)
+        medir_memoria = not options['sin_memoria']
+
+        with transaction.atomic():
+            inicio = time.perf_counter()
+            for modelo in exportacion.MODULOS.values():
+                poblar(modelo, vigencia, por_modulo)
+            self.stdout.write(
+                f'{por_modulo * len(exportacion.MODULOS)} filas sinteticas creadas en '
+                f'{time.perf_counter() - inicio:.1f} s (vigencia {vigencia})'
+            )
+
+            for tipo in exportacion.TIPOS_EXPORTACION:
+                def csv(ruta, tipo=tipo):
+                    columnas, filas = exportacion.columnas_y_filas(tipo, vigencia)
+                    with open(ruta, 'wb') as archivo:
+                        for bloque in exportacion.generar_csv(columnas, filas):
+                            archivo.write(bloque)
+
+                def parquet(ruta, tipo=tipo):
+                    exportacion.escribir_parquet(*exportacion.columnas_y_filas(tipo, vigencia), ruta)
+
+                self._medir(f'{tipo} CSV', csv, por_modulo, medir_memoria)
+                if exportacion.parquet_disponible():
+                    self._medir(f'{tipo} Parquet', parquet, por_modulo, medir_memoria)
+            # Los datos sinteticos no se conservan
+            transaction.set_rollback(True)
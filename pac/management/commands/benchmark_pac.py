@@ -0,0 +1,67 @@
+import json
+import tempfile
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test.utils import override_settings
+
+from pac import benchmark
+
+
+class Command(BaseCommand):
+    help = ('Suite de benchmarks de importacion, vistas de lectura y exportaciones sobre libros sinteticos '
+            'de tamano creciente. Los datos se crean en una transaccion que se revierte al terminar.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--escalas', default='1,10',
+                            help='Multiplos del tamano del archivo real, separados por coma (por defecto 1,10)')
+        parser.add_argument('--repeticiones', type=int, default=3)
+        parser.add_argument('--semilla', type=int, default=0)
+        parser.add_argument('--sin-memoria', action='store_true', help='No medir el pico de memoria (tracemalloc)')
+        parser.add_argument('--salida', help='Archivo JSON donde guardar los resultados')
+        parser.add_argument('--comparar', help='Resultados JSON de referencia (por ejemplo del commit anterior)')
+        parser.add_argument('--umbral', type=float, default=0.2,
+                            help='Aumento de tiempo tolerado frente a la referencia (0.2 = 20%%)')
+        parser.add_argument('--estricto', action='store_true', help='Terminar con error si hay regresiones')
+
+    def _informar(self, r):
+        memoria = f"{r['memoria_pico_kb'] / 1024:8.1f} MB" if r['memoria_pico_kb'] is not None else ''
+        self.stdout.write(
+            f"  x{r['escala']:<4d} {r['grupo']:12s} {r['nombre']:34s} {r['segundos']:8.3f} s  "
+            f"(min {r['minimo']:.3f})  {r['consultas']:>5} consultas  {memoria}"
+        )
+
+    def handle(self, *args, **options):
+        try:
+            escalas = [int(e) for e in options['escalas'].split(',') if e.strip()]
+        except ValueError:
+            raise CommandError('--escalas debe ser una lista de enteros separados por coma')
+
+        # La cache de exportaciones se vacia en cada medicion: se usa un MEDIA_ROOT temporal
+        with tempfile.TemporaryDirectory() as media, override_settings(MEDIA_ROOT=media):
+            with transaction.atomic():
+                usuario = User.objects.create(username='benchmark_pac', is_staff=True)
+                resultados = benchmark.ejecutar(
+                    usuario, escalas, repeticiones=options['repeticiones'],
+                    medir_memoria=not options['sin_memoria'], semilla=options['semilla'], informar=self._informar,
+                )
+                transaction.set_rollback(True)
+
+        documento = benchmark.informe(resultados)
+        if options['salida']:
+            benchmark.guardar(documento, options['salida'])
+            self.stdout.write(f"Resultados guardados en {options['salida']}")
+
+        if options['comparar']:
+            with open(options['comparar'], encoding='utf-8') as archivo:
+                base = json.load(archivo)
+            regresiones = benchmark.comparar(documento, base, options['umbral'])
+            self.stdout.write(f"\nComparacion con {options['comparar']} (commit {base.get('commit') or '?'}, "
+                              f"umbral {options['umbral'] * 100:.0f}%):")
+            if not regresiones:
+                self.stdout.write(self.style.SUCCESS('  Sin regresiones'))
+            for (escala, grupo, nombre), descripcion in regresiones:
+                self.stdout.write(self.style.ERROR(f'  x{escala} {grupo} {nombre}: {descripcion}'))
+            if regresiones and options['estricto']:
+                raise CommandError(f'{len(regresiones)} regresiones de rendimiento')
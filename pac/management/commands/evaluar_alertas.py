@@ -0,0 +1,29 @@
+import time
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+
+from pac import alertas
+from pac.models import PACValorMensual
+
+
+class Command(BaseCommand):
+    help = ('Recalcula todas las alertas de desviacion de una vigencia (las importaciones solo reevaluan los '
+            'rubros que cambian). Paso del despliegue despues de migrate (docker-compose.yml): llena la tabla '
+            'para las vigencias ya cargadas y aplica los umbrales PAC_ALERTA_* vigentes.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('vigencia', type=int, nargs='*', help='Vigencias (por defecto todas las que tienen datos)')
+
+    def handle(self, *args, **options):
+        vigencias = options['vigencia'] or sorted(
+            PACValorMensual.objects.values_list('vigencia', flat=True).distinct().order_by()
+        )
+        for vigencia in vigencias:
+            inicio = time.perf_counter()
+            creadas = alertas.evaluar(vigencia)
+            niveles = Counter(a.nivel for a in creadas)
+            self.stdout.write(
+                f'Vigencia {vigencia}: {len(creadas)} alertas ({niveles["CRITICA"]} criticas, '
+                f'{niveles["ADVERTENCIA"]} advertencias) en {(time.perf_counter() - inicio) * 1000:.0f} ms'
+            )
@@ -0,0 +1,38 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from pac import exportacion
+
+
+class Command(BaseCommand):
+    help = 'Exporta el detalle por rubro de un modulo (o el consolidado de los cuatro) en CSV o Parquet'
+
+    def add_arguments(self, parser):
+        parser.add_argument('tipo', choices=exportacion.TIPOS_EXPORTACION)
+        parser.add_argument('--vigencia', type=int, default=2026)
+        parser.add_argument('--formato', choices=exportacion.FORMATOS, default='csv')
+        parser.add_argument('--salida', help='Archivo de salida (por defecto pac_<tipo>_<vigencia>.<formato>; "-" para stdout en CSV)')
+
+    def handle(self, *args, **options):
+        tipo, vigencia, formato = options['tipo'], options['vigencia'], options['formato']
+        salida = options['salida'] or f'pac_{tipo}_{vigencia}.{formato}'
+        columnas, filas = exportacion.columnas_y_filas(tipo, vigencia)
+
+        if formato == 'parquet':
+            if not exportacion.parquet_disponible():
+                raise CommandError('La exportacion Parquet requiere pyarrow')
+            if salida == '-':
+                raise CommandError('Parquet no se puede escribir en stdout')
+            n = exportacion.escribir_parquet(columnas, filas, salida)
+            self.stdout.write(self.style.SUCCESS(f'{n} filas exportadas a {salida}'))
+            return
+
+        if salida == '-':
+            for bloque in exportacion.generar_csv(columnas, filas):
+                sys.stdout.buffer.write(bloque)
+            return
+        with open(salida, 'wb') as archivo:
+            for bloque in exportacion.generar_csv(columnas, filas):
+                archivo.write(bloque)
+        self.stdout.write(self.style.SUCCESS(f'Exportado {salida}'))
@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from pac.libro_consolidado import procesos_disponibles
+from pac.views import generar_libro_consolidado
+
+
+class Command(BaseCommand):
+    help = 'Genera el libro consolidado (modulos, seguimientos y reporte por categorias) construyendo las hojas en paralelo'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--vigencia', type=int, default=2026)
+        parser.add_argument('--salida', help='Archivo de salida (por defecto pac_consolidado_<vigencia>.xlsx)')
+        parser.add_argument('--procesos', type=int, default=None, help='Procesos para construir las hojas (1 = en serie)')
+        parser.add_argument('--comparar', action='store_true', help='Construir tambien en serie y comparar el tiempo total')
+
+    def _construir(self, vigencia, salida, procesos):
+        inicio = time.perf_counter()
+        with open(salida, 'wb') as destino:
+            tiempos = generar_libro_consolidado(vigencia, destino, procesos)
+        return tiempos, time.perf_counter() - inicio
+
+    def handle(self, *args, **options):
+        vigencia = options['vigencia']
+        salida = options['salida'] or f'pac_consolidado_{vigencia}.xlsx'
+        procesos = options['procesos'] or procesos_disponibles()
+
+        tiempos, total = self._construir(vigencia, salida, procesos)
+        for titulo, segundos in tiempos:
+            self.stdout.write(f'  {titulo:25s} {segundos * 1000:9.1f} ms')
+        mas_lenta = max(segundos for _, segundos in tiempos)
+        self.stdout.write(
+            f'Total con {procesos} procesos: {total * 1000:.1f} ms '
+            f'(hoja mas lenta {mas_lenta * 1000:.1f} ms, suma de hojas {sum(s for _, s in tiempos) * 1000:.1f} ms)'
+        )
+        if options['comparar'] and procesos > 1:
+            _, total_serie = self._construir(vigencia, salida, 1)
+            self.stdout.write(f'Total en serie: {total_serie * 1000:.1f} ms')
+        self.stdout.write(self.style.SUCCESS(f'Libro generado: {salida}'))
@@ -0,0 +1,76 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from pac.models import AIMInicial, PACProgramado, PACEjecutadoCompromiso, PACEjecutadoPago
+from pac.sintetico import libro_pac
+from pac.utils import importar_excel_pac
+
+
+# Modulo y hoja que lee cada importacion (las mismas que usan las vistas importar_*)
+IMPORTACIONES = [
+    (AIMInicial, None),
+    (PACProgramado, 'PROG PAC'),
+    (PACEjecutadoCompromiso, 'EJECUTADO COMPROMISO'),
+    (PACEjecutadoPago, 'EJECUTADO PAGO'),
+]
+
+
+class Command(BaseCommand):
+    help = ('Genera libros Excel PAC sinteticos con el formato de la entidad (uno por vigencia) y, '
+            'opcionalmente, los importa en la base de datos. El contenido depende solo de la semilla.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--salida', default='.', help='Directorio donde se escriben los libros')
+        parser.add_argument('--vigencia-inicial', type=int, default=2026)
+        parser.add_argument('--vigencias', type=int, default=1, help='Numero de vigencias consecutivas')
+        parser.add_argument('--semilla', type=int, default=0)
+        parser.add_argument('--escala', type=int, default=1,
+                            help='Multiplica rubros, proyectos BPIN, reservas y cuentas por pagar')
+        parser.add_argument('--rubros', type=int, default=40, help='Rubros de funcionamiento')
+        parser.add_argument('--items-por-grupo', type=int, default=8, help='Rubros por subtotal de funcionamiento')
+        parser.add_argument('--sectores', type=int, default=5, help='Sectores de inversion')
+        parser.add_argument('--bpin-por-sector', type=int, default=3)
+        parser.add_argument('--items-por-bpin', type=int, default=2, help='Productos por proyecto BPIN')
+        parser.add_argument('--reservas', type=int, default=40, help='Items de reservas presupuestales (RP)')
+        parser.add_argument('--cuentas-por-pagar', type=int, default=15, help='Items de cuentas por pagar (CxP)')
+        parser.add_argument('--fuentes', type=int, default=9, help='Fuentes de financiacion distintas')
+        parser.add_argument('--cargar', action='store_true',
+                            help='Importar cada libro en los cuatro modulos con importar_excel_pac '
+                                 '(reemplaza los datos de esas vigencias)')
+
+    def handle(self, *args, **options):
+        if options['escala'] < 1 or options['items_por_grupo'] < 1:
+            raise CommandError('--escala e --items-por-grupo deben ser mayores que cero')
+        escala = options['escala']
+        configuracion = {
+            'rubros': options['rubros'] * escala,
+            'items_por_grupo': options['items_por_grupo'],
+            'sectores': options['sectores'],
+            'bpin_por_sector': options['bpin_por_sector'] * escala,
+            'items_por_bpin': options['items_por_bpin'],
+            'reservas': options['reservas'] * escala,
+            'cuentas_por_pagar': options['cuentas_por_pagar'] * escala,
+            'fuentes': options['fuentes'],
+        }
+        os.makedirs(options['salida'], exist_ok=True)
+
+        for vigencia in range(options['vigencia_inicial'], options['vigencia_inicial'] + options['vigencias']):
+            ruta = os.path.join(options['salida'], f'pac_sintetico_{vigencia}.xlsx')
+            inicio = time.perf_counter()
+            with open(ruta, 'wb') as destino:
+                libro_pac(vigencia, options['semilla'], **configuracion).guardar(destino)
+            self.stdout.write(
+                f'{ruta}: {os.path.getsize(ruta) / 1024:.0f} KB en {time.perf_counter() - inicio:.1f} s'
+            )
+
+            if options['cargar']:
+                for modelo, nombre_hoja in IMPORTACIONES:
+                    inicio = time.perf_counter()
+                    with open(ruta, 'rb') as archivo:
+                        count = importar_excel_pac(archivo, vigencia, modelo, None, nombre_hoja=nombre_hoja)
+                    self.stdout.write(
+                        f'  {modelo.MODULO:22s} {count:>7d} registros en {time.perf_counter() - inicio:.1f} s'
+                    )
+        self.stdout.write(self.style.SUCCESS('Listo'))
@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from pac import busqueda
+from pac.archivado import vigencias_archivadas
+from pac.models import PACValorMensual
+
+
+class Command(BaseCommand):
+    help = ('Reconstruye el indice de busqueda de rubros (las importaciones solo actualizan las filas que '
+            'cambian). Util al crear la tabla o si el indice de texto se desincroniza.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('vigencia', type=int, nargs='*', help='Vigencias (por defecto todas, incluidas las archivadas)')
+
+    def handle(self, *args, **options):
+        vigencias = options['vigencia'] or sorted(
+            set(PACValorMensual.objects.values_list('vigencia', flat=True).distinct().order_by())
+            | set(vigencias_archivadas())
+        )
+        inicio = time.perf_counter()
+        busqueda.reconstruir_texto()
+        self.stdout.write(f'Indice de texto reconstruido en {(time.perf_counter() - inicio) * 1000:.0f} ms')
+        for vigencia in vigencias:
+            inicio = time.perf_counter()
+            escritas = busqueda.indexar(vigencia)
+            self.stdout.write(
+                f'Vigencia {vigencia}: {escritas} filas escritas en {(time.perf_counter() - inicio) * 1000:.0f} ms'
+            )
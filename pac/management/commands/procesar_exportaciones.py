@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from pac import metricas, trabajos
+
+
+class Command(BaseCommand):
+    help = 'Worker de exportaciones en segundo plano: ejecuta los trabajos pendientes y purga los vencidos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--intervalo', type=float, default=2.0, help='Segundos de espera cuando no hay trabajos')
+        parser.add_argument('--una-vez', action='store_true', help='Procesar los trabajos pendientes y terminar')
+
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            # En cada vuelta: un worker que murio a mitad de un archivo deja de latir aunque este se reinicie pronto
+            recuperados = trabajos.recuperar_interrumpidos()
+            if recuperados:
+                self.stdout.write(self.style.WARNING(f'{recuperados} trabajos interrumpidos vueltos a encolar'))
+            purgados = trabajos.purgar_vencidos()
+            if purgados:
+                self.stdout.write(f'{purgados} trabajos vencidos eliminados')
+
+            trabajo = trabajos.tomar_siguiente()
+            if trabajo is None:
+                if options['una_vez']:
+                    return
+                time.sleep(options['intervalo'])
+                continue
+
+            inicio = time.perf_counter()
+            trabajos.ejecutar(trabajo)
+            duracion = time.perf_counter() - inicio
+            metricas.volcar()
+            if trabajo.estado == 'TERMINADO':
+                self.stdout.write(self.style.SUCCESS(f'[{trabajo.pk}] {trabajo} en {duracion:.1f} s'))
+            else:
+                self.stdout.write(self.style.ERROR(f'[{trabajo.pk}] {trabajo}: {trabajo.error.strip().splitlines()[-1]}'))
@@ -0,0 +1,87 @@
+import json
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from pac import benchmark, carga
+
+
+class Command(BaseCommand):
+    help = ('Prueba de carga contra un servidor en ejecucion: analistas concurrentes (hilos) que inician sesion y '
+            'repiten una mezcla de vistas, exportaciones e importaciones de libros sinteticos. Reporta p50/p95/p99, '
+            'throughput, tasa de error y bloqueos de SQLite por endpoint. Las importaciones reemplazan los datos '
+            'de la vigencia indicada en el servidor (por defecto una vigencia reservada).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help='URL base del servidor')
+        parser.add_argument('--usuario', required=True)
+        parser.add_argument('--clave', default=os.environ.get('PAC_CARGA_CLAVE', ''),
+                            help='Clave del usuario (por defecto la variable PAC_CARGA_CLAVE)')
+        parser.add_argument('--analistas', type=int, default=10, help='Usuarios concurrentes')
+        parser.add_argument('--duracion', type=int, default=60, help='Segundos de carga')
+        parser.add_argument('--mezcla', default='vistas=80,exportaciones=15,importaciones=5',
+                            help='Peso de cada grupo de operaciones')
+        parser.add_argument('--pausa', type=float, default=0.5, help='Pausa media entre requests de un analista (s)')
+        parser.add_argument('--vigencia', type=int, default=benchmark.VIGENCIA)
+        parser.add_argument('--escala', type=int, default=1, help='Tamano del libro sintetico importado')
+        parser.add_argument('--semilla', type=int, default=0)
+        parser.add_argument('--timeout', type=int, default=120, help='Segundos maximos por request')
+        parser.add_argument('--sin-preparar', action='store_true',
+                            help='No importar el libro sintetico antes de empezar (la vigencia ya tiene datos)')
+        parser.add_argument('--salida', help='Archivo JSON donde guardar el resumen')
+
+    def handle(self, *args, **options):
+        try:
+            mezcla = {
+                grupo.strip(): float(peso)
+                for grupo, peso in (parte.split('=') for parte in options['mezcla'].split(',') if parte.strip())
+            }
+        except ValueError:
+            raise CommandError('--mezcla debe tener la forma vistas=80,exportaciones=15,importaciones=5')
+        desconocidos = set(mezcla) - {'vistas', 'exportaciones', 'importaciones'}
+        if desconocidos:
+            raise CommandError(f'Grupos desconocidos en --mezcla: {", ".join(sorted(desconocidos))}')
+        if not options['clave']:
+            raise CommandError('Indique --clave o la variable de entorno PAC_CARGA_CLAVE')
+
+        libro = benchmark.libro_sintetico(options['escala'], options['semilla'], options['vigencia'])
+        sesion = carga.Sesion(options['url'], options['timeout'])
+        try:
+            sesion.iniciar_sesion(options['usuario'], options['clave'])
+            if not options['sin_preparar']:
+                self.stdout.write(f"Importando libro sintetico (escala {options['escala']}) en la vigencia {options['vigencia']}...")
+            fuente_pk = carga.preparar(sesion, libro, options['vigencia'], importar=not options['sin_preparar'])
+        except (RuntimeError, OSError) as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(f"{options['analistas']} analistas durante {options['duracion']} s contra {options['url']} "
+                          f"(mezcla {options['mezcla']})...")
+        try:
+            resultados, segundos = carga.ejecutar(
+                options['url'], options['usuario'], options['clave'], mezcla, options['analistas'],
+                options['duracion'], libro, options['vigencia'], fuente_pk=fuente_pk, pausa=options['pausa'],
+                semilla=options['semilla'], timeout=options['timeout'],
+            )
+        except RuntimeError as e:
+            raise CommandError(str(e))
+        filas = resultados.resumen(segundos)
+
+        self.stdout.write(f"\n{'endpoint':34s} {'req':>6s} {'req/s':>7s} {'p50':>8s} {'p95':>8s} {'p99':>8s} "
+                          f"{'max':>8s} {'error':>7s} {'locked':>6s}")
+        for f in filas:
+            linea = (f"{f['nombre']:34s} {f['requests']:>6d} {f['por_segundo']:>7.2f} "
+                     + ' '.join(f"{f[k]:>8.0f}" if f[k] is not None else f"{'-':>8s}"
+                                for k in ('p50_ms', 'p95_ms', 'p99_ms', 'max_ms'))
+                     + f" {f['tasa_error'] * 100:>6.1f}% {f['bloqueos_sqlite']:>6d}")
+            estilo = self.style.ERROR if f['errores'] or f['bloqueos_sqlite'] else (lambda texto: texto)
+            self.stdout.write(estilo(linea))
+        self.stdout.write('Latencias en ms.')
+
+        if options['salida']:
+            with open(options['salida'], 'w', encoding='utf-8') as archivo:
+                json.dump({
+                    'url': options['url'], 'analistas': options['analistas'], 'segundos': round(segundos, 1),
+                    'mezcla': mezcla, 'vigencia': options['vigencia'], 'escala': options['escala'],
+                    'endpoints': filas,
+                }, archivo, indent=2, ensure_ascii=False)
+            self.stdout.write(f"Resumen guardado en {options['salida']}")
@@ -0,0 +1,122 @@
+import io
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, transaction
+from django.db.models import Sum
+
+from pac import benchmark
+from pac.carga import percentil
+from pac.concurrencia import ImportacionEnCurso
+from pac.models import PACProgramado, PACValorMensual
+from pac.utils import eliminar_modulo, importar_excel_pac
+
+
+class Command(BaseCommand):
+    help = ('Prueba de esfuerzo de concurrencia: lectores continuos mientras dos hilos importan a la vez el mismo '
+            'modulo y vigencia. Verifica que ninguna lectura falle por bloqueo ni vea la vigencia a medio '
+            'reemplazar, y que las cargas simultaneas se rechacen en lugar de intercalarse. Usa la base de datos '
+            'configurada (una vigencia reservada que se borra al terminar).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lectores', type=int, default=4)
+        parser.add_argument('--importaciones', type=int, default=3, help='Importaciones por cada hilo importador')
+        parser.add_argument('--escala', type=int, default=3, help='Tamano del libro sintetico importado')
+        parser.add_argument('--vigencia', type=int, default=benchmark.VIGENCIA)
+
+    def handle(self, *args, **options):
+        vigencia = options['vigencia']
+        libro = benchmark.libro_sintetico(options['escala'], vigencia=vigencia)
+
+        def importar():
+            return importar_excel_pac(io.BytesIO(libro), vigencia, PACProgramado, None, nombre_hoja='PROG PAC')
+
+        # Estado de referencia: todas las importaciones del mismo libro producen los mismos datos
+        importar()
+        esperado = self._leer(vigencia)
+        self.stdout.write(f'Vigencia {vigencia}: {esperado[0]} registros, {esperado[1]} valores mensuales por carga')
+
+        resultado = {'lecturas': [], 'inconsistentes': 0, 'bloqueos_lectura': 0,
+                     'completadas': 0, 'rechazadas': 0, 'bloqueos_escritura': 0}
+        candado = threading.Lock()
+        terminado = threading.Event()
+
+        def sumar(clave, valor=1):
+            with candado:
+                resultado[clave] += valor
+
+        def lector():
+            try:
+                while not terminado.is_set():
+                    inicio = time.perf_counter()
+                    try:
+                        leido = self._leer(vigencia)
+                    except OperationalError as e:
+                        if 'locked' not in str(e):
+                            raise
+                        sumar('bloqueos_lectura')
+                        continue
+                    with candado:
+                        resultado['lecturas'].append((time.perf_counter() - inicio) * 1000)
+                    if leido != esperado:
+                        sumar('inconsistentes')
+            finally:
+                connection.close()
+
+        def importador():
+            try:
+                for _ in range(options['importaciones']):
+                    try:
+                        importar()
+                        sumar('completadas')
+                    except ImportacionEnCurso:
+                        sumar('rechazadas')
+                    except OperationalError as e:
+                        if 'locked' not in str(e):
+                            raise
+                        sumar('bloqueos_escritura')
+            finally:
+                connection.close()
+
+        lectores = [threading.Thread(target=lector) for _ in range(options['lectores'])]
+        importadores = [threading.Thread(target=importador) for _ in range(2)]
+        inicio = time.monotonic()
+        try:
+            for hilo in lectores + importadores:
+                hilo.start()
+            for hilo in importadores:
+                hilo.join()
+        finally:
+            terminado.set()
+            for hilo in lectores:
+                hilo.join()
+            eliminar_modulo(PACProgramado, vigencia)
+        segundos = time.monotonic() - inicio
+
+        lecturas = sorted(resultado['lecturas'])
+        self.stdout.write(
+            f"{len(lecturas)} lecturas en {segundos:.1f} s: p50 {percentil(lecturas, 50) or 0:.1f} ms, "
+            f"p95 {percentil(lecturas, 95) or 0:.1f} ms, max {lecturas[-1] if lecturas else 0:.1f} ms"
+        )
+        self.stdout.write(
+            f"Importaciones: {resultado['completadas']} completadas, {resultado['rechazadas']} rechazadas por "
+            f"otra carga en curso, {resultado['bloqueos_escritura']} fallidas por bloqueo"
+        )
+        self.stdout.write(f"Lecturas inconsistentes: {resultado['inconsistentes']}, "
+                          f"fallidas por bloqueo: {resultado['bloqueos_lectura']}")
+
+        fallas = resultado['inconsistentes'] + resultado['bloqueos_lectura'] + resultado['bloqueos_escritura']
+        if fallas or not resultado['completadas']:
+            raise CommandError('La prueba de concurrencia fallo')
+        self.stdout.write(self.style.SUCCESS('Sin bloqueos ni lecturas inconsistentes'))
+
+    def _leer(self, vigencia):
+        """(registros, valores mensuales, total) de la vigencia, leidos en una misma transaccion."""
+        with transaction.atomic():
+            registros = PACProgramado.objects.filter(vigencia=vigencia)
+            return (
+                registros.count(),
+                PACValorMensual.objects.filter(modulo=PACProgramado.MODULO, vigencia=vigencia).count(),
+                registros.aggregate(t=Sum('total_centavos'))['t'],
+            )
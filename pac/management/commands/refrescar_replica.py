@@ -0,0 +1,39 @@
+import sqlite3
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from pac.enrutador import ALIAS_REPLICA, replica_configurada
+
+
+class Command(BaseCommand):
+    help = ('Copia la base de datos SQLite primaria sobre la replica de lectura (PAC_DB_REPLICA) con la API de '
+            'backup de SQLite. La copia es una sola transaccion: los lectores ven la instantanea anterior o la nueva.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--intervalo', type=int, default=0,
+                            help='Repetir cada N segundos (0 = una sola vez)')
+
+    def handle(self, *args, **options):
+        if not replica_configurada():
+            raise CommandError('No hay replica configurada (defina PAC_DB_REPLICA con la ruta del archivo)')
+        if connections['default'].vendor != 'sqlite' or connections[ALIAS_REPLICA].vendor != 'sqlite':
+            raise CommandError('refrescar_replica solo copia entre archivos SQLite; '
+                               'con PostgreSQL la replica la mantiene la replicacion del servidor')
+
+        destino_ruta = str(connections[ALIAS_REPLICA].settings_dict['NAME'])
+        while True:
+            inicio = time.perf_counter()
+            primaria = connections['default']
+            primaria.ensure_connection()
+            destino = sqlite3.connect(destino_ruta, timeout=20)
+            try:
+                primaria.connection.backup(destino)
+            finally:
+                destino.close()
+                primaria.close()
+            self.stdout.write(f'Replica {destino_ruta} actualizada en {time.perf_counter() - inicio:.2f} s')
+            if not options['intervalo']:
+                break
+            time.sleep(options['intervalo'])
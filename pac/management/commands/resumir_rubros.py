@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from pac import resumen
+from pac.archivado import vigencias_archivadas
+from pac.models import PACValorMensual
+
+
+class Command(BaseCommand):
+    help = ('Reconstruye el resumen por rubro (las importaciones solo actualizan las filas que cambian). '
+            'Util para las vigencias archivadas antes de crear la tabla o si el resumen se desincroniza.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'vigencia', type=int, nargs='*', help='Vigencias (por defecto todas, incluidas las archivadas)',
+        )
+
+    def handle(self, *args, **options):
+        vigencias = options['vigencia'] or sorted(
+            set(PACValorMensual.objects.values_list('vigencia', flat=True).distinct().order_by())
+            | set(vigencias_archivadas())
+        )
+        for vigencia in vigencias:
+            inicio = time.perf_counter()
+            escritas = resumen.resumir(vigencia)
+            self.stdout.write(
+                f'Vigencia {vigencia}: {escritas} filas escritas en {(time.perf_counter() - inicio) * 1000:.0f} ms'
+            )
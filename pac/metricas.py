@@ -0,0 +1,190 @@
+"""
+Metricas de operacion en formato de exposicion de Prometheus.
+
+Cada proceso (worker de gunicorn, worker de exportaciones) acumula sus
+observaciones en memoria y las vuelca periodicamente, con upserts aditivos,
+en un archivo SQLite compartido (PAC_METRICAS_DB). El endpoint /metrics lee
+ese archivo, de modo que las metricas quedan agregadas entre procesos sin
+servicios externos.
+"""
+
+import atexit
+import os
+import sqlite3
+import threading
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+
+
+BUCKETS_SEGUNDOS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120]
+BUCKETS_CONSULTAS = [1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000]
+
+# nombre: (tipo, ayuda, buckets)
+DEFINICIONES = {
+    'pac_http_requests_total': ('counter', 'Requests atendidos por vista, metodo y codigo de estado', None),
+    'pac_http_request_duracion_segundos': ('histogram', 'Latencia de los requests por vista', BUCKETS_SEGUNDOS),
+    'pac_http_consultas_sql': ('histogram', 'Consultas SQL por request por vista', BUCKETS_CONSULTAS),
+    'pac_http_db_segundos_total': ('counter', 'Tiempo acumulado en base de datos por vista', None),
+    'pac_importacion_duracion_segundos': ('histogram', 'Duracion de las importaciones por tipo de carga', BUCKETS_SEGUNDOS),
+    'pac_importacion_filas_total': ('counter', 'Registros importados por tipo de carga', None),
+    'pac_importacion_filas_por_segundo': ('gauge', 'Registros por segundo de la ultima importacion por tipo de carga', None),
+    'pac_exportacion_duracion_segundos': ('histogram', 'Tiempo de construccion de archivos exportados', BUCKETS_SEGUNDOS),
+    'pac_cache_exportaciones_total': ('counter', 'Consultas a la cache de exportaciones por resultado (hit/miss)', None),
+}
+
+_pendientes = {}  # (nombre, etiquetas, le) -> (valor, es_gauge)
+_candado = threading.Lock()
+_ultimo_volcado = time.monotonic()
+
+
+def _ruta_db():
+    return str(getattr(settings, 'PAC_METRICAS_DB', os.path.join(settings.BASE_DIR, 'metricas.sqlite3')))
+
+
+def _conectar():
+    conexion = sqlite3.connect(_ruta_db(), timeout=5, isolation_level=None)
+    conexion.execute('PRAGMA journal_mode=WAL')
+    conexion.execute('PRAGMA synchronous=OFF')
+    conexion.execute(
+        'CREATE TABLE IF NOT EXISTS metricas ('
+        ' nombre TEXT NOT NULL, etiquetas TEXT NOT NULL, le TEXT NOT NULL, valor REAL NOT NULL,'
+        ' PRIMARY KEY (nombre, etiquetas, le))'
+    )
+    return conexion
+
+
+def _etiquetas(etiquetas):
+    def escapar(valor):
+        return str(valor).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+    return ','.join(f'{k}="{escapar(v)}"' for k, v in sorted(etiquetas.items()))
+
+
+def _acumular(clave, valor, es_gauge=False):
+    with _candado:
+        if es_gauge:
+            _pendientes[clave] = (valor, True)
+        else:
+            _pendientes[clave] = (_pendientes.get(clave, (0, False))[0] + valor, False)
+    _volcar_si_corresponde()
+
+
+def contador(nombre, valor=1, **etiquetas):
+    _acumular((nombre, _etiquetas(etiquetas), ''), valor)
+
+
+def gauge(nombre, valor, **etiquetas):
+    _acumular((nombre, _etiquetas(etiquetas), ''), valor, es_gauge=True)
+
+
+def histograma(nombre, valor, **etiquetas):
+    buckets = DEFINICIONES[nombre][2]
+    clave = _etiquetas(etiquetas)
+    i = bisect_left(buckets, valor)
+    # Se guarda el conteo por bucket (no acumulado); exponer() lo acumula
+    le = str(buckets[i]) if i < len(buckets) else '+Inf'
+    with _candado:
+        for sufijo, incremento in ((le, 1), ('sum', valor), ('count', 1)):
+            k = (nombre, clave, sufijo)
+            _pendientes[k] = (_pendientes.get(k, (0, False))[0] + incremento, False)
+    _volcar_si_corresponde()
+
+
+def _volcar_si_corresponde():
+    if time.monotonic() - _ultimo_volcado >= getattr(settings, 'PAC_METRICAS_INTERVALO', 5):
+        volcar()
+
+
+def volcar():
+    """Escribe las observaciones pendientes de este proceso en el archivo compartido."""
+    global _ultimo_volcado
+    with _candado:
+        pendientes = dict(_pendientes)
+        _pendientes.clear()
+        _ultimo_volcado = time.monotonic()
+    if not pendientes:
+        return
+    try:
+        conexion = _conectar()
+        try:
+            conexion.execute('BEGIN IMMEDIATE')
+            conexion.executemany(
+                'INSERT INTO metricas (nombre, etiquetas, le, valor) VALUES (?, ?, ?, ?) '
+                'ON CONFLICT (nombre, etiquetas, le) DO UPDATE SET valor = valor + excluded.valor',
+                [(*k, v) for k, (v, es_gauge) in pendientes.items() if not es_gauge],
+            )
+            conexion.executemany(
+                'INSERT INTO metricas (nombre, etiquetas, le, valor) VALUES (?, ?, ?, ?) '
+                'ON CONFLICT (nombre, etiquetas, le) DO UPDATE SET valor = excluded.valor',
+                [(*k, v) for k, (v, es_gauge) in pendientes.items() if es_gauge],
+            )
+            conexion.execute('COMMIT')
+        finally:
+            conexion.close()
+    except sqlite3.Error:
+        # Las metricas nunca deben romper un request: se reintentan en el siguiente volcado
+        with _candado:
+            for k, (v, es_gauge) in pendientes.items():
+                if es_gauge:
+                    _pendientes.setdefault(k, (v, True))
+                else:
+                    _pendientes[k] = (_pendientes.get(k, (0, False))[0] + v, False)
+
+
+atexit.register(volcar)
+
+
+def _numero(valor):
+    return str(int(valor)) if float(valor).is_integer() else repr(float(valor))
+
+
+def exponer():
+    """Texto en formato de exposicion de Prometheus con las metricas de todos los procesos."""
+    volcar()
+    conexion = _conectar()
+    try:
+        filas = conexion.execute('SELECT nombre, etiquetas, le, valor FROM metricas').fetchall()
+    finally:
+        conexion.close()
+
+    por_nombre = {}
+    for nombre, etiquetas, le, valor in filas:
+        por_nombre.setdefault(nombre, {}).setdefault(etiquetas, {})[le] = valor
+
+    lineas = []
+    for nombre, (tipo, ayuda, buckets) in DEFINICIONES.items():
+        series = por_nombre.get(nombre, {})
+        lineas.append(f'# HELP {nombre} {ayuda}')
+        lineas.append(f'# TYPE {nombre} {tipo}')
+        for etiquetas, valores in sorted(series.items()):
+            if tipo != 'histogram':
+                lineas.append(f'{nombre}{{{etiquetas}}} {_numero(valores.get("", 0))}')
+                continue
+            acumulado = 0
+            for le in [*map(str, buckets), '+Inf']:
+                acumulado += valores.get(le, 0)
+                separador = ',' if etiquetas else ''
+                lineas.append(f'{nombre}_bucket{{{etiquetas}{separador}le="{le}"}} {_numero(acumulado)}')
+            lineas.append(f'{nombre}_sum{{{etiquetas}}} {_numero(valores.get("sum", 0))}')
+            lineas.append(f'{nombre}_count{{{etiquetas}}} {_numero(valores.get("count", 0))}')
+
+    # Proporcion de aciertos de la cache de exportaciones, derivada de los contadores
+    cache = por_nombre.get('pac_cache_exportaciones_total', {})
+    aciertos = sum(v.get('', 0) for e, v in cache.items() if 'resultado="hit"' in e)
+    total = sum(v.get('', 0) for v in cache.values())
+    lineas.append('# HELP pac_cache_exportaciones_ratio_aciertos Proporcion de descargas servidas desde la cache')
+    lineas.append('# TYPE pac_cache_exportaciones_ratio_aciertos gauge')
+    lineas.append(f'pac_cache_exportaciones_ratio_aciertos {_numero(aciertos / total if total else 0)}')
+    return '\n'.join(lineas) + '\n'
+
+
+def limpiar():
+    """Borra todas las metricas acumuladas."""
+    with _candado:
+        _pendientes.clear()
+    conexion = _conectar()
+    try:
+        conexion.execute('DELETE FROM metricas')
+    finally:
+        conexion.close()
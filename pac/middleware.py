@@ -0,0 +1,382 @@
+"""
+Instrumentacion por request: numero de consultas SQL, tiempo en base de
+datos, tiempo de la vista, tiempo de render de plantillas y tamano de la
+respuesta.
+
+El costo es bajo para dejarla activa en produccion: las consultas se cuentan
+con connection.execute_wrapper (sin DEBUG ni captura del SQL) y el tiempo de
+plantillas con un envoltorio sobre el render del backend de Django. Los datos
+se envian en el encabezado Server-Timing, se registran en el log
+'pac.rendimiento' cuando superan los presupuestos configurados y se acumulan
+en histogramas por vista en memoria del proceso (ver estadisticas_vistas())
+y en las metricas compartidas entre procesos (ver metricas.py). Se cuentan
+las consultas de todas las bases de datos configuradas (primaria y replica).
+"""
+
+import contextvars
+import cProfile
+from contextlib import ExitStack
+import io
+import logging
+import marshal
+import pstats
+import threading
+import time
+import tracemalloc
+from bisect import bisect_left
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connections
+from django.template.backends.django import Template as PlantillaDjango
+
+from . import metricas
+from .enrutador import ALIAS_REPLICA, fijar_alias_lectura, replica_configurada
+from .models import PerfilRequest
+
+
+logger = logging.getLogger('pac.rendimiento')
+
+# Limites superiores (ms) de los buckets del histograma de latencia
+BUCKETS_MS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+_medicion_actual = contextvars.ContextVar('pac_medicion', default=None)
+_histogramas = {}
+_candado = threading.Lock()
+
+
+class Medicion:
+    __slots__ = ('consultas', 'segundos_db', 'segundos_plantillas', 'inicio_vista')
+
+    def __init__(self):
+        self.consultas = 0
+        self.segundos_db = 0.0
+        self.segundos_plantillas = 0.0
+        self.inicio_vista = None
+
+    def __call__(self, execute, sql, params, many, context):
+        # execute_wrapper: se invoca por cada consulta SQL
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.segundos_db += time.perf_counter() - inicio
+            self.consultas += 1
+
+
+def _instalar_medicion_plantillas():
+    """Envuelve Template.render del backend de Django para medir el render (una sola vez)."""
+    if getattr(PlantillaDjango.render, '_pac_medido', False):
+        return
+    render_original = PlantillaDjango.render
+
+    def render(self, context=None, request=None):
+        medicion = _medicion_actual.get()
+        if medicion is None:
+            return render_original(self, context, request)
+        inicio = time.perf_counter()
+        try:
+            return render_original(self, context, request)
+        finally:
+            medicion.segundos_plantillas += time.perf_counter() - inicio
+
+    render._pac_medido = True
+    PlantillaDjango.render = render
+
+
+def _registrar_histograma(vista, ms, consultas):
+    with _candado:
+        h = _histogramas.get(vista)
+        if h is None:
+            h = _histogramas[vista] = {
+                'buckets': [0] * (len(BUCKETS_MS) + 1), 'cantidad': 0, 'suma_ms': 0.0,
+                'max_ms': 0.0, 'consultas': 0, 'max_consultas': 0,
+            }
+        h['buckets'][bisect_left(BUCKETS_MS, ms)] += 1
+        h['cantidad'] += 1
+        h['suma_ms'] += ms
+        h['max_ms'] = max(h['max_ms'], ms)
+        h['consultas'] += consultas
+        h['max_consultas'] = max(h['max_consultas'], consultas)
+
+
+def estadisticas_vistas():
+    """Copia de los histogramas por vista acumulados en este proceso."""
+    with _candado:
+        return {
+            vista: dict(h, buckets=dict(zip([*map(str, BUCKETS_MS), 'inf'], h['buckets'])))
+            for vista, h in _histogramas.items()
+        }
+
+
+def reiniciar_estadisticas():
+    with _candado:
+        _histogramas.clear()
+
+
+def _tamano_respuesta(response):
+    if response.has_header('Content-Length'):
+        return int(response['Content-Length'])
+    return len(response.content)
+
+
+class _ContenidoMedido:
+    """
+    Contenido de una respuesta en streaming, que se genera despues de que la vista retorna: cuenta sus
+    consultas y bytes mientras se recorre y llama a al_terminar(bytes) una sola vez, al agotarse o al
+    cerrarse la respuesta (tambien si el cliente se desconecta o nunca se recorre, como en HEAD).
+    """
+
+    def __init__(self, contenido, medicion, al_terminar):
+        self.contenido = contenido
+        self.medicion = medicion
+        self.al_terminar = al_terminar
+        self.bytes = 0
+        self._generador = None
+        self._terminado = False
+
+    def __iter__(self):
+        self._generador = self._recorrer()
+        return self._generador
+
+    def _recorrer(self):
+        try:
+            with ExitStack() as envoltorios:
+                for conexion in connections.all():
+                    envoltorios.enter_context(conexion.execute_wrapper(self.medicion))
+                for bloque in self.contenido:
+                    self.bytes += len(bloque)
+                    yield bloque
+        finally:
+            self._terminar()
+
+    def close(self):
+        # HttpResponse.close() lo llama al terminar la respuesta
+        if self._generador is not None:
+            self._generador.close()
+        self._terminar()
+
+    def _terminar(self):
+        if not self._terminado:
+            self._terminado = True
+            self.al_terminar(self.bytes)
+
+
+class InstrumentacionMiddleware:
+    """
+    Mide cada request y publica Server-Timing; ver el docstring del modulo. En las respuestas en
+    streaming Server-Timing cubre hasta que la vista retorna; las consultas, el tiempo y los bytes de
+    la generacion del contenido se suman y la medicion se registra al cerrarse la respuesta.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.presupuesto_consultas = getattr(settings, 'PAC_PRESUPUESTO_CONSULTAS', 50)
+        self.presupuesto_ms = getattr(settings, 'PAC_PRESUPUESTO_MS', 1000)
+        _instalar_medicion_plantillas()
+
+    def __call__(self, request):
+        medicion = Medicion()
+        token = _medicion_actual.set(medicion)
+        inicio = time.perf_counter()
+        try:
+            with ExitStack() as envoltorios:
+                for conexion in connections.all():
+                    envoltorios.enter_context(conexion.execute_wrapper(medicion))
+                response = self.get_response(request)
+        finally:
+            _medicion_actual.reset(token)
+        fin = time.perf_counter()
+
+        # Desde process_view hasta la respuesta: incluye consultas y render hechos dentro de la vista
+        vista_ms = (fin - medicion.inicio_vista) * 1000 if medicion.inicio_vista is not None else 0.0
+        response['Server-Timing'] = ', '.join([
+            f'db;desc="{medicion.consultas} consultas";dur={medicion.segundos_db * 1000:.1f}',
+            f'vista;dur={vista_ms:.1f}',
+            f'plantillas;dur={medicion.segundos_plantillas * 1000:.1f}',
+            f'total;dur={(fin - inicio) * 1000:.1f}',
+        ])
+        if response.streaming:
+            response.streaming_content = _ContenidoMedido(
+                response.streaming_content, medicion,
+                lambda tamano: self._registrar(request, response, medicion, inicio, vista_ms, tamano),
+            )
+        else:
+            self._registrar(request, response, medicion, inicio, vista_ms, _tamano_respuesta(response))
+        return response
+
+    def _registrar(self, request, response, medicion, inicio, vista_ms, tamano):
+        """Histograma, metricas y log de presupuesto del request, con el contenido ya generado."""
+        total_ms = (time.perf_counter() - inicio) * 1000
+        match = getattr(request, 'resolver_match', None)
+        vista = match.view_name if match else 'sin_ruta'
+        db_ms = medicion.segundos_db * 1000
+        plantillas_ms = medicion.segundos_plantillas * 1000
+
+        _registrar_histograma(vista, total_ms, medicion.consultas)
+        if vista != 'metricas':
+            metricas.contador('pac_http_requests_total', vista=vista, metodo=request.method, estado=response.status_code)
+            metricas.histograma('pac_http_request_duracion_segundos', total_ms / 1000, vista=vista)
+            metricas.histograma('pac_http_consultas_sql', medicion.consultas, vista=vista)
+            metricas.contador('pac_http_db_segundos_total', medicion.segundos_db, vista=vista)
+
+        if medicion.consultas > self.presupuesto_consultas or total_ms > self.presupuesto_ms:
+            logger.warning(
+                'Request sobre presupuesto: %s %s vista=%s consultas=%d db=%.1fms vista=%.1fms '
+                'plantillas=%.1fms total=%.1fms bytes=%s',
+                request.method, request.path, vista, medicion.consultas, db_ms, vista_ms,
+                plantillas_ms, total_ms, tamano,
+            )
+        request.pac_medicion = {
+            'vista': vista, 'consultas': medicion.consultas, 'db_ms': db_ms, 'vista_ms': vista_ms,
+            'plantillas_ms': plantillas_ms, 'total_ms': total_ms, 'bytes': tamano,
+        }
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        medicion = _medicion_actual.get()
+        if medicion is not None:
+            medicion.inicio_vista = time.perf_counter()
+        return None
+
+
+# ============================================================
+# PERFILADO BAJO DEMANDA
+# ============================================================
+class PerfilamientoMiddleware:
+    """
+    Ejecuta el request bajo cProfile y tracemalloc cuando un usuario staff lo
+    pide con ?perfilar=1 o el encabezado X-PAC-Perfilar: 1, y guarda el perfil
+    como PerfilRequest (ver el admin). En respuestas por streaming solo se
+    perfila la vista, no la generacion del contenido.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.maximo = getattr(settings, 'PAC_PERFILES_MAXIMO', 100)
+
+    def _solicitado(self, request):
+        pedido = request.GET.get('perfilar') == '1' or request.headers.get('X-PAC-Perfilar') == '1'
+        return pedido and request.user.is_staff
+
+    def __call__(self, request):
+        if not self._solicitado(request):
+            return self.get_response(request)
+
+        perfil = cProfile.Profile()
+        # tracemalloc es global al proceso: si ya esta activo (otro perfil en curso) no se mide memoria
+        medir_memoria = not tracemalloc.is_tracing()
+        if medir_memoria:
+            tracemalloc.start()
+        inicio = time.perf_counter()
+        try:
+            perfil.enable()
+        except ValueError:
+            # Otro perfilador activo en este hilo
+            perfil = None
+        try:
+            response = self.get_response(request)
+        finally:
+            if perfil is not None:
+                perfil.disable()
+            duracion_ms = (time.perf_counter() - inicio) * 1000
+            if medir_memoria:
+                _, pico = tracemalloc.get_traced_memory()
+                asignaciones = tracemalloc.take_snapshot().statistics('lineno')[:15]
+                tracemalloc.stop()
+
+        if perfil is not None:
+            registro = self._guardar(request, response, perfil, duracion_ms,
+                                     pico if medir_memoria else None, asignaciones if medir_memoria else [])
+            response['X-PAC-Perfil'] = str(registro.pk)
+        return response
+
+    def _guardar(self, request, response, perfil, duracion_ms, pico, asignaciones):
+        perfil.create_stats()
+        # Mismo contenido que Profile.dump_stats: se abre con pstats.Stats(ruta).
+        # Se serializa antes de crear el Stats, que vacia perfil.stats
+        datos = marshal.dumps(perfil.stats)
+        salida = io.StringIO()
+        pstats.Stats(perfil, stream=salida).sort_stats('cumulative').print_stats(40)
+        if asignaciones:
+            salida.write('\nMayores asignaciones de memoria vivas al terminar:\n')
+            for estadistica in asignaciones:
+                salida.write(f'{estadistica}\n')
+
+        medicion = _medicion_actual.get()
+        match = getattr(request, 'resolver_match', None)
+        registro = PerfilRequest(
+            url=request.get_full_path()[:500], metodo=request.method,
+            vista=match.view_name if match else '', usuario=request.user,
+            estado_http=response.status_code, duracion_ms=duracion_ms,
+            consultas=medicion.consultas if medicion else 0,
+            memoria_pico_kb=pico // 1024 if pico is not None else None,
+            resumen=salida.getvalue(),
+        )
+        registro.archivo.save('perfil.pstats', ContentFile(datos), save=False)
+        registro.save()
+
+        for antiguo in PerfilRequest.objects.order_by('-fecha')[self.maximo:]:
+            antiguo.archivo.delete(save=False)
+            antiguo.delete()
+        return registro
+
+
+# ============================================================
+# LECTURAS EN REPLICA
+# ============================================================
+class ReplicaLecturaMiddleware:
+    """
+    Envia a la replica las lecturas de las vistas de consulta y exportacion
+    de pac (GET sin escrituras recientes del usuario); ver enrutador.py.
+    """
+
+    COOKIE = 'pac_primaria'
+    # Vistas de pac que leen siempre de la primaria: importaciones, CRUD y estado de trabajos
+    VISTAS_PRIMARIA = {
+        'importar_aim_inicial', 'importar_pac_programado', 'importar_pac_compromisos', 'importar_pac_pagos',
+        'fuente_crear', 'fuente_editar', 'fuente_eliminar', 'eliminar_datos',
+        'solicitar_exportacion', 'estado_exportacion', 'descargar_exportacion',
+    }
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.segundos_lectura_propia = getattr(settings, 'PAC_REPLICA_LECTURA_PROPIA_SEGUNDOS', 60)
+
+    def __call__(self, request):
+        if not replica_configurada():
+            return self.get_response(request)
+        fijar_alias_lectura(None)
+        try:
+            response = self.get_response(request)
+        finally:
+            fijar_alias_lectura(None)
+
+        if request.method not in ('GET', 'HEAD', 'OPTIONS'):
+            # Lectura de lo propio: tras escribir, este navegador lee de la primaria un tiempo
+            response.set_cookie(self.COOKIE, '1', max_age=self.segundos_lectura_propia, httponly=True, samesite='Lax')
+        elif response.streaming and getattr(request, 'pac_alias_lectura', None):
+            # El contenido en streaming se genera despues de retornar: lee de la misma base
+            response.streaming_content = _leyendo_de(request.pac_alias_lectura, response.streaming_content)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not replica_configurada():
+            return None
+        usar_replica = (
+            request.method in ('GET', 'HEAD')
+            and view_func.__module__ == 'pac.views'
+            and request.resolver_match.url_name not in self.VISTAS_PRIMARIA
+            and self.COOKIE not in request.COOKIES
+        )
+        if usar_replica:
+            request.pac_alias_lectura = ALIAS_REPLICA
+            fijar_alias_lectura(ALIAS_REPLICA)
+        return None
+
+
+def _leyendo_de(alias, contenido):
+    fijar_alias_lectura(alias)
+    try:
+        yield from contenido
+    finally:
+        fijar_alias_lectura(None)
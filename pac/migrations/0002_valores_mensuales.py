@@ -0,0 +1,142 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:22
+
+from django.db import migrations, models
+
+MESES = [
+    "enero", "febrero", "marzo", "abril", "mayo", "junio",
+    "julio", "agosto", "septiembre", "octubre", "noviembre", "diciembre",
+]
+
+MODELOS = [
+    ("AIMInicial", "AIM_INICIAL"),
+    ("PACProgramado", "PROGRAMADO"),
+    ("PACEjecutadoCompromiso", "EJECUTADO_COMPROMISO"),
+    ("PACEjecutadoPago", "EJECUTADO_PAGO"),
+]
+
+
+def poblar_valores_mensuales(apps, schema_editor):
+    """Llena la tabla larga a partir de las columnas mensuales ya cargadas."""
+    PACValorMensual = apps.get_model("pac", "PACValorMensual")
+    for nombre_modelo, modulo in MODELOS:
+        modelo = apps.get_model("pac", nombre_modelo)
+        valores = []
+        for reg in modelo.objects.all().iterator():
+            for num_mes, mes in enumerate(MESES, start=1):
+                valor = getattr(reg, mes)
+                if not valor:
+                    continue
+                valores.append(
+                    PACValorMensual(
+                        modulo=modulo,
+                        registro_id=reg.pk,
+                        vigencia=reg.vigencia,
+                        tipo=reg.tipo,
+                        categoria=reg.categoria,
+                        codigo_rubro=reg.codigo_rubro,
+                        fuente_financiacion=reg.fuente_financiacion,
+                        es_subtotal=reg.es_subtotal,
+                        mes=num_mes,
+                        valor=valor,
+                    )
+                )
+        PACValorMensual.objects.bulk_create(valores, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("pac", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PACValorMensual",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "modulo",
+                    models.CharField(
+                        choices=[
+                            ("AIM_INICIAL", "AIM Inicial"),
+                            ("PROGRAMADO", "PAC Programado"),
+                            ("EJECUTADO_COMPROMISO", "PAC Ejecutado - Compromisos"),
+                            ("EJECUTADO_PAGO", "PAC Ejecutado - Pagos"),
+                        ],
+                        max_length=30,
+                    ),
+                ),
+                (
+                    "registro_id",
+                    models.BigIntegerField(
+                        help_text="ID del registro en la tabla del modulo"
+                    ),
+                ),
+                ("vigencia", models.IntegerField()),
+                (
+                    "tipo",
+                    models.CharField(
+                        choices=[("INGRESO", "Ingreso"), ("GASTO", "Gasto")],
+                        max_length=10,
+                    ),
+                ),
+                (
+                    "categoria",
+                    models.CharField(
+                        blank=True,
+                        choices=[
+                            ("SALDO_INICIAL", "Saldo Inicial"),
+                            ("INGRESO_CORRIENTE", "Ingresos Corrientes"),
+                            ("INGRESO_CAPITAL", "Ingresos de Capital"),
+                            ("FUNCIONAMIENTO", "Funcionamiento"),
+                            ("INVERSION", "Inversion"),
+                            ("DEUDA", "Servicio a la Deuda"),
+                            ("RESERVAS", "Reservas Presupuestales"),
+                            ("CUENTAS_POR_PAGAR", "Cuentas por Pagar"),
+                        ],
+                        default="",
+                        max_length=30,
+                    ),
+                ),
+                ("codigo_rubro", models.CharField(max_length=200)),
+                (
+                    "fuente_financiacion",
+                    models.CharField(blank=True, default="", max_length=200),
+                ),
+                ("es_subtotal", models.BooleanField(default=False)),
+                (
+                    "mes",
+                    models.PositiveSmallIntegerField(
+                        help_text="1 = enero ... 12 = diciembre"
+                    ),
+                ),
+                (
+                    "valor",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=20),
+                ),
+            ],
+            options={
+                "verbose_name": "Valor Mensual PAC",
+                "verbose_name_plural": "Valores Mensuales PAC",
+                "indexes": [
+                    models.Index(
+                        fields=["modulo", "vigencia", "tipo", "mes"],
+                        name="pac_pacvalo_modulo_2e59a6_idx",
+                    ),
+                    models.Index(
+                        fields=["modulo", "registro_id"],
+                        name="pac_pacvalo_modulo_b399d1_idx",
+                    ),
+                ],
+            },
+        ),
+        migrations.RunPython(poblar_valores_mensuales, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:24
+
+import pac.centavos
+from django.db import migrations
+
+MODELOS = ["AIMInicial", "PACProgramado", "PACEjecutadoCompromiso", "PACEjecutadoPago"]
+
+
+def poblar_centavos(apps, schema_editor):
+    """Copia los valores Decimal existentes a las columnas en centavos."""
+    for nombre_modelo in MODELOS:
+        modelo = apps.get_model("pac", nombre_modelo)
+        registros = list(modelo.objects.only("pk", "apropiacion_definitiva"))
+        for reg in registros:
+            reg.apropiacion_definitiva_centavos = reg.apropiacion_definitiva
+        modelo.objects.bulk_update(
+            registros, ["apropiacion_definitiva_centavos"], batch_size=500
+        )
+
+    PACValorMensual = apps.get_model("pac", "PACValorMensual")
+    valores = list(PACValorMensual.objects.only("pk", "valor"))
+    for val in valores:
+        val.valor_centavos = val.valor
+    PACValorMensual.objects.bulk_update(valores, ["valor_centavos"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("pac", "0002_valores_mensuales"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="aiminicial",
+            name="apropiacion_definitiva_centavos",
+            field=pac.centavos.CentavosField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="pacejecutadocompromiso",
+            name="apropiacion_definitiva_centavos",
+            field=pac.centavos.CentavosField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="pacejecutadopago",
+            name="apropiacion_definitiva_centavos",
+            field=pac.centavos.CentavosField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="pacprogramado",
+            name="apropiacion_definitiva_centavos",
+            field=pac.centavos.CentavosField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="pacvalormensual",
+            name="valor_centavos",
+            field=pac.centavos.CentavosField(default=0),
+        ),
+        migrations.RunPython(poblar_centavos, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,105 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:41
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("pac", "0003_valores_centavos"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TrabajoExportacion",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "tipo",
+                    models.CharField(
+                        choices=[
+                            ("LIBRO_CONSOLIDADO", "Libro Consolidado (xlsx)"),
+                            ("DATOS", "Datos por Rubro"),
+                        ],
+                        max_length=30,
+                    ),
+                ),
+                ("vigencia", models.IntegerField(default=2026)),
+                (
+                    "modulo",
+                    models.CharField(
+                        blank=True,
+                        default="",
+                        help_text="Para DATOS: modulo o consolidado",
+                        max_length=30,
+                    ),
+                ),
+                ("formato", models.CharField(default="xlsx", max_length=10)),
+                (
+                    "clave",
+                    models.CharField(
+                        help_text="Exportacion y version de los datos; une solicitudes equivalentes",
+                        max_length=200,
+                    ),
+                ),
+                (
+                    "estado",
+                    models.CharField(
+                        choices=[
+                            ("PENDIENTE", "Pendiente"),
+                            ("EN_PROCESO", "En Proceso"),
+                            ("TERMINADO", "Terminado"),
+                            ("ERROR", "Error"),
+                        ],
+                        default="PENDIENTE",
+                        max_length=15,
+                    ),
+                ),
+                (
+                    "archivo",
+                    models.FileField(blank=True, upload_to="trabajos_exportacion/"),
+                ),
+                ("error", models.TextField(blank=True)),
+                ("fecha_solicitud", models.DateTimeField(auto_now_add=True)),
+                ("fecha_inicio", models.DateTimeField(blank=True, null=True)),
+                ("fecha_fin", models.DateTimeField(blank=True, null=True)),
+                (
+                    "usuario",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Trabajo de Exportacion",
+                "verbose_name_plural": "Trabajos de Exportacion",
+                "ordering": ["-fecha_solicitud"],
+                "indexes": [
+                    models.Index(
+                        fields=["clave", "estado"], name="pac_trabajo_clave_f6f4a6_idx"
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        condition=models.Q(("estado__in", ["PENDIENTE", "EN_PROCESO"])),
+                        fields=("clave",),
+                        name="trabajo_exportacion_activo_unico",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:45
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("pac", "0004_trabajos_exportacion"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PerfilRequest",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("url", models.CharField(max_length=500)),
+                ("metodo", models.CharField(max_length=10)),
+                ("vista", models.CharField(blank=True, max_length=200)),
+                ("fecha", models.DateTimeField(auto_now_add=True)),
+                ("estado_http", models.PositiveSmallIntegerField(default=200)),
+                ("duracion_ms", models.FloatField(verbose_name="Duracion (ms)")),
+                ("consultas", models.IntegerField(default=0)),
+                (
+                    "memoria_pico_kb",
+                    models.IntegerField(
+                        blank=True, null=True, verbose_name="Memoria pico (KB)"
+                    ),
+                ),
+                (
+                    "archivo",
+                    models.FileField(
+                        help_text="Estadisticas en formato pstats",
+                        upload_to="perfiles/",
+                    ),
+                ),
+                ("resumen", models.TextField(blank=True)),
+                (
+                    "usuario",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Perfil de Request",
+                "verbose_name_plural": "Perfiles de Requests",
+                "ordering": ["-duracion_ms"],
+            },
+        ),
+    ]
@@ -0,0 +1,81 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("pac", "0005_perfiles_request"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="cargaarchivo",
+            name="filas_omitidas",
+            field=models.JSONField(
+                blank=True, default=dict, help_text="Filas omitidas por motivo"
+            ),
+        ),
+        migrations.AddField(
+            model_name="cargaarchivo",
+            name="filas_por_segundo",
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="cargaarchivo",
+            name="hoja",
+            field=models.CharField(
+                blank=True, max_length=100, verbose_name="Hoja leida"
+            ),
+        ),
+        migrations.AddField(
+            model_name="cargaarchivo",
+            name="memoria_pico_kb",
+            field=models.IntegerField(
+                blank=True, null=True, verbose_name="Memoria pico (KB)"
+            ),
+        ),
+        migrations.AddField(
+            model_name="cargaarchivo",
+            name="tiempo_clasificacion_ms",
+            field=models.FloatField(
+                blank=True, null=True, verbose_name="Clasificacion de filas (ms)"
+            ),
+        ),
+        migrations.AddField(
+            model_name="cargaarchivo",
+            name="tiempo_conversion_ms",
+            field=models.FloatField(
+                blank=True, null=True, verbose_name="Conversion numerica (ms)"
+            ),
+        ),
+        migrations.AddField(
+            model_name="cargaarchivo",
+            name="tiempo_eliminacion_ms",
+            field=models.FloatField(
+                blank=True, null=True, verbose_name="Eliminacion previa (ms)"
+            ),
+        ),
+        migrations.AddField(
+            model_name="cargaarchivo",
+            name="tiempo_insercion_ms",
+            field=models.FloatField(
+                blank=True, null=True, verbose_name="Insercion (ms)"
+            ),
+        ),
+        migrations.AddField(
+            model_name="cargaarchivo",
+            name="tiempo_lectura_ms",
+            field=models.FloatField(
+                blank=True, null=True, verbose_name="Lectura del libro (ms)"
+            ),
+        ),
+        migrations.AddField(
+            model_name="cargaarchivo",
+            name="tiempo_total_ms",
+            field=models.FloatField(
+                blank=True, null=True, verbose_name="Tiempo total (ms)"
+            ),
+        ),
+    ]
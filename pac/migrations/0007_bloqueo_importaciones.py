@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:59
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("pac", "0006_instrumentacion_cargas"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BloqueoImportacion",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("modulo", models.CharField(max_length=30)),
+                ("vigencia", models.IntegerField()),
+                ("fecha", models.DateTimeField(auto_now_add=True)),
+                (
+                    "usuario",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Bloqueo de Importacion",
+                "verbose_name_plural": "Bloqueos de Importacion",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("modulo", "vigencia"), name="bloqueo_importacion_unico"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,124 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("pac", "0007_bloqueo_importaciones"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Alerta",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("vigencia", models.IntegerField()),
+                (
+                    "regla",
+                    models.CharField(
+                        choices=[
+                            ("EJECUCION_BAJA", "Ejecucion baja"),
+                            ("SOBRECOMPROMISO", "Sobrecompromiso"),
+                            ("SALDO_NEGATIVO", "Saldo negativo"),
+                            ("SALTO_MENSUAL", "Salto mensual"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "nivel",
+                    models.CharField(
+                        choices=[
+                            ("CRITICA", "Critica"),
+                            ("ADVERTENCIA", "Advertencia"),
+                        ],
+                        max_length=12,
+                    ),
+                ),
+                (
+                    "modulo",
+                    models.CharField(
+                        blank=True,
+                        choices=[
+                            ("AIM_INICIAL", "AIM Inicial"),
+                            ("PROGRAMADO", "PAC Programado"),
+                            ("EJECUTADO_COMPROMISO", "PAC Ejecutado - Compromisos"),
+                            ("EJECUTADO_PAGO", "PAC Ejecutado - Pagos"),
+                        ],
+                        default="",
+                        max_length=30,
+                    ),
+                ),
+                (
+                    "tipo",
+                    models.CharField(
+                        blank=True,
+                        choices=[("INGRESO", "Ingreso"), ("GASTO", "Gasto")],
+                        default="",
+                        max_length=10,
+                    ),
+                ),
+                (
+                    "fuente_financiacion",
+                    models.CharField(blank=True, default="", max_length=200),
+                ),
+                (
+                    "codigo_rubro",
+                    models.CharField(
+                        blank=True,
+                        default="",
+                        help_text="Vacio = alerta de la fuente",
+                        max_length=200,
+                    ),
+                ),
+                (
+                    "mes",
+                    models.PositiveSmallIntegerField(
+                        blank=True, help_text="1 = enero ... 12 = diciembre", null=True
+                    ),
+                ),
+                (
+                    "valor",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=0,
+                        help_text="Valor observado",
+                        max_digits=20,
+                    ),
+                ),
+                (
+                    "referencia",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=0,
+                        help_text="Valor contra el que se compara (programado, apropiacion, presupuesto)",
+                        max_digits=20,
+                    ),
+                ),
+                ("porcentaje", models.FloatField(blank=True, null=True)),
+                ("mensaje", models.CharField(max_length=300)),
+                ("fecha", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "verbose_name": "Alerta",
+                "verbose_name_plural": "Alertas",
+                "ordering": ["-nivel", "regla", "fuente_financiacion", "codigo_rubro"],
+                "indexes": [
+                    models.Index(
+                        fields=["vigencia", "fuente_financiacion"],
+                        name="pac_alerta_vigenci_a21077_idx",
+                    )
+                ],
+            },
+        ),
+    ]
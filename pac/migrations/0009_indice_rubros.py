@@ -0,0 +1,261 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:40
+
+import re
+import unicodedata
+
+import pac.centavos
+from django.db import migrations, models
+
+
+# SQLite: tabla FTS5 de contenido externo sobre pac_indicerubro.texto, sincronizada por triggers.
+# El texto ya llega normalizado (pac/busqueda.py), asi que basta el tokenizador unicode61.
+# Una migracion que reconstruya la tabla en SQLite (la mayoria de AlterField) borra los triggers
+# y debe volver a crearlos; el comando indexar_rubros repuebla el indice.
+SQLITE = [
+    "CREATE VIRTUAL TABLE pac_indicerubro_fts USING fts5("
+    "texto, content='pac_indicerubro', content_rowid='id', tokenize='unicode61')",
+    "CREATE TRIGGER pac_indicerubro_fts_ai AFTER INSERT ON pac_indicerubro BEGIN "
+    "INSERT INTO pac_indicerubro_fts(rowid, texto) VALUES (new.id, new.texto); END",
+    "CREATE TRIGGER pac_indicerubro_fts_ad AFTER DELETE ON pac_indicerubro BEGIN "
+    "INSERT INTO pac_indicerubro_fts(pac_indicerubro_fts, rowid, texto) VALUES ('delete', old.id, old.texto); END",
+    "CREATE TRIGGER pac_indicerubro_fts_au AFTER UPDATE OF texto ON pac_indicerubro BEGIN "
+    "INSERT INTO pac_indicerubro_fts(pac_indicerubro_fts, rowid, texto) VALUES ('delete', old.id, old.texto); "
+    "INSERT INTO pac_indicerubro_fts(rowid, texto) VALUES (new.id, new.texto); END",
+]
+SQLITE_REVERSA = [
+    "DROP TRIGGER IF EXISTS pac_indicerubro_fts_ai",
+    "DROP TRIGGER IF EXISTS pac_indicerubro_fts_ad",
+    "DROP TRIGGER IF EXISTS pac_indicerubro_fts_au",
+    "DROP TABLE IF EXISTS pac_indicerubro_fts",
+]
+
+# PostgreSQL: columna tsvector generada (configuracion 'simple', sin stemming) con indice GIN
+POSTGRESQL = [
+    "ALTER TABLE pac_indicerubro ADD COLUMN documento tsvector "
+    "GENERATED ALWAYS AS (to_tsvector('simple', texto)) STORED",
+    "CREATE INDEX pac_indicerubro_documento ON pac_indicerubro USING GIN (documento)",
+]
+POSTGRESQL_REVERSA = [
+    "DROP INDEX IF EXISTS pac_indicerubro_documento",
+    "ALTER TABLE pac_indicerubro DROP COLUMN IF EXISTS documento",
+]
+
+
+def _ejecutar(schema_editor, sentencias):
+    for sql in sentencias.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(sql)
+
+
+def crear_indice_texto(apps, schema_editor):
+    _ejecutar(schema_editor, {'sqlite': SQLITE, 'postgresql': POSTGRESQL})
+
+
+def borrar_indice_texto(apps, schema_editor):
+    _ejecutar(schema_editor, {'sqlite': SQLITE_REVERSA, 'postgresql': POSTGRESQL_REVERSA})
+
+
+MESES = [
+    "enero", "febrero", "marzo", "abril", "mayo", "junio",
+    "julio", "agosto", "septiembre", "octubre", "noviembre", "diciembre",
+]
+MODELOS = [
+    ("AIMInicial", "AIM_INICIAL"),
+    ("PACProgramado", "PROGRAMADO"),
+    ("PACEjecutadoCompromiso", "EJECUTADO_COMPROMISO"),
+    ("PACEjecutadoPago", "EJECUTADO_PAGO"),
+]
+_NO_ALFANUMERICO = re.compile(r"[^0-9a-z]+")
+_BPIN = re.compile(r"BPIN\D{0,3}(\d{6,})", re.IGNORECASE)
+_RP = re.compile(r"RP:\s*([^)\s]+)")
+
+
+def _normalizar(texto):
+    descompuesto = unicodedata.normalize("NFKD", texto.lower())
+    sin_tildes = "".join(c for c in descompuesto if not unicodedata.combining(c))
+    return " ".join(_NO_ALFANUMERICO.sub(" ", sin_tildes).split())
+
+
+def _codigo_base(codigo):
+    return codigo.split(" (RP:")[0]
+
+
+def _bpin(codigo, proyectos):
+    base = _codigo_base(codigo)
+    if base in proyectos:
+        return proyectos[base]
+    while "." in base:
+        base = base.rsplit(".", 1)[0]
+        if base in proyectos:
+            return proyectos[base]
+    return ""
+
+
+def poblar_indice(apps, schema_editor):
+    """Indexa los registros ya cargados, como busqueda.documentos (las vigencias archivadas: indexar_rubros)."""
+    IndiceRubro = apps.get_model("pac", "IndiceRubro")
+    filas = []
+    for nombre_modelo, modulo in MODELOS:
+        modelo = apps.get_model("pac", nombre_modelo)
+        vigencias = modelo.objects.values_list("vigencia", flat=True).distinct().order_by()
+        for vigencia in vigencias:
+            registros = list(modelo.objects.filter(vigencia=vigencia).order_by("fila_excel", "tipo", "codigo_rubro"))
+            proyectos = {}
+            for reg in registros:
+                bpin = _BPIN.search(reg.nombre_rubro)
+                if bpin:
+                    proyectos[_codigo_base(reg.codigo_rubro)] = bpin.group(1)
+            por_codigo = {}
+            for reg in registros:
+                codigo = reg.codigo_rubro
+                if not codigo:
+                    continue
+                total = sum(getattr(reg, mes) for mes in MESES)
+                fila = por_codigo.get(codigo)
+                if fila is not None:
+                    fila.apropiacion += reg.apropiacion_definitiva
+                    fila.total += total
+                    continue
+                bpin = _bpin(codigo, proyectos)
+                rp = _RP.search(codigo)
+                por_codigo[codigo] = IndiceRubro(
+                    vigencia=vigencia,
+                    modulo=modulo,
+                    codigo_rubro=codigo,
+                    nombre_rubro=reg.nombre_rubro,
+                    tipo=reg.tipo,
+                    categoria=reg.categoria,
+                    fuente_financiacion=reg.fuente_financiacion,
+                    es_subtotal=reg.es_subtotal,
+                    bpin=bpin[:30],
+                    numero_rp=rp.group(1)[:30] if rp else "",
+                    apropiacion=reg.apropiacion_definitiva,
+                    total=total,
+                    texto=_normalizar(f"{codigo} {reg.nombre_rubro} {bpin}"),
+                )
+            filas.extend(por_codigo.values())
+    # Los triggers (SQLite) o la columna generada (PostgreSQL) llenan el indice de texto
+    IndiceRubro.objects.bulk_create(filas, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("pac", "0008_alertas"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="IndiceRubro",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("vigencia", models.IntegerField()),
+                (
+                    "modulo",
+                    models.CharField(
+                        choices=[
+                            ("AIM_INICIAL", "AIM Inicial"),
+                            ("PROGRAMADO", "PAC Programado"),
+                            ("EJECUTADO_COMPROMISO", "PAC Ejecutado - Compromisos"),
+                            ("EJECUTADO_PAGO", "PAC Ejecutado - Pagos"),
+                        ],
+                        max_length=30,
+                    ),
+                ),
+                ("codigo_rubro", models.CharField(max_length=200)),
+                ("nombre_rubro", models.CharField(max_length=500)),
+                (
+                    "tipo",
+                    models.CharField(
+                        choices=[("INGRESO", "Ingreso"), ("GASTO", "Gasto")],
+                        max_length=10,
+                    ),
+                ),
+                (
+                    "categoria",
+                    models.CharField(
+                        blank=True,
+                        choices=[
+                            ("SALDO_INICIAL", "Saldo Inicial"),
+                            ("INGRESO_CORRIENTE", "Ingresos Corrientes"),
+                            ("INGRESO_CAPITAL", "Ingresos de Capital"),
+                            ("FUNCIONAMIENTO", "Funcionamiento"),
+                            ("INVERSION", "Inversion"),
+                            ("DEUDA", "Servicio a la Deuda"),
+                            ("RESERVAS", "Reservas Presupuestales"),
+                            ("CUENTAS_POR_PAGAR", "Cuentas por Pagar"),
+                        ],
+                        default="",
+                        max_length=30,
+                    ),
+                ),
+                (
+                    "fuente_financiacion",
+                    models.CharField(blank=True, default="", max_length=200),
+                ),
+                ("es_subtotal", models.BooleanField(default=False)),
+                (
+                    "bpin",
+                    models.CharField(
+                        blank=True,
+                        default="",
+                        help_text="Propio o del proyecto que lo contiene",
+                        max_length=30,
+                    ),
+                ),
+                (
+                    "numero_rp",
+                    models.CharField(
+                        blank=True,
+                        default="",
+                        max_length=30,
+                        verbose_name="Numero RP/CxP",
+                    ),
+                ),
+                (
+                    "apropiacion",
+                    pac.centavos.CentavosField(
+                        default=0, help_text="Apropiacion definitiva"
+                    ),
+                ),
+                (
+                    "total",
+                    pac.centavos.CentavosField(
+                        default=0, help_text="Suma de los doce meses"
+                    ),
+                ),
+                (
+                    "texto",
+                    models.TextField(
+                        help_text="Codigo, nombre, BPIN y RP normalizados (minusculas, sin tildes ni signos)"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Indice de Rubro",
+                "verbose_name_plural": "Indice de Rubros",
+                "ordering": ["vigencia", "codigo_rubro", "modulo"],
+                "indexes": [
+                    models.Index(
+                        fields=["vigencia", "codigo_rubro"],
+                        name="pac_indicer_vigenci_03ad16_idx",
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("modulo", "vigencia", "codigo_rubro"),
+                        name="indice_rubro_unico",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(crear_indice_texto, borrar_indice_texto),
+        migrations.RunPython(poblar_indice, migrations.RunPython.noop),
+    ]
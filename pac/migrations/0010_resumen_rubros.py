@@ -0,0 +1,202 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:46
+
+import pac.centavos
+from django.db import migrations, models
+
+MESES = [
+    "enero", "febrero", "marzo", "abril", "mayo", "junio",
+    "julio", "agosto", "septiembre", "octubre", "noviembre", "diciembre",
+]
+
+# (modelo, bandera de presencia, prefijo de las columnas mensuales; None = solo apropiacion)
+MODELOS = [
+    ("AIMInicial", "en_aim", None),
+    ("PACProgramado", "en_programado", "prog"),
+    ("PACEjecutadoCompromiso", "en_compromisos", "comp"),
+    ("PACEjecutadoPago", "en_pagos", "pago"),
+]
+
+
+def poblar_resumen(apps, schema_editor):
+    """Llena el resumen por rubro con los registros hoja ya cargados (las vigencias archivadas: resumir_rubros)."""
+    ResumenRubro = apps.get_model("pac", "ResumenRubro")
+    filas = {}
+    for nombre_modelo, bandera, prefijo in MODELOS:
+        modelo = apps.get_model("pac", nombre_modelo)
+        vistos = {}
+        registros = modelo.objects.filter(es_subtotal=False).order_by("vigencia", "fila_excel", "tipo", "codigo_rubro")
+        for reg in registros.iterator():
+            codigo = (reg.vigencia, reg.tipo, reg.categoria, reg.codigo_rubro)
+            ocurrencia = vistos.get(codigo, 0)
+            vistos[codigo] = ocurrencia + 1
+            fila = filas.get(codigo + (ocurrencia,))
+            if fila is None:
+                fila = filas[codigo + (ocurrencia,)] = ResumenRubro(
+                    vigencia=reg.vigencia,
+                    tipo=reg.tipo,
+                    categoria=reg.categoria,
+                    codigo_rubro=reg.codigo_rubro,
+                    ocurrencia=ocurrencia,
+                    codigo_base=reg.codigo_rubro.split(" (RP:")[0],
+                    nombre_rubro=reg.nombre_rubro,
+                    fuente_financiacion=reg.fuente_financiacion,
+                    fila_excel=reg.fila_excel,
+                )
+            setattr(fila, bandera, True)
+            if prefijo is None:
+                fila.apropiacion = reg.apropiacion_definitiva
+                continue
+            for mes in MESES:
+                setattr(fila, f"{prefijo}_{mes}", getattr(reg, mes))
+            setattr(fila, f"{prefijo}_total", reg.total)
+    ResumenRubro.objects.bulk_create(filas.values(), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("pac", "0009_indice_rubros"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ResumenRubro",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("vigencia", models.IntegerField()),
+                (
+                    "tipo",
+                    models.CharField(
+                        choices=[("INGRESO", "Ingreso"), ("GASTO", "Gasto")],
+                        max_length=10,
+                    ),
+                ),
+                (
+                    "categoria",
+                    models.CharField(
+                        blank=True,
+                        choices=[
+                            ("SALDO_INICIAL", "Saldo Inicial"),
+                            ("INGRESO_CORRIENTE", "Ingresos Corrientes"),
+                            ("INGRESO_CAPITAL", "Ingresos de Capital"),
+                            ("FUNCIONAMIENTO", "Funcionamiento"),
+                            ("INVERSION", "Inversion"),
+                            ("DEUDA", "Servicio a la Deuda"),
+                            ("RESERVAS", "Reservas Presupuestales"),
+                            ("CUENTAS_POR_PAGAR", "Cuentas por Pagar"),
+                        ],
+                        default="",
+                        max_length=30,
+                    ),
+                ),
+                (
+                    "codigo_rubro",
+                    models.CharField(max_length=200, verbose_name="Codigo Rubro"),
+                ),
+                (
+                    "ocurrencia",
+                    models.PositiveIntegerField(
+                        default=0,
+                        help_text="Repeticion del codigo en la hoja (0 = primera)",
+                    ),
+                ),
+                (
+                    "codigo_base",
+                    models.CharField(
+                        help_text="Codigo sin el sufijo (RP:...)", max_length=200
+                    ),
+                ),
+                ("nombre_rubro", models.CharField(max_length=500)),
+                (
+                    "fuente_financiacion",
+                    models.CharField(blank=True, default="", max_length=200),
+                ),
+                ("fila_excel", models.IntegerField(default=0)),
+                ("en_aim", models.BooleanField(default=False)),
+                ("en_programado", models.BooleanField(default=False)),
+                ("en_compromisos", models.BooleanField(default=False)),
+                ("en_pagos", models.BooleanField(default=False)),
+                (
+                    "apropiacion",
+                    pac.centavos.CentavosField(
+                        default=0, help_text="Apropiacion definitiva del AIM"
+                    ),
+                ),
+                ("prog_enero", pac.centavos.CentavosField(default=0)),
+                ("prog_febrero", pac.centavos.CentavosField(default=0)),
+                ("prog_marzo", pac.centavos.CentavosField(default=0)),
+                ("prog_abril", pac.centavos.CentavosField(default=0)),
+                ("prog_mayo", pac.centavos.CentavosField(default=0)),
+                ("prog_junio", pac.centavos.CentavosField(default=0)),
+                ("prog_julio", pac.centavos.CentavosField(default=0)),
+                ("prog_agosto", pac.centavos.CentavosField(default=0)),
+                ("prog_septiembre", pac.centavos.CentavosField(default=0)),
+                ("prog_octubre", pac.centavos.CentavosField(default=0)),
+                ("prog_noviembre", pac.centavos.CentavosField(default=0)),
+                ("prog_diciembre", pac.centavos.CentavosField(default=0)),
+                ("prog_total", pac.centavos.CentavosField(default=0)),
+                ("comp_enero", pac.centavos.CentavosField(default=0)),
+                ("comp_febrero", pac.centavos.CentavosField(default=0)),
+                ("comp_marzo", pac.centavos.CentavosField(default=0)),
+                ("comp_abril", pac.centavos.CentavosField(default=0)),
+                ("comp_mayo", pac.centavos.CentavosField(default=0)),
+                ("comp_junio", pac.centavos.CentavosField(default=0)),
+                ("comp_julio", pac.centavos.CentavosField(default=0)),
+                ("comp_agosto", pac.centavos.CentavosField(default=0)),
+                ("comp_septiembre", pac.centavos.CentavosField(default=0)),
+                ("comp_octubre", pac.centavos.CentavosField(default=0)),
+                ("comp_noviembre", pac.centavos.CentavosField(default=0)),
+                ("comp_diciembre", pac.centavos.CentavosField(default=0)),
+                ("comp_total", pac.centavos.CentavosField(default=0)),
+                ("pago_enero", pac.centavos.CentavosField(default=0)),
+                ("pago_febrero", pac.centavos.CentavosField(default=0)),
+                ("pago_marzo", pac.centavos.CentavosField(default=0)),
+                ("pago_abril", pac.centavos.CentavosField(default=0)),
+                ("pago_mayo", pac.centavos.CentavosField(default=0)),
+                ("pago_junio", pac.centavos.CentavosField(default=0)),
+                ("pago_julio", pac.centavos.CentavosField(default=0)),
+                ("pago_agosto", pac.centavos.CentavosField(default=0)),
+                ("pago_septiembre", pac.centavos.CentavosField(default=0)),
+                ("pago_octubre", pac.centavos.CentavosField(default=0)),
+                ("pago_noviembre", pac.centavos.CentavosField(default=0)),
+                ("pago_diciembre", pac.centavos.CentavosField(default=0)),
+                ("pago_total", pac.centavos.CentavosField(default=0)),
+            ],
+            options={
+                "verbose_name": "Resumen de Rubro",
+                "verbose_name_plural": "Resumen de Rubros",
+                "ordering": ["vigencia", "fila_excel", "codigo_rubro"],
+                "indexes": [
+                    models.Index(
+                        fields=["vigencia", "fuente_financiacion"],
+                        name="pac_resumen_vigenci_a184cb_idx",
+                    ),
+                    models.Index(
+                        fields=["vigencia", "codigo_base"],
+                        name="pac_resumen_vigenci_d7b082_idx",
+                    ),
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=(
+                            "vigencia",
+                            "tipo",
+                            "categoria",
+                            "codigo_rubro",
+                            "ocurrencia",
+                        ),
+                        name="resumen_rubro_unico",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(poblar_resumen, migrations.RunPython.noop),
+    ]
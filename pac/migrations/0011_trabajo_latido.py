@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("pac", "0010_resumen_rubros"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="trabajoexportacion",
+            name="latido",
+            field=models.DateTimeField(
+                blank=True,
+                help_text="Ultima senal del worker que construye el archivo",
+                null=True,
+            ),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("pac", "0011_trabajo_latido"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="VersionDatos",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("vigencia", models.IntegerField(unique=True)),
+                ("version", models.BigIntegerField(default=0)),
+                ("fecha", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name": "Version de Datos",
+                "verbose_name_plural": "Versiones de Datos",
+                "ordering": ["vigencia"],
+            },
+        ),
+    ]
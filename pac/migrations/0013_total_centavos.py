@@ -0,0 +1,72 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:45
+
+import pac.centavos
+from django.db import migrations
+from django.db.models import F, Sum
+
+MESES = [
+    "enero", "febrero", "marzo", "abril", "mayo", "junio",
+    "julio", "agosto", "septiembre", "octubre", "noviembre", "diciembre",
+]
+
+MODELOS = [
+    ("AIMInicial", "AIM_INICIAL"),
+    ("PACProgramado", "PROGRAMADO"),
+    ("PACEjecutadoCompromiso", "EJECUTADO_COMPROMISO"),
+    ("PACEjecutadoPago", "EJECUTADO_PAGO"),
+]
+
+
+def poblar_total_centavos(apps, schema_editor):
+    """Total en centavos (suma de los meses) de los registros y del resumen por rubro."""
+    PACValorMensual = apps.get_model("pac", "PACValorMensual")
+    for nombre_modelo, modulo in MODELOS:
+        modelo = apps.get_model("pac", nombre_modelo)
+        # La tabla larga guarda los centavos de la carga; las columnas Decimal se leen ya redondeadas
+        totales = dict(
+            PACValorMensual.objects.filter(modulo=modulo)
+            .values("registro_id").annotate(t=Sum("valor_centavos")).order_by()
+            .values_list("registro_id", "t")
+        )
+        registros = list(modelo.objects.only("pk"))
+        for reg in registros:
+            reg.total_centavos = totales.get(reg.pk, 0)
+        modelo.objects.bulk_update(registros, ["total_centavos"], batch_size=500)
+
+    ResumenRubro = apps.get_model("pac", "ResumenRubro")
+    for prefijo in ("prog", "comp", "pago"):
+        suma = F(f"{prefijo}_{MESES[0]}")
+        for mes in MESES[1:]:
+            suma = suma + F(f"{prefijo}_{mes}")
+        ResumenRubro.objects.update(**{f"{prefijo}_total": suma})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("pac", "0012_version_datos"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="aiminicial",
+            name="total_centavos",
+            field=pac.centavos.CentavosField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="pacejecutadocompromiso",
+            name="total_centavos",
+            field=pac.centavos.CentavosField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="pacejecutadopago",
+            name="total_centavos",
+            field=pac.centavos.CentavosField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="pacprogramado",
+            name="total_centavos",
+            field=pac.centavos.CentavosField(default=0, editable=False),
+        ),
+        migrations.RunPython(poblar_total_centavos, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,11 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
 from django.contrib.auth.models import User
+from django.utils import timezone
 from decimal import Decimal
 
+from . import archivado
+from .centavos import CentavosField, a_centavos, de_centavos
+
 MESES = [
     'enero', 'febrero', 'marzo', 'abril', 'mayo', 'junio',
     'julio', 'agosto', 'septiembre', 'octubre', 'noviembre', 'diciembre'
@@ -13,6 +17,11 @@ MESES_DISPLAY = [
 ]
 
 
+def codigo_base(codigo):
+    """Codigo del rubro sin el sufijo ' (RP:...)' que la importacion agrega a reservas y cuentas por pagar."""
+    return codigo.split(' (RP:')[0]
+
+
 class FuenteFinanciacion(models.Model):
     """Fuentes de financiacion con presupuesto asignado"""
     codigo = models.CharField(max_length=50, verbose_name='Codigo', blank=True)
@@ -34,40 +43,37 @@ class FuenteFinanciacion(models.Model):
     def __str__(self):
         return self.nombre
 
-    def get_total_programado_ingresos(self):
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        VersionDatos.incrementar(self.vigencia)
+
+    def delete(self, *args, **kwargs):
+        resultado = super().delete(*args, **kwargs)
+        VersionDatos.incrementar(self.vigencia)
+        return resultado
+
+    def _total(self, modelo, tipo):
+        """Suma de los doce meses (en centavos, ver consultas.campo_total) de la fuente en un modulo y tipo."""
         from django.db.models import Sum
-        from django.db.models.functions import Coalesce
-        return PACProgramado.objects.filter(
-            vigencia=self.vigencia, tipo='INGRESO', fuente_financiacion=self.nombre
-        ).aggregate(t=Coalesce(Sum('total'), Decimal('0')))['t']
+        from .consultas import campo_total
+        return modelo.objects.filter(
+            vigencia=self.vigencia, tipo=tipo, fuente_financiacion=self.nombre
+        ).aggregate(t=Sum(campo_total()))['t'] or Decimal('0')
+
+    def get_total_programado_ingresos(self):
+        return self._total(PACProgramado, 'INGRESO')
 
     def get_total_programado_gastos(self):
-        from django.db.models import Sum
-        from django.db.models.functions import Coalesce
-        return PACProgramado.objects.filter(
-            vigencia=self.vigencia, tipo='GASTO', fuente_financiacion=self.nombre
-        ).aggregate(t=Coalesce(Sum('total'), Decimal('0')))['t']
+        return self._total(PACProgramado, 'GASTO')
 
     def get_total_compromisos(self):
-        from django.db.models import Sum
-        from django.db.models.functions import Coalesce
-        return PACEjecutadoCompromiso.objects.filter(
-            vigencia=self.vigencia, tipo='GASTO', fuente_financiacion=self.nombre
-        ).aggregate(t=Coalesce(Sum('total'), Decimal('0')))['t']
+        return self._total(PACEjecutadoCompromiso, 'GASTO')
 
     def get_total_pagos_gastos(self):
-        from django.db.models import Sum
-        from django.db.models.functions import Coalesce
-        return PACEjecutadoPago.objects.filter(
-            vigencia=self.vigencia, tipo='GASTO', fuente_financiacion=self.nombre
-        ).aggregate(t=Coalesce(Sum('total'), Decimal('0')))['t']
+        return self._total(PACEjecutadoPago, 'GASTO')
 
     def get_total_recaudo(self):
-        from django.db.models import Sum
-        from django.db.models.functions import Coalesce
-        return PACEjecutadoPago.objects.filter(
-            vigencia=self.vigencia, tipo='INGRESO', fuente_financiacion=self.nombre
-        ).aggregate(t=Coalesce(Sum('total'), Decimal('0')))['t']
+        return self._total(PACEjecutadoPago, 'INGRESO')
 
     def get_saldo_disponible(self):
         return self.presupuesto_asignado - self.get_total_compromisos()
@@ -84,6 +90,23 @@ class FuenteFinanciacion(models.Model):
         return 0
 
 
+class PACQuerySet(models.QuerySet):
+    """Envia las consultas de una vigencia archivada a su base de archivo (ver pac/archivado.py)."""
+
+    def filter(self, *args, **kwargs):
+        qs = super().filter(*args, **kwargs)
+        if self._db is None:
+            alias = archivado.alias_para_filtro(kwargs, args)
+            if alias:
+                qs = qs.using(alias)
+        return qs
+
+    def exclude(self, *args, **kwargs):
+        if self._db is None:
+            archivado.verificar_exclusion(kwargs, args)
+        return super().exclude(*args, **kwargs)
+
+
 class PACBase(models.Model):
     """Modelo base para todos los modulos PAC - replica la estructura del Excel real"""
     TIPO_CHOICES = [
@@ -115,6 +138,8 @@ class PACBase(models.Model):
     creditos = models.DecimalField(max_digits=20, decimal_places=2, default=0)
     contracreditos = models.DecimalField(max_digits=20, decimal_places=2, default=0)
     apropiacion_definitiva = models.DecimalField(max_digits=20, decimal_places=2, default=0, verbose_name='Aprop. Definitiva')
+    # Representacion en centavos enteros para agregaciones exactas (ver pac/centavos.py)
+    apropiacion_definitiva_centavos = CentavosField(default=0, editable=False)
 
     # Campos mensuales (columnas J-U del Excel)
     enero = models.DecimalField(max_digits=20, decimal_places=2, default=0)
@@ -130,6 +155,9 @@ class PACBase(models.Model):
     noviembre = models.DecimalField(max_digits=20, decimal_places=2, default=0)
     diciembre = models.DecimalField(max_digits=20, decimal_places=2, default=0)
     total = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    # Suma de los doce meses en centavos: la misma que la tabla larga PACValorMensual, aunque la columna
+    # TOTAL del Excel difiera de ella en centavos
+    total_centavos = CentavosField(default=0, editable=False)
 
     # Metadata
     es_subtotal = models.BooleanField(default=False)
@@ -137,6 +165,8 @@ class PACBase(models.Model):
     fecha_carga = models.DateTimeField(auto_now_add=True)
     usuario = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
 
+    objects = PACQuerySet.as_manager()
+
     class Meta:
         abstract = True
         ordering = ['fila_excel', 'tipo', 'codigo_rubro']
@@ -152,7 +182,8 @@ class PACBase(models.Model):
         ])
         return self.total
 
-    def save(self, *args, **kwargs):
+    def normalizar(self):
+        """Completa los campos derivados. Lo llama save(); bulk_create no lo hace, se debe llamar antes."""
         if not self.total:
             self.calcular_total()
         if not self.apropiacion_definitiva:
@@ -160,7 +191,18 @@ class PACBase(models.Model):
                 self.apropiacion_inicial + self.adiciones - self.reduccion
                 + self.creditos - self.contracreditos
             )
+        self.apropiacion_definitiva_centavos = self.apropiacion_definitiva
+        self.total_centavos = de_centavos(sum(a_centavos(v) for v in self.get_valores_mensuales()))
+
+    def save(self, *args, **kwargs):
+        self.normalizar()
         super().save(*args, **kwargs)
+        VersionDatos.incrementar(self.vigencia)
+
+    def delete(self, *args, **kwargs):
+        resultado = super().delete(*args, **kwargs)
+        VersionDatos.incrementar(self.vigencia)
+        return resultado
 
     def get_valores_mensuales(self):
         return [
@@ -172,6 +214,8 @@ class PACBase(models.Model):
 
 class AIMInicial(PACBase):
     """PAC 2026 AIM INICIAL - Apropiacion Inicial Modificada"""
+    MODULO = 'AIM_INICIAL'
+
     class Meta(PACBase.Meta):
         verbose_name = 'AIM Inicial'
         verbose_name_plural = 'AIM Iniciales'
@@ -179,6 +223,8 @@ class AIMInicial(PACBase):
 
 class PACProgramado(PACBase):
     """PAC Programado mensual - Hoja PROG PAC INGRESOS-GASTOS"""
+    MODULO = 'PROGRAMADO'
+
     class Meta(PACBase.Meta):
         verbose_name = 'PAC Programado'
         verbose_name_plural = 'PAC Programados'
@@ -186,6 +232,8 @@ class PACProgramado(PACBase):
 
 class PACEjecutadoCompromiso(PACBase):
     """PAC Ejecutado Compromisos - Hoja PAC EJECUTADO COMPROMISOS"""
+    MODULO = 'EJECUTADO_COMPROMISO'
+
     class Meta(PACBase.Meta):
         verbose_name = 'PAC Ejecutado Compromiso'
         verbose_name_plural = 'PAC Ejecutados Compromisos'
@@ -193,6 +241,8 @@ class PACEjecutadoCompromiso(PACBase):
 
 class PACEjecutadoPago(PACBase):
     """PAC Ejecutado Pagos - Hoja PAC EJECUTADO PAGOS"""
+    MODULO = 'EJECUTADO_PAGO'
+
     class Meta(PACBase.Meta):
         verbose_name = 'PAC Ejecutado Pago'
         verbose_name_plural = 'PAC Ejecutados Pagos'
@@ -213,6 +263,20 @@ class CargaArchivo(models.Model):
     registros_cargados = models.IntegerField(default=0)
     observaciones = models.TextField(blank=True)
 
+    # Instrumentacion de la importacion (ver utils.MedicionImportacion)
+    hoja = models.CharField(max_length=100, blank=True, verbose_name='Hoja leida')
+    tiempo_lectura_ms = models.FloatField(null=True, blank=True, verbose_name='Lectura del libro (ms)')
+    tiempo_clasificacion_ms = models.FloatField(null=True, blank=True, verbose_name='Clasificacion de filas (ms)')
+    tiempo_conversion_ms = models.FloatField(null=True, blank=True, verbose_name='Conversion numerica (ms)')
+    tiempo_eliminacion_ms = models.FloatField(null=True, blank=True, verbose_name='Eliminacion previa (ms)')
+    tiempo_insercion_ms = models.FloatField(null=True, blank=True, verbose_name='Insercion (ms)')
+    tiempo_total_ms = models.FloatField(null=True, blank=True, verbose_name='Tiempo total (ms)')
+    memoria_pico_kb = models.IntegerField(null=True, blank=True, verbose_name='Memoria pico (KB)')
+    filas_por_segundo = models.FloatField(null=True, blank=True)
+    filas_omitidas = models.JSONField(default=dict, blank=True, help_text='Filas omitidas por motivo')
+
+    ETAPAS = ['lectura', 'clasificacion', 'conversion', 'eliminacion', 'insercion']
+
     class Meta:
         verbose_name = 'Carga de Archivo'
         verbose_name_plural = 'Cargas de Archivos'
@@ -220,3 +284,336 @@ class CargaArchivo(models.Model):
 
     def __str__(self):
         return f"{self.get_tipo_display()} - {self.fecha_carga.strftime('%Y-%m-%d %H:%M')}"
+
+    def tiempos_etapas(self):
+        """[(etapa, ms)] de las etapas medidas; vacio en cargas anteriores a la instrumentacion."""
+        return [
+            (etapa, getattr(self, f'tiempo_{etapa}_ms')) for etapa in self.ETAPAS
+            if getattr(self, f'tiempo_{etapa}_ms') is not None
+        ]
+
+    @property
+    def total_omitidas(self):
+        return sum(self.filas_omitidas.values())
+
+
+class BloqueoImportacion(models.Model):
+    """Importacion en curso de un modulo y vigencia (ver pac/concurrencia.py)"""
+    modulo = models.CharField(max_length=30)
+    vigencia = models.IntegerField()
+    usuario = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    fecha = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Bloqueo de Importacion'
+        verbose_name_plural = 'Bloqueos de Importacion'
+        constraints = [
+            # Una sola carga por modulo y vigencia: la segunda solicitud falla al crear su bloqueo
+            models.UniqueConstraint(fields=['modulo', 'vigencia'], name='bloqueo_importacion_unico'),
+        ]
+
+    def __str__(self):
+        return f'{self.modulo} {self.vigencia} ({self.fecha:%Y-%m-%d %H:%M})'
+
+
+class PACValorMensual(models.Model):
+    """
+    Tabla de hechos en formato largo: un valor por registro PAC y mes.
+    Se mantiene sincronizada por la importacion; permite obtener series
+    mensuales, acumulados y rangos de meses con un solo GROUP BY mes.
+    Las columnas enero..diciembre de PACBase se conservan para paridad con el Excel.
+    """
+    MODULO_CHOICES = CargaArchivo.TIPO_CHOICES
+
+    modulo = models.CharField(max_length=30, choices=MODULO_CHOICES)
+    registro_id = models.BigIntegerField(help_text='ID del registro en la tabla del modulo')
+    vigencia = models.IntegerField()
+    tipo = models.CharField(max_length=10, choices=PACBase.TIPO_CHOICES)
+    categoria = models.CharField(max_length=30, choices=PACBase.CATEGORIA_CHOICES, blank=True, default='')
+    codigo_rubro = models.CharField(max_length=200)
+    fuente_financiacion = models.CharField(max_length=200, blank=True, default='')
+    es_subtotal = models.BooleanField(default=False)
+    mes = models.PositiveSmallIntegerField(help_text='1 = enero ... 12 = diciembre')
+    valor = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    valor_centavos = CentavosField(default=0)
+
+    objects = PACQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'Valor Mensual PAC'
+        verbose_name_plural = 'Valores Mensuales PAC'
+        indexes = [
+            models.Index(fields=['modulo', 'vigencia', 'tipo', 'mes']),
+            models.Index(fields=['modulo', 'registro_id']),
+        ]
+
+    def __str__(self):
+        return f"{self.modulo} {self.vigencia} - {self.codigo_rubro} - {MESES_DISPLAY[self.mes - 1]}"
+
+
+class TrabajoExportacion(models.Model):
+    """Exportacion pesada ejecutada en segundo plano por el comando procesar_exportaciones"""
+    TIPO_CHOICES = [
+        ('LIBRO_CONSOLIDADO', 'Libro Consolidado (xlsx)'),
+        ('DATOS', 'Datos por Rubro'),
+    ]
+    ESTADO_CHOICES = [
+        ('PENDIENTE', 'Pendiente'),
+        ('EN_PROCESO', 'En Proceso'),
+        ('TERMINADO', 'Terminado'),
+        ('ERROR', 'Error'),
+    ]
+    ESTADOS_ACTIVOS = ['PENDIENTE', 'EN_PROCESO']
+
+    tipo = models.CharField(max_length=30, choices=TIPO_CHOICES)
+    vigencia = models.IntegerField(default=2026)
+    modulo = models.CharField(max_length=30, blank=True, default='', help_text='Para DATOS: modulo o consolidado')
+    formato = models.CharField(max_length=10, default='xlsx')
+    clave = models.CharField(max_length=200, help_text='Exportacion y version de los datos; une solicitudes equivalentes')
+    estado = models.CharField(max_length=15, choices=ESTADO_CHOICES, default='PENDIENTE')
+    archivo = models.FileField(upload_to='trabajos_exportacion/', blank=True)
+    error = models.TextField(blank=True)
+    usuario = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    fecha_solicitud = models.DateTimeField(auto_now_add=True)
+    fecha_inicio = models.DateTimeField(null=True, blank=True)
+    latido = models.DateTimeField(null=True, blank=True, help_text='Ultima senal del worker que construye el archivo')
+    fecha_fin = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Trabajo de Exportacion'
+        verbose_name_plural = 'Trabajos de Exportacion'
+        ordering = ['-fecha_solicitud']
+        constraints = [
+            # Solo un trabajo activo por exportacion: las solicitudes concurrentes se unen a el
+            models.UniqueConstraint(
+                fields=['clave'], condition=models.Q(estado__in=['PENDIENTE', 'EN_PROCESO']),
+                name='trabajo_exportacion_activo_unico',
+            ),
+        ]
+        indexes = [models.Index(fields=['clave', 'estado'])]
+
+    def __str__(self):
+        return f"{self.get_tipo_display()} {self.vigencia} - {self.get_estado_display()}"
+
+    def nombre_descarga(self):
+        if self.tipo == 'LIBRO_CONSOLIDADO':
+            return f'pac_consolidado_{self.vigencia}.xlsx'
+        return f'pac_{self.modulo}_{self.vigencia}.{self.formato}'
+
+
+class PerfilRequest(models.Model):
+    """Perfil cProfile/tracemalloc de un request, solicitado por staff con ?perfilar=1"""
+    url = models.CharField(max_length=500)
+    metodo = models.CharField(max_length=10)
+    vista = models.CharField(max_length=200, blank=True)
+    usuario = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    fecha = models.DateTimeField(auto_now_add=True)
+    estado_http = models.PositiveSmallIntegerField(default=200)
+    duracion_ms = models.FloatField(verbose_name='Duracion (ms)')
+    consultas = models.IntegerField(default=0)
+    memoria_pico_kb = models.IntegerField(null=True, blank=True, verbose_name='Memoria pico (KB)')
+    archivo = models.FileField(upload_to='perfiles/', help_text='Estadisticas en formato pstats')
+    resumen = models.TextField(blank=True)
+
+    class Meta:
+        verbose_name = 'Perfil de Request'
+        verbose_name_plural = 'Perfiles de Requests'
+        ordering = ['-duracion_ms']
+
+    def __str__(self):
+        return f"{self.metodo} {self.url} - {self.duracion_ms:.0f} ms"
+
+
+class Alerta(models.Model):
+    """Desviacion detectada por el motor de alertas al importar (ver pac/alertas.py)"""
+    REGLA_CHOICES = [
+        ('EJECUCION_BAJA', 'Ejecucion baja'),
+        ('SOBRECOMPROMISO', 'Sobrecompromiso'),
+        ('SALDO_NEGATIVO', 'Saldo negativo'),
+        ('SALTO_MENSUAL', 'Salto mensual'),
+    ]
+    NIVEL_CHOICES = [
+        ('CRITICA', 'Critica'),
+        ('ADVERTENCIA', 'Advertencia'),
+    ]
+
+    vigencia = models.IntegerField()
+    regla = models.CharField(max_length=20, choices=REGLA_CHOICES)
+    nivel = models.CharField(max_length=12, choices=NIVEL_CHOICES)
+    modulo = models.CharField(max_length=30, choices=CargaArchivo.TIPO_CHOICES, blank=True, default='')
+    tipo = models.CharField(max_length=10, choices=PACBase.TIPO_CHOICES, blank=True, default='')
+    fuente_financiacion = models.CharField(max_length=200, blank=True, default='')
+    codigo_rubro = models.CharField(max_length=200, blank=True, default='', help_text='Vacio = alerta de la fuente')
+    mes = models.PositiveSmallIntegerField(null=True, blank=True, help_text='1 = enero ... 12 = diciembre')
+    valor = models.DecimalField(max_digits=20, decimal_places=2, default=0, help_text='Valor observado')
+    referencia = models.DecimalField(max_digits=20, decimal_places=2, default=0,
+                                     help_text='Valor contra el que se compara (programado, apropiacion, presupuesto)')
+    porcentaje = models.FloatField(null=True, blank=True)
+    mensaje = models.CharField(max_length=300)
+    fecha = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Alerta'
+        verbose_name_plural = 'Alertas'
+        ordering = ['-nivel', 'regla', 'fuente_financiacion', 'codigo_rubro']
+        indexes = [models.Index(fields=['vigencia', 'fuente_financiacion'])]
+
+    def __str__(self):
+        return f"{self.get_nivel_display()} {self.vigencia} - {self.mensaje}"
+
+
+
+class IndiceRubro(models.Model):
+    """
+    Documento de busqueda de un codigo de rubro de un modulo y vigencia (ver pac/busqueda.py).
+    Cada importacion mantiene las filas de su modulo; el indice de texto completo
+    (FTS5 en SQLite, tsvector en PostgreSQL) lo crea la migracion sobre la columna texto.
+    """
+    vigencia = models.IntegerField()
+    modulo = models.CharField(max_length=30, choices=CargaArchivo.TIPO_CHOICES)
+    codigo_rubro = models.CharField(max_length=200)
+    nombre_rubro = models.CharField(max_length=500)
+    tipo = models.CharField(max_length=10, choices=PACBase.TIPO_CHOICES)
+    categoria = models.CharField(max_length=30, choices=PACBase.CATEGORIA_CHOICES, blank=True, default='')
+    fuente_financiacion = models.CharField(max_length=200, blank=True, default='')
+    es_subtotal = models.BooleanField(default=False)
+    bpin = models.CharField(max_length=30, blank=True, default='', help_text='Propio o del proyecto que lo contiene')
+    numero_rp = models.CharField(max_length=30, blank=True, default='', verbose_name='Numero RP/CxP')
+    apropiacion = CentavosField(default=0, help_text='Apropiacion definitiva')
+    total = CentavosField(default=0, help_text='Suma de los doce meses')
+    texto = models.TextField(help_text='Codigo, nombre, BPIN y RP normalizados (minusculas, sin tildes ni signos)')
+
+    class Meta:
+        verbose_name = 'Indice de Rubro'
+        verbose_name_plural = 'Indice de Rubros'
+        ordering = ['vigencia', 'codigo_rubro', 'modulo']
+        constraints = [
+            models.UniqueConstraint(fields=['modulo', 'vigencia', 'codigo_rubro'], name='indice_rubro_unico'),
+        ]
+        indexes = [models.Index(fields=['vigencia', 'codigo_rubro'])]
+
+    def __str__(self):
+        return f"{self.modulo} {self.vigencia} - {self.codigo_rubro} - {self.nombre_rubro[:50]}"
+
+
+class ResumenRubro(models.Model):
+    """
+    Una fila por vigencia y rubro hoja (tipo, categoria, codigo completo con su RP y repeticion en la
+    hoja) con la apropiacion del AIM y los meses y totales de programado, compromisos y pagos (ver
+    pac/resumen.py). Cada importacion actualiza las columnas de su modulo.
+    """
+    vigencia = models.IntegerField()
+    tipo = models.CharField(max_length=10, choices=PACBase.TIPO_CHOICES)
+    categoria = models.CharField(max_length=30, choices=PACBase.CATEGORIA_CHOICES, blank=True, default='')
+    codigo_rubro = models.CharField(max_length=200, verbose_name='Codigo Rubro')
+    ocurrencia = models.PositiveIntegerField(default=0, help_text='Repeticion del codigo en la hoja (0 = primera)')
+    codigo_base = models.CharField(max_length=200, help_text='Codigo sin el sufijo (RP:...)')
+    nombre_rubro = models.CharField(max_length=500)
+    fuente_financiacion = models.CharField(max_length=200, blank=True, default='')
+    fila_excel = models.IntegerField(default=0)
+
+    # Modulos en los que aparece el rubro (una fila sin ninguno se elimina)
+    en_aim = models.BooleanField(default=False)
+    en_programado = models.BooleanField(default=False)
+    en_compromisos = models.BooleanField(default=False)
+    en_pagos = models.BooleanField(default=False)
+
+    apropiacion = CentavosField(default=0, help_text='Apropiacion definitiva del AIM')
+
+    # Programado: meses y total (columna TOTAL del Excel)
+    prog_enero = CentavosField(default=0)
+    prog_febrero = CentavosField(default=0)
+    prog_marzo = CentavosField(default=0)
+    prog_abril = CentavosField(default=0)
+    prog_mayo = CentavosField(default=0)
+    prog_junio = CentavosField(default=0)
+    prog_julio = CentavosField(default=0)
+    prog_agosto = CentavosField(default=0)
+    prog_septiembre = CentavosField(default=0)
+    prog_octubre = CentavosField(default=0)
+    prog_noviembre = CentavosField(default=0)
+    prog_diciembre = CentavosField(default=0)
+    prog_total = CentavosField(default=0)
+
+    # Compromisos: meses y total (columna TOTAL del Excel)
+    comp_enero = CentavosField(default=0)
+    comp_febrero = CentavosField(default=0)
+    comp_marzo = CentavosField(default=0)
+    comp_abril = CentavosField(default=0)
+    comp_mayo = CentavosField(default=0)
+    comp_junio = CentavosField(default=0)
+    comp_julio = CentavosField(default=0)
+    comp_agosto = CentavosField(default=0)
+    comp_septiembre = CentavosField(default=0)
+    comp_octubre = CentavosField(default=0)
+    comp_noviembre = CentavosField(default=0)
+    comp_diciembre = CentavosField(default=0)
+    comp_total = CentavosField(default=0)
+
+    # Pagos: meses y total (columna TOTAL del Excel)
+    pago_enero = CentavosField(default=0)
+    pago_febrero = CentavosField(default=0)
+    pago_marzo = CentavosField(default=0)
+    pago_abril = CentavosField(default=0)
+    pago_mayo = CentavosField(default=0)
+    pago_junio = CentavosField(default=0)
+    pago_julio = CentavosField(default=0)
+    pago_agosto = CentavosField(default=0)
+    pago_septiembre = CentavosField(default=0)
+    pago_octubre = CentavosField(default=0)
+    pago_noviembre = CentavosField(default=0)
+    pago_diciembre = CentavosField(default=0)
+    pago_total = CentavosField(default=0)
+
+    class Meta:
+        verbose_name = 'Resumen de Rubro'
+        verbose_name_plural = 'Resumen de Rubros'
+        ordering = ['vigencia', 'fila_excel', 'codigo_rubro']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['vigencia', 'tipo', 'categoria', 'codigo_rubro', 'ocurrencia'], name='resumen_rubro_unico',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['vigencia', 'fuente_financiacion']),
+            models.Index(fields=['vigencia', 'codigo_base']),
+        ]
+
+    def __str__(self):
+        return f"{self.vigencia} - {self.codigo_rubro} - {self.nombre_rubro[:50]}"
+
+    def meses(self, prefijo):
+        """Los doce valores mensuales de 'prog', 'comp' o 'pago'."""
+        return [getattr(self, f'{prefijo}_{mes}') for mes in MESES]
+
+
+class VersionDatos(models.Model):
+    """
+    Contador de escrituras de los datos de una vigencia (registros PAC y fuentes). Lo incrementan la
+    importacion, la eliminacion, la carga sintetica y el save()/delete() de cada registro; forma parte
+    de consultas.version_datos, la clave de las caches de exportaciones, comparaciones y proyecciones.
+    """
+    vigencia = models.IntegerField(unique=True)
+    version = models.BigIntegerField(default=0)
+    fecha = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Version de Datos'
+        verbose_name_plural = 'Versiones de Datos'
+        ordering = ['vigencia']
+
+    def __str__(self):
+        return f'{self.vigencia} v{self.version}'
+
+    @classmethod
+    def incrementar(cls, vigencia):
+        """Incrementa el contador de la vigencia (lo crea en la primera escritura)."""
+        ahora = timezone.now()
+        if cls.objects.filter(vigencia=vigencia).update(version=models.F('version') + 1, fecha=ahora):
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(vigencia=vigencia, version=1)
+        except IntegrityError:
+            # Otra escritura de la misma vigencia creo la fila primero
+            cls.objects.filter(vigencia=vigencia).update(version=models.F('version') + 1, fecha=ahora)
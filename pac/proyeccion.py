@@ -0,0 +1,189 @@
+"""
+Proyeccion de la posicion de caja.
+
+Combina, por rubro y fuente de financiacion, los meses ejecutados hasta un
+mes de corte (PAC Ejecutado Pagos: recaudo de los ingresos y pagos de los
+gastos) con los meses programados restantes, y calcula con NumPy sobre
+todos los rubros a la vez:
+
+- el saldo de caja proyectado al cierre de cada mes, por fuente y total;
+- el mes en que se agota la caja de cada fuente (primer saldo negativo);
+- un pronostico ajustado por la tasa de ejecucion de cada rubro hasta el
+  corte (ejecutado / programado), ademas del pronostico segun el plan.
+
+Los importes se manejan como int64 en centavos (ver pac/centavos.py) y se
+convierten a pesos solo al presentar. Las matrices se guardan en la cache
+'pac' con la version de los datos de la vigencia en la clave, de modo
+que se recalculan solo despues de una importacion. El saldo inicial entra como un
+ingreso mas (categoria SALDO_INICIAL); las reservas y cuentas por pagar
+cuentan como salidas de caja.
+"""
+
+import numpy as np
+from django.conf import settings
+from django.db.models import BigIntegerField, Sum
+from django.db.models.functions import Cast
+
+from .centavos import de_centavos
+from .consultas import cache_resultados, version_datos
+from .models import PACEjecutadoPago, PACProgramado, PACValorMensual, MESES
+
+
+# Tope de la tasa de ejecucion usada para proyectar: evita que un rubro con un programado minimo
+# hasta el corte multiplique su programado restante
+TASA_MAXIMA = 2.0
+
+
+def matrices_caja(vigencia):
+    """matriz_caja desde la cache 'pac' mientras no cambien los datos de la vigencia."""
+    clave = f'pac:proyeccion:{vigencia}:{version_datos(vigencia)}'
+    cache = cache_resultados()
+    datos = cache.get(clave)
+    if datos is None:
+        datos = matriz_caja(vigencia)
+        cache.set(clave, datos, getattr(settings, 'PAC_COMPARACION_CACHE_SEGUNDOS', 3600))
+    return datos
+
+
+def matriz_caja(vigencia):
+    """
+    Programado y ejecutado por (tipo, fuente, rubro) como matrices int64 (n, 12) en centavos, con una
+    sola consulta agrupada sobre la tabla larga. Retorna un dict con los arreglos 'tipo', 'fuente',
+    'codigo_rubro', 'programado' y 'ejecutado' alineados por fila.
+    """
+    qs = PACValorMensual.objects.filter(
+        vigencia=vigencia, es_subtotal=False, modulo__in=[PACProgramado.MODULO, PACEjecutadoPago.MODULO],
+    )
+    filas = list(
+        qs.values('modulo', 'tipo', 'fuente_financiacion', 'codigo_rubro', 'mes')
+        .annotate(c=Cast(Sum('valor_centavos'), BigIntegerField())).order_by()
+        .values_list('modulo', 'tipo', 'fuente_financiacion', 'codigo_rubro', 'mes', 'c')
+    )
+    n = len(filas)
+    # Indice de fila por llave con un dict: mucho mas rapido que np.unique sobre textos
+    indice = {}
+    fila = np.fromiter((indice.setdefault((t, f, r), len(indice)) for _, t, f, r, _, _ in filas), dtype=np.intp, count=n)
+    mes = np.fromiter((m - 1 for *_, m, _ in filas), dtype=np.intp, count=n)
+    valores = np.fromiter((c or 0 for *_, c in filas), dtype=np.int64, count=n)
+    es_programado = np.fromiter((m == PACProgramado.MODULO for m, *_ in filas), dtype=bool, count=n)
+
+    programado = np.zeros((len(indice), len(MESES)), dtype=np.int64)
+    ejecutado = np.zeros_like(programado)
+    # Cada (llave, mes) aparece una sola vez por modulo: asignacion directa sin acumular
+    programado[fila[es_programado], mes[es_programado]] = valores[es_programado]
+    ejecutado[fila[~es_programado], mes[~es_programado]] = valores[~es_programado]
+
+    llaves = list(indice)
+    return {
+        'tipo': np.array([t for t, _, _ in llaves], dtype=str),
+        'fuente': np.array([f for _, f, _ in llaves], dtype=str),
+        'codigo_rubro': np.array([r for _, _, r in llaves], dtype=str),
+        'programado': programado, 'ejecutado': ejecutado,
+    }
+
+
+def mes_corte_automatico(ejecutado):
+    """Numero de meses ejecutados: hasta el ultimo mes con algun recaudo o pago registrado."""
+    meses = np.flatnonzero(ejecutado.any(axis=0))
+    return int(meses[-1]) + 1 if len(meses) else 0
+
+
+def _tasas(programado, ejecutado, corte, grupos, n_grupos):
+    """Tasa de ejecucion hasta el corte por fila y por grupo (ejecutado / programado de los meses cerrados)."""
+    prog = programado[:, :corte].sum(axis=1)
+    ejec = ejecutado[:, :corte].sum(axis=1)
+    prog_grupo = np.zeros(n_grupos, dtype=np.int64)
+    ejec_grupo = np.zeros(n_grupos, dtype=np.int64)
+    np.add.at(prog_grupo, grupos, prog)
+    np.add.at(ejec_grupo, grupos, ejec)
+    tasa_grupo = np.divide(ejec_grupo, prog_grupo, out=np.ones(n_grupos), where=prog_grupo != 0)
+    # Sin programado hasta el corte el rubro toma la tasa de su grupo
+    tasa = np.divide(ejec, prog, out=tasa_grupo[grupos].astype(float), where=prog != 0)
+    return np.clip(tasa, 0, TASA_MAXIMA), tasa_grupo
+
+
+def _agotamiento(saldos):
+    """Mes (1-12) del primer saldo negativo de cada fila, o 0 si nunca se agota."""
+    negativos = saldos < 0
+    return np.where(negativos.any(axis=1), negativos.argmax(axis=1) + 1, 0)
+
+
+def proyectar(programado, ejecutado, es_ingreso, fuente, n_fuentes, corte):
+    """
+    Motor vectorizado. `programado` y `ejecutado` son int64 (n, 12) en centavos, `es_ingreso` bool (n,),
+    `fuente` el indice de fuente de cada fila (n,) y `corte` el numero de meses ejecutados.
+
+    Retorna un dict de arreglos por fuente: flujos y saldos mensuales segun el plan y ajustados por tasa
+    de ejecucion, mes de agotamiento, tasas de ejecucion de ingresos y gastos, y lo ejecutado hasta el corte.
+    """
+    # Grupos (fuente, tipo) para las tasas: 2*fuente + 1 son los ingresos
+    grupos = fuente * 2 + es_ingreso
+    tasa, tasa_grupo = _tasas(programado, ejecutado, corte, grupos, n_fuentes * 2)
+
+    plan = programado.copy()
+    plan[:, :corte] = ejecutado[:, :corte]
+    ajustado = plan.copy()
+    ajustado[:, corte:] = np.rint(programado[:, corte:] * tasa[:, None]).astype(np.int64)
+
+    signo = np.where(es_ingreso, 1, -1)[:, None]
+    flujo_plan = np.zeros((n_fuentes, len(MESES)), dtype=np.int64)
+    flujo_ajustado = np.zeros_like(flujo_plan)
+    np.add.at(flujo_plan, fuente, plan * signo)
+    np.add.at(flujo_ajustado, fuente, ajustado * signo)
+
+    ejecutado_corte = ejecutado[:, :corte].sum(axis=1)
+    ingresos_ejecutados = np.zeros(n_fuentes, dtype=np.int64)
+    gastos_ejecutados = np.zeros(n_fuentes, dtype=np.int64)
+    np.add.at(ingresos_ejecutados, fuente[es_ingreso], ejecutado_corte[es_ingreso])
+    np.add.at(gastos_ejecutados, fuente[~es_ingreso], ejecutado_corte[~es_ingreso])
+
+    saldo_plan = flujo_plan.cumsum(axis=1)
+    saldo_ajustado = flujo_ajustado.cumsum(axis=1)
+    return {
+        'flujo_plan': flujo_plan, 'flujo_ajustado': flujo_ajustado,
+        'saldo_plan': saldo_plan, 'saldo_ajustado': saldo_ajustado,
+        'agotamiento_plan': _agotamiento(saldo_plan), 'agotamiento_ajustado': _agotamiento(saldo_ajustado),
+        'tasa_ingresos': tasa_grupo[1::2], 'tasa_gastos': tasa_grupo[0::2],
+        'ingresos_ejecutados': ingresos_ejecutados, 'gastos_ejecutados': gastos_ejecutados,
+    }
+
+
+def _pesos(centavos):
+    return [de_centavos(c) for c in centavos.tolist()]
+
+
+def _resumen(resultado, i, nombre):
+    mes = lambda m: int(m) or None  # noqa: E731
+    return {
+        'fuente': nombre,
+        'ingresos_ejecutados': de_centavos(resultado['ingresos_ejecutados'][i]),
+        'gastos_ejecutados': de_centavos(resultado['gastos_ejecutados'][i]),
+        'tasa_ingresos': round(float(resultado['tasa_ingresos'][i]) * 100, 1),
+        'tasa_gastos': round(float(resultado['tasa_gastos'][i]) * 100, 1),
+        'saldo_plan': _pesos(resultado['saldo_plan'][i]),
+        'saldo_ajustado': _pesos(resultado['saldo_ajustado'][i]),
+        'mes_agotamiento_plan': mes(resultado['agotamiento_plan'][i]),
+        'mes_agotamiento_ajustado': mes(resultado['agotamiento_ajustado'][i]),
+    }
+
+
+def proyeccion_caja(vigencia, mes_corte=None):
+    """
+    Proyeccion de caja de la vigencia por fuente y total. `mes_corte` es el numero de meses ejecutados
+    (por defecto, hasta el ultimo mes con recaudo o pagos). Los importes se retornan en pesos (Decimal).
+    """
+    datos = matrices_caja(vigencia)
+    corte = mes_corte_automatico(datos['ejecutado']) if mes_corte is None else mes_corte
+    nombres, fuente = np.unique(datos['fuente'], return_inverse=True)
+    es_ingreso = datos['tipo'] == 'INGRESO'
+    resultado = proyectar(datos['programado'], datos['ejecutado'], es_ingreso, fuente, len(nombres), corte)
+    total = proyectar(datos['programado'], datos['ejecutado'], es_ingreso, np.zeros_like(fuente), 1, corte)
+
+    fuentes = [_resumen(resultado, i, nombre or '(sin fuente)') for i, nombre in enumerate(nombres.tolist())]
+    # Primero las fuentes que se agotan antes, luego las de menor saldo final ajustado
+    fuentes.sort(key=lambda f: (f['mes_agotamiento_ajustado'] or 13, f['saldo_ajustado'][-1] if f['saldo_ajustado'] else 0))
+    return {
+        'vigencia': vigencia, 'mes_corte': corte, 'rubros': len(datos['tipo']),
+        'total': _resumen(total, 0, 'Total') if len(nombres) else None,
+        'fuentes': fuentes,
+    }
@@ -0,0 +1,144 @@
+"""
+Tabla resumen por rubro.
+
+ResumenRubro tiene una fila por vigencia y rubro hoja: tipo, categoria,
+codigo completo (con el sufijo " (RP:...)" de reservas y cuentas por
+pagar, de modo que cada reserva conserva su fila) y ocurrencia, el numero
+de veces que el mismo codigo ya aparecio en la hoja. Las cuatro hojas
+traen los mismos codigos en el mismo orden, asi que la n-esima repeticion
+de un codigo en un modulo coincide con la n-esima de los demas. La
+columna codigo_base (models.codigo_base) agrupa las reservas de un rubro.
+Guarda la apropiacion del AIM y los doce meses y el total (la suma de los
+meses, PACBase.total_centavos) de programado, compromisos y pagos en centavos; seguimiento y el detalle de fuente leen
+una fila por rubro hoja en lugar de agrupar cuatro tablas.
+
+Cada importacion (utils.importar_excel_pac) reescribe solo las columnas de
+su modulo y solo en las filas que cambian; una fila que ya no aparece en
+ningun modulo se elimina. La migracion 0010 llena la tabla y el comando
+resumir_rubros la reconstruye (por ejemplo para vigencias archivadas).
+"""
+
+from collections import Counter
+
+from django.db import IntegrityError, OperationalError, transaction
+
+from .centavos import a_centavos, de_centavos
+from .consultas import matriz_mensual_centavos
+from .models import (
+    AIMInicial, PACEjecutadoCompromiso, PACEjecutadoPago, PACProgramado, ResumenRubro, MESES, codigo_base,
+)
+
+
+# Modulo: (bandera de presencia, prefijo de las columnas mensuales; None = solo apropiacion)
+COLUMNAS_MODULO = {
+    AIMInicial.MODULO: ('en_aim', None),
+    PACProgramado.MODULO: ('en_programado', 'prog'),
+    PACEjecutadoCompromiso.MODULO: ('en_compromisos', 'comp'),
+    PACEjecutadoPago.MODULO: ('en_pagos', 'pago'),
+}
+BANDERAS = [bandera for bandera, _ in COLUMNAS_MODULO.values()]
+INTENTOS = 3
+
+
+def columnas(modulo):
+    """Columnas de valores que escribe un modulo."""
+    prefijo = COLUMNAS_MODULO[modulo][1]
+    if prefijo is None:
+        return ['apropiacion']
+    return [f'{prefijo}_{mes}' for mes in MESES] + [f'{prefijo}_total']
+
+
+def agregar(modulo, registros):
+    """
+    {(tipo, categoria, codigo, ocurrencia): [valores en centavos de columnas(modulo)]} de los registros
+    hoja de una carga (en el orden de la hoja), mas {llave: (nombre, fuente, fila_excel)}.
+    """
+    prefijo = COLUMNAS_MODULO[modulo][1]
+    valores, descripciones, vistos = {}, {}, Counter()
+    for r in registros:
+        if r.es_subtotal:
+            continue
+        codigo = (r.tipo, r.categoria, r.codigo_rubro)
+        clave = codigo + (vistos[codigo],)
+        vistos[codigo] += 1
+        if prefijo is None:
+            valores[clave] = [a_centavos(r.apropiacion_definitiva)]
+        else:
+            valores[clave] = [a_centavos(v) for v in r.get_valores_mensuales()] + [a_centavos(r.total_centavos)]
+        descripciones[clave] = (r.nombre_rubro, r.fuente_financiacion, r.fila_excel)
+    return valores, descripciones
+
+
+def actualizar(vigencia, modelo_class, registros):
+    """
+    Lleva las columnas del modulo en el resumen de la vigencia a los registros de una carga (lista
+    vacia = modulo eliminado). Retorna las filas escritas o eliminadas. Dos cargas de modulos
+    distintos pueden coincidir: si la otra crea la misma fila primero, se relee y se reintenta.
+    """
+    modulo = modelo_class.MODULO
+    valores, descripciones = agregar(modulo, registros)
+    for intento in range(INTENTOS):
+        try:
+            with transaction.atomic():
+                return _escribir(vigencia, modulo, valores, descripciones)
+        except (IntegrityError, OperationalError):
+            if intento == INTENTOS - 1:
+                raise
+
+
+def _escribir(vigencia, modulo, valores, descripciones):
+    bandera = COLUMNAS_MODULO[modulo][0]
+    campos = columnas(modulo)
+    ceros = [de_centavos(0)] * len(campos)
+    nuevos = {clave: [de_centavos(v) for v in fila] for clave, fila in valores.items()}
+
+    existentes = ResumenRubro.objects.filter(vigencia=vigencia).only(
+        'tipo', 'categoria', 'codigo_rubro', 'ocurrencia', bandera, *campos,
+    )
+    cambiar, vistas = [], set()
+    for fila in existentes:
+        clave = (fila.tipo, fila.categoria, fila.codigo_rubro, fila.ocurrencia)
+        vistas.add(clave)
+        objetivo = nuevos.get(clave)
+        presente = objetivo is not None
+        objetivo = objetivo or ceros
+        if getattr(fila, bandera) != presente or any(getattr(fila, c) != v for c, v in zip(campos, objetivo)):
+            setattr(fila, bandera, presente)
+            for campo, valor in zip(campos, objetivo):
+                setattr(fila, campo, valor)
+            cambiar.append(fila)
+
+    crear = []
+    for clave in nuevos.keys() - vistas:
+        tipo, categoria, codigo, ocurrencia = clave
+        nombre, fuente, fila_excel = descripciones[clave]
+        crear.append(ResumenRubro(
+            vigencia=vigencia, tipo=tipo, categoria=categoria, codigo_rubro=codigo, ocurrencia=ocurrencia,
+            codigo_base=codigo_base(codigo), nombre_rubro=nombre, fuente_financiacion=fuente, fila_excel=fila_excel,
+            **{bandera: True}, **dict(zip(campos, nuevos[clave])),
+        ))
+
+    ResumenRubro.objects.bulk_update(cambiar, [bandera] + campos, batch_size=500)
+    ResumenRubro.objects.bulk_create(crear, batch_size=500)
+    vacias, _ = ResumenRubro.objects.filter(vigencia=vigencia, **{b: False for b in BANDERAS}).delete()
+    return len(cambiar) + len(crear) + vacias
+
+
+def resumir(vigencia):
+    """Reconstruye el resumen de la vigencia desde las tablas de los modulos. Retorna las filas escritas."""
+    escritas = 0
+    for modelo_class in (AIMInicial, PACProgramado, PACEjecutadoCompromiso, PACEjecutadoPago):
+        registros = modelo_class.objects.filter(vigencia=vigencia, es_subtotal=False).only(
+            'tipo', 'categoria', 'codigo_rubro', 'nombre_rubro', 'fuente_financiacion', 'fila_excel', 'es_subtotal',
+            'apropiacion_definitiva', 'total_centavos', *MESES,
+        )
+        registros = list(registros)
+        if COLUMNAS_MODULO[modelo_class.MODULO][1]:
+            # Los meses de la tabla larga conservan los centavos de la carga; las columnas Decimal se leen redondeadas
+            ids, matriz = matriz_mensual_centavos(modelo_class, vigencia, es_subtotal=False)
+            por_registro = dict(zip(ids.tolist(), matriz.tolist()))
+            for r in registros:
+                for mes, centavos in zip(MESES, por_registro.get(r.pk, [0] * len(MESES))):
+                    setattr(r, mes, de_centavos(centavos))
+        escritas += actualizar(vigencia, modelo_class, registros)
+    return escritas
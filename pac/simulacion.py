@@ -0,0 +1,222 @@
+"""
+Simulacion Monte Carlo del riesgo de liquidez.
+
+Para cada rubro la desviacion de la ejecucion es la razon ejecutado /
+programado de un mes (PAC Ejecutado Pagos contra PAC Programado). Se toman
+como referencias los meses ejecutados de las vigencias anteriores (mismo
+tipo, fuente y codigo de rubro) y los meses ya cerrados de la vigencia. Un
+rubro sin dato en una referencia toma la desviacion agregada de su tipo en
+ese mes, de modo que cada referencia es una columna completa.
+
+Cada escenario elige, para cada mes pendiente, una referencia al azar y
+aplica la desviacion de cada rubro en ella a su programado del mes. Asi se
+conserva la correlacion entre rubros observada en la historia. Como las
+referencias son columnas completas, el flujo de cada fuente por mes y
+referencia se calcula una sola vez con NumPy sobre todos los rubros; los
+escenarios se generan en bloques vectorizados repartidos en un pool de
+procesos (fork, como pac/libro_consolidado.py). El resultado es,
+por mes y por fuente, la probabilidad de saldo de caja negativo y las
+bandas de percentiles del saldo.
+
+El resultado se guarda en la cache 'pac' con la version de los datos
+de todas las vigencias usadas en la clave: se recalcula despues de una
+importacion.
+"""
+
+import multiprocessing
+import threading
+from hashlib import sha1
+
+import numpy as np
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+from . import proyeccion
+from .archivado import vigencias_archivadas
+from .centavos import de_centavos
+from .consultas import cache_resultados, versiones_datos
+from .libro_consolidado import procesos_disponibles
+from .models import PACEjecutadoPago, PACValorMensual, MESES
+
+
+PERCENTILES = [5, 25, 50, 75, 95]
+
+MAX_ESCENARIOS = 20000
+
+# Vigencias anteriores que se usan como historia
+MAX_VIGENCIAS_HISTORIA = 5
+
+# Escenarios por bloque: cada bloque es una tarea del pool con su propia semilla (el resultado no depende
+# del numero de procesos)
+TAMANO_BLOQUE = 500
+
+_estado = {}
+_candado = threading.Lock()
+
+
+def vigencias_historia(vigencia):
+    """Vigencias anteriores con pagos registrados, en la base principal o archivadas."""
+    principales = set(
+        PACValorMensual.objects.using(DEFAULT_DB_ALIAS).filter(modulo=PACEjecutadoPago.MODULO, vigencia__lt=vigencia)
+        .values_list('vigencia', flat=True).distinct().order_by()
+    )
+    archivadas = {v for v in vigencias_archivadas() if v < vigencia}
+    return sorted(principales | archivadas)[-MAX_VIGENCIAS_HISTORIA:]
+
+
+def simular(vigencia, escenarios=None, semilla=0, mes_corte=None):
+    """Simulacion de la vigencia desde la cache si los datos de la vigencia y su historia no cambiaron."""
+    escenarios = min(escenarios or getattr(settings, 'PAC_SIMULACION_ESCENARIOS', 5000), MAX_ESCENARIOS)
+    historia = vigencias_historia(vigencia)
+    versiones = versiones_datos([vigencia] + historia)
+    huella = sha1(repr(sorted(versiones.items())).encode()).hexdigest()[:12]
+    clave = f'pac:simulacion:{vigencia}:{escenarios}:{semilla}:{mes_corte}:{huella}'
+    cache = cache_resultados()
+    resultado = cache.get(clave)
+    if resultado is None:
+        resultado = _calcular(vigencia, historia, escenarios, semilla, mes_corte)
+        cache.set(clave, resultado, getattr(settings, 'PAC_COMPARACION_CACHE_SEGUNDOS', 3600))
+    return resultado
+
+
+def _razones(programado, ejecutado, meses):
+    """Razon ejecutado / programado de los `meses` (NaN donde no hay programado)."""
+    prog = programado[:, meses].astype(float)
+    ejec = ejecutado[:, meses].astype(float)
+    return np.divide(ejec, prog, out=np.full(prog.shape, np.nan), where=prog > 0)
+
+
+def _agregadas(programado, ejecutado, es_ingreso, meses):
+    """Razon agregada por tipo (fila 0 gastos, fila 1 ingresos) en cada mes; 1 donde no hay programado."""
+    agregadas = np.ones((2, len(meses)))
+    for fila, mascara in enumerate([~es_ingreso, es_ingreso]):
+        prog = programado[mascara][:, meses].sum(axis=0)
+        ejec = ejecutado[mascara][:, meses].sum(axis=0)
+        np.divide(ejec, prog, out=agregadas[fila], where=prog > 0)
+    return agregadas
+
+
+def desviaciones(datos, corte, historia):
+    """
+    Matriz (rubros, referencias) de desviaciones de los rubros de `datos` (ver proyeccion.matriz_caja):
+    una columna por mes cerrado de la vigencia y por mes ejecutado de cada vigencia de `historia`.
+    """
+    es_ingreso = datos['tipo'] == 'INGRESO'
+    meses = np.arange(corte)
+    columnas = [_razones(datos['programado'], datos['ejecutado'], meses)]
+    agregadas = [_agregadas(datos['programado'], datos['ejecutado'], es_ingreso, meses)]
+
+    fila = {llave: i for i, llave in enumerate(zip(datos['tipo'], datos['fuente'], datos['codigo_rubro']))}
+    for vigencia in historia:
+        anterior = proyeccion.matriz_caja(vigencia)
+        meses = np.arange(proyeccion.mes_corte_automatico(anterior['ejecutado']))
+        razones = _razones(anterior['programado'], anterior['ejecutado'], meses)
+        alineadas = np.full((len(fila), len(meses)), np.nan)
+        llaves = zip(anterior['tipo'], anterior['fuente'], anterior['codigo_rubro'])
+        origen, destino = [], []
+        for i, llave in enumerate(llaves):
+            if llave in fila:
+                origen.append(i)
+                destino.append(fila[llave])
+        alineadas[np.array(destino, dtype=np.intp)] = razones[np.array(origen, dtype=np.intp)]
+        columnas.append(alineadas)
+        agregadas.append(_agregadas(anterior['programado'], anterior['ejecutado'], anterior['tipo'] == 'INGRESO', meses))
+
+    razones = np.concatenate(columnas, axis=1)
+    respaldo = np.concatenate(agregadas, axis=1)[es_ingreso.astype(int)]
+    return np.clip(np.where(np.isnan(razones), respaldo, razones), 0, proyeccion.TASA_MAXIMA)
+
+
+def _simular_bloque(semilla, escenarios):
+    """Saldos (escenarios, 12, fuentes) de un bloque; usa el estado compartido por fork."""
+    e = _estado
+    rng = np.random.default_rng(semilla)
+    pendientes = range(e['corte'], len(MESES))
+    referencias = rng.integers(0, e['flujos'].shape[2], size=(escenarios, len(pendientes)))
+    flujo = np.empty((escenarios, len(MESES), e['flujos'].shape[1]))
+    flujo[:, :e['corte']] = e['flujo_ejecutado'][:e['corte']]
+    for j, mes in enumerate(pendientes):
+        flujo[:, mes] = e['flujos'][mes][:, referencias[:, j]].T
+    return flujo.cumsum(axis=1)
+
+
+def _calcular(vigencia, historia, escenarios, semilla, mes_corte):
+    # La simulacion ya se cachea con la version de los datos: las matrices se leen sin pasar por la cache
+    datos = proyeccion.matriz_caja(vigencia)
+    corte = proyeccion.mes_corte_automatico(datos['ejecutado']) if mes_corte is None else mes_corte
+    resultado = {
+        'vigencia': vigencia, 'mes_corte': corte, 'escenarios': escenarios, 'semilla': semilla,
+        'vigencias_historia': historia, 'referencias': 0, 'rubros': len(datos['tipo']),
+        'percentiles': PERCENTILES, 'total': None, 'fuentes': [],
+    }
+    if not len(datos['tipo']):
+        return resultado
+
+    desviacion = desviaciones(datos, corte, historia)
+    if not desviacion.shape[1]:
+        # Sin meses ejecutados en ninguna vigencia: el unico escenario posible es el plan
+        desviacion = np.ones((len(datos['tipo']), 1))
+    resultado['referencias'] = int(desviacion.shape[1])
+
+    signo = np.where(datos['tipo'] == 'INGRESO', 1, -1)
+    nombres, fuente = np.unique(datos['fuente'], return_inverse=True)
+    orden = np.argsort(fuente, kind='stable')
+    inicios = np.flatnonzero(np.r_[True, np.diff(fuente[orden]) != 0])
+    flujo_ejecutado = np.zeros((len(MESES), len(nombres)))
+    np.add.at(flujo_ejecutado.T, fuente, datos['ejecutado'] * signo[:, None])
+
+    semillas = np.random.SeedSequence(semilla).spawn(-(-escenarios // TAMANO_BLOQUE))
+    bloques = [(s, min(TAMANO_BLOQUE, escenarios - i * TAMANO_BLOQUE)) for i, s in enumerate(semillas)]
+    procesos = min(getattr(settings, 'PAC_SIMULACION_PROCESOS', None) or procesos_disponibles(), len(bloques))
+    # Flujo de cada fuente en cada mes pendiente bajo cada referencia (12, fuentes, referencias): los escenarios
+    # solo eligen columnas de esta matriz, sin volver a recorrer los rubros
+    programado = (datos['programado'] * signo[:, None])[orden]
+    desviacion = desviacion[orden]
+    flujos = np.zeros((len(MESES), len(nombres), desviacion.shape[1]))
+    for mes in range(corte, len(MESES)):
+        # Filas ordenadas por fuente: reduceat suma cada fuente para todas las referencias a la vez
+        flujos[mes] = np.add.reduceat(desviacion * programado[:, mes, None], inicios, axis=0)
+
+    with _candado:
+        _estado.update(corte=corte, flujos=flujos, flujo_ejecutado=flujo_ejecutado)
+        try:
+            if procesos > 1 and 'fork' in multiprocessing.get_all_start_methods():
+                with multiprocessing.get_context('fork').Pool(procesos) as pool:
+                    saldos = pool.starmap(_simular_bloque, bloques)
+            else:
+                saldos = [_simular_bloque(*b) for b in bloques]
+        finally:
+            _estado.clear()
+    saldos = np.concatenate(saldos)
+
+    prob, prob_vigencia, bandas = _estadisticas(saldos)
+    fuentes = [
+        _resumen(prob[:, i], prob_vigencia[i], bandas[:, :, i], nombre or '(sin fuente)')
+        for i, nombre in enumerate(nombres.tolist())
+    ]
+    # Primero las fuentes con mayor probabilidad de deficit en algun mes
+    fuentes.sort(key=lambda f: -f['prob_deficit_vigencia'])
+    resultado.update(total=_resumen(*_estadisticas(saldos.sum(axis=2)), 'Total'), fuentes=fuentes)
+    return resultado
+
+
+def _estadisticas(saldos):
+    """
+    De saldos (escenarios, 12, ...) en centavos: probabilidad de deficit por mes, probabilidad de deficit en
+    algun mes de la vigencia y bandas de percentiles (percentiles, 12, ...), todo en una pasada por arreglo.
+    """
+    negativos = saldos < 0
+    bandas = np.rint(np.percentile(saldos, PERCENTILES, axis=0)).astype(np.int64)
+    return negativos.mean(axis=0), negativos.any(axis=1).mean(axis=0), bandas
+
+
+def _resumen(prob, prob_vigencia, bandas, nombre):
+    return {
+        'fuente': nombre,
+        'prob_deficit': [round(p * 100, 1) for p in prob.tolist()],
+        'prob_deficit_vigencia': round(float(prob_vigencia) * 100, 1),
+        'bandas': [
+            {'percentil': p, 'saldo': [de_centavos(v) for v in banda.tolist()]}
+            for p, banda in zip(PERCENTILES, bandas)
+        ],
+    }
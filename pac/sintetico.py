@@ -0,0 +1,362 @@
+"""
+Generador de datos PAC sinteticos para pruebas de rendimiento.
+
+Dos niveles:
+  - registros_sinteticos / poblar: instancias de los modelos PAC insertadas
+    directamente con bulk_create (sin pasar por la importacion). Las claves
+    de rubro dependen solo del indice del registro, de modo que poblar los
+    cuatro modulos con el mismo `n` produce rubros que se cruzan entre
+    modulos igual que en los archivos reales.
+  - libro_pac: libros Excel con el formato de la entidad (secciones de
+    ingresos, funcionamiento, deuda, inversion por sector y BPIN, reservas
+    presupuestales y cuentas por pagar, con sus subtotales), listos para
+    importar_excel_pac. El contenido depende solo de la semilla y la vigencia.
+"""
+
+import random
+from decimal import Decimal
+
+from .models import FuenteFinanciacion, VersionDatos, MESES
+from .xlsx_stream import LibroStream
+
+
+CATEGORIAS_INGRESO = ['INGRESO_CORRIENTE', 'INGRESO_CAPITAL']
+CATEGORIAS_GASTO = ['FUNCIONAMIENTO', 'INVERSION', 'DEUDA']
+NUM_FUENTES = 40
+
+
+def registros_sinteticos(modelo, vigencia, n, semilla=0):
+    """Genera `n` instancias (sin guardar) del modelo PAC indicado."""
+    rnd = random.Random(f'{semilla}-{modelo.MODULO}')
+    for i in range(n):
+        tipo = 'INGRESO' if i % 5 == 0 else 'GASTO'
+        categorias = CATEGORIAS_INGRESO if tipo == 'INGRESO' else CATEGORIAS_GASTO
+        fuente = f'{i % NUM_FUENTES + 1:02d}'
+        mensuales = [Decimal(rnd.randint(0, 10 ** 11)).scaleb(-2) for _ in MESES]
+        total = sum(mensuales)
+        yield modelo(
+            vigencia=vigencia, tipo=tipo, categoria=categorias[i % len(categorias)],
+            codigo_rubro=f'SINT - {tipo[0]}.{i:07d} - {fuente}',
+            nombre_rubro=f'Rubro sintetico {i}',
+            fuente_financiacion=fuente,
+            apropiacion_inicial=total, apropiacion_definitiva=total,
+            apropiacion_definitiva_centavos=total,
+            total=total, total_centavos=total, fila_excel=i + 1,
+            **dict(zip(MESES, mensuales)),
+        )
+
+
+def poblar(modelo, vigencia, n, semilla=0, lote=5000):
+    """Inserta `n` registros sinteticos con bulk_create. Retorna el numero de registros creados."""
+    pendientes = []
+    creados = 0
+    for registro in registros_sinteticos(modelo, vigencia, n, semilla):
+        pendientes.append(registro)
+        if len(pendientes) >= lote:
+            modelo.objects.bulk_create(pendientes)
+            creados += len(pendientes)
+            pendientes = []
+    if pendientes:
+        modelo.objects.bulk_create(pendientes)
+        creados += len(pendientes)
+    VersionDatos.incrementar(vigencia)
+    return creados
+
+
+# ============================================================
+# LIBROS EXCEL CON EL FORMATO DE LA ENTIDAD
+# ============================================================
+HOJAS_LIBRO = [
+    ('PROG PAC INGRESOS-GASTOS', 'PROGRAMACION PLAN ANUAL DE CAJA', 'FFC107'),
+    ('PAC EJECUTADO COMPROMISOS', 'EJECUCION (COMPROMISOS) PLAN ANUAL DE CAJA', '2196F3'),
+    ('PAC EJECUTADO PAGOS', 'EJECUCION (PAGOS) PLAN ANUAL DE CAJA', '9C27B0'),
+]
+
+FUENTES_BASE = ['20', '03', '05', '04', '23', '08', '312', '316', '23F']
+
+GRUPOS_FUNCIONAMIENTO = [
+    ('2.1.1.01.01', 'FACTORES CONSTITUTIVOS DE SALARIO', 'Sueldo basico'),
+    ('2.1.1.01.02', 'CONTRIBUCIONES INHERENTES A LA NOMINA', 'Aportes a la seguridad social'),
+    ('2.1.1.01.03', 'REMUNERACIONES NO CONSTITUTIVAS DE FACTOR SALARIAL', 'Vacaciones'),
+    ('2.1.2.01', 'Adquisicion de activos no financieros', 'Maquinaria de informatica y sus partes'),
+    ('2.1.2.02.02', 'Adquisicion de servicios', 'Servicios prestados a las empresas y servicios de produccion'),
+    ('2.1.3', 'TRANSFERENCIAS CORRIENTES', 'Sentencias'),
+    ('2.1.8', 'Gastos por tributos, multas, sanciones e intereses de mora', 'Tasas y derechos administrativos'),
+]
+
+# (codigo de sector, nombre, programa, subprograma)
+SECTORES = [
+    ('21', 'MINAS Y ENERGIA', '2102', '1900'),
+    ('22', 'EDUCACION', '2201', '0700'),
+    ('24', 'TRANSPORTE', '2402', '0600'),
+    ('41', 'INCLUSION SOCIAL Y RECONCILIACION', '4104', '1500'),
+    ('45', 'GOBIERNO TERRITORIAL', '4599', '1000'),
+    ('32', 'AMBIENTE Y DESARROLLO SOSTENIBLE', '3205', '0900'),
+    ('19', 'SALUD Y PROTECCION SOCIAL', '1903', '0300'),
+    ('43', 'DEPORTE Y RECREACION', '4301', '1600'),
+]
+
+PRODUCTOS_INVERSION = [
+    ('2.3.2.02.02.005', 'Construccion y Servicios de la construccion'),
+    ('2.3.2.02.02.008', 'Servicios prestados a las empresas y servicios de produccion'),
+    ('2.3.2.02.02.009', 'Servicios para la comunidad, sociales y personales'),
+]
+
+OBRAS_BPIN = [
+    'CONSTRUCCION DE AULAS EN LA INSTITUCION EDUCATIVA', 'MEJORAMIENTO DE LA VIA TERCIARIA',
+    'AMPLIACION DE COBERTURA DEL SISTEMA DE INTERCONEXION ELECTRICA', 'CONSTRUCCION DE CENTROS VIDA',
+    'FORTALECIMIENTO A LA GESTION PUBLICA TERRITORIAL', 'REHABILITACION DE LA RED VIAL SECUNDARIA',
+]
+MUNICIPIOS = ['VILLAVICENCIO', 'GRANADA', 'PUERTO GAITAN', 'LEJANIAS', 'URIBE', 'SAN JUANITO', 'ACACIAS', 'MESETAS']
+
+
+def fuentes_financiacion(n):
+    """Codigos de fuente: los de la entidad y, si se piden mas, codigos numericos adicionales."""
+    return (FUENTES_BASE + [str(100 + i) for i in range(max(0, n - len(FUENTES_BASE)))])[:n]
+
+
+def crear_fuentes(vigencia, n=len(FUENTES_BASE)):
+    """
+    Registra las fuentes de financiacion sinteticas. El nombre es el codigo de
+    fuente, que es lo que FuenteFinanciacion cruza con fuente_financiacion de
+    los rubros; como el nombre es unico, se reutilizan las fuentes existentes.
+    """
+    return [
+        FuenteFinanciacion.objects.get_or_create(
+            nombre=codigo, defaults={'codigo': codigo, 'vigencia': vigencia, 'presupuesto_asignado': Decimal(10 ** 10)},
+        )[0]
+        for codigo in fuentes_financiacion(n)
+    ]
+
+
+def _mensuales(rnd, total_centavos):
+    """Reparte un total (centavos) en 12 meses; el ultimo mes absorbe el redondeo."""
+    pesos = [rnd.random() for _ in MESES]
+    suma = sum(pesos)
+    meses = [int(total_centavos * p / suma) for p in pesos[:-1]]
+    return meses + [total_centavos - sum(meses)]
+
+
+def _hoja(a, codigo, nombre, rnd, minimo=10 ** 8, maximo=10 ** 12):
+    """Item de detalle: (col A, codigo, nombre, centavos mensuales programados)."""
+    return {'a': a, 'codigo': codigo, 'nombre': nombre, 'meses': _mensuales(rnd, rnd.randint(minimo, maximo))}
+
+
+def _grupo(a, codigo, nombre, hijos):
+    """Fila de subtotal: sus valores son la suma de los items debajo de ella."""
+    return {'a': a, 'codigo': codigo, 'nombre': nombre, 'hijos': hijos}
+
+
+def estructura_pac(vigencia, semilla=0, rubros=40, items_por_grupo=8, sectores=5, bpin_por_sector=3,
+                   items_por_bpin=2, reservas=40, cuentas_por_pagar=15, fuentes=9):
+    """
+    Arbol del presupuesto de ingresos y gastos de una vigencia, en el orden
+    de las filas del Excel. Retorna (ingresos, gastos), listas de nodos.
+
+    rubros: items de funcionamiento, en grupos de `items_por_grupo`.
+    sectores, bpin_por_sector, items_por_bpin: forma de la seccion de inversion.
+    reservas, cuentas_por_pagar: items de RP y CxP (sobre rubros existentes).
+    fuentes: numero de fuentes de financiacion distintas.
+    Los ingresos tienen una transferencia por fuente igual al gasto programado con ella.
+    """
+    rnd = random.Random(f'pac-{semilla}-{vigencia}')
+    codigos_fuente = fuentes_financiacion(fuentes)
+
+    def fuente():
+        return codigos_fuente[rnd.randrange(len(codigos_fuente))]
+
+    # Funcionamiento: grupos de `items_por_grupo` rubros cada uno
+    grupos = []
+    for g in range(0, rubros, items_por_grupo):
+        base, nombre_grupo, nombre_item = GRUPOS_FUNCIONAMIENTO[(g // items_por_grupo) % len(GRUPOS_FUNCIONAMIENTO)]
+        codigo_grupo = f'1003 - {base}' if g < items_por_grupo * len(GRUPOS_FUNCIONAMIENTO) else \
+            f'1003 - {base}.{g // items_por_grupo:03d}'
+        hijos = [
+            _hoja(None, f'{codigo_grupo}.{i + 1:03d} - {fuente()}', nombre_item, rnd)
+            for i in range(min(items_por_grupo, rubros - g))
+        ]
+        grupos.append(_grupo(None, codigo_grupo, nombre_grupo, hijos))
+    funcionamiento = _grupo(None, '1003 - 2.1', 'Funcionamiento', grupos)
+
+    deuda = _grupo(None, None, 'Servicio a la deuda', [
+        _grupo(None, None, ' Amortizacion', []), _grupo(None, None, ' Intereses y otros', []),
+    ])
+
+    # Inversion: sector > proyecto BPIN > producto por fuente
+    nodos_sector = []
+    for s in range(sectores):
+        codigo_sector, nombre_sector, programa, subprograma = SECTORES[s % len(SECTORES)]
+        if s >= len(SECTORES):
+            codigo_sector = f'{codigo_sector}{s // len(SECTORES)}'
+        proyectos = []
+        for b in range(bpin_por_sector):
+            codigo_bpin = f'1003 - 2.3.{codigo_sector}.{programa}.{subprograma}.{b + 1:03d}'
+            obra = f'{OBRAS_BPIN[rnd.randrange(len(OBRAS_BPIN))]} EN EL MUNICIPIO DE {MUNICIPIOS[rnd.randrange(len(MUNICIPIOS))]}'
+            productos = []
+            for p in range(items_por_bpin):
+                codigo_producto, nombre_producto = PRODUCTOS_INVERSION[p % len(PRODUCTOS_INVERSION)]
+                productos.append(_hoja(
+                    None, f'{codigo_bpin}.{codigo_producto} - {fuente()}', nombre_producto, rnd, maximo=5 * 10 ** 12,
+                ))
+            proyectos.append(_grupo(None, codigo_bpin, f'BPIN {vigencia - 1}{rnd.randrange(10 ** 9):010d} {obra}, META', productos))
+        nodos_sector.append(_grupo(None, f'1003 - 2.3.{codigo_sector}', f'SECTOR: {nombre_sector}', proyectos))
+    inversion = _grupo(None, '1003 - 2.3', 'Inversion', nodos_sector)
+    items_funcionamiento = list(_items([funcionamiento]))
+    items_inversion = list(_items([inversion]))
+
+    def rezago(n, numerar):
+        """
+        Items de reservas o cuentas por pagar sobre rubros ya existentes: la
+        cuarta parte de funcionamiento y el resto de inversion.
+        """
+        items_func, items_inv = [], []
+        for i in range(n):
+            es_func = i < n // 4
+            origenes = (items_funcionamiento if es_func else items_inversion) or items_funcionamiento or items_inversion
+            if not origenes:
+                break
+            origen = origenes[rnd.randrange(len(origenes))]
+            (items_func if es_func else items_inv).append(
+                _hoja(numerar(i), origen['codigo'], origen['nombre'], rnd, maximo=10 ** 11)
+            )
+        return items_func, items_inv
+
+    rp_func, rp_inv = rezago(reservas, lambda i: 900 + i if i < reservas // 4 else i + 1)
+    reservas_nodo = _grupo(None, '2', 'RESERVAS PRESUPUESTALES', [
+        _grupo('RP', None, ' Funcionamiento', rp_func), _grupo(None, None, ' Inversion', rp_inv),
+    ])
+    cxp_func, cxp_inv = rezago(
+        cuentas_por_pagar, lambda i: f'{3000 + i} - {vigencia - 1} RP {700 + i}/{vigencia - 1}'
+    )
+    cxp_nodo = _grupo(None, '3', 'CUENTAS POR PAGAR', [
+        _grupo(None, None, ' Funcionamiento', cxp_func), _grupo(None, None, ' Inversion', cxp_inv),
+    ])
+    gastos = [funcionamiento, deuda, inversion, reservas_nodo, cxp_nodo]
+
+    # Ingresos: transferencias por fuente que financian el gasto programado de esa fuente
+    por_fuente = {}
+    for nodo in _items(gastos):
+        f = nodo['codigo'].rsplit(' - ', 1)[-1]
+        por_fuente[f] = [a + b for a, b in zip(por_fuente.get(f, [0] * 12), nodo['meses'])]
+    transferencias = [
+        {'a': None, 'codigo': f'1003 - 1.2.08.06.002.01 - {f}', 'nombre': 'Transferencias para Inversion', 'meses': meses}
+        for f, meses in sorted(por_fuente.items())
+    ]
+    bancos = _hoja(None, None, ' Bancos', rnd, maximo=10 ** 13)
+    ingresos = [
+        _grupo(None, 1, 'Saldo Inicial', [_grupo(None, None, ' Caja', []), bancos, _grupo(None, None, 'Otros', [])]),
+        _grupo(None, 2, 'Ingresos Corrientes', [
+            _grupo(None, None, ' Tributarios', [
+                _grupo(None, '1003 - 0101', 'Entidades Departamentales', [
+                    _grupo(None, '1003 - 01010101', 'Departamento del Meta', transferencias),
+                ]),
+            ]),
+            _grupo(None, None, ' No Tributarios', []),
+        ]),
+        _grupo(None, 3, 'Ingresos Capital', [
+            _grupo(None, None, ' Superavit', []), _grupo(None, None, ' Rendimientos Fcros', []),
+            _grupo(None, None, ' Otros', []),
+        ]),
+    ]
+    _ejecucion(rnd, ingresos + gastos)
+    return ingresos, gastos
+
+
+def _items(nodos):
+    for nodo in nodos:
+        if 'hijos' in nodo:
+            yield from _items(nodo['hijos'])
+        else:
+            yield nodo
+
+
+def _ejecucion(rnd, nodos):
+    """Asigna a cada item la proporcion comprometida y pagada de lo programado."""
+    for nodo in _items(nodos):
+        comprometido = rnd.uniform(0.4, 1.0)
+        nodo['factores'] = (1.0, comprometido, comprometido * rnd.uniform(0.5, 1.0))
+
+
+def _filas_nodos(nodos, indice_hoja):
+    """
+    Filas (col A, codigo, nombre, apropiacion, meses) de un arbol con su
+    profundidad y si son subtotal; los grupos suman sus items.
+    """
+    for nodo in nodos:
+        if 'hijos' in nodo:
+            filas_hijos = list(_filas_nodos(nodo['hijos'], indice_hoja))
+            directos = [f for f, profundidad, _ in filas_hijos if profundidad == 0]
+            apropiacion = sum(f[3] for f in directos)
+            meses = [sum(f[4][m] for f in directos) for m in range(12)]
+            yield (nodo['a'], nodo['codigo'], nodo['nombre'], apropiacion, meses), 0, True
+            for fila, profundidad, es_grupo in filas_hijos:
+                yield fila, profundidad + 1, es_grupo
+        else:
+            factor = nodo['factores'][indice_hoja]
+            meses = [int(v * factor) for v in nodo['meses']]
+            yield (nodo['a'], nodo['codigo'], nodo['nombre'], sum(nodo['meses']), meses), 0, False
+
+
+def _centavos(valor):
+    return Decimal(valor).scaleb(-2)
+
+
+def _valores_fila(a, codigo, nombre, apropiacion, meses):
+    """Columnas A a V de una fila del Excel."""
+    return [
+        a, codigo, nombre, _centavos(apropiacion), 0, 0, 0, 0, _centavos(apropiacion),
+        *(_centavos(v) for v in meses), _centavos(sum(meses)),
+    ]
+
+
+def _filas_hoja(ingresos, gastos, indice_hoja):
+    """Filas de una hoja desde la fila 5: ingresos, total A, gastos, total B, saldo y firmas."""
+    total_ingresos = [0, [0] * 12]
+    for fila, profundidad, es_grupo in _filas_nodos(ingresos, indice_hoja):
+        if profundidad == 0:
+            total_ingresos[0] += fila[3]
+            total_ingresos[1] = [a + b for a, b in zip(total_ingresos[1], fila[4])]
+        yield _valores_fila(*fila), 'subtotal' if es_grupo else 'numero'
+    yield _valores_fila(None, 'A', 'Total Ingresos (1+2+3)', *total_ingresos), 'seccion'
+
+    yield [None, None, 'GASTOS'], 'negrita'
+    total_gastos = [0, [0] * 12]
+    for fila, profundidad, es_grupo in _filas_nodos(gastos, indice_hoja):
+        if profundidad == 0:
+            total_gastos[0] += fila[3]
+            total_gastos[1] = [a + b for a, b in zip(total_gastos[1], fila[4])]
+        yield _valores_fila(*fila), 'subtotal' if es_grupo else 'numero'
+    yield _valores_fila(None, 'B', 'Total Gastos (1 + 2 + 3 + 4 +5)', *total_gastos), 'seccion'
+    yield _valores_fila(
+        None, None, 'Saldo Disponible (A - B)', total_ingresos[0] - total_gastos[0],
+        [a - b for a, b in zip(total_ingresos[1], total_gastos[1])],
+    ), 'seccion'
+
+    for _ in range(5):
+        yield [], None
+    yield [None, None, 'NOMBRE DEL FIRMANTE'], None
+    yield [None, None, 'SUBGERENTE GENERAL DE GESTION CORPORATIVA'], None
+
+
+def libro_pac(vigencia, semilla=0, **configuracion):
+    """
+    LibroStream con las tres hojas del PAC de la entidad (programado,
+    compromisos y pagos) para una vigencia. `configuracion` se pasa a
+    estructura_pac (rubros, sectores, bpin_por_sector, reservas, ...).
+    """
+    ingresos, gastos = estructura_pac(vigencia, semilla, **configuracion)
+    anchos = {1: 8, 2: 40, 3: 45}
+    anchos.update({col: 16 for col in range(4, 23)})
+    encabezados = [
+        'INGRESOS', 'Apro Inicial', 'Adiciones', 'Reduccion', 'Creditos', 'Contracred', 'Apro Definitiva',
+        *[m.capitalize() for m in MESES], 'Total',
+    ]
+    libro = LibroStream()
+    for indice, (titulo_hoja, titulo, color) in enumerate(HOJAS_LIBRO):
+        hoja = libro.hoja(f'{titulo_hoja} {vigencia}' if indice == 0 else titulo_hoja,
+                          anchos=anchos, combinadas=['C1:I1', 'C2:I2'])
+        hoja.fila([f'{titulo} {vigencia}'], estilo='titulo', num_fila=1, columna_inicial=3)
+        hoja.fila(['NOMBRE ENTIDAD: ENTIDAD SINTETICA'], estilo='subtitulo', num_fila=2, columna_inicial=3)
+        hoja.fila(encabezados, estilo=f'encabezado_{color}', num_fila=4, columna_inicial=3)
+        hoja.filas(_filas_hoja(ingresos, gastos, indice))
+    return libro
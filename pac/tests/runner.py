@@ -0,0 +1,34 @@
+"""
+Ejecutor de las pruebas (settings.TEST_RUNNER).
+
+Las metricas (pac/metricas.py) se acumulan en memoria y se vuelcan al
+archivo PAC_METRICAS_DB cada PAC_METRICAS_INTERVALO segundos y al terminar
+el proceso. Durante las pruebas ese archivo es uno temporal, de modo que la
+suite no escribe en las metricas reales; lo pendiente se vuelca en el
+temporal antes de restaurar el ajuste.
+"""
+
+import tempfile
+from pathlib import Path
+
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+from pac import metricas
+
+
+class EjecutorPruebas(DiscoverRunner):
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._directorio_metricas = tempfile.TemporaryDirectory()
+        self._ajuste_metricas = override_settings(
+            PAC_METRICAS_DB=Path(self._directorio_metricas.name) / 'metricas.sqlite3',
+        )
+        self._ajuste_metricas.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        metricas.volcar()
+        self._ajuste_metricas.disable()
+        self._directorio_metricas.cleanup()
+        super().teardown_test_environment(**kwargs)
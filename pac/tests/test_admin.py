@@ -0,0 +1,76 @@
+"""Admin de fuentes de financiacion: alertas y version de los datos al guardar o borrar (pac/admin.py)."""
+
+from django.contrib.auth.models import User
+from django.db.models import Sum
+from django.test import TestCase
+from django.urls import reverse
+
+from pac import alertas, benchmark
+from pac.consultas import version_datos
+from pac.models import Alerta, FuenteFinanciacion, PACEjecutadoCompromiso
+from pac.sintetico import crear_fuentes
+
+
+VIGENCIA = benchmark.VIGENCIA
+
+
+class FuenteFinanciacionAdminTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        benchmark.cargar(benchmark.libro_sintetico(1))
+        crear_fuentes(VIGENCIA)
+        comprometido = dict(
+            PACEjecutadoCompromiso.objects.filter(vigencia=VIGENCIA, tipo='GASTO', es_subtotal=False)
+            .values('fuente_financiacion').annotate(t=Sum('total')).values_list('fuente_financiacion', 't')
+        )
+        cls.fuentes = list(
+            FuenteFinanciacion.objects.filter(vigencia=VIGENCIA, nombre__in=[f for f, t in comprometido.items() if t])
+            .order_by('nombre')[:2]
+        )
+        alertas.evaluar(VIGENCIA)
+        cls.admin = User.objects.create_superuser('admin_pruebas', 'admin@example.com', 'clave')
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def sobrecompromiso(self, fuente):
+        return Alerta.objects.filter(
+            vigencia=VIGENCIA, regla='SOBRECOMPROMISO', fuente_financiacion=fuente.nombre, codigo_rubro='',
+        ).exists()
+
+    def editar(self, fuente, presupuesto):
+        respuesta = self.client.post(reverse('admin:pac_fuentefinanciacion_change', args=[fuente.pk]), {
+            'codigo': fuente.codigo, 'nombre': fuente.nombre, 'descripcion': '', 'vigencia': fuente.vigencia,
+            'presupuesto_asignado': presupuesto, 'activa': 'on',
+        })
+        self.assertEqual(respuesta.status_code, 302)
+
+    def test_editar_presupuesto_reevalua_la_fuente(self):
+        fuente = self.fuentes[0]
+        self.editar(fuente, '10000000000000000')
+        self.assertFalse(self.sobrecompromiso(fuente))
+        self.editar(fuente, '1.00')
+        self.assertTrue(self.sobrecompromiso(fuente))
+        self.editar(fuente, '10000000000000000')
+        self.assertFalse(self.sobrecompromiso(fuente))
+
+    def test_borrar_reevalua_la_fuente(self):
+        for fuente in self.fuentes:
+            self.editar(fuente, '1.00')
+            self.assertTrue(self.sobrecompromiso(fuente))
+
+        uno, otro = self.fuentes
+        respuesta = self.client.post(reverse('admin:pac_fuentefinanciacion_delete', args=[uno.pk]), {'post': 'yes'})
+        self.assertEqual(respuesta.status_code, 302)
+        self.assertFalse(self.sobrecompromiso(uno))
+
+        version = version_datos(VIGENCIA)
+        respuesta = self.client.post(reverse('admin:pac_fuentefinanciacion_changelist'), {
+            'action': 'delete_selected', '_selected_action': [otro.pk], 'post': 'yes',
+        })
+        self.assertEqual(respuesta.status_code, 302)
+        self.assertFalse(FuenteFinanciacion.objects.filter(pk=otro.pk).exists())
+        self.assertFalse(self.sobrecompromiso(otro))
+        # Las exportaciones, comparaciones y proyecciones en cache dejan de servirse
+        self.assertNotEqual(version_datos(VIGENCIA), version)
@@ -0,0 +1,120 @@
+"""Archivado de vigencias (pac/archivado.py) y enrutamiento de sus consultas (models.PACQuerySet)."""
+
+import tempfile
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.db.models import Q
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from pac import archivado, benchmark, cache_exportaciones, comparacion
+from pac.models import PACProgramado, PACValorMensual
+
+
+ARCHIVADA = 2019
+ACTUAL = 2026
+
+
+class EnrutamientoTest(SimpleTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        directorio = tempfile.TemporaryDirectory()
+        cls.addClassCleanup(directorio.cleanup)
+        # La existencia del archivo es la marca de vigencia archivada
+        Path(directorio.name, f'vigencia_{ARCHIVADA}.sqlite3').touch()
+        ajuste = override_settings(PAC_ARCHIVO_DIR=directorio.name)
+        ajuste.enable()
+        cls.addClassCleanup(ajuste.disable)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        # La conexion de archivo se registra durante las pruebas: se retira antes de que SimpleTestCase
+        # restaure las conexiones que bloqueo al empezar
+        archivado._olvidar(f'{archivado.PREFIJO_ALIAS}{ARCHIVADA}')
+        super().tearDownClass()
+
+    def test_filtros_enrutados(self):
+        alias = f'{archivado.PREFIJO_ALIAS}{ARCHIVADA}'
+        self.assertEqual(PACProgramado.objects.filter(vigencia=ARCHIVADA).db, alias)
+        # El filtro de vigencia del admin (list_filter)
+        self.assertEqual(PACProgramado.objects.filter(vigencia__exact=ARCHIVADA).db, alias)
+        self.assertEqual(PACValorMensual.objects.filter(vigencia__in=[ARCHIVADA]).db, alias)
+        self.assertEqual(PACProgramado.objects.filter(vigencia__exact=ACTUAL).db, 'default')
+        self.assertEqual(PACProgramado.objects.filter(vigencia__gte=ARCHIVADA + 1).db, 'default')
+        self.assertEqual(PACProgramado.objects.filter(vigencia=ACTUAL).exclude(categoria='RESERVAS').db, 'default')
+        self.assertEqual(PACProgramado.objects.filter(Q(tipo='GASTO') | Q(tipo='INGRESO')).db, 'default')
+
+    def test_filtros_no_enrutables_fallan(self):
+        no_enrutables = [
+            lambda qs: qs.filter(vigencia__in=[ARCHIVADA, ACTUAL]),
+            lambda qs: qs.filter(vigencia__gte=ARCHIVADA),
+            lambda qs: qs.filter(vigencia__range=(2010, ACTUAL)),
+            lambda qs: qs.filter(Q(vigencia=ARCHIVADA) | Q(tipo='GASTO')),
+            lambda qs: qs.filter(~Q(vigencia=ACTUAL)),
+            lambda qs: qs.exclude(vigencia=ACTUAL),
+        ]
+        for consulta in no_enrutables:
+            with self.subTest(consulta=consulta), self.assertRaises(ValueError):
+                consulta(PACProgramado.objects.all())
+        # Eligiendo la base explicitamente no se enruta
+        self.assertEqual(PACProgramado.objects.using('default').filter(vigencia__gte=ARCHIVADA).db, 'default')
+
+
+class ArchivarRestaurarTest(TransactionTestCase):
+    """Las bases de archivo se abren con sus propias conexiones: cada prueba confirma sus datos y se vacian al final."""
+
+    @classmethod
+    def setUpClass(cls):
+        media = tempfile.TemporaryDirectory()
+        cls.addClassCleanup(media.cleanup)
+        directorio = tempfile.TemporaryDirectory()
+        cls.addClassCleanup(directorio.cleanup)
+        ajuste = override_settings(MEDIA_ROOT=media.name, PAC_ARCHIVO_DIR=directorio.name)
+        ajuste.enable()
+        cls.addClassCleanup(ajuste.disable)
+        super().setUpClass()
+        # Las bases de archivo se registran durante la prueba (archivado._registrar): se permiten sus conexiones
+        # una vez validadas las de DATABASES
+        cls.databases = cls.databases | {
+            f'{archivado.PREFIJO_ALIAS}nuevo_{benchmark.VIGENCIA}', f'{archivado.PREFIJO_ALIAS}{benchmark.VIGENCIA}',
+        }
+
+    def setUp(self):
+        benchmark.cargar(benchmark.libro_sintetico(1))
+        self.client.force_login(User.objects.create(username='archivado', is_staff=True))
+        # Si la prueba falla a medias, la conexion de archivo no debe quedar registrada
+        self.addCleanup(archivado._olvidar, f'{archivado.PREFIJO_ALIAS}{benchmark.VIGENCIA}')
+
+    def leer(self):
+        """Totales de una vista, exportacion CSV y comparacion de la vigencia, sin caches."""
+        cache_exportaciones.limpiar()
+        comparacion.limpiar()
+        parametros = {'vigencia': benchmark.VIGENCIA}
+        vista = self.client.get(reverse('pac_programado'), parametros)
+        self.assertEqual(vista.status_code, 200)
+        exportacion = self.client.get(reverse('exportar_datos', args=['programado']), {**parametros, 'formato': 'csv'})
+        self.assertEqual(exportacion.status_code, 200)
+        contenido = b''.join(exportacion.streaming_content)
+        return vista.context['totales'], contenido, comparacion.comparar([benchmark.VIGENCIA])
+
+    def test_archivar_y_restaurar(self):
+        vigencia = benchmark.VIGENCIA
+        esperado = archivado.resumen(vigencia, 'default')
+        antes = self.leer()
+        self.assertTrue(antes[0]['total'])
+
+        self.assertEqual(archivado.archivar(vigencia), esperado)
+        self.assertTrue(archivado.esta_archivada(vigencia))
+        self.assertFalse(PACProgramado.objects.using('default').filter(vigencia=vigencia).exists())
+        self.assertFalse(PACValorMensual.objects.using('default').filter(vigencia=vigencia).exists())
+        # Las vistas y exportaciones leen la vigencia del archivo
+        self.assertEqual(PACProgramado.objects.filter(vigencia=vigencia).db, archivado.alias_vigencia(vigencia))
+        self.assertEqual(self.leer(), antes)
+
+        self.assertEqual(archivado.restaurar(vigencia), esperado)
+        self.assertFalse(archivado.esta_archivada(vigencia))
+        self.assertEqual(archivado.resumen(vigencia, 'default'), esperado)
+        self.assertEqual(self.leer(), antes)
@@ -0,0 +1,62 @@
+"""Humo de la suite de benchmarks (pac/benchmark.py) en la escala mas pequena."""
+
+import copy
+import json
+import tempfile
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.test.utils import override_settings
+
+from pac import benchmark
+
+
+CLAVES = {'escala', 'grupo', 'nombre', 'segundos', 'minimo', 'consultas', 'memoria_pico_kb', 'filas'}
+
+
+class BenchmarkTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        media = tempfile.TemporaryDirectory()
+        cls.addClassCleanup(media.cleanup)
+        ajuste = override_settings(MEDIA_ROOT=media.name)
+        ajuste.enable()
+        cls.addClassCleanup(ajuste.disable)
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        usuario = User.objects.create(username='benchmark', is_staff=True)
+        cls.resultados = benchmark.ejecutar(usuario, escalas=[1], repeticiones=1, medir_memoria=False)
+
+    def test_casos_de_cada_grupo(self):
+        nombres = {}
+        for r in self.resultados:
+            nombres.setdefault(r['grupo'], []).append(r['nombre'])
+        self.assertEqual(nombres['importacion'], [nombre for nombre, _, _ in benchmark.IMPORTACIONES])
+        self.assertEqual(nombres['vista'], benchmark.VISTAS + ['fuente_detalle'])
+        self.assertEqual(nombres['exportacion'], [nombre for nombre, _ in benchmark.urls_exportaciones(benchmark.VIGENCIA)])
+
+    def test_estructura_de_resultados(self):
+        for r in self.resultados:
+            with self.subTest(grupo=r['grupo'], nombre=r['nombre']):
+                self.assertEqual(set(r), CLAVES)
+                self.assertEqual(r['escala'], 1)
+                self.assertGreaterEqual(r['segundos'], r['minimo'])
+                self.assertGreaterEqual(r['minimo'], 0)
+                self.assertGreater(r['consultas'], 0)
+                self.assertIsNone(r['memoria_pico_kb'])
+                self.assertGreater(r['filas'], 0)
+
+    def test_informe_y_comparacion(self):
+        documento = json.loads(json.dumps(benchmark.informe(self.resultados)))
+        self.assertEqual(len(documento['resultados']), len(self.resultados))
+        self.assertEqual(benchmark.comparar(documento, documento), [])
+
+        lento = copy.deepcopy(documento)
+        caso = lento['resultados'][0]
+        caso['segundos'] = documento['resultados'][0]['segundos'] * 2 + 1
+        caso['consultas'] += 1
+        regresiones = benchmark.comparar(lento, documento)
+        self.assertEqual([clave for clave, _ in regresiones], [(caso['escala'], caso['grupo'], caso['nombre'])])
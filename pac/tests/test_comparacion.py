@@ -0,0 +1,45 @@
+"""Cache y totales de la comparacion entre vigencias (pac/comparacion.py)."""
+
+from decimal import Decimal
+
+from django.core.cache import cache, caches
+from django.db.models import F, Sum
+from django.test import TestCase
+
+from pac import benchmark, comparacion
+from pac.models import PACProgramado, PACValorMensual
+
+
+class CacheComparacionTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        benchmark.cargar(benchmark.libro_sintetico(1))
+
+    def tearDown(self):
+        cache.clear()
+        comparacion.limpiar()
+
+    def test_limpiar_no_vacia_la_cache_por_defecto(self):
+        cache.set('otra_aplicacion', 1)
+        resultado = comparacion.comparar([benchmark.VIGENCIA])
+        clave = comparacion._clave_cache([benchmark.VIGENCIA])
+        self.assertEqual(caches['pac'].get(clave), resultado)
+
+        comparacion.limpiar()
+        self.assertIsNone(caches['pac'].get(clave))
+        self.assertEqual(cache.get('otra_aplicacion'), 1)
+
+    def test_totales_desde_la_tabla_larga(self):
+        # La columna TOTAL del Excel puede diferir de la suma de sus meses: no se agrega
+        PACProgramado.objects.filter(vigencia=benchmark.VIGENCIA, es_subtotal=False).update(
+            total=F('total') + Decimal('0.12')
+        )
+        resultado = comparacion.comparar([benchmark.VIGENCIA])
+        esperado = dict(
+            PACValorMensual.objects.filter(
+                vigencia=benchmark.VIGENCIA, modulo=PACProgramado.MODULO, es_subtotal=False,
+            ).values('categoria').annotate(t=Sum('valor_centavos')).values_list('categoria', 't')
+        )
+        categorias = {c['categoria']: c['valores'][0]['prog'] for c in resultado['categorias']}
+        self.assertEqual({c: categorias[c] for c in esperado}, esperado)
@@ -0,0 +1,122 @@
+"""
+Lecturas e importaciones simultaneas (ver pac/concurrencia.py y el comando prueba_concurrencia).
+
+TransactionTestCase: cada hilo abre su propia conexion y ve solo lo confirmado,
+como los workers en produccion. En SQLite la base de pruebas es un archivo
+(DATABASES['default']['TEST']) para que las conexiones usen el modo WAL.
+"""
+
+import io
+import threading
+import unittest
+
+from django.db import OperationalError, connection, transaction
+from django.db.models import Sum
+from django.test import TransactionTestCase
+
+from pac import benchmark
+from pac.concurrencia import ImportacionEnCurso, bloqueo_importacion
+from pac.models import BloqueoImportacion, PACProgramado, PACValorMensual
+from pac.utils import importar_excel_pac
+
+
+VIGENCIA = benchmark.VIGENCIA
+
+
+def _leer():
+    """(registros, valores mensuales, total) de la vigencia, leidos en una misma transaccion."""
+    with transaction.atomic():
+        registros = PACProgramado.objects.filter(vigencia=VIGENCIA)
+        return (
+            registros.count(),
+            PACValorMensual.objects.filter(modulo=PACProgramado.MODULO, vigencia=VIGENCIA).count(),
+            registros.aggregate(t=Sum('total'))['t'],
+        )
+
+
+class ConcurrenciaTest(TransactionTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.libro = benchmark.libro_sintetico(1, vigencia=VIGENCIA)
+
+    def importar(self):
+        return importar_excel_pac(io.BytesIO(self.libro), VIGENCIA, PACProgramado, None, nombre_hoja='PROG PAC')
+
+    @unittest.skipUnless(connection.vendor == 'sqlite', 'modo WAL de SQLite')
+    def test_conexiones_en_modo_wal(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            self.assertEqual(cursor.fetchone()[0], 'wal')
+
+    def test_lecturas_durante_importaciones(self):
+        # Estado de referencia: todas las importaciones del mismo libro producen los mismos datos
+        self.importar()
+        esperado = _leer()
+        self.assertGreater(esperado[0], 0)
+
+        resultado = {'lecturas': 0, 'inconsistentes': [], 'errores': [], 'completadas': 0, 'rechazadas': 0}
+        candado = threading.Lock()
+        terminado = threading.Event()
+
+        def lector():
+            try:
+                while not terminado.is_set():
+                    leido = _leer()
+                    with candado:
+                        resultado['lecturas'] += 1
+                        if leido != esperado:
+                            resultado['inconsistentes'].append(leido)
+            except OperationalError as e:
+                with candado:
+                    resultado['errores'].append(str(e))
+            finally:
+                connection.close()
+
+        def importador():
+            try:
+                for _ in range(2):
+                    try:
+                        self.importar()
+                        clave = 'completadas'
+                    except ImportacionEnCurso:
+                        clave = 'rechazadas'
+                    with candado:
+                        resultado[clave] += 1
+            except OperationalError as e:
+                with candado:
+                    resultado['errores'].append(str(e))
+            finally:
+                connection.close()
+
+        lectores = [threading.Thread(target=lector) for _ in range(3)]
+        importadores = [threading.Thread(target=importador) for _ in range(2)]
+        try:
+            for hilo in lectores + importadores:
+                hilo.start()
+            for hilo in importadores:
+                hilo.join()
+        finally:
+            terminado.set()
+            for hilo in lectores:
+                hilo.join()
+
+        self.assertEqual(resultado['errores'], [])
+        self.assertEqual(resultado['inconsistentes'], [])
+        self.assertGreater(resultado['lecturas'], 0)
+        self.assertGreater(resultado['completadas'], 0)
+        self.assertEqual(resultado['completadas'] + resultado['rechazadas'], 4)
+        self.assertEqual(_leer(), esperado)
+        self.assertFalse(BloqueoImportacion.objects.exists())
+
+    def test_importacion_simultanea_rechazada(self):
+        self.importar()
+        esperado = _leer()
+        with bloqueo_importacion(PACProgramado.MODULO, VIGENCIA):
+            with self.assertRaises(ImportacionEnCurso):
+                self.importar()
+        self.assertEqual(_leer(), esperado)
+        # Liberado el bloqueo, la siguiente carga procede
+        self.importar()
+        self.assertEqual(_leer(), esperado)
@@ -0,0 +1,27 @@
+"""Acceso al endpoint /metrics (views.metricas_prometheus)."""
+
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+
+
+class AccesoMetricasTest(SimpleTestCase):
+
+    def setUp(self):
+        self.url = reverse('metricas')
+
+    @override_settings(PAC_METRICAS_TOKEN='')
+    def test_sin_token_solo_solicitudes_locales(self):
+        self.assertEqual(self.client.get(self.url, REMOTE_ADDR='127.0.0.1').status_code, 200)
+        self.assertEqual(self.client.get(self.url, REMOTE_ADDR='::1').status_code, 200)
+        self.assertEqual(self.client.get(self.url, REMOTE_ADDR='10.0.0.8').status_code, 403)
+        # Un proxy local reenvia solicitudes externas desde 127.0.0.1
+        respuesta = self.client.get(self.url, REMOTE_ADDR='127.0.0.1', HTTP_X_FORWARDED_FOR='203.0.113.5')
+        self.assertEqual(respuesta.status_code, 403)
+
+    @override_settings(PAC_METRICAS_TOKEN='secreto')
+    def test_con_token_exige_el_token(self):
+        self.assertEqual(self.client.get(self.url, REMOTE_ADDR='127.0.0.1').status_code, 401)
+        self.assertEqual(self.client.get(self.url, HTTP_AUTHORIZATION='Bearer otro').status_code, 401)
+        respuesta = self.client.get(self.url, REMOTE_ADDR='10.0.0.8', HTTP_AUTHORIZATION='Bearer secreto')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,64 @@
+"""Instrumentacion de requests (pac/middleware.py) en respuestas en streaming."""
+
+import re
+import tempfile
+
+from django.contrib.auth.models import User
+from django.core.signals import request_finished
+from django.db import close_old_connections
+from django.test import TestCase
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from pac import benchmark
+from pac.middleware import estadisticas_vistas, reiniciar_estadisticas
+
+
+class InstrumentacionStreamingTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        media = tempfile.TemporaryDirectory()
+        cls.addClassCleanup(media.cleanup)
+        ajuste = override_settings(MEDIA_ROOT=media.name)
+        ajuste.enable()
+        cls.addClassCleanup(ajuste.disable)
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        benchmark.cargar(benchmark.libro_sintetico(1))
+        cls.usuario = User.objects.create(username='instrumentacion', is_staff=True)
+
+    def setUp(self):
+        reiniciar_estadisticas()
+        self.client.force_login(self.usuario)
+        self.url = reverse('exportar_datos', args=['programado'])
+
+    def test_registra_al_terminar_el_contenido(self):
+        response = self.client.get(self.url, {'vigencia': benchmark.VIGENCIA, 'formato': 'csv'})
+        self.assertTrue(response.streaming)
+        # La vista retorno pero el contenido aun no se genera: nada registrado todavia
+        self.assertNotIn('exportar_datos', estadisticas_vistas())
+        consultas_vista = int(re.search(r'db;desc="(\d+) consultas"', response['Server-Timing']).group(1))
+
+        contenido = b''.join(response.streaming_content)
+        medicion = response.wsgi_request.pac_medicion
+        self.assertEqual(medicion['bytes'], len(contenido))
+        self.assertGreater(medicion['consultas'], consultas_vista)
+        estadistica = estadisticas_vistas()['exportar_datos']
+        self.assertEqual(estadistica['cantidad'], 1)
+        self.assertEqual(estadistica['consultas'], medicion['consultas'])
+
+    def test_registra_al_cerrar_sin_recorrer(self):
+        response = self.client.get(self.url, {'vigencia': benchmark.VIGENCIA, 'formato': 'csv'})
+        # Como el cliente de pruebas: cerrar la respuesta no debe cerrar la conexion de la prueba
+        request_finished.disconnect(close_old_connections)
+        try:
+            response.close()
+            self.assertEqual(response.wsgi_request.pac_medicion['bytes'], 0)
+            self.assertEqual(estadisticas_vistas()['exportar_datos']['cantidad'], 1)
+            response.close()
+            self.assertEqual(estadisticas_vistas()['exportar_datos']['cantidad'], 1)
+        finally:
+            request_finished.connect(close_old_connections)
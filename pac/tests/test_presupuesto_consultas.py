@@ -0,0 +1,169 @@
+"""
+Presupuesto de consultas SQL de cada ruta de pac/urls.py.
+
+Cada ruta se mide sobre dos tamanos de datos sinteticos: el numero de
+consultas no debe crecer con el numero de rubros y fuentes (N+1) ni superar
+su presupuesto. Al fallar se muestran las consultas repetidas y el SQL
+capturado en el tamano grande.
+"""
+
+import re
+import tempfile
+from collections import Counter
+
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from pac import benchmark, cache_exportaciones, comparacion
+from pac.models import FuenteFinanciacion, TrabajoExportacion
+from pac.sintetico import crear_fuentes
+from pac.urls import urlpatterns
+
+
+# Tamanos de datos sobre los que se compara el numero de consultas de cada ruta
+TAMANOS = [
+    ('pequeno', {'escala': 1, 'fuentes': 12}),
+    ('grande', {'escala': 3, 'fuentes': 24}),
+]
+
+# (ruta, etiqueta, presupuesto de consultas, metodo, argumentos de reverse, parametros)
+# Los argumentos 'fuente' y 'trabajo' se reemplazan por el pk del objeto creado para la verificacion.
+# Toda ruta de pac/urls.py debe tener al menos un caso: una vista nueva falla hasta que se le asigne presupuesto.
+CASOS = [
+    ('dashboard', '', 17, 'get', [], {}),
+    ('aim_inicial', '', 9, 'get', [], {}),
+    ('importar_aim_inicial', '', 2, 'get', [], {}),
+    ('pac_programado', '', 6, 'get', [], {}),
+    ('importar_pac_programado', '', 2, 'get', [], {}),
+    ('pac_ejecutado_compromisos', '', 6, 'get', [], {}),
+    ('importar_pac_compromisos', '', 2, 'get', [], {}),
+    ('pac_ejecutado_pagos', '', 6, 'get', [], {}),
+    ('importar_pac_pagos', '', 2, 'get', [], {}),
+    ('seguimiento_ingresos', '', 4, 'get', [], {}),
+    ('seguimiento_gastos', '', 4, 'get', [], {}),
+    ('seguimiento_compromisos_vs_pagos', '', 4, 'get', [], {}),
+    ('fuentes_financiacion', '', 8, 'get', [], {}),
+    ('fuente_crear', '', 2, 'get', [], {}),
+    ('fuente_editar', '', 3, 'get', ['fuente'], {}),
+    ('fuente_eliminar', '', 3, 'get', ['fuente'], {}),
+    ('fuente_detalle', '', 12, 'get', ['fuente'], {}),
+    ('reportes', '', 12, 'get', [], {}),
+    ('comparacion_vigencias', '', 12, 'get', [], {}),
+    ('api_comparacion', '', 12, 'get', [], {}),
+    ('proyeccion_caja', '', 10, 'get', [], {}),
+    ('api_proyeccion_caja', '', 10, 'get', [], {}),
+    ('simulacion_liquidez', '', 12, 'get', [], {'escenarios': 500}),
+    ('api_simulacion_liquidez', '', 12, 'get', [], {'escenarios': 500}),
+    ('alertas', '', 3, 'get', [], {}),
+    ('api_buscar_rubros', 'nombre', 4, 'get', [], {'q': 'construccion'}),
+    ('api_buscar_rubros', 'codigo', 4, 'get', [], {'q': '2.3'}),
+    ('exportar_seguimiento', 'ingresos', 18, 'get', ['ingresos'], {}),
+    ('exportar_seguimiento', 'gastos', 18, 'get', ['gastos'], {}),
+    ('exportar_seguimiento', 'comp_vs_pago', 18, 'get', ['comp_vs_pago'], {}),
+    ('exportar_reporte_fuentes', '', 11, 'get', [], {}),
+    ('exportar_datos', 'aim_inicial', 8, 'get', ['aim_inicial'], {'formato': 'csv'}),
+    ('exportar_datos', 'programado', 8, 'get', ['programado'], {'formato': 'csv'}),
+    ('exportar_datos', 'compromisos', 8, 'get', ['compromisos'], {'formato': 'csv'}),
+    ('exportar_datos', 'pagos', 8, 'get', ['pagos'], {'formato': 'csv'}),
+    ('exportar_datos', 'consolidado', 11, 'get', ['consolidado'], {'formato': 'csv'}),
+    ('exportar_libro_consolidado', '', 50, 'get', [], {}),
+    ('solicitar_exportacion', '', 12, 'post', [], {'tipo': 'DATOS', 'modulo': 'aim_inicial', 'formato': 'csv'}),
+    ('estado_exportacion', '', 3, 'get', ['trabajo'], {}),
+    ('descargar_exportacion', '', 3, 'get', ['trabajo'], {}),
+    ('descargar_plantilla', 'programado', 2, 'get', ['programado'], {}),
+    ('rendimiento_vistas', '', 2, 'get', [], {}),
+    ('metricas', '', 0, 'get', [], {}),
+    ('eliminar_datos', 'programado', 2, 'get', ['programado'], {}),
+]
+
+
+def _patron(sql):
+    """SQL sin literales, para agrupar consultas repetidas (N+1)."""
+    return re.sub(r"'[^']*'|\b\d+(\.\d+)?\b", '?', sql)
+
+
+def _detalle(consultas):
+    """Consultas repetidas y SQL capturado, para el mensaje de una falla."""
+    lineas = []
+    repetidas = [(p, n) for p, n in Counter(map(_patron, consultas)).most_common() if n > 1]
+    if repetidas:
+        lineas.append('Consultas repetidas (posible N+1):')
+        lineas += [f'{n:>5} x {patron}' for patron, n in repetidas]
+    lineas.append('Consultas en el tamano grande:')
+    lineas += [f'{i:>5}. {sql}' for i, sql in enumerate(consultas, 1)]
+    return '\n'.join(lineas)
+
+
+def _medir(casos, semilla=0):
+    """Retorna, alineado con casos, [(status, consultas, sql capturado) por tamano]."""
+    usuario = User.objects.create(username='presupuesto_consultas', is_staff=True)
+    c = benchmark.cliente(usuario)
+    mediciones = [[] for _ in casos]
+    for tamano, configuracion in TAMANOS:
+        benchmark.cargar(benchmark.libro_sintetico(configuracion['escala'], semilla, fuentes=configuracion['fuentes']))
+        crear_fuentes(benchmark.VIGENCIA, configuracion['fuentes'])
+        trabajo = TrabajoExportacion(tipo='DATOS', vigencia=benchmark.VIGENCIA, modulo='aim_inicial',
+                                     formato='csv', clave=f'presupuesto_consultas:{tamano}', estado='TERMINADO')
+        trabajo.archivo.save('verificar.csv', ContentFile(b'codigo\n'), save=False)
+        trabajo.save()
+        objetos = {
+            'fuente': FuenteFinanciacion.objects.filter(vigencia=benchmark.VIGENCIA).first().pk,
+            'trabajo': trabajo.pk,
+        }
+
+        for (ruta, _, _, metodo, argumentos, parametros), medicion in zip(casos, mediciones):
+            url = reverse(ruta, args=[objetos.get(a, a) for a in argumentos])
+            # Las exportaciones se cachean en disco y las comparaciones, proyecciones y simulaciones en la cache 'pac'
+            cache_exportaciones.limpiar()
+            comparacion.limpiar()
+            with CaptureQueriesContext(connection) as capturadas:
+                if metodo == 'post':
+                    response = c.post(url, {'vigencia': benchmark.VIGENCIA, **parametros})
+                else:
+                    response = c.get(url, {'vigencia': benchmark.VIGENCIA, **parametros})
+                # El contenido en streaming se genera (y consulta) al recorrerlo; al terminar se cierra
+                if response.streaming:
+                    for _ in response.streaming_content:
+                        pass
+            medicion.append((response.status_code, len(capturadas), [q['sql'] for q in capturadas.captured_queries]))
+    return mediciones
+
+
+class PresupuestoConsultasTest(TestCase):
+    """Numero de consultas de cada ruta en dos tamanos de datos; los datos se revierten al terminar."""
+
+    @classmethod
+    def setUpClass(cls):
+        media = tempfile.TemporaryDirectory()
+        cls.addClassCleanup(media.cleanup)
+        ajuste = override_settings(MEDIA_ROOT=media.name)
+        ajuste.enable()
+        cls.addClassCleanup(ajuste.disable)
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.mediciones = _medir(CASOS)
+
+    def test_toda_ruta_tiene_presupuesto(self):
+        nombres = {p.name for p in urlpatterns if p.name}
+        self.assertEqual(sorted(nombres - {caso[0] for caso in CASOS}), [], 'Rutas sin presupuesto de consultas')
+
+    def test_presupuesto_por_ruta(self):
+        for caso, ((status_pequeno, pequeno, _), (status, grande, capturadas)) in zip(CASOS, self.mediciones):
+            ruta, etiqueta, presupuesto = caso[:3]
+            with self.subTest(ruta=ruta, etiqueta=etiqueta):
+                self.assertIn(status_pequeno, (200, 302))
+                self.assertIn(status, (200, 302))
+                self.assertLessEqual(
+                    grande, pequeno,
+                    f'{ruta}: las consultas crecen con los datos ({pequeno} -> {grande})\n{_detalle(capturadas)}',
+                )
+                self.assertLessEqual(
+                    grande, presupuesto,
+                    f'{ruta}: {grande} consultas, presupuesto {presupuesto}\n{_detalle(capturadas)}',
+                )
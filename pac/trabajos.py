@@ -0,0 +1,175 @@
+"""
+Cola de exportaciones en segundo plano.
+
+Las vistas registran un TrabajoExportacion y el comando procesar_exportaciones
+lo ejecuta en un proceso aparte, sin ocupar un worker de gunicorn mientras
+se construye el archivo. Las solicitudes equivalentes (misma exportacion y
+misma version de los datos) se unen en un solo trabajo mientras este activo
+o su archivo siga dentro del periodo de retencion
+(PAC_EXPORTACION_RETENCION_HORAS).
+
+Mientras construye un archivo el worker renueva el latido del trabajo cada
+PAC_EXPORTACION_LATIDO_SEGUNDOS; en cada vuelta del worker los trabajos
+EN_PROCESO sin latido reciente (su worker murio) vuelven a PENDIENTE.
+"""
+
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db import IntegrityError, OperationalError, connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import exportacion, metricas
+from .consultas import version_datos
+from .models import TrabajoExportacion
+
+
+DIRECTORIO = 'trabajos_exportacion'
+
+
+def retencion():
+    return timedelta(hours=getattr(settings, 'PAC_EXPORTACION_RETENCION_HORAS', 24))
+
+
+def intervalo_latido():
+    return getattr(settings, 'PAC_EXPORTACION_LATIDO_SEGUNDOS', 30)
+
+
+def _clave(tipo, vigencia, modulo, formato):
+    return f'{tipo}:{modulo}:{formato}:{vigencia}:{version_datos(vigencia)}'
+
+
+def _equivalente(clave):
+    """Trabajo activo, o terminado y vigente, con la misma clave."""
+    activo = TrabajoExportacion.objects.filter(clave=clave, estado__in=TrabajoExportacion.ESTADOS_ACTIVOS).first()
+    if activo:
+        return activo
+    return TrabajoExportacion.objects.filter(
+        clave=clave, estado='TERMINADO', fecha_fin__gte=timezone.now() - retencion()
+    ).order_by('-fecha_fin').first()
+
+
+def solicitar(tipo, vigencia, modulo='', formato='xlsx', usuario=None):
+    """Retorna (trabajo, creado). Reutiliza un trabajo equivalente si existe."""
+    clave = _clave(tipo, vigencia, modulo, formato)
+    existente = _equivalente(clave)
+    if existente:
+        return existente, False
+    try:
+        with transaction.atomic():
+            trabajo = TrabajoExportacion.objects.create(
+                tipo=tipo, vigencia=vigencia, modulo=modulo, formato=formato, clave=clave, usuario=usuario
+            )
+        return trabajo, True
+    except IntegrityError:
+        # Otra solicitud creo el trabajo activo al mismo tiempo
+        return _equivalente(clave), False
+
+
+def tomar_siguiente():
+    """Marca como EN_PROCESO el trabajo pendiente mas antiguo y lo retorna (None si no hay)."""
+    pendientes = TrabajoExportacion.objects.filter(estado='PENDIENTE').order_by('fecha_solicitud')
+    for pk in pendientes.values_list('pk', flat=True)[:10]:
+        # La actualizacion condicional evita que dos workers tomen el mismo trabajo
+        ahora = timezone.now()
+        if TrabajoExportacion.objects.filter(pk=pk, estado='PENDIENTE').update(
+            estado='EN_PROCESO', fecha_inicio=ahora, latido=ahora
+        ):
+            return TrabajoExportacion.objects.get(pk=pk)
+    return None
+
+
+def _generar(trabajo, ruta):
+    if trabajo.tipo == 'LIBRO_CONSOLIDADO':
+        from .views import generar_libro_consolidado
+        with open(ruta, 'wb') as destino:
+            generar_libro_consolidado(trabajo.vigencia, destino)
+        return
+    columnas, filas = exportacion.columnas_y_filas(trabajo.modulo, trabajo.vigencia)
+    if trabajo.formato == 'parquet':
+        exportacion.escribir_parquet(columnas, filas, str(ruta))
+    else:
+        with open(ruta, 'wb') as destino:
+            for bloque in exportacion.generar_csv(columnas, filas):
+                destino.write(bloque)
+
+
+@contextmanager
+def latiendo(trabajo):
+    """Mientras dura el bloque, un hilo renueva el latido del trabajo cada PAC_EXPORTACION_LATIDO_SEGUNDOS."""
+    detenido = threading.Event()
+
+    def latir():
+        try:
+            while not detenido.wait(intervalo_latido()):
+                try:
+                    TrabajoExportacion.objects.filter(pk=trabajo.pk, estado='EN_PROCESO').update(latido=timezone.now())
+                except OperationalError:
+                    # Un latido perdido (base ocupada) no importa: el siguiente lo renueva
+                    pass
+        finally:
+            connection.close()
+
+    hilo = threading.Thread(target=latir, daemon=True)
+    hilo.start()
+    try:
+        yield
+    finally:
+        detenido.set()
+        hilo.join()
+
+
+def ejecutar(trabajo):
+    """Construye el archivo del trabajo y registra el resultado."""
+    nombre = f'{DIRECTORIO}/{trabajo.pk}_{trabajo.nombre_descarga()}'
+    ruta = Path(settings.MEDIA_ROOT) / nombre
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    inicio = time.perf_counter()
+    try:
+        with latiendo(trabajo):
+            _generar(trabajo, ruta)
+    except Exception:
+        ruta.unlink(missing_ok=True)
+        trabajo.estado = 'ERROR'
+        trabajo.error = traceback.format_exc()
+    else:
+        trabajo.estado = 'TERMINADO'
+        trabajo.archivo.name = nombre
+        metricas.histograma(
+            'pac_exportacion_duracion_segundos', time.perf_counter() - inicio,
+            exportacion=trabajo.modulo or trabajo.tipo.lower(), formato=trabajo.formato,
+        )
+    trabajo.fecha_fin = timezone.now()
+    trabajo.save()
+    return trabajo
+
+
+def recuperar_interrumpidos(limite=None):
+    """
+    Vuelve a encolar los trabajos EN_PROCESO cuyo worker dejo de latir (murio o se reinicio a mitad de un
+    archivo). Por defecto se espera tres intervalos de latido.
+    """
+    corte = timezone.now() - (limite or timedelta(seconds=3 * intervalo_latido()))
+    return TrabajoExportacion.objects.filter(
+        Q(latido__lt=corte) | Q(latido__isnull=True, fecha_inicio__lt=corte), estado='EN_PROCESO',
+    ).update(estado='PENDIENTE', fecha_inicio=None, latido=None)
+
+
+def purgar_vencidos():
+    """Elimina los trabajos finalizados (y sus archivos) con mas antiguedad que la retencion."""
+    vencidos = TrabajoExportacion.objects.filter(
+        estado__in=['TERMINADO', 'ERROR'], fecha_fin__lt=timezone.now() - retencion()
+    )
+    n = 0
+    for trabajo in vencidos:
+        if trabajo.archivo:
+            trabajo.archivo.delete(save=False)
+        trabajo.delete()
+        n += 1
+    return n
@@ -37,13 +37,42 @@ urlpatterns = [
     # Reportes
     path('reportes/', views.reportes, name='reportes'),
 
+    # Comparacion entre vigencias
+    path('comparacion/', views.comparacion_vigencias, name='comparacion_vigencias'),
+    path('api/comparacion/', views.api_comparacion, name='api_comparacion'),
+
+    # Proyeccion de caja
+    path('proyeccion-caja/', views.proyeccion_caja, name='proyeccion_caja'),
+    path('api/proyeccion-caja/', views.api_proyeccion_caja, name='api_proyeccion_caja'),
+
+    # Simulacion de liquidez
+    path('simulacion-liquidez/', views.simulacion_liquidez, name='simulacion_liquidez'),
+    path('api/simulacion-liquidez/', views.api_simulacion_liquidez, name='api_simulacion_liquidez'),
+
+    # Alertas
+    path('alertas/', views.alertas_lista, name='alertas'),
+
+    # Busqueda de rubros
+    path('api/buscar-rubros/', views.api_buscar_rubros, name='api_buscar_rubros'),
+
     # Exportar Excel
     path('exportar/seguimiento/<str:tipo>/', views.exportar_seguimiento_excel, name='exportar_seguimiento'),
     path('exportar/reporte-fuentes/', views.exportar_reporte_fuentes_excel, name='exportar_reporte_fuentes'),
+    path('exportar/datos/<str:tipo>/', views.exportar_datos, name='exportar_datos'),
+    path('exportar/libro-consolidado/', views.exportar_libro_consolidado, name='exportar_libro_consolidado'),
+
+    # Exportaciones en segundo plano
+    path('exportar/trabajos/solicitar/', views.solicitar_exportacion, name='solicitar_exportacion'),
+    path('exportar/trabajos/<int:pk>/', views.estado_exportacion, name='estado_exportacion'),
+    path('exportar/trabajos/<int:pk>/descargar/', views.descargar_exportacion, name='descargar_exportacion'),
 
     # Plantillas de ejemplo
     path('plantilla/<str:tipo>/', views.descargar_plantilla, name='descargar_plantilla'),
 
+    # Rendimiento
+    path('rendimiento/vistas/', views.rendimiento_vistas, name='rendimiento_vistas'),
+    path('metrics', views.metricas_prometheus, name='metricas'),
+
     # Eliminar datos
     path('eliminar/<str:tipo>/', views.eliminar_datos, name='eliminar_datos'),
 ]
@@ -17,9 +17,18 @@ Columnas:
 """
 
 import re
+import time
+import tracemalloc
 from decimal import Decimal, InvalidOperation
+from django.conf import settings
+from django.db import transaction
 from openpyxl import load_workbook
 
+from . import alertas, busqueda, metricas, resumen
+from .concurrencia import bloqueo_importacion
+from .insercion import insertar
+from .models import CargaArchivo, PACValorMensual, VersionDatos, MESES
+
 
 def es_item_hoja(codigo_str):
     """
@@ -183,7 +192,106 @@ def detectar_seccion(codigo, nombre, fila_idx, seccion_actual):
     return tipo, 'FUNCIONAMIENTO', False, seccion_actual
 
 
-def importar_excel_pac(archivo, vigencia, modelo_class, usuario, nombre_hoja=None):
+def construir_valores_mensuales(registro):
+    """
+    Genera las filas de la tabla larga PACValorMensual para un registro PAC.
+    Solo se incluyen los meses con valor distinto de cero.
+    """
+    valores = []
+    for num_mes, mes in enumerate(MESES, start=1):
+        valor = getattr(registro, mes)
+        if not valor:
+            continue
+        valores.append(PACValorMensual(
+            modulo=registro.MODULO,
+            registro_id=registro.pk,
+            vigencia=registro.vigencia,
+            tipo=registro.tipo,
+            categoria=registro.categoria,
+            codigo_rubro=registro.codigo_rubro,
+            fuente_financiacion=registro.fuente_financiacion,
+            es_subtotal=registro.es_subtotal,
+            mes=num_mes,
+            valor=valor,
+            valor_centavos=valor,
+        ))
+    return valores
+
+
+def eliminar_datos_vigencia(modelo_class, vigencia):
+    """
+    Elimina los registros de un modulo y vigencia junto con sus valores mensuales e incrementa la version
+    de los datos (la importacion la llama antes de insertar, en su transaccion).
+    """
+    with transaction.atomic():
+        PACValorMensual.objects.filter(modulo=modelo_class.MODULO, vigencia=vigencia).delete()
+        eliminados = modelo_class.objects.filter(vigencia=vigencia).delete()
+        VersionDatos.incrementar(vigencia)
+        return eliminados
+
+
+def eliminar_modulo(modelo_class, vigencia):
+    """
+    Elimina los datos de un modulo y vigencia y, en la misma transaccion, actualiza las alertas, el indice
+    de busqueda y el resumen por rubro. El llamador toma el bloqueo de importacion.
+    """
+    previo = alertas.antes_de_importar(modelo_class, vigencia)
+    with transaction.atomic():
+        eliminados = eliminar_datos_vigencia(modelo_class, vigencia)
+        alertas.despues_de_importar(vigencia, previo, [])
+        busqueda.actualizar(vigencia, modelo_class, [])
+        resumen.actualizar(vigencia, modelo_class, [])
+    return eliminados
+
+
+class MedicionImportacion:
+    """Tiempos por etapa, memoria pico y filas omitidas (por motivo) de una importacion."""
+
+    def __init__(self):
+        self.segundos = dict.fromkeys(CargaArchivo.ETAPAS, 0.0)
+        self.omitidas = {}
+        # tracemalloc es global al proceso: si ya esta activo no se mide la memoria de esta carga
+        self.medir_memoria = (
+            getattr(settings, 'PAC_IMPORTACION_MEDIR_MEMORIA', False) and not tracemalloc.is_tracing()
+        )
+        self.memoria_pico = None
+        self.total = None
+        if self.medir_memoria:
+            tracemalloc.start()
+        self.inicio = self._marca = time.perf_counter()
+
+    def etapa(self, nombre):
+        """Asigna a la etapa el tiempo transcurrido desde la marca anterior."""
+        ahora = time.perf_counter()
+        self.segundos[nombre] += ahora - self._marca
+        self._marca = ahora
+
+    def omitir(self, motivo):
+        self.omitidas[motivo] = self.omitidas.get(motivo, 0) + 1
+
+    def detener(self):
+        if self.total is not None:
+            return
+        self.total = time.perf_counter() - self.inicio
+        if self.medir_memoria:
+            self.memoria_pico = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            self.medir_memoria = False
+
+    def campos_carga(self, registros, hoja):
+        """Valores para los campos de instrumentacion de CargaArchivo."""
+        campos = {f'tiempo_{etapa}_ms': round(s * 1000, 1) for etapa, s in self.segundos.items()}
+        campos.update(
+            hoja=hoja[:100],
+            tiempo_total_ms=round(self.total * 1000, 1),
+            memoria_pico_kb=self.memoria_pico // 1024 if self.memoria_pico is not None else None,
+            filas_por_segundo=round(registros / self.total, 1) if self.total else None,
+            filas_omitidas=self.omitidas,
+        )
+        return campos
+
+
+def importar_excel_pac(archivo, vigencia, modelo_class, usuario, nombre_hoja=None, estadisticas=None):
     """
     Importa un archivo Excel con formato PAC real.
     Lee las filas del Excel y crea registros en el modelo especificado.
@@ -194,10 +302,47 @@ def importar_excel_pac(archivo, vigencia, modelo_class, usuario, nombre_hoja=Non
         modelo_class: clase del modelo (AIMInicial, PACProgramado, etc.)
         usuario: usuario que realiza la carga
         nombre_hoja: nombre de la hoja a leer (None = primera hoja)
+        estadisticas: dict opcional que se completa con los campos de
+            instrumentacion de CargaArchivo (tiempos por etapa, memoria, hoja...)
 
     Returns:
         count: numero de registros importados
+
+    Lanza concurrencia.ImportacionEnCurso si ya hay una carga del mismo modulo
+    y vigencia en curso. En la misma transaccion que la escritura evalua las
+    alertas de los rubros que la carga cambio (ver pac/alertas.py) y actualiza
+    las columnas del modulo en el indice de busqueda y en el resumen por rubro
+    (pac/busqueda.py y pac/resumen.py).
     """
+    with bloqueo_importacion(modelo_class.MODULO, vigencia, usuario):
+        previo = alertas.antes_de_importar(modelo_class, vigencia)
+        medicion = MedicionImportacion()
+        try:
+            registros, hoja = _leer_hoja(archivo, vigencia, modelo_class, usuario, nombre_hoja, medicion)
+            # Solo la escritura y lo que se deriva de ella van en la transaccion, corta: los lectores ven
+            # los datos, las alertas, el indice y el resumen anteriores o los nuevos, nunca una mezcla, y
+            # si una actualizacion falla la carga entera se revierte
+            with transaction.atomic():
+                _guardar_registros(modelo_class, vigencia, registros, medicion)
+                medicion.detener()
+                alertas.despues_de_importar(vigencia, previo, registros)
+                busqueda.actualizar(vigencia, modelo_class, registros)
+                resumen.actualizar(vigencia, modelo_class, registros)
+        finally:
+            medicion.detener()
+    count = len(registros)
+
+    campos = medicion.campos_carga(count, hoja)
+    metricas.histograma('pac_importacion_duracion_segundos', medicion.total, tipo=modelo_class.MODULO)
+    metricas.contador('pac_importacion_filas_total', count, tipo=modelo_class.MODULO)
+    metricas.gauge('pac_importacion_filas_por_segundo', campos['filas_por_segundo'] or 0, tipo=modelo_class.MODULO)
+    if estadisticas is not None:
+        estadisticas.update(campos)
+    return count
+
+
+def _leer_hoja(archivo, vigencia, modelo_class, usuario, nombre_hoja, medicion):
+    """Lectura de importar_excel_pac. Retorna (lista de registros sin guardar, titulo de la hoja leida)."""
     wb = load_workbook(archivo, data_only=True)
 
     if nombre_hoja:
@@ -211,11 +356,9 @@ def importar_excel_pac(archivo, vigencia, modelo_class, usuario, nombre_hoja=Non
             ws = wb.active
     else:
         ws = wb.active
+    medicion.etapa('lectura')
 
-    # Eliminar datos anteriores de la misma vigencia
-    modelo_class.objects.filter(vigencia=vigencia).delete()
-
-    count = 0
+    registros = []
     seccion_actual = 'INGRESOS'  # Empezamos en seccion de ingresos
 
     # Iterar desde fila 5 (despues de titulos y encabezados)
@@ -226,6 +369,7 @@ def importar_excel_pac(archivo, vigencia, modelo_class, usuario, nombre_hoja=Non
 
         # Saltar filas completamente vacias
         if col_b is None and col_c is None:
+            medicion.omitir('vacia')
             continue
 
         codigo = str(col_b or '').strip()
@@ -233,10 +377,12 @@ def importar_excel_pac(archivo, vigencia, modelo_class, usuario, nombre_hoja=Non
 
         # Si no tiene ni codigo ni nombre significativo, saltar
         if not codigo and not nombre:
+            medicion.omitir('sin_codigo_ni_nombre')
             continue
 
         # Saltar filas de firma/footer
         if any(x in nombre.upper() for x in ['SUBGERENTE', 'GERENTE', 'FIRMA', 'ELABOR']):
+            medicion.omitir('firma')
             continue
 
         # Detectar tipo y categoria
@@ -252,6 +398,7 @@ def importar_excel_pac(archivo, vigencia, modelo_class, usuario, nombre_hoja=Non
                 es_subtotal = False
             elif codigo not in ('A', 'B', '1', '2', '3', '4', '5'):
                 es_subtotal = True
+        medicion.etapa('clasificacion')
 
         # Leer valores numericos
         aprop_inicial = safe_decimal(ws.cell(row=row_idx, column=4).value)
@@ -274,6 +421,7 @@ def importar_excel_pac(archivo, vigencia, modelo_class, usuario, nombre_hoja=Non
         noviembre_val = safe_decimal(ws.cell(row=row_idx, column=20).value)
         diciembre_val = safe_decimal(ws.cell(row=row_idx, column=21).value)
         total_val = safe_decimal(ws.cell(row=row_idx, column=22).value)
+        medicion.etapa('conversion')
 
         # Solo saltar filas sin datos numericos Y sin codigo significativo
         tiene_datos = any([
@@ -284,10 +432,12 @@ def importar_excel_pac(archivo, vigencia, modelo_class, usuario, nombre_hoja=Non
         ])
 
         if not tiene_datos and not codigo:
+            medicion.omitir('sin_datos')
             continue
 
         # Si es solo el titulo de seccion "GASTOS", no crear registro
         if nombre.upper() == 'GASTOS' and not codigo:
+            medicion.omitir('titulo_seccion')
             continue
 
         # Incluir numero RP/CxP en el codigo si existe
@@ -305,8 +455,9 @@ def importar_excel_pac(archivo, vigencia, modelo_class, usuario, nombre_hoja=Non
             if len(parts) >= 3:
                 fuente_code = parts[-1].strip().split(' ')[0]  # Tomar solo el codigo
                 fuente = fuente_code
+        medicion.etapa('clasificacion')
 
-        modelo_class.objects.create(
+        registro = modelo_class(
             vigencia=vigencia,
             tipo=tipo,
             categoria=categoria,
@@ -340,6 +491,20 @@ def importar_excel_pac(archivo, vigencia, modelo_class, usuario, nombre_hoja=Non
             fila_excel=row_idx,
             usuario=usuario,
         )
-        count += 1
+        registro.normalizar()
+        registros.append(registro)
+        medicion.etapa('conversion')
+
+    return registros, ws.title
+
+
+def _guardar_registros(modelo_class, vigencia, registros, medicion):
+    """Reemplaza los registros del modulo y vigencia; se llama dentro de la transaccion de la carga."""
+    eliminar_datos_vigencia(modelo_class, vigencia)
+    medicion.etapa('eliminacion')
+    # Los valores mensuales necesitan el pk de cada registro
+    insertar(modelo_class, registros, asignar_pk=True, tamano_lote=500)
+    # Tabla larga de valores mensuales (una fila por registro y mes)
+    insertar(PACValorMensual, [valor for registro in registros for valor in construir_valores_mensuales(registro)])
+    medicion.etapa('insercion')
 
-    return count
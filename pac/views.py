@@ -1,28 +1,59 @@
+import hmac
+import ipaddress
 import json
+from functools import lru_cache
 from decimal import Decimal, InvalidOperation
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib import messages
-from django.http import HttpResponse
-from django.db.models import Sum
-from django.db.models.functions import Coalesce
-from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-from openpyxl.utils import get_column_letter
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.conf import settings
+from django.urls import reverse
+from django.views.decorators.http import require_POST
+from django.db import router, transaction
+from django.db.models import Count, F, Q, Sum
 
 from .models import (
     AIMInicial, PACProgramado, PACEjecutadoCompromiso, PACEjecutadoPago,
-    CargaArchivo, FuenteFinanciacion, MESES, MESES_DISPLAY
+    Alerta, CargaArchivo, FuenteFinanciacion, ResumenRubro, TrabajoExportacion, MESES, MESES_DISPLAY
 )
 from .forms import ImportarArchivoForm, FuenteFinanciacionForm
-from .utils import importar_excel_pac, safe_decimal
+from .utils import importar_excel_pac, safe_decimal, eliminar_modulo
+from .consultas import serie_mensual, totales_mensuales, campo_apropiacion, campo_total
+from .archivado import VigenciaArchivada
+from .concurrencia import ImportacionEnCurso, bloqueo_importacion
+from .xlsx_stream import LibroStream, HojaStream, CONTENT_TYPE_XLSX
+from .libro_consolidado import construir_libro
+from . import (
+    alertas, busqueda, cache_exportaciones, comparacion, exportacion, metricas, proyeccion, resumen, simulacion,
+    trabajos,
+)
+from .middleware import estadisticas_vistas
 
 
 D0 = Decimal('0')
 
 
 def _sum(qs, field):
-    return qs.aggregate(t=Coalesce(Sum(field), D0))['t']
+    return qs.aggregate(t=Sum(field))['t'] or D0
+
+
+def _sum_por(qs, campos, field=None):
+    """Suma agrupada: retorna {tupla de valores de campos: total}. Por defecto suma campo_total()."""
+    return {
+        tuple(fila[c] for c in campos): fila['t'] or D0
+        for fila in qs.values(*campos).annotate(t=Sum(field or campo_total())).order_by()
+    }
+
+
+def _mes_param(request, nombre, defecto):
+    """Lee un numero de mes (1-12) de los parametros GET."""
+    try:
+        mes = int(request.GET.get(nombre, defecto))
+    except (TypeError, ValueError):
+        return defecto
+    return mes if 1 <= mes <= 12 else defecto
 
 
 # ============================================================
@@ -41,29 +72,31 @@ def dashboard(request):
     comp_qs = PACEjecutadoCompromiso.objects.filter(vigencia=vigencia, es_subtotal=False)
     pago_qs = PACEjecutadoPago.objects.filter(vigencia=vigencia, es_subtotal=False)
 
-    aim_ingresos = _sum(aim_qs.filter(tipo='INGRESO').exclude(categoria__in=_excl_ing), 'apropiacion_definitiva')
-    aim_gastos = _sum(aim_qs.filter(tipo='GASTO').exclude(categoria__in=_excl_gas), 'apropiacion_definitiva')
+    aim_ingresos = _sum(aim_qs.filter(tipo='INGRESO').exclude(categoria__in=_excl_ing), campo_apropiacion())
+    aim_gastos = _sum(aim_qs.filter(tipo='GASTO').exclude(categoria__in=_excl_gas), campo_apropiacion())
 
-    prog_ingresos = _sum(prog_qs.filter(tipo='INGRESO').exclude(categoria__in=_excl_ing), 'total')
-    prog_gastos = _sum(prog_qs.filter(tipo='GASTO').exclude(categoria__in=_excl_gas), 'total')
+    prog_ingresos = _sum(prog_qs.filter(tipo='INGRESO').exclude(categoria__in=_excl_ing), campo_total())
+    prog_gastos = _sum(prog_qs.filter(tipo='GASTO').exclude(categoria__in=_excl_gas), campo_total())
 
-    comp_ingresos = _sum(comp_qs.filter(tipo='INGRESO').exclude(categoria__in=_excl_ing), 'total')
-    comp_gastos = _sum(comp_qs.filter(tipo='GASTO').exclude(categoria__in=_excl_gas), 'total')
+    comp_ingresos = _sum(comp_qs.filter(tipo='INGRESO').exclude(categoria__in=_excl_ing), campo_total())
+    comp_gastos = _sum(comp_qs.filter(tipo='GASTO').exclude(categoria__in=_excl_gas), campo_total())
 
-    pago_ingresos = _sum(pago_qs.filter(tipo='INGRESO').exclude(categoria__in=_excl_ing), 'total')
-    pago_gastos = _sum(pago_qs.filter(tipo='GASTO').exclude(categoria__in=_excl_gas), 'total')
+    pago_ingresos = _sum(pago_qs.filter(tipo='INGRESO').exclude(categoria__in=_excl_ing), campo_total())
+    pago_gastos = _sum(pago_qs.filter(tipo='GASTO').exclude(categoria__in=_excl_gas), campo_total())
 
-    datos_mensuales_ingresos = []
-    datos_mensuales_gastos = []
-    for mes in MESES:
-        datos_mensuales_ingresos.append({
-            'programado': float(_sum(prog_qs.filter(tipo='INGRESO').exclude(categoria__in=_excl_ing), mes)),
-            'ejecutado': float(_sum(pago_qs.filter(tipo='INGRESO').exclude(categoria__in=_excl_ing), mes)),
-        })
-        datos_mensuales_gastos.append({
-            'programado': float(_sum(prog_qs.filter(tipo='GASTO').exclude(categoria__in=_excl_gas), mes)),
-            'ejecutado': float(_sum(pago_qs.filter(tipo='GASTO').exclude(categoria__in=_excl_gas), mes)),
-        })
+    # Series mensuales desde la tabla larga (un GROUP BY mes por serie)
+    base_ing = {'tipo': 'INGRESO', 'es_subtotal': False, 'excluir_categorias': _excl_ing}
+    base_gas = {'tipo': 'GASTO', 'es_subtotal': False, 'excluir_categorias': _excl_gas}
+    datos_mensuales_ingresos = [
+        {'programado': float(p), 'ejecutado': float(e)}
+        for p, e in zip(serie_mensual(PACProgramado, vigencia, **base_ing),
+                        serie_mensual(PACEjecutadoPago, vigencia, **base_ing))
+    ]
+    datos_mensuales_gastos = [
+        {'programado': float(p), 'ejecutado': float(e)}
+        for p, e in zip(serie_mensual(PACProgramado, vigencia, **base_gas),
+                        serie_mensual(PACEjecutadoPago, vigencia, **base_gas))
+    ]
 
     pct_ing = (float(pago_ingresos) / float(prog_ingresos) * 100) if prog_ingresos else 0
     pct_gas = (float(pago_gastos) / float(prog_gastos) * 100) if prog_gastos else 0
@@ -71,6 +104,10 @@ def dashboard(request):
 
     cargas_recientes = CargaArchivo.objects.all()[:5]
 
+    # Alertas calculadas en la importacion (pac/alertas.py): aqui solo se leen
+    alertas_vigencia = Alerta.objects.filter(vigencia=vigencia)
+    conteo_alertas = dict(alertas_vigencia.values_list('nivel').annotate(n=Count('id')).order_by())
+
     context = {
         'vigencia': vigencia,
         'aim_ingresos': aim_ingresos, 'aim_gastos': aim_gastos,
@@ -82,6 +119,9 @@ def dashboard(request):
         'meses_display': json.dumps(MESES_DISPLAY),
         'pct_ing': round(pct_ing, 1), 'pct_gas': round(pct_gas, 1), 'pct_comp': round(pct_comp, 1),
         'cargas_recientes': cargas_recientes,
+        'alertas': alertas_vigencia[:10],
+        'alertas_criticas': conteo_alertas.get('CRITICA', 0),
+        'alertas_advertencias': conteo_alertas.get('ADVERTENCIA', 0),
     }
     return render(request, 'pac/dashboard.html', context)
 
@@ -98,21 +138,22 @@ def aim_inicial(request):
     # AIM Inicial solo muestra presupuesto vigente (sin Saldo Inicial, Reservas, CxP)
     _excl_aim = ['SALDO_INICIAL', 'RESERVAS', 'CUENTAS_POR_PAGAR']
     registros = AIMInicial.objects.filter(vigencia=vigencia).exclude(categoria__in=_excl_aim)
+    filtros = {}
     if tipo_filtro:
-        registros = registros.filter(tipo=tipo_filtro)
+        filtros['tipo'] = tipo_filtro
     if cat_filtro:
-        registros = registros.filter(categoria=cat_filtro)
+        filtros['categoria'] = cat_filtro
+    registros = registros.filter(**filtros)
 
     no_sub = registros.filter(es_subtotal=False)
-    total_ingresos = _sum(no_sub.filter(tipo='INGRESO'), 'apropiacion_definitiva')
-    total_gastos = _sum(no_sub.filter(tipo='GASTO'), 'apropiacion_definitiva')
+    total_ingresos = _sum(no_sub.filter(tipo='INGRESO'), campo_apropiacion())
+    total_gastos = _sum(no_sub.filter(tipo='GASTO'), campo_apropiacion())
 
     # Totales mensuales para el footer
-    no_sub_all = registros.filter(es_subtotal=False)
-    totales = {}
-    for mes in MESES:
-        totales[mes] = _sum(no_sub_all, mes)
-    totales['total'] = _sum(no_sub_all, 'total')
+    totales = totales_mensuales(
+        AIMInicial, vigencia, es_subtotal=False, excluir_categorias=_excl_aim, **filtros
+    )
+    totales['total'] = _sum(no_sub, campo_total())
 
     context = {
         'registros': registros,
@@ -138,11 +179,13 @@ def importar_aim_inicial(request):
             archivo = request.FILES['archivo']
             vigencia = form.cleaned_data['vigencia']
             try:
-                count = importar_excel_pac(archivo, vigencia, AIMInicial, request.user)
+                estadisticas = {}
+                count = importar_excel_pac(archivo, vigencia, AIMInicial, request.user, estadisticas=estadisticas)
                 CargaArchivo.objects.create(
                     tipo='AIM_INICIAL', archivo=archivo, usuario=request.user,
                     registros_cargados=count,
-                    observaciones=f'Vigencia {vigencia}. {count} registros cargados desde formato AIM.'
+                    observaciones=f'Vigencia {vigencia}. {count} registros cargados desde formato AIM.',
+                    **estadisticas,
                 )
                 messages.success(request, f'Se cargaron {count} registros de AIM Inicial correctamente.')
                 return redirect('aim_inicial')
@@ -167,17 +210,16 @@ def pac_programado(request):
     tipo_filtro = request.GET.get('tipo', '')
     cat_filtro = request.GET.get('categoria', '')
 
-    registros = PACProgramado.objects.filter(vigencia=vigencia)
+    filtros = {}
     if tipo_filtro:
-        registros = registros.filter(tipo=tipo_filtro)
+        filtros['tipo'] = tipo_filtro
     if cat_filtro:
-        registros = registros.filter(categoria=cat_filtro)
+        filtros['categoria'] = cat_filtro
+    registros = PACProgramado.objects.filter(vigencia=vigencia, **filtros)
 
     no_sub = registros.filter(es_subtotal=False)
-    totales = {}
-    for mes in MESES:
-        totales[mes] = _sum(no_sub, mes)
-    totales['total'] = _sum(no_sub, 'total')
+    totales = totales_mensuales(PACProgramado, vigencia, es_subtotal=False, **filtros)
+    totales['total'] = _sum(no_sub, campo_total())
 
     context = {
         'registros': registros, 'vigencia': vigencia,
@@ -196,14 +238,16 @@ def importar_pac_programado(request):
             archivo = request.FILES['archivo']
             vigencia = form.cleaned_data['vigencia']
             try:
+                estadisticas = {}
                 count = importar_excel_pac(
                     archivo, vigencia, PACProgramado, request.user,
-                    nombre_hoja='PROG PAC'
+                    nombre_hoja='PROG PAC', estadisticas=estadisticas
                 )
                 CargaArchivo.objects.create(
                     tipo='PROGRAMADO', archivo=archivo, usuario=request.user,
                     registros_cargados=count,
-                    observaciones=f'Vigencia {vigencia}. {count} registros. Hoja: PROG PAC INGRESOS-GASTOS.'
+                    observaciones=f'Vigencia {vigencia}. {count} registros. Hoja: PROG PAC INGRESOS-GASTOS.',
+                    **estadisticas,
                 )
                 messages.success(request, f'Se cargaron {count} registros de PAC Programado.')
                 return redirect('pac_programado')
@@ -228,17 +272,16 @@ def pac_ejecutado_compromisos(request):
     tipo_filtro = request.GET.get('tipo', '')
     cat_filtro = request.GET.get('categoria', '')
 
-    registros = PACEjecutadoCompromiso.objects.filter(vigencia=vigencia)
+    filtros = {}
     if tipo_filtro:
-        registros = registros.filter(tipo=tipo_filtro)
+        filtros['tipo'] = tipo_filtro
     if cat_filtro:
-        registros = registros.filter(categoria=cat_filtro)
+        filtros['categoria'] = cat_filtro
+    registros = PACEjecutadoCompromiso.objects.filter(vigencia=vigencia, **filtros)
 
     no_sub = registros.filter(es_subtotal=False)
-    totales = {}
-    for mes in MESES:
-        totales[mes] = _sum(no_sub, mes)
-    totales['total'] = _sum(no_sub, 'total')
+    totales = totales_mensuales(PACEjecutadoCompromiso, vigencia, es_subtotal=False, **filtros)
+    totales['total'] = _sum(no_sub, campo_total())
 
     context = {
         'registros': registros, 'vigencia': vigencia,
@@ -257,14 +300,16 @@ def importar_pac_compromisos(request):
             archivo = request.FILES['archivo']
             vigencia = form.cleaned_data['vigencia']
             try:
+                estadisticas = {}
                 count = importar_excel_pac(
                     archivo, vigencia, PACEjecutadoCompromiso, request.user,
-                    nombre_hoja='EJECUTADO COMPROMISO'
+                    nombre_hoja='EJECUTADO COMPROMISO', estadisticas=estadisticas
                 )
                 CargaArchivo.objects.create(
                     tipo='EJECUTADO_COMPROMISO', archivo=archivo, usuario=request.user,
                     registros_cargados=count,
-                    observaciones=f'Vigencia {vigencia}. {count} registros. Hoja: PAC EJECUTADO COMPROMISOS.'
+                    observaciones=f'Vigencia {vigencia}. {count} registros. Hoja: PAC EJECUTADO COMPROMISOS.',
+                    **estadisticas,
                 )
                 messages.success(request, f'Se cargaron {count} registros de PAC Ejecutado Compromisos.')
                 return redirect('pac_ejecutado_compromisos')
@@ -289,17 +334,16 @@ def pac_ejecutado_pagos(request):
     tipo_filtro = request.GET.get('tipo', '')
     cat_filtro = request.GET.get('categoria', '')
 
-    registros = PACEjecutadoPago.objects.filter(vigencia=vigencia)
+    filtros = {}
     if tipo_filtro:
-        registros = registros.filter(tipo=tipo_filtro)
+        filtros['tipo'] = tipo_filtro
     if cat_filtro:
-        registros = registros.filter(categoria=cat_filtro)
+        filtros['categoria'] = cat_filtro
+    registros = PACEjecutadoPago.objects.filter(vigencia=vigencia, **filtros)
 
     no_sub = registros.filter(es_subtotal=False)
-    totales = {}
-    for mes in MESES:
-        totales[mes] = _sum(no_sub, mes)
-    totales['total'] = _sum(no_sub, 'total')
+    totales = totales_mensuales(PACEjecutadoPago, vigencia, es_subtotal=False, **filtros)
+    totales['total'] = _sum(no_sub, campo_total())
 
     context = {
         'registros': registros, 'vigencia': vigencia,
@@ -318,14 +362,16 @@ def importar_pac_pagos(request):
             archivo = request.FILES['archivo']
             vigencia = form.cleaned_data['vigencia']
             try:
+                estadisticas = {}
                 count = importar_excel_pac(
                     archivo, vigencia, PACEjecutadoPago, request.user,
-                    nombre_hoja='EJECUTADO PAGO'
+                    nombre_hoja='EJECUTADO PAGO', estadisticas=estadisticas
                 )
                 CargaArchivo.objects.create(
                     tipo='EJECUTADO_PAGO', archivo=archivo, usuario=request.user,
                     registros_cargados=count,
-                    observaciones=f'Vigencia {vigencia}. {count} registros. Hoja: PAC EJECUTADO PAGOS.'
+                    observaciones=f'Vigencia {vigencia}. {count} registros. Hoja: PAC EJECUTADO PAGOS.',
+                    **estadisticas,
                 )
                 messages.success(request, f'Se cargaron {count} registros de PAC Ejecutado Pagos.')
                 return redirect('pac_ejecutado_pagos')
@@ -345,63 +391,63 @@ def importar_pac_pagos(request):
 # SEGUIMIENTO PAC
 # ============================================================
 def _build_seguimiento(vigencia, tipo_pac, modelo_prog, modelo_ejec, label_prog='Programado', label_ejec='Ejecutado'):
-    """Construye datos de seguimiento agrupados por categoria con detalle de items."""
-    categorias = set()
-    for model in [modelo_prog, modelo_ejec]:
-        categorias.update(
-            model.objects.filter(vigencia=vigencia, tipo=tipo_pac, es_subtotal=False)
-            .values_list('categoria', flat=True).distinct()
-        )
+    """
+    Construye datos de seguimiento agrupados por categoria con detalle de items.
+    Lee el resumen por rubro (pac/resumen.py): una consulta agrupada por categoria y una fila por rubro.
+    """
+    bandera_prog = resumen.COLUMNAS_MODULO[modelo_prog.MODULO][0]
+    bandera_ejec = resumen.COLUMNAS_MODULO[modelo_ejec.MODULO][0]
+    columnas_prog, columnas_ejec = resumen.columnas(modelo_prog.MODULO), resumen.columnas(modelo_ejec.MODULO)
+    rubros = ResumenRubro.objects.filter(
+        Q(**{bandera_prog: True}) | Q(**{bandera_ejec: True}), vigencia=vigencia, tipo=tipo_pac,
+    )
+
+    # Meses y total (ultima columna) de programado y ejecutado por categoria, sumados en la base de datos
+    columnas = columnas_prog + columnas_ejec
+    por_categoria = {
+        fila['categoria']: [fila[f'suma_{c}'] for c in columnas]
+        for fila in rubros.values('categoria').annotate(**{f'suma_{c}': Sum(c) for c in columnas}).order_by()
+    }
+
+    # Items individuales (rubros hoja del modulo programado) por categoria, en el orden del Excel
+    rubros_por_cat = {}
+    for categoria, codigo_rubro, nombre_rubro, *valores in (
+        rubros.filter(**{bandera_prog: True}).values_list('categoria', 'codigo_rubro', 'nombre_rubro', *columnas)
+    ):
+        rubros_por_cat.setdefault(categoria, []).append((codigo_rubro, nombre_rubro, valores))
 
+    n = len(columnas_prog)
     datos = []
-    for cat in sorted(categorias):
+    for cat in sorted(por_categoria):
         if not cat:
             continue
         cat_display = dict(AIMInicial.CATEGORIA_CHOICES).get(cat, cat)
+        valores = por_categoria[cat]
 
         # Fila agregada de categoria
         fila = {'fuente': cat_display, 'es_categoria': True, 'meses': [], 'items': []}
-        for mes in MESES:
-            prog = _sum(modelo_prog.objects.filter(vigencia=vigencia, tipo=tipo_pac, categoria=cat, es_subtotal=False), mes)
-            ejec = _sum(modelo_ejec.objects.filter(vigencia=vigencia, tipo=tipo_pac, categoria=cat, es_subtotal=False), mes)
+        for prog, ejec in zip(valores[:n - 1], valores[n:-1]):
             pct = (float(ejec) / float(prog) * 100) if prog else 0
             fila['meses'].append({'programado': prog, 'ejecutado': ejec, 'pct': round(pct, 1)})
 
-        prog_total = _sum(modelo_prog.objects.filter(vigencia=vigencia, tipo=tipo_pac, categoria=cat, es_subtotal=False), 'total')
-        ejec_total = _sum(modelo_ejec.objects.filter(vigencia=vigencia, tipo=tipo_pac, categoria=cat, es_subtotal=False), 'total')
+        prog_total, ejec_total = valores[n - 1], valores[-1]
         pct_total = (float(ejec_total) / float(prog_total) * 100) if prog_total else 0
         fila['prog_total'] = prog_total
         fila['ejec_total'] = ejec_total
         fila['pct_total'] = round(pct_total, 1)
 
-        # Items individuales (rubros hoja) dentro de esta categoria
-        rubros = modelo_prog.objects.filter(
-            vigencia=vigencia, tipo=tipo_pac, categoria=cat, es_subtotal=False
-        ).values_list('codigo_rubro', 'nombre_rubro').distinct()
-
-        for codigo_rubro, nombre_rubro in rubros:
+        for codigo_rubro, nombre_rubro, valores_rubro in rubros_por_cat.get(cat, []):
             item = {
                 'fuente': nombre_rubro or codigo_rubro,
                 'codigo': codigo_rubro,
                 'es_categoria': False,
                 'meses': [],
             }
-            for mes in MESES:
-                p = _sum(modelo_prog.objects.filter(
-                    vigencia=vigencia, tipo=tipo_pac, categoria=cat,
-                    codigo_rubro=codigo_rubro, es_subtotal=False), mes)
-                e = _sum(modelo_ejec.objects.filter(
-                    vigencia=vigencia, tipo=tipo_pac, categoria=cat,
-                    codigo_rubro=codigo_rubro, es_subtotal=False), mes)
+            for p, e in zip(valores_rubro[:n - 1], valores_rubro[n:-1]):
                 pct_i = (float(e) / float(p) * 100) if p else 0
                 item['meses'].append({'programado': p, 'ejecutado': e, 'pct': round(pct_i, 1)})
 
-            pt = _sum(modelo_prog.objects.filter(
-                vigencia=vigencia, tipo=tipo_pac, categoria=cat,
-                codigo_rubro=codigo_rubro, es_subtotal=False), 'total')
-            et = _sum(modelo_ejec.objects.filter(
-                vigencia=vigencia, tipo=tipo_pac, categoria=cat,
-                codigo_rubro=codigo_rubro, es_subtotal=False), 'total')
+            pt, et = valores_rubro[n - 1], valores_rubro[-1]
             pct_t = (float(et) / float(pt) * 100) if pt else 0
             item['prog_total'] = pt
             item['ejec_total'] = et
@@ -473,16 +519,14 @@ def seguimiento_compromisos_vs_pagos(request):
 # ============================================================
 # REPORTES Y ANALISIS
 # ============================================================
-@login_required
-def reportes(request):
-    vigencia = int(request.GET.get('vigencia', 2026))
-
-    categorias = set()
-    for model in [AIMInicial, PACProgramado, PACEjecutadoCompromiso, PACEjecutadoPago]:
-        categorias.update(
-            model.objects.filter(vigencia=vigencia, es_subtotal=False)
-            .values_list('categoria', flat=True).distinct()
-        )
+def _build_reporte_categorias(vigencia):
+    """Totales por categoria de los cuatro modulos (una consulta agrupada por modulo)."""
+    base = {'vigencia': vigencia, 'es_subtotal': False}
+    aim = _sum_por(AIMInicial.objects.filter(**base), ['categoria', 'tipo'], campo_apropiacion())
+    prog = _sum_por(PACProgramado.objects.filter(**base), ['categoria', 'tipo'])
+    comp = _sum_por(PACEjecutadoCompromiso.objects.filter(**base), ['categoria', 'tipo'])
+    pago = _sum_por(PACEjecutadoPago.objects.filter(**base), ['categoria', 'tipo'])
+    categorias = {cat for totales in [aim, prog, comp, pago] for cat, _ in totales}
 
     cat_display_map = dict(AIMInicial.CATEGORIA_CHOICES)
     reporte_fuentes = []
@@ -490,21 +534,27 @@ def reportes(request):
         if not cat:
             continue
         fila = {'fuente': cat_display_map.get(cat, cat)}
-        base_f = {'vigencia': vigencia, 'categoria': cat, 'es_subtotal': False}
-
-        fila['aim_ingresos'] = _sum(AIMInicial.objects.filter(tipo='INGRESO', **base_f), 'apropiacion_definitiva')
-        fila['aim_gastos'] = _sum(AIMInicial.objects.filter(tipo='GASTO', **base_f), 'apropiacion_definitiva')
-        fila['prog_ingresos'] = _sum(PACProgramado.objects.filter(tipo='INGRESO', **base_f), 'total')
-        fila['prog_gastos'] = _sum(PACProgramado.objects.filter(tipo='GASTO', **base_f), 'total')
-        fila['comp_ingresos'] = _sum(PACEjecutadoCompromiso.objects.filter(tipo='INGRESO', **base_f), 'total')
-        fila['comp_gastos'] = _sum(PACEjecutadoCompromiso.objects.filter(tipo='GASTO', **base_f), 'total')
-        fila['pago_ingresos'] = _sum(PACEjecutadoPago.objects.filter(tipo='INGRESO', **base_f), 'total')
-        fila['pago_gastos'] = _sum(PACEjecutadoPago.objects.filter(tipo='GASTO', **base_f), 'total')
+        fila['aim_ingresos'] = aim.get((cat, 'INGRESO'), D0)
+        fila['aim_gastos'] = aim.get((cat, 'GASTO'), D0)
+        fila['prog_ingresos'] = prog.get((cat, 'INGRESO'), D0)
+        fila['prog_gastos'] = prog.get((cat, 'GASTO'), D0)
+        fila['comp_ingresos'] = comp.get((cat, 'INGRESO'), D0)
+        fila['comp_gastos'] = comp.get((cat, 'GASTO'), D0)
+        fila['pago_ingresos'] = pago.get((cat, 'INGRESO'), D0)
+        fila['pago_gastos'] = pago.get((cat, 'GASTO'), D0)
 
         fila['pct_ing'] = round(float(fila['pago_ingresos']) / float(fila['prog_ingresos']) * 100, 1) if fila['prog_ingresos'] else 0
         fila['pct_gas_comp'] = round(float(fila['comp_gastos']) / float(fila['prog_gastos']) * 100, 1) if fila['prog_gastos'] else 0
         fila['pct_gas_pago'] = round(float(fila['pago_gastos']) / float(fila['prog_gastos']) * 100, 1) if fila['prog_gastos'] else 0
         reporte_fuentes.append(fila)
+    return reporte_fuentes
+
+
+@login_required
+def reportes(request):
+    vigencia = int(request.GET.get('vigencia', 2026))
+
+    reporte_fuentes = _build_reporte_categorias(vigencia)
 
     grafica_fuentes = {
         'labels': [f['fuente'][:30] for f in reporte_fuentes],
@@ -516,16 +566,28 @@ def reportes(request):
 
     resumen_mensual = []
     acum_prog_ing = acum_ejec_ing = acum_prog_gas = acum_comp_gas = acum_pago_gas = D0
-    base_no_sub = {'vigencia': vigencia, 'es_subtotal': False}
     _excl_ing = ['SALDO_INICIAL']
     _excl_gas = ['RESERVAS', 'CUENTAS_POR_PAGAR']
 
-    for i, mes in enumerate(MESES):
-        prog_ing = _sum(PACProgramado.objects.filter(tipo='INGRESO', **base_no_sub).exclude(categoria__in=_excl_ing), mes)
-        ejec_ing = _sum(PACEjecutadoPago.objects.filter(tipo='INGRESO', **base_no_sub).exclude(categoria__in=_excl_ing), mes)
-        prog_gas = _sum(PACProgramado.objects.filter(tipo='GASTO', **base_no_sub).exclude(categoria__in=_excl_gas), mes)
-        comp_gas = _sum(PACEjecutadoCompromiso.objects.filter(tipo='GASTO', **base_no_sub).exclude(categoria__in=_excl_gas), mes)
-        pago_gas = _sum(PACEjecutadoPago.objects.filter(tipo='GASTO', **base_no_sub).exclude(categoria__in=_excl_gas), mes)
+    # Rango de meses opcional (ej: mes_desde=1&mes_hasta=9 para Q1-Q3)
+    mes_desde = _mes_param(request, 'mes_desde', 1)
+    mes_hasta = _mes_param(request, 'mes_hasta', 12)
+    if mes_desde > mes_hasta:
+        mes_desde, mes_hasta = mes_hasta, mes_desde
+    rango = {'mes_desde': mes_desde, 'mes_hasta': mes_hasta, 'es_subtotal': False}
+    base_ing = {'tipo': 'INGRESO', 'excluir_categorias': _excl_ing, **rango}
+    base_gas = {'tipo': 'GASTO', 'excluir_categorias': _excl_gas, **rango}
+    series = zip(
+        serie_mensual(PACProgramado, vigencia, **base_ing),
+        serie_mensual(PACEjecutadoPago, vigencia, **base_ing),
+        serie_mensual(PACProgramado, vigencia, **base_gas),
+        serie_mensual(PACEjecutadoCompromiso, vigencia, **base_gas),
+        serie_mensual(PACEjecutadoPago, vigencia, **base_gas),
+    )
+
+    for i, (prog_ing, ejec_ing, prog_gas, comp_gas, pago_gas) in enumerate(series):
+        if not mes_desde <= i + 1 <= mes_hasta:
+            continue
 
         acum_prog_ing += prog_ing
         acum_ejec_ing += ejec_ing
@@ -552,182 +614,508 @@ def reportes(request):
         'resumen_mensual': resumen_mensual,
         'meses_display': json.dumps(MESES_DISPLAY),
         'cargas': cargas,
+        'mes_desde': mes_desde, 'mes_hasta': mes_hasta,
+        'meses_opciones': list(enumerate(MESES_DISPLAY, start=1)),
     }
     return render(request, 'pac/reportes.html', context)
 
 
 # ============================================================
-# EXPORTAR A EXCEL
+# COMPARACION ENTRE VIGENCIAS
 # ============================================================
+def _vigencias_param(request):
+    """Vigencias a comparar (?vigencias=2025,2026 o repetido); por defecto la vigencia y la anterior."""
+    vigencias = set()
+    for valor in request.GET.getlist('vigencias'):
+        for parte in valor.split(','):
+            try:
+                vigencias.add(int(parte))
+            except ValueError:
+                continue
+    if not vigencias:
+        vigencia = int(request.GET.get('vigencia', 2026))
+        vigencias = {vigencia - 1, vigencia}
+    return sorted(vigencias)[-comparacion.MAX_VIGENCIAS:]
+
+
+def _variacion(valores, campo):
+    """Variacion porcentual de `campo` entre la primera y la ultima vigencia comparada."""
+    inicial, final = valores[0][campo], valores[-1][campo]
+    return round((float(final) - float(inicial)) / float(inicial) * 100, 1) if inicial else None
+
+
 @login_required
-def exportar_seguimiento_excel(request, tipo):
+def comparacion_vigencias(request):
+    vigencias = _vigencias_param(request)
+    datos = comparacion.comparar(vigencias)
+
+    curvas = datos['curvas']
+    claves = [clave for clave, *_ in comparacion.CURVAS]
+    meses = [
+        {'mes': nombre, 'valores': [{clave: curva[clave][i] for clave in claves} for curva in curvas]}
+        for i, nombre in enumerate(MESES_DISPLAY)
+    ]
+    grafica = [
+        {
+            'vigencia': curva['vigencia'],
+            'acum_ejec_ing': [float(v) for v in curva['acum_ejec_ing']],
+            'acum_pago_gas': [float(v) for v in curva['acum_pago_gas']],
+        }
+        for curva in curvas
+    ]
+    categorias = [{**c, 'variacion': _variacion(c['valores'], 'pago')} for c in datos['categorias']]
+    rubros = [{**r, 'variacion': _variacion(r['valores'], 'pago')} for r in datos['rubros']]
+
+    context = {
+        'vigencias': vigencias, 'vigencias_texto': ','.join(map(str, vigencias)),
+        'vigencia': vigencias[-1],
+        'meses': meses, 'categorias': categorias, 'rubros': rubros,
+        'grafica': json.dumps(grafica),
+        'meses_display': json.dumps(MESES_DISPLAY),
+    }
+    return render(request, 'pac/comparacion.html', context)
+
+
+@login_required
+def api_comparacion(request):
+    """Comparacion entre vigencias en JSON (importes como texto decimal exacto)."""
+    return JsonResponse(comparacion.comparar(_vigencias_param(request)))
+
+
+# ============================================================
+# PROYECCION DE CAJA
+# ============================================================
+def _proyeccion_param(request):
+    """Vigencia y mes de corte (?mes_corte=1..12; vacio = ultimo mes con ejecucion)."""
     vigencia = int(request.GET.get('vigencia', 2026))
-    wb = Workbook()
-    ws = wb.active
-    hf = Font(bold=True, color='FFFFFF', size=11)
-    fill_g = PatternFill(start_color='4CAF50', end_color='4CAF50', fill_type='solid')
-    fill_o = PatternFill(start_color='FF5722', end_color='FF5722', fill_type='solid')
-    brd = Border(left=Side(style='thin'), right=Side(style='thin'), top=Side(style='thin'), bottom=Side(style='thin'))
-
-    if tipo == 'ingresos':
-        ws.title = 'Seg. Ingresos'
-        fill = fill_g
-        datos = _build_seguimiento(vigencia, 'INGRESO', PACProgramado, PACEjecutadoPago)
-        titulo = 'SEGUIMIENTO PAC INGRESOS'
-    elif tipo == 'gastos':
-        ws.title = 'Seg. Gastos'
-        fill = fill_g
-        datos = _build_seguimiento(vigencia, 'GASTO', PACProgramado, PACEjecutadoPago)
-        titulo = 'SEGUIMIENTO PAC GASTOS'
-    else:
-        ws.title = 'Comp. vs Pagos'
-        fill = fill_o
-        datos = _build_seguimiento(vigencia, 'GASTO', PACEjecutadoCompromiso, PACEjecutadoPago)
-        titulo = 'SEGUIMIENTO COMPROMISOS VS PAGOS'
+    try:
+        mes_corte = min(max(int(request.GET['mes_corte']), 0), 12)
+    except (KeyError, ValueError):
+        mes_corte = None
+    return proyeccion.proyeccion_caja(vigencia, mes_corte)
+
+
+@login_required
+def proyeccion_caja(request):
+    datos = _proyeccion_param(request)
+    grafica = [
+        {'fuente': f['fuente'], 'saldo_ajustado': [float(v) for v in f['saldo_ajustado']]}
+        for f in datos['fuentes']
+    ]
+    total = datos['total']
+    meses = []
+    if total:
+        meses = [
+            {'mes': nombre, 'cerrado': i < datos['mes_corte'],
+             'saldo_plan': total['saldo_plan'][i], 'saldo_ajustado': total['saldo_ajustado'][i]}
+            for i, nombre in enumerate(MESES_DISPLAY)
+        ]
+    context = {
+        **datos, 'meses': meses, 'meses_nombres': MESES_DISPLAY,
+        'grafica': json.dumps(grafica),
+        'grafica_total': json.dumps([float(m['saldo_ajustado']) for m in meses]),
+        'meses_display': json.dumps(MESES_DISPLAY),
+    }
+    return render(request, 'pac/proyeccion_caja.html', context)
+
+
+@login_required
+def api_proyeccion_caja(request):
+    """Proyeccion de caja en JSON (importes como texto decimal exacto)."""
+    return JsonResponse(_proyeccion_param(request))
+
+
+# ============================================================
+# SIMULACION DE LIQUIDEZ
+# ============================================================
+def _entero_param(request, nombre, minimo, maximo):
+    try:
+        return min(max(int(request.GET[nombre]), minimo), maximo)
+    except (KeyError, ValueError):
+        return None
+
+
+def _simulacion_param(request):
+    """Vigencia, ?escenarios=, ?semilla= y ?mes_corte= de la simulacion."""
+    return simulacion.simular(
+        int(request.GET.get('vigencia', 2026)),
+        escenarios=_entero_param(request, 'escenarios', 1, simulacion.MAX_ESCENARIOS),
+        semilla=_entero_param(request, 'semilla', 0, 2 ** 32 - 1) or 0,
+        mes_corte=_entero_param(request, 'mes_corte', 0, 12),
+    )
+
+
+@login_required
+def simulacion_liquidez(request):
+    datos = _simulacion_param(request)
+    grafica = {}
+    meses = []
+    total = datos['total']
+    if total:
+        bandas = {b['percentil']: b['saldo'] for b in total['bandas']}
+        grafica = {str(p): [float(v) for v in saldo] for p, saldo in bandas.items()}
+        meses = [
+            {'mes': nombre, 'prob_deficit': total['prob_deficit'][i], 'saldos': [bandas[p][i] for p in datos['percentiles']]}
+            for i, nombre in enumerate(MESES_DISPLAY)
+        ]
+    context = {
+        **datos, 'meses': meses, 'meses_nombres': MESES_DISPLAY,
+        'grafica': json.dumps(grafica),
+        'meses_display': json.dumps(MESES_DISPLAY),
+    }
+    return render(request, 'pac/simulacion_liquidez.html', context)
+
+
+@login_required
+def api_simulacion_liquidez(request):
+    """Simulacion de liquidez en JSON (importes como texto decimal exacto, probabilidades en %)."""
+    return JsonResponse(_simulacion_param(request))
+
+
+# ============================================================
+# ALERTAS
+# ============================================================
+@login_required
+def alertas_lista(request):
+    vigencia = int(request.GET.get('vigencia', 2026))
+    filtros = {
+        campo: request.GET[param] for param, campo in
+        [('regla', 'regla'), ('nivel', 'nivel'), ('fuente', 'fuente_financiacion')] if request.GET.get(param)
+    }
+    context = {
+        'vigencia': vigencia,
+        'alertas': Alerta.objects.filter(vigencia=vigencia, **filtros),
+        'reglas': Alerta.REGLA_CHOICES, 'niveles': Alerta.NIVEL_CHOICES,
+        'regla_filtro': request.GET.get('regla', ''), 'nivel_filtro': request.GET.get('nivel', ''),
+        'fuente_filtro': request.GET.get('fuente', ''),
+        'meses_nombres': MESES_DISPLAY,
+    }
+    return render(request, 'pac/alertas.html', context)
+
+
+# ============================================================
+# BUSQUEDA DE RUBROS
+# ============================================================
+@login_required
+def api_buscar_rubros(request):
+    """Typeahead: rubros por nombre, codigo, BPIN o RP (?q=, ?limite=) con sus totales por modulo."""
+    vigencia = int(request.GET.get('vigencia', 2026))
+    consulta = request.GET.get('q', '')
+    limite = _entero_param(request, 'limite', 1, busqueda.MAX_LIMITE) or busqueda.LIMITE
+    return JsonResponse({
+        'vigencia': vigencia, 'consulta': consulta,
+        'resultados': busqueda.buscar(vigencia, consulta, limite),
+    })
+
+
+# ============================================================
+# EXPORTAR A EXCEL
+# ============================================================
+def _respuesta_cacheada(nombre_cache, filename, content_type, generar):
+    """
+    Sirve una exportacion desde la cache en disco; si no existe para la version
+    actual de los datos, la genera en streaming (`generar` retorna los bloques
+    de bytes) y la guarda mientras se envia.
+    """
+    ruta = cache_exportaciones.obtener(nombre_cache)
+    if ruta:
+        return FileResponse(open(ruta, 'rb'), as_attachment=True, filename=filename, content_type=content_type)
+    response = StreamingHttpResponse(
+        cache_exportaciones.guardar_mientras_envia(nombre_cache, generar()), content_type=content_type
+    )
+    response['Content-Disposition'] = f'attachment; filename={filename}'
+    return response
 
-    ws.append([titulo + f' - Vigencia {vigencia}'])
-    headers = ['Categoria']
-    for m in MESES_DISPLAY:
-        headers.extend([f'{m} Prog.', f'{m} Ejec.', f'{m} %'])
-    headers.extend(['Total Prog.', 'Total Ejec.', 'Total %'])
-    ws.append(headers)
-    for cell in ws[2]:
-        cell.font = hf
-        cell.fill = fill
-        cell.border = brd
-        cell.alignment = Alignment(horizontal='center', wrap_text=True)
 
+def _filas_seguimiento(datos):
     for fila in datos:
         row = [fila['fuente']]
         for md in fila['meses']:
             row.extend([float(md['programado']), float(md['ejecutado']), md['pct']])
         row.extend([float(fila['prog_total']), float(fila['ejec_total']), fila['pct_total']])
-        ws.append(row)
+        yield row
 
-    for col in range(1, ws.max_column + 1):
-        ws.column_dimensions[get_column_letter(col)].width = 14
 
-    response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-    response['Content-Disposition'] = f'attachment; filename=seguimiento_{tipo}_{vigencia}.xlsx'
-    wb.save(response)
-    return response
+# tipo: (titulo hoja, color encabezado, (tipo PAC, modelo programado, modelo ejecutado), titulo)
+SEGUIMIENTOS = {
+    'ingresos': ('Seg. Ingresos', '4CAF50', ('INGRESO', PACProgramado, PACEjecutadoPago), 'SEGUIMIENTO PAC INGRESOS'),
+    'gastos': ('Seg. Gastos', '4CAF50', ('GASTO', PACProgramado, PACEjecutadoPago), 'SEGUIMIENTO PAC GASTOS'),
+    'comp_vs_pago': ('Comp. vs Pagos', 'FF5722', ('GASTO', PACEjecutadoCompromiso, PACEjecutadoPago),
+                     'SEGUIMIENTO COMPROMISOS VS PAGOS'),
+}
+
+
+def _hoja_seguimiento(tipo, vigencia, datos):
+    hoja_titulo, color, _, titulo = SEGUIMIENTOS[tipo]
+    headers = ['Categoria']
+    for m in MESES_DISPLAY:
+        headers.extend([f'{m} Prog.', f'{m} Ejec.', f'{m} %'])
+    headers.extend(['Total Prog.', 'Total Ejec.', 'Total %'])
+
+    ws = HojaStream(hoja_titulo, anchos={col: 14 for col in range(1, len(headers) + 1)})
+    ws.fila([titulo + f' - Vigencia {vigencia}'])
+    ws.fila(headers, estilo=f'encabezado_{color}')
+    ws.filas(_filas_seguimiento(datos))
+    return ws
 
 
 @login_required
-def exportar_reporte_fuentes_excel(request):
+def exportar_seguimiento_excel(request, tipo):
     vigencia = int(request.GET.get('vigencia', 2026))
-    wb = Workbook()
-    ws = wb.active
-    ws.title = 'Reporte Categorias'
-    hf = Font(bold=True, color='FFFFFF', size=11)
-    fill = PatternFill(start_color='1565C0', end_color='1565C0', fill_type='solid')
-    brd = Border(left=Side(style='thin'), right=Side(style='thin'), top=Side(style='thin'), bottom=Side(style='thin'))
-
-    ws.append([f'REPORTE POR CATEGORIAS - Vigencia {vigencia}'])
+    if tipo not in SEGUIMIENTOS:
+        tipo = 'comp_vs_pago'
+
+    def generar():
+        libro = LibroStream()
+        libro.agregar_hoja(_hoja_seguimiento(tipo, vigencia, _build_seguimiento(vigencia, *SEGUIMIENTOS[tipo][2])))
+        return libro.generar()
+
+    filename = f'seguimiento_{tipo}_{vigencia}.xlsx'
+    nombre_cache = cache_exportaciones.clave(f'seguimiento_{tipo}', vigencia, 'xlsx')
+    return _respuesta_cacheada(nombre_cache, filename, CONTENT_TYPE_XLSX, generar)
+
+
+def _filas_reporte_categorias(reporte_fuentes):
+    for f in reporte_fuentes:
+        pi, pg, cg, pag = float(f['prog_ingresos']), float(f['prog_gastos']), float(f['comp_gastos']), float(f['pago_gastos'])
+        pai = float(f['pago_ingresos'])
+        yield [
+            f['fuente'], float(f['aim_ingresos']), float(f['aim_gastos']), pi, pg,
+            float(f['comp_ingresos']), cg, pai, pag,
+            round(pai / pi * 100, 1) if pi else 0,
+            round(cg / pg * 100, 1) if pg else 0,
+            round(pag / pg * 100, 1) if pg else 0,
+        ]
+
+
+def _hoja_reporte_categorias(vigencia, reporte_fuentes):
     headers = ['Categoria', 'AIM Ing.', 'AIM Gas.', 'Prog. Ing.', 'Prog. Gas.',
                'Comp. Rec.', 'Comp. Gas.', 'Pagos Rec.', 'Pagos Gas.',
                '% Ejec. Ing.', '% Ejec. Gas.(C)', '% Ejec. Gas.(P)']
-    ws.append(headers)
-    for cell in ws[2]:
-        cell.font = hf
-        cell.fill = fill
-        cell.border = brd
-        cell.alignment = Alignment(horizontal='center', wrap_text=True)
 
-    cat_display_map = dict(AIMInicial.CATEGORIA_CHOICES)
-    categorias = set()
-    for model in [AIMInicial, PACProgramado, PACEjecutadoCompromiso, PACEjecutadoPago]:
-        categorias.update(model.objects.filter(vigencia=vigencia, es_subtotal=False).values_list('categoria', flat=True).distinct())
+    ws = HojaStream('Reporte Categorias', anchos={col: 18 for col in range(1, len(headers) + 1)})
+    ws.fila([f'REPORTE POR CATEGORIAS - Vigencia {vigencia}'])
+    ws.fila(headers, estilo='encabezado_1565C0')
+    ws.filas(_filas_reporte_categorias(reporte_fuentes))
+    return ws
 
-    for cat in sorted(categorias):
-        if not cat:
-            continue
-        bf = {'vigencia': vigencia, 'categoria': cat, 'es_subtotal': False}
-        ai = float(_sum(AIMInicial.objects.filter(tipo='INGRESO', **bf), 'apropiacion_definitiva'))
-        ag = float(_sum(AIMInicial.objects.filter(tipo='GASTO', **bf), 'apropiacion_definitiva'))
-        pi = float(_sum(PACProgramado.objects.filter(tipo='INGRESO', **bf), 'total'))
-        pg = float(_sum(PACProgramado.objects.filter(tipo='GASTO', **bf), 'total'))
-        ci = float(_sum(PACEjecutadoCompromiso.objects.filter(tipo='INGRESO', **bf), 'total'))
-        cg = float(_sum(PACEjecutadoCompromiso.objects.filter(tipo='GASTO', **bf), 'total'))
-        pai = float(_sum(PACEjecutadoPago.objects.filter(tipo='INGRESO', **bf), 'total'))
-        pag = float(_sum(PACEjecutadoPago.objects.filter(tipo='GASTO', **bf), 'total'))
-        ws.append([
-            cat_display_map.get(cat, cat), ai, ag, pi, pg, ci, cg, pai, pag,
-            round(pai / pi * 100, 1) if pi else 0,
-            round(cg / pg * 100, 1) if pg else 0,
-            round(pag / pg * 100, 1) if pg else 0,
-        ])
 
-    for col in range(1, ws.max_column + 1):
-        ws.column_dimensions[get_column_letter(col)].width = 18
+@login_required
+def exportar_reporte_fuentes_excel(request):
+    vigencia = int(request.GET.get('vigencia', 2026))
 
-    response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-    response['Content-Disposition'] = f'attachment; filename=reporte_categorias_{vigencia}.xlsx'
-    wb.save(response)
-    return response
+    def generar():
+        libro = LibroStream()
+        libro.agregar_hoja(_hoja_reporte_categorias(vigencia, _build_reporte_categorias(vigencia)))
+        return libro.generar()
+
+    filename = f'reporte_categorias_{vigencia}.xlsx'
+    nombre_cache = cache_exportaciones.clave('reporte_categorias', vigencia, 'xlsx')
+    return _respuesta_cacheada(nombre_cache, filename, CONTENT_TYPE_XLSX, generar)
 
 
 # ============================================================
-# DESCARGAR PLANTILLAS DE EJEMPLO (basadas en los datos reales)
+# LIBRO CONSOLIDADO (todas las hojas en un solo archivo)
 # ============================================================
+# Hojas de detalle por modulo: (modelo, titulo hoja, color encabezado)
+HOJAS_MODULO = [
+    (AIMInicial, 'AIM Inicial', 'FF9800'),
+    (PACProgramado, 'PAC Programado', 'FFC107'),
+    (PACEjecutadoCompromiso, 'Ejec. Compromisos', '2196F3'),
+    (PACEjecutadoPago, 'Ejec. Pagos', '9C27B0'),
+]
+_COLUMNAS_HOJA_MODULO = [
+    'codigo_rubro', 'nombre_rubro', 'fuente_financiacion',
+    'apropiacion_inicial', 'adiciones', 'reduccion', 'creditos', 'contracreditos', 'apropiacion_definitiva',
+    *MESES, 'total', 'es_subtotal',
+]
+
+
+def _hoja_modulo(titulo, color, registros):
+    headers = ['Codigo', 'Rubro', 'Fuente', 'Apro Inicial', 'Adiciones', 'Reduccion', 'Creditos',
+               'Contracred', 'Apro Definitiva', *MESES_DISPLAY, 'Total']
+    anchos = {1: 35, 2: 45, 3: 10}
+    anchos.update({col: 16 for col in range(4, len(headers) + 1)})
+
+    ws = HojaStream(titulo, anchos=anchos)
+    ws.fila(headers, estilo=f'encabezado_{color}')
+    detalle = [None, None, None] + ['numero'] * (len(headers) - 3)
+    ws.filas((list(r[:-1]), 'subtotal' if r[-1] else detalle) for r in registros)
+    return ws
+
+
+def _trabajos_libro_consolidado(vigencia):
+    """
+    Lee en una sola transaccion todos los datos del libro consolidado y
+    retorna un trabajo (funcion, argumentos) por hoja para construir_libro.
+    """
+    # Misma base de la que leen las consultas (la replica si el request lee de ella)
+    with transaction.atomic(using=router.db_for_read(PACProgramado)):
+        trabajos = []
+        for modelo, titulo, color in HOJAS_MODULO:
+            registros = list(
+                modelo.objects.filter(vigencia=vigencia).order_by('fila_excel', 'id')
+                .values_list(*_COLUMNAS_HOJA_MODULO)
+            )
+            trabajos.append((_hoja_modulo, (titulo, color, registros)))
+        for tipo, (_, _, fuentes, _) in SEGUIMIENTOS.items():
+            trabajos.append((_hoja_seguimiento, (tipo, vigencia, _build_seguimiento(vigencia, *fuentes))))
+        trabajos.append((_hoja_reporte_categorias, (vigencia, _build_reporte_categorias(vigencia))))
+    return trabajos
+
+
+def generar_libro_consolidado(vigencia, destino, procesos=None):
+    """Escribe el libro consolidado en `destino`. Retorna [(titulo hoja, segundos)]."""
+    return construir_libro(_trabajos_libro_consolidado(vigencia), destino, procesos)
+
+
 @login_required
-def descargar_plantilla(request, tipo):
-    """Genera una plantilla Excel con el mismo formato que los archivos reales de la entidad."""
-    wb = Workbook()
-    ws = wb.active
-    brd = Border(left=Side(style='thin'), right=Side(style='thin'), top=Side(style='thin'), bottom=Side(style='thin'))
-    hf = Font(bold=True, color='FFFFFF', size=11)
-    hf_dark = Font(bold=True, size=11)
-    section_font = Font(bold=True, size=10)
+def exportar_libro_consolidado(request):
+    vigencia = int(request.GET.get('vigencia', 2026))
+    nombre_cache = cache_exportaciones.clave('libro_consolidado', vigencia, 'xlsx')
+    ruta = cache_exportaciones.obtener(nombre_cache)
+    if not ruta:
+        def escribir(temporal):
+            with open(temporal, 'wb') as destino:
+                generar_libro_consolidado(vigencia, destino)
+        ruta = cache_exportaciones.guardar_con(nombre_cache, escribir)
+    return FileResponse(open(ruta, 'rb'), as_attachment=True,
+                        filename=f'pac_consolidado_{vigencia}.xlsx', content_type=CONTENT_TYPE_XLSX)
+
+
+# ============================================================
+# EXPORTACIONES EN SEGUNDO PLANO
+# ============================================================
+def _estado_trabajo(trabajo):
+    datos = {
+        'id': trabajo.pk,
+        'estado': trabajo.estado,
+        'estado_display': trabajo.get_estado_display(),
+        'url_estado': reverse('estado_exportacion', args=[trabajo.pk]),
+    }
+    if trabajo.estado == 'TERMINADO':
+        datos['url_descarga'] = reverse('descargar_exportacion', args=[trabajo.pk])
+    elif trabajo.estado == 'ERROR':
+        datos['error'] = trabajo.error.strip().splitlines()[-1] if trabajo.error else ''
+    return datos
+
+
+@login_required
+@require_POST
+def solicitar_exportacion(request):
+    """Encola una exportacion pesada; el navegador consulta luego su estado."""
+    tipo = request.POST.get('tipo', '')
+    vigencia = int(request.POST.get('vigencia', 2026))
+    modulo = request.POST.get('modulo', '')
+    formato = request.POST.get('formato', 'xlsx')
+    if tipo == 'LIBRO_CONSOLIDADO':
+        modulo, formato = '', 'xlsx'
+    elif tipo != 'DATOS' or modulo not in exportacion.TIPOS_EXPORTACION or formato not in exportacion.FORMATOS:
+        return JsonResponse({'error': 'Exportacion no valida'}, status=400)
+    if formato == 'parquet' and not exportacion.parquet_disponible():
+        return JsonResponse({'error': 'Exportacion Parquet no disponible (requiere pyarrow)'}, status=501)
+
+    trabajo, _ = trabajos.solicitar(tipo, vigencia, modulo, formato, usuario=request.user)
+    return JsonResponse(_estado_trabajo(trabajo))
+
+
+@login_required
+def estado_exportacion(request, pk):
+    return JsonResponse(_estado_trabajo(get_object_or_404(TrabajoExportacion, pk=pk)))
+
+
+@login_required
+def descargar_exportacion(request, pk):
+    trabajo = get_object_or_404(TrabajoExportacion, pk=pk, estado='TERMINADO')
+    try:
+        archivo = trabajo.archivo.open('rb')
+    except (ValueError, FileNotFoundError):
+        raise Http404('El archivo ya no esta disponible')
+    return FileResponse(archivo, as_attachment=True, filename=trabajo.nombre_descarga())
 
+
+# ============================================================
+# EXPORTACION MASIVA (CSV / PARQUET)
+# ============================================================
+@login_required
+def exportar_datos(request, tipo):
+    """Detalle completo por rubro de un modulo (o los cuatro unidos) en CSV o Parquet."""
+    vigencia = int(request.GET.get('vigencia', 2026))
+    formato = request.GET.get('formato', 'csv')
+    if tipo not in exportacion.TIPOS_EXPORTACION or formato not in exportacion.FORMATOS:
+        return HttpResponse('Tipo no valido', status=400)
+
+    filename = f'pac_{tipo}_{vigencia}.{formato}'
+    nombre_cache = cache_exportaciones.clave(f'pac_{tipo}', vigencia, formato)
+    if formato == 'csv':
+        def generar():
+            return exportacion.generar_csv(*exportacion.columnas_y_filas(tipo, vigencia))
+        return _respuesta_cacheada(nombre_cache, filename, 'text/csv', generar)
+
+    if not exportacion.parquet_disponible():
+        return HttpResponse('Exportacion Parquet no disponible (requiere pyarrow)', status=501)
+    # Parquet escribe el indice al final del archivo: se genera completo en la cache y se envia desde alli
+    ruta = cache_exportaciones.obtener(nombre_cache)
+    if not ruta:
+        ruta = cache_exportaciones.guardar_con(
+            nombre_cache,
+            lambda destino: exportacion.escribir_parquet(*exportacion.columnas_y_filas(tipo, vigencia), str(destino)),
+        )
+    return FileResponse(open(ruta, 'rb'), as_attachment=True, filename=filename, content_type='application/vnd.apache.parquet')
+
+
+# ============================================================
+# DESCARGAR PLANTILLAS DE EJEMPLO (basadas en los datos reales)
+# ============================================================
+@lru_cache(maxsize=None)
+def _plantilla_xlsx(tipo):
+    """
+    Plantilla Excel con el mismo formato que los archivos reales de la entidad.
+    Su contenido es fijo: se genera una sola vez por proceso.
+    Retorna (filename, contenido).
+    """
     if tipo == 'aim_inicial':
-        ws.title = 'AIM INICIAL'
-        fill = PatternFill(start_color='FF9800', end_color='FF9800', fill_type='solid')
+        hoja_titulo = 'AIM INICIAL'
+        color = 'FF9800'
         titulo = 'PROGRAMACION PLAN ANUAL DE CAJA 2026 - AIM INICIAL'
         filename = 'plantilla_aim_inicial.xlsx'
     elif tipo == 'programado':
-        ws.title = 'PROG PAC INGRESOS-GASTOS 2026'
-        fill = PatternFill(start_color='FFC107', end_color='FFC107', fill_type='solid')
+        hoja_titulo = 'PROG PAC INGRESOS-GASTOS 2026'
+        color = 'FFC107'
         titulo = 'PROGRAMACION PLAN ANUAL DE CAJA 2026'
         filename = 'plantilla_pac_programado.xlsx'
     elif tipo == 'compromisos':
-        ws.title = 'PAC EJECUTADO COMPROMISOS'
-        fill = PatternFill(start_color='2196F3', end_color='2196F3', fill_type='solid')
+        hoja_titulo = 'PAC EJECUTADO COMPROMISOS'
+        color = '2196F3'
         titulo = 'EJECUCION (COMPROMISOS) PLAN ANUAL DE CAJA 2026'
         filename = 'plantilla_pac_ejecutado_compromisos.xlsx'
-    elif tipo == 'pagos':
-        ws.title = 'PAC EJECUTADO PAGOS'
-        fill = PatternFill(start_color='9C27B0', end_color='9C27B0', fill_type='solid')
+    else:
+        hoja_titulo = 'PAC EJECUTADO PAGOS'
+        color = '9C27B0'
         titulo = 'EJECUCION (PAGOS) PLAN ANUAL DE CAJA 2026'
         filename = 'plantilla_pac_ejecutado_pagos.xlsx'
-    else:
-        return HttpResponse('Tipo no valido', status=400)
 
-    # Fila 1: Titulo
-    ws.cell(row=1, column=3, value=titulo).font = Font(bold=True, size=14)
-    ws.merge_cells('C1:I1')
-    # Fila 2: Entidad
-    ws.cell(row=2, column=3, value='ENTIDAD EJEMPLO').font = Font(bold=True, size=12)
-    ws.merge_cells('C2:I2')
-    # Fila 3: vacia
-
-    # Fila 4: Encabezados
-    headers = {
-        'B': 'CODIGO', 'C': 'INGRESOS',
-        'D': 'Apro Inicial', 'E': 'Adiciones', 'F': 'Reduccion',
-        'G': 'Creditos', 'H': 'Contracred', 'I': 'Apro Definitiva',
-        'J': 'Enero', 'K': 'Febrero', 'L': 'Marzo', 'M': 'Abril',
-        'N': 'Mayo', 'O': 'Junio', 'P': 'Julio', 'Q': 'Agosto',
-        'R': 'Septiembre', 'S': 'Octubre', 'T': 'Noviembre', 'U': 'Diciembre',
-        'V': 'Total'
-    }
-    for col_letter, header in headers.items():
-        cell = ws[f'{col_letter}4']
-        cell.value = header
-        cell.font = hf
-        cell.fill = fill
-        cell.border = brd
-        cell.alignment = Alignment(horizontal='center', wrap_text=True)
+    # Anchos: A=8, B=40, C=45, D-V=16
+    anchos = {1: 8, 2: 40, 3: 45}
+    anchos.update({col: 16 for col in range(4, 23)})
+    libro = LibroStream()
+    ws = libro.hoja(hoja_titulo, anchos=anchos, combinadas=['C1:I1', 'C2:I2'])
+
+    # Fila 1: Titulo / Fila 2: Entidad / Fila 3: vacia
+    ws.fila([titulo], estilo='titulo', num_fila=1, columna_inicial=3)
+    ws.fila(['ENTIDAD EJEMPLO'], estilo='subtitulo', num_fila=2, columna_inicial=3)
+
+    # Fila 4: Encabezados (columnas B a V)
+    headers = [
+        'CODIGO', 'INGRESOS',
+        'Apro Inicial', 'Adiciones', 'Reduccion',
+        'Creditos', 'Contracred', 'Apro Definitiva',
+        'Enero', 'Febrero', 'Marzo', 'Abril',
+        'Mayo', 'Junio', 'Julio', 'Agosto',
+        'Septiembre', 'Octubre', 'Noviembre', 'Diciembre',
+        'Total'
+    ]
+    ws.fila(headers, estilo=f'encabezado_{color}', num_fila=4, columna_inicial=2)
 
     # Datos de ejemplo basados en la estructura real
     ejemplo_data = [
@@ -782,40 +1170,27 @@ def descargar_plantilla(request, tipo):
 
     all_data = ejemplo_data + gastos_data
 
-    # Estilos
-    sub_fill = PatternFill(start_color='F5F5F5', end_color='F5F5F5', fill_type='solid')
-    gastos_fill = PatternFill(start_color='FFCDD2', end_color='FFCDD2', fill_type='solid')
-
     for data_row in all_data:
-        fila_num = data_row[0]
-        ws.cell(row=fila_num, column=2, value=data_row[1])  # Codigo
-        ws.cell(row=fila_num, column=3, value=data_row[2])  # Descripcion
-        for col_idx in range(3, 22):
-            val = data_row[col_idx]
-            ws.cell(row=fila_num, column=col_idx + 1, value=val)
-            ws.cell(row=fila_num, column=col_idx + 1).number_format = '#,##0.00'
-
-        # Estilo para filas especiales
+        # Estilo para filas especiales; columnas D-V con formato numerico
         desc = data_row[2].strip().upper()
         if desc == 'GASTOS':
-            for c in range(2, 23):
-                ws.cell(row=fila_num, column=c).fill = gastos_fill
-                ws.cell(row=fila_num, column=c).font = section_font
+            estilo = 'seccion'
         elif data_row[1] in ('A', 'B') or 'TOTAL' in desc:
-            for c in range(2, 23):
-                ws.cell(row=fila_num, column=c).font = Font(bold=True)
-                ws.cell(row=fila_num, column=c).fill = sub_fill
-
-    # Ajustar anchos
-    ws.column_dimensions['A'].width = 8
-    ws.column_dimensions['B'].width = 40
-    ws.column_dimensions['C'].width = 45
-    for col_letter in 'DEFGHIJKLMNOPQRSTUV':
-        ws.column_dimensions[col_letter].width = 16
-
-    response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+            estilo = 'subtotal'
+        else:
+            estilo = [None, None] + ['numero'] * 19
+        ws.fila(list(data_row[1:22]), estilo=estilo, num_fila=data_row[0], columna_inicial=2)
+
+    return filename, b''.join(libro.generar())
+
+
+@login_required
+def descargar_plantilla(request, tipo):
+    if tipo not in ('aim_inicial', 'programado', 'compromisos', 'pagos'):
+        return HttpResponse('Tipo no valido', status=400)
+    filename, contenido = _plantilla_xlsx(tipo)
+    response = HttpResponse(contenido, content_type=CONTENT_TYPE_XLSX)
     response['Content-Disposition'] = f'attachment; filename={filename}'
-    wb.save(response)
     return response
 
 
@@ -834,9 +1209,14 @@ def eliminar_datos(request, tipo):
         }
         if tipo in modelos:
             modelo, nombre = modelos[tipo]
-            count = modelo.objects.filter(vigencia=vigencia).count()
-            modelo.objects.filter(vigencia=vigencia).delete()
-            messages.success(request, f'Se eliminaron {count} registros de {nombre} (Vigencia {vigencia}).')
+            try:
+                # No se borra mientras una carga del mismo modulo y vigencia esta escribiendo
+                with bloqueo_importacion(modelo.MODULO, vigencia, request.user):
+                    count = modelo.objects.filter(vigencia=vigencia).count()
+                    eliminar_modulo(modelo, vigencia)
+                messages.success(request, f'Se eliminaron {count} registros de {nombre} (Vigencia {vigencia}).')
+            except (ImportacionEnCurso, VigenciaArchivada) as e:
+                messages.error(request, str(e))
     return redirect(request.META.get('HTTP_REFERER', '/'))
 
 
@@ -846,19 +1226,29 @@ def eliminar_datos(request, tipo):
 @login_required
 def fuentes_financiacion(request):
     vigencia = int(request.GET.get('vigencia', 2026))
-    fuentes = FuenteFinanciacion.objects.filter(vigencia=vigencia)
+    fuentes = list(FuenteFinanciacion.objects.filter(vigencia=vigencia))
+
+    # Una consulta agrupada por modulo y tipo (mismos totales que los metodos get_total_* del modelo)
+    base = {'vigencia': vigencia, 'fuente_financiacion__in': [f.nombre for f in fuentes]}
+    totales = {
+        nombre: _sum_por(modelo.objects.filter(tipo=tipo, **base), ['fuente_financiacion'])
+        for nombre, modelo, tipo in [
+            ('programado_ing', PACProgramado, 'INGRESO'), ('programado_gas', PACProgramado, 'GASTO'),
+            ('compromisos', PACEjecutadoCompromiso, 'GASTO'), ('pagos', PACEjecutadoPago, 'GASTO'),
+            ('recaudo', PACEjecutadoPago, 'INGRESO'),
+        ]
+    }
     fuentes_data = []
     for fuente in fuentes:
+        fila = {nombre: por_fuente.get((fuente.nombre,), D0) for nombre, por_fuente in totales.items()}
+        compromisos = fila['compromisos']
         fuentes_data.append({
             'obj': fuente,
-            'programado_ing': fuente.get_total_programado_ingresos(),
-            'programado_gas': fuente.get_total_programado_gastos(),
-            'compromisos': fuente.get_total_compromisos(),
-            'pagos': fuente.get_total_pagos_gastos(),
-            'recaudo': fuente.get_total_recaudo(),
-            'saldo': fuente.get_saldo_disponible(),
-            'pct_ejecucion': fuente.get_porcentaje_ejecucion(),
-            'pct_pagos': fuente.get_porcentaje_pagos(),
+            **fila,
+            'saldo': fuente.presupuesto_asignado - compromisos,
+            'pct_ejecucion': round(float(compromisos) / float(fuente.presupuesto_asignado) * 100, 1)
+            if fuente.presupuesto_asignado else 0,
+            'pct_pagos': round(float(fila['pagos']) / float(compromisos) * 100, 1) if compromisos else 0,
         })
     context = {'fuentes_data': fuentes_data, 'vigencia': vigencia}
     return render(request, 'pac/fuentes.html', context)
@@ -869,7 +1259,8 @@ def fuente_crear(request):
     if request.method == 'POST':
         form = FuenteFinanciacionForm(request.POST)
         if form.is_valid():
-            form.save()
+            fuente = form.save()
+            alertas.evaluar(fuente.vigencia, fuentes=[fuente.nombre])
             messages.success(request, 'Fuente de financiacion creada correctamente.')
             return redirect('fuentes_financiacion')
     else:
@@ -881,9 +1272,13 @@ def fuente_crear(request):
 def fuente_editar(request, pk):
     fuente = get_object_or_404(FuenteFinanciacion, pk=pk)
     if request.method == 'POST':
+        anterior = (fuente.vigencia, fuente.nombre)
         form = FuenteFinanciacionForm(request.POST, instance=fuente)
         if form.is_valid():
-            form.save()
+            fuente = form.save()
+            # El presupuesto asignado cambia la regla de sobrecompromiso de la fuente (y de su nombre anterior)
+            alertas.evaluar(anterior[0], fuentes=[anterior[1]])
+            alertas.evaluar(fuente.vigencia, fuentes=[fuente.nombre])
             messages.success(request, 'Fuente de financiacion actualizada correctamente.')
             return redirect('fuentes_financiacion')
     else:
@@ -896,6 +1291,7 @@ def fuente_eliminar(request, pk):
     fuente = get_object_or_404(FuenteFinanciacion, pk=pk)
     if request.method == 'POST':
         fuente.delete()
+        alertas.evaluar(fuente.vigencia, fuentes=[fuente.nombre])
         messages.success(request, 'Fuente de financiacion eliminada correctamente.')
     return redirect('fuentes_financiacion')
 
@@ -903,13 +1299,24 @@ def fuente_eliminar(request, pk):
 @login_required
 def fuente_detalle(request, pk):
     fuente = get_object_or_404(FuenteFinanciacion, pk=pk)
+    # Resumen por rubro de la fuente: series mensuales por tipo sumadas en la base de datos y una fila por rubro
+    rubros = ResumenRubro.objects.filter(vigencia=fuente.vigencia, fuente_financiacion=fuente.nombre)
+    columnas = [f'{prefijo}_{mes}' for prefijo in ('prog', 'comp', 'pago') for mes in MESES]
+    por_tipo = {
+        fila['tipo']: fila
+        for fila in rubros.values('tipo').annotate(**{f'suma_{c}': Sum(c) for c in columnas}).order_by()
+    }
+
+    def serie(tipo, prefijo):
+        fila = por_tipo.get(tipo, {})
+        return [fila.get(f'suma_{prefijo}_{mes}') or D0 for mes in MESES]
+
     datos_mensuales = []
-    for i, mes in enumerate(MESES):
-        prog_ing = _sum(PACProgramado.objects.filter(vigencia=fuente.vigencia, tipo='INGRESO', fuente_financiacion=fuente.nombre, es_subtotal=False), mes)
-        prog_gas = _sum(PACProgramado.objects.filter(vigencia=fuente.vigencia, tipo='GASTO', fuente_financiacion=fuente.nombre, es_subtotal=False), mes)
-        comp = _sum(PACEjecutadoCompromiso.objects.filter(vigencia=fuente.vigencia, tipo='GASTO', fuente_financiacion=fuente.nombre, es_subtotal=False), mes)
-        pago = _sum(PACEjecutadoPago.objects.filter(vigencia=fuente.vigencia, tipo='GASTO', fuente_financiacion=fuente.nombre, es_subtotal=False), mes)
-        recaudo = _sum(PACEjecutadoPago.objects.filter(vigencia=fuente.vigencia, tipo='INGRESO', fuente_financiacion=fuente.nombre, es_subtotal=False), mes)
+    series = zip(
+        serie('INGRESO', 'prog'), serie('GASTO', 'prog'), serie('GASTO', 'comp'), serie('GASTO', 'pago'),
+        serie('INGRESO', 'pago'),
+    )
+    for i, (prog_ing, prog_gas, comp, pago, recaudo) in enumerate(series):
         datos_mensuales.append({
             'mes': MESES_DISPLAY[i],
             'prog_ing': prog_ing, 'prog_gas': prog_gas,
@@ -918,8 +1325,9 @@ def fuente_detalle(request, pk):
             'pct_pago': round(float(pago) / float(prog_gas) * 100, 1) if prog_gas else 0,
         })
 
-    rubros_ingreso = PACProgramado.objects.filter(vigencia=fuente.vigencia, tipo='INGRESO', fuente_financiacion=fuente.nombre, es_subtotal=False).values('codigo_rubro', 'nombre_rubro', 'total')
-    rubros_gasto = PACProgramado.objects.filter(vigencia=fuente.vigencia, tipo='GASTO', fuente_financiacion=fuente.nombre, es_subtotal=False).values('codigo_rubro', 'nombre_rubro', 'total')
+    rubros_ingreso, rubros_gasto = [], []
+    for rubro in rubros.filter(en_programado=True).values('tipo', 'codigo_rubro', 'nombre_rubro', total=F('prog_total')):
+        (rubros_ingreso if rubro['tipo'] == 'INGRESO' else rubros_gasto).append(rubro)
 
     context = {
         'fuente': fuente, 'datos_mensuales': datos_mensuales,
@@ -934,3 +1342,37 @@ def fuente_detalle(request, pk):
         'pct_ejecucion': fuente.get_porcentaje_ejecucion(),
     }
     return render(request, 'pac/fuente_detalle.html', context)
+
+
+# ============================================================
+# RENDIMIENTO
+# ============================================================
+@staff_member_required
+def rendimiento_vistas(request):
+    """Histogramas de latencia y consultas por vista acumulados en este proceso."""
+    return JsonResponse(estadisticas_vistas())
+
+
+def _solicitud_local(request):
+    """Solicitud hecha desde el propio host, sin pasar por un proxy (que la haria parecer local)."""
+    if 'X-Forwarded-For' in request.headers:
+        return False
+    try:
+        return ipaddress.ip_address(request.META.get('REMOTE_ADDR', '')).is_loopback
+    except ValueError:
+        return False
+
+
+def metricas_prometheus(request):
+    """
+    Metricas de todos los procesos en formato Prometheus. Sin sesion: con PAC_METRICAS_TOKEN exige
+    'Authorization: Bearer <token>'; sin token solo responde a solicitudes locales.
+    """
+    token = getattr(settings, 'PAC_METRICAS_TOKEN', '')
+    if token:
+        if not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+            return HttpResponse('No autorizado', status=401, content_type='text/plain')
+    elif not _solicitud_local(request):
+        return HttpResponse('Defina PAC_METRICAS_TOKEN para consultar las metricas desde otro host',
+                            status=403, content_type='text/plain')
+    return HttpResponse(metricas.exponer(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,370 @@
+"""
+Escritor OOXML (xlsx) en streaming con memoria constante.
+
+Genera el libro directamente como XML dentro de un ZIP escrito sobre un
+buffer que se vacia despues de cada bloque de filas, de modo que los primeros
+bytes llegan al cliente antes de terminar el libro y el uso de memoria no
+crece con el numero de filas.
+
+Los estilos son estilos con nombre (ESTILOS); cada celda referencia su estilo
+por nombre en lugar de crear objetos Font/Fill/Border por celda.
+
+Uso:
+    libro = LibroStream()
+    hoja = libro.hoja('Datos', anchos={1: 40}, combinadas=['C1:I1'])
+    hoja.fila(['Titulo'], estilo='titulo')
+    ...
+    response = StreamingHttpResponse(libro.generar(), content_type=CONTENT_TYPE_XLSX)
+
+Las filas de cada hoja se generan de forma perezosa: `hoja.filas(iterable)`
+acepta un generador que solo se consume durante `libro.generar()`.
+"""
+
+import zipfile
+import math
+from decimal import Decimal
+from xml.sax.saxutils import escape
+
+from openpyxl.utils import get_column_letter
+
+
+CONTENT_TYPE_XLSX = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# Estilos con nombre: font, fill (color RGB o None), borde, alineacion, formato numerico
+ESTILOS = {
+    'normal': {},
+    'titulo': {'bold': True, 'size': 14},
+    'subtitulo': {'bold': True, 'size': 12},
+    'encabezado': {'bold': True, 'color': 'FFFFFF', 'size': 11, 'borde': True, 'centrado': True},
+    'numero': {'formato': '#,##0.00'},
+    'porcentaje': {'formato': '0.0'},
+    'negrita': {'bold': True},
+    'subtotal': {'bold': True, 'fill': 'F5F5F5', 'formato': '#,##0.00'},
+    'seccion': {'bold': True, 'size': 10, 'fill': 'FFCDD2', 'formato': '#,##0.00'},
+}
+
+# Los encabezados se colorean por modulo; cada color genera una variante 'encabezado_<RGB>'
+COLORES_ENCABEZADO = ['4CAF50', 'FF5722', '1565C0', 'FF9800', 'FFC107', '2196F3', '9C27B0']
+for _color in COLORES_ENCABEZADO:
+    ESTILOS[f'encabezado_{_color}'] = dict(ESTILOS['encabezado'], fill=_color)
+
+_TAMANO_BLOQUE = 64 * 1024
+
+
+class _BufferSalida:
+    """Destino no buscable para zipfile: acumula bytes hasta que se vacian."""
+
+    def __init__(self):
+        self._partes = []
+        self._posicion = 0
+
+    def write(self, datos):
+        self._partes.append(bytes(datos))
+        self._posicion += len(datos)
+        return len(datos)
+
+    def tell(self):
+        return self._posicion
+
+    def flush(self):
+        pass
+
+    def vaciar(self):
+        datos = b''.join(self._partes)
+        self._partes = []
+        return datos
+
+
+def _tabla_estilos():
+    """Construye styles.xml y el indice {nombre_estilo: xf_id}."""
+    fuentes = ['<font><sz val="11"/><name val="Calibri"/></font>']
+    rellenos = ['<fill><patternFill patternType="none"/></fill>', '<fill><patternFill patternType="gray125"/></fill>']
+    bordes = ['<border><left/><right/><top/><bottom/><diagonal/></border>',
+              '<border><left style="thin"/><right style="thin"/><top style="thin"/><bottom style="thin"/><diagonal/></border>']
+    formatos = {}
+    xfs = ['<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>']
+    estilos_nombrados = ['<cellStyle name="Normal" xfId="0" builtinId="0"/>']
+    indice = {}
+    for nombre, est in ESTILOS.items():
+        if nombre == 'normal':
+            indice[nombre] = 0
+            continue
+        font = '<font>{b}<sz val="{sz}"/>{c}<name val="Calibri"/></font>'.format(
+            b='<b/>' if est.get('bold') else '',
+            sz=est.get('size', 11),
+            c=f'<color rgb="FF{est["color"]}"/>' if est.get('color') else '',
+        )
+        fuentes.append(font)
+        font_id = len(fuentes) - 1
+        fill_id = 0
+        if est.get('fill'):
+            rellenos.append(
+                f'<fill><patternFill patternType="solid"><fgColor rgb="FF{est["fill"]}"/>'
+                f'<bgColor rgb="FF{est["fill"]}"/></patternFill></fill>'
+            )
+            fill_id = len(rellenos) - 1
+        num_fmt_id = 0
+        if est.get('formato'):
+            num_fmt_id = formatos.setdefault(est['formato'], 164 + len(formatos))
+        atributos = [
+            f'numFmtId="{num_fmt_id}"', f'fontId="{font_id}"', f'fillId="{fill_id}"',
+            f'borderId="{1 if est.get("borde") else 0}"', 'xfId="0"', 'applyFont="1"',
+        ]
+        if fill_id:
+            atributos.append('applyFill="1"')
+        if num_fmt_id:
+            atributos.append('applyNumberFormat="1"')
+        if est.get('borde'):
+            atributos.append('applyBorder="1"')
+        if est.get('centrado'):
+            atributos.append('applyAlignment="1"')
+            xfs.append(f'<xf {" ".join(atributos)}><alignment horizontal="center" wrapText="1"/></xf>')
+        else:
+            xfs.append(f'<xf {" ".join(atributos)}/>')
+        indice[nombre] = len(xfs) - 1
+
+    num_fmts = ''.join(
+        f'<numFmt numFmtId="{fid}" formatCode="{escape(codigo)}"/>' for codigo, fid in formatos.items()
+    )
+    xml = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+        f'<numFmts count="{len(formatos)}">{num_fmts}</numFmts>'
+        f'<fonts count="{len(fuentes)}">{"".join(fuentes)}</fonts>'
+        f'<fills count="{len(rellenos)}">{"".join(rellenos)}</fills>'
+        f'<borders count="{len(bordes)}">{"".join(bordes)}</borders>'
+        '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+        f'<cellXfs count="{len(xfs)}">{"".join(xfs)}</cellXfs>'
+        f'<cellStyles count="{len(estilos_nombrados)}">{"".join(estilos_nombrados)}</cellStyles>'
+        '</styleSheet>'
+    )
+    return xml, indice
+
+
+STYLES_XML, INDICE_ESTILOS = _tabla_estilos()
+
+
+def _celda(ref, valor, estilo_id):
+    s = f' s="{estilo_id}"' if estilo_id else ''
+    if valor is None or valor == '':
+        return f'<c r="{ref}"{s}/>' if estilo_id else ''
+    if isinstance(valor, bool):
+        return f'<c r="{ref}"{s} t="b"><v>{int(valor)}</v></c>'
+    if isinstance(valor, (int, float, Decimal)) and math.isfinite(valor):
+        # Los valores enteros se escriben sin parte decimal, igual que openpyxl
+        if valor == int(valor):
+            valor = int(valor)
+        elif isinstance(valor, float):
+            valor = repr(valor)
+        return f'<c r="{ref}"{s}><v>{valor}</v></c>'
+    texto = escape(str(valor))
+    return f'<c r="{ref}"{s} t="inlineStr"><is><t xml:space="preserve">{texto}</t></is></c>'
+
+
+def fila_xml(num_fila, valores, estilo=None, columna_inicial=1):
+    """
+    XML de una fila. `estilo` puede ser un nombre de estilo para toda la fila
+    o una lista con un nombre (o None) por celda.
+    """
+    celdas = []
+    for i, valor in enumerate(valores):
+        est = estilo[i] if isinstance(estilo, (list, tuple)) else estilo
+        ref = f'{get_column_letter(columna_inicial + i)}{num_fila}'
+        celdas.append(_celda(ref, valor, INDICE_ESTILOS.get(est or 'normal', 0)))
+    return f'<row r="{num_fila}">{"".join(celdas)}</row>'
+
+
+class HojaStream:
+    """Hoja de un LibroStream. Las filas se agregan en orden creciente."""
+
+    def __init__(self, titulo, anchos=None, combinadas=None):
+        self.titulo = titulo[:31]
+        self.anchos = anchos or {}
+        self.combinadas = combinadas or []
+        self._fuentes = []
+
+    def fila(self, valores, estilo=None, num_fila=None, columna_inicial=1):
+        """Agrega una fila. num_fila permite dejar filas vacias (debe ser creciente)."""
+        self._fuentes.append([(num_fila, valores, estilo, columna_inicial)])
+
+    def filas(self, iterable, estilo=None):
+        """
+        Agrega filas perezosas desde un iterable. Cada elemento es una lista de
+        valores o una tupla (valores, estilo) para sobreescribir el estilo.
+        """
+        self._fuentes.append(
+            (None, *item, 1) if isinstance(item, tuple) else (None, item, estilo, 1)
+            for item in iterable
+        )
+
+    def encabezado_xml(self):
+        cols = ''
+        if self.anchos:
+            cols = '<cols>' + ''.join(
+                f'<col min="{c}" max="{c}" width="{w}" customWidth="1"/>' for c, w in sorted(self.anchos.items())
+            ) + '</cols>'
+        return (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+            f'{cols}<sheetData>'
+        )
+
+    def pie_xml(self):
+        merges = ''
+        if self.combinadas:
+            merges = f'<mergeCells count="{len(self.combinadas)}">' + ''.join(
+                f'<mergeCell ref="{rango}"/>' for rango in self.combinadas
+            ) + '</mergeCells>'
+        return f'</sheetData>{merges}</worksheet>'
+
+    def iter_xml(self):
+        """Genera el XML de la hoja por partes (encabezado, filas, pie)."""
+        yield self.encabezado_xml()
+        siguiente = 1
+        for fuente in self._fuentes:
+            for num, valores, estilo, col in fuente:
+                num = num or siguiente
+                siguiente = num + 1
+                yield fila_xml(num, valores, estilo, col)
+        yield self.pie_xml()
+
+    def escribir_xml(self, destino):
+        """Escribe el XML completo de la hoja en un archivo abierto en modo binario."""
+        pendiente = []
+        for parte in self.iter_xml():
+            pendiente.append(parte)
+            if len(pendiente) >= 500:
+                destino.write(''.join(pendiente).encode('utf-8'))
+                pendiente = []
+        destino.write(''.join(pendiente).encode('utf-8'))
+
+
+class HojaArchivo:
+    """Hoja cuyo XML ya fue generado (por ejemplo en otro proceso) y esta guardado en un archivo."""
+
+    def __init__(self, titulo, ruta):
+        self.titulo = titulo[:31]
+        self.ruta = ruta
+
+    def iter_xml(self):
+        with open(self.ruta, 'rb') as origen:
+            while True:
+                bloque = origen.read(_TAMANO_BLOQUE)
+                if not bloque:
+                    break
+                yield bloque
+
+
+def _workbook_xml(titulos):
+    hojas = ''.join(
+        f'<sheet name="{escape(t)}" sheetId="{i}" r:id="rId{i}"/>' for i, t in enumerate(titulos, start=1)
+    )
+    return (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        f'<sheets>{hojas}</sheets></workbook>'
+    )
+
+
+def _workbook_rels(n_hojas):
+    rels = ''.join(
+        f'<Relationship Id="rId{i}" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        f'Target="worksheets/sheet{i}.xml"/>' for i in range(1, n_hojas + 1)
+    )
+    rels += (
+        f'<Relationship Id="rId{n_hojas + 1}" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>'
+    )
+    return (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        f'<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">{rels}</Relationships>'
+    )
+
+
+def _content_types(n_hojas):
+    hojas = ''.join(
+        f'<Override PartName="/xl/worksheets/sheet{i}.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        for i in range(1, n_hojas + 1)
+    )
+    return (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/styles.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+        f'{hojas}</Types>'
+    )
+
+
+_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/></Relationships>'
+)
+
+
+class LibroStream:
+    """Libro xlsx que se escribe en streaming."""
+
+    def __init__(self):
+        self.hojas = []
+
+    def hoja(self, titulo, anchos=None, combinadas=None):
+        hoja = HojaStream(titulo, anchos=anchos, combinadas=combinadas)
+        self.hojas.append(hoja)
+        return hoja
+
+    def agregar_hoja(self, hoja):
+        """Agrega una hoja ya construida (HojaStream o HojaArchivo)."""
+        self.hojas.append(hoja)
+        return hoja
+
+    def generar(self):
+        """Generador de bytes del archivo xlsx; cada bloque se puede enviar de inmediato."""
+        salida = _BufferSalida()
+        with zipfile.ZipFile(salida, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+            for nombre, contenido in self._partes_fijas():
+                zf.writestr(nombre, contenido)
+            yield salida.vaciar()
+
+            for i, hoja in enumerate(self.hojas, start=1):
+                with zf.open(f'xl/worksheets/sheet{i}.xml', 'w', force_zip64=True) as destino:
+                    pendiente = []
+                    tamano = 0
+                    for parte in hoja.iter_xml():
+                        datos = parte if isinstance(parte, bytes) else parte.encode('utf-8')
+                        pendiente.append(datos)
+                        tamano += len(datos)
+                        if tamano >= _TAMANO_BLOQUE:
+                            destino.write(b''.join(pendiente))
+                            pendiente, tamano = [], 0
+                            bloque = salida.vaciar()
+                            if bloque:
+                                yield bloque
+                    destino.write(b''.join(pendiente))
+                bloque = salida.vaciar()
+                if bloque:
+                    yield bloque
+        yield salida.vaciar()
+
+    def _partes_fijas(self):
+        n = len(self.hojas)
+        return [
+            ('[Content_Types].xml', _content_types(n)),
+            ('_rels/.rels', _ROOT_RELS),
+            ('xl/workbook.xml', _workbook_xml([h.titulo for h in self.hojas])),
+            ('xl/_rels/workbook.xml.rels', _workbook_rels(n)),
+            ('xl/styles.xml', STYLES_XML),
+        ]
+
+    def guardar(self, destino):
+        """Escribe el libro completo en un archivo abierto en modo binario."""
+        for bloque in self.generar():
+            destino.write(bloque)
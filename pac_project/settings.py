@@ -34,6 +34,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'pac.middleware.InstrumentacionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -43,6 +44,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'pac.middleware.ReplicaLecturaMiddleware',
+    'pac.middleware.PerfilamientoMiddleware',
 ]
 
 ROOT_URLCONF = 'pac_project.urls'
@@ -65,12 +68,50 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'pac_project.wsgi.application'
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# PostgreSQL en produccion con PAC_DB_MOTOR=postgresql; SQLite (db.sqlite3) por defecto para desarrollo
+if os.environ.get('PAC_DB_MOTOR') == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('PAC_DB_NOMBRE', 'pac'),
+            'USER': os.environ.get('PAC_DB_USUARIO', 'pac'),
+            'PASSWORD': os.environ.get('PAC_DB_CLAVE', ''),
+            'HOST': os.environ.get('PAC_DB_HOST', 'localhost'),
+            'PORT': os.environ.get('PAC_DB_PUERTO', '5432'),
+            # Conexiones persistentes por worker, verificadas antes de reutilizarlas en cada request
+            'CONN_MAX_AGE': int(os.environ.get('PAC_DB_CONN_MAX_AGE', 300)),
+            'CONN_HEALTH_CHECKS': True,
+            # Detras de PgBouncer en modo transaccion los cursores del lado del servidor no sobreviven
+            'DISABLE_SERVER_SIDE_CURSORS': os.environ.get('PAC_DB_PGBOUNCER') == '1',
+            'OPTIONS': {'connect_timeout': 10},
+        }
     }
-}
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+            # Segundos que una escritura espera el bloqueo de otra antes de fallar con "database is locked"
+            'OPTIONS': {'timeout': 20},
+            # Base de pruebas en archivo y no en memoria: las pruebas de concurrencia abren una conexion por
+            # hilo y verifican el modo WAL
+            'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
+        }
+    }
+
+# Replica de solo lectura opcional para las vistas de consulta y las exportaciones (ver pac/enrutador.py):
+# PAC_DB_REPLICA_HOST con PostgreSQL, o PAC_DB_REPLICA con la ruta de una copia SQLite (comando refrescar_replica)
+if os.environ.get('PAC_DB_MOTOR') == 'postgresql' and os.environ.get('PAC_DB_REPLICA_HOST'):
+    DATABASES['replica'] = {**DATABASES['default'], 'HOST': os.environ['PAC_DB_REPLICA_HOST']}
+elif os.environ.get('PAC_DB_MOTOR') != 'postgresql' and os.environ.get('PAC_DB_REPLICA'):
+    DATABASES['replica'] = {**DATABASES['default'], 'NAME': os.environ['PAC_DB_REPLICA']}
+if 'replica' in DATABASES:
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+
+DATABASE_ROUTERS = ['pac.enrutador.EnrutadorReplica']
+
+# Segundos que un usuario lee de la primaria despues de escribir (importar, editar), para ver sus cambios
+PAC_REPLICA_LECTURA_PROPIA_SEGUNDOS = 60
 
 AUTH_PASSWORD_VALIDATORS = []
 
@@ -91,3 +132,88 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 LOGIN_URL = '/login/'
 LOGIN_REDIRECT_URL = '/'
 LOGOUT_REDIRECT_URL = '/login/'
+
+# Agregaciones sobre columnas en centavos enteros (BIGINT) en lugar de Decimal.
+# Con False se usan las columnas Decimal originales.
+PAC_ARITMETICA_CENTAVOS = True
+
+# Tamano maximo de la cache de archivos exportados en MEDIA_ROOT/exportaciones (LRU)
+PAC_CACHE_EXPORTACIONES_MB = 200
+
+# Procesos para construir en paralelo las hojas del libro consolidado (None = segun CPUs, maximo 4)
+PAC_EXPORTACION_PROCESOS = None
+
+# Horas que se conservan los archivos de las exportaciones en segundo plano
+PAC_EXPORTACION_RETENCION_HORAS = 24
+
+# Segundos entre latidos del worker mientras construye una exportacion; un trabajo EN_PROCESO sin latido
+# durante tres intervalos (worker caido) se vuelve a encolar
+PAC_EXPORTACION_LATIDO_SEGUNDOS = 30
+
+# Instrumentacion por request (pac.middleware): se registra en el log 'pac.rendimiento'
+# todo request que supere alguno de estos presupuestos
+PAC_PRESUPUESTO_CONSULTAS = 50
+PAC_PRESUPUESTO_MS = 1000
+
+# Medir la memoria pico de cada importacion con tracemalloc. Solo para diagnostico: la carga tarda unas tres
+# veces mas y los tiempos por etapa quedan distorsionados; con False memoria_pico_kb queda vacio
+PAC_IMPORTACION_MEDIR_MEMORIA = False
+
+# Perfiles de requests (?perfilar=1, solo staff) que se conservan
+PAC_PERFILES_MAXIMO = 100
+
+# SQLite en modo WAL (ver pac/concurrencia.py): las lecturas no se bloquean durante las importaciones
+PAC_SQLITE_WAL = True
+
+# Cargar las importaciones con COPY en PostgreSQL (ver pac/insercion.py); False usa bulk_create
+PAC_IMPORTACION_COPY = True
+
+# Minutos tras los cuales se descarta el bloqueo de una importacion que no termino (proceso caido)
+PAC_IMPORTACION_BLOQUEO_MINUTOS = 30
+
+# Segundos que se conservan en cache las comparaciones, proyecciones y simulaciones (se invalidan antes si
+# cambian los datos)
+PAC_COMPARACION_CACHE_SEGUNDOS = 3600
+
+# Las comparaciones, proyecciones y simulaciones van en su propia cache ('pac', ver consultas.cache_resultados):
+# vaciarla no toca la cache por defecto ni lo que otras aplicaciones guarden en ella
+CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'pac': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'pac-resultados'},
+}
+
+# Escenarios por defecto de la simulacion de liquidez y procesos que los calculan (None = segun CPUs, maximo 4)
+PAC_SIMULACION_ESCENARIOS = 5000
+PAC_SIMULACION_PROCESOS = None
+
+# Umbrales del motor de alertas (ver pac/alertas.py): ejecucion acumulada minima y critica (% del programado),
+# salto entre meses (veces el mes anterior) y monto minimo en pesos para evaluar un rubro o mes
+PAC_ALERTA_EJECUCION_MINIMA = 50
+PAC_ALERTA_EJECUCION_CRITICA = 25
+PAC_ALERTA_SALTO_MENSUAL = 3.0
+PAC_ALERTA_MONTO_MINIMO = 1000000
+
+# Directorio de las vigencias archivadas, un archivo SQLite de solo lectura por año (ver pac/archivado.py)
+PAC_ARCHIVO_DIR = Path(os.environ.get('PAC_ARCHIVO_DIR', BASE_DIR / 'archivo_vigencias'))
+
+# Metricas Prometheus (/metrics): archivo SQLite compartido por todos los procesos,
+# segundos entre volcados de cada proceso y token (Authorization: Bearer <token>). Sin token
+# /metrics solo responde a solicitudes locales directas; un Prometheus en otro host o detras
+# de un proxy necesita el token
+PAC_METRICAS_DB = BASE_DIR / 'metricas.sqlite3'
+PAC_METRICAS_INTERVALO = 5
+PAC_METRICAS_TOKEN = os.environ.get('PAC_METRICAS_TOKEN', '')
+
+# Las pruebas escriben las metricas en un archivo temporal y no en PAC_METRICAS_DB (ver pac/tests/runner.py)
+TEST_RUNNER = 'pac.tests.runner.EjecutorPruebas'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'pac': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}